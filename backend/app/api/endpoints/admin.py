@@ -1,26 +1,34 @@
 """管理画面用APIエンドポイント"""
 
-from fastapi import APIRouter, HTTPException, Request, Depends
+from fastapi import APIRouter, HTTPException, Request, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text
 from datetime import datetime
 from typing import List, Optional, Dict, Any, Tuple
 from collections import OrderedDict
 
-from app.db.connection import get_db_session, get_asyncpg_connection, release_asyncpg_connection
-from app.models import FormSubmission, ButtonClick, DiagnosisResult
+from app.core.http_cache import master_data_cache
+from app.db.connection import get_db_session, acquire_connection
+from app.models import FormSubmission, ButtonClick, DiagnosisResult, DiagnosisResultView
+from app.services.diagnosis_storage import compact_enabled
+from app.services.partition_maintenance import history_lower_bound
 from pydantic import BaseModel
 
 router = APIRouter()
 
 
+def _diagnosis_result_model():
+    """診断結果の読み取り元（DIAGNOSIS_STORAGE=compact では配列形式も含む互換ビュー）"""
+    return DiagnosisResultView if compact_enabled() else DiagnosisResult
+
+
 async def convert_matching_results_to_csv_format(
     matching_results: List[Dict],
     industry: str,
     target_segment: str
 ) -> List[Dict[str, Any]]:
     """
-    execute_matching_logic + apply_recommended_talents_integrationの結果を
+    run_matching_pipeline（STEP 0-5）の結果を
     16列CSV形式に変換
     """
     if not matching_results:
@@ -29,8 +37,7 @@ async def convert_matching_results_to_csv_format(
     # account_idリストを取得
     account_ids = [result['account_id'] for result in matching_results]
 
-    conn = await get_asyncpg_connection()
-    try:
+    async with acquire_connection() as conn:
         # 追加データ一括取得（Enhanced_matching_debugと同様）
         additional_query = """
         SELECT
@@ -65,9 +72,6 @@ async def convert_matching_results_to_csv_format(
         for row in additional_rows:
             additional_data[row['account_id']] = dict(row)
 
-    finally:
-        await release_asyncpg_connection(conn)
-
     # 16列形式に変換
     detailed_results = []
 
@@ -146,6 +150,23 @@ async def convert_matching_results_to_csv_format(
 class BookingLinkUpdate(BaseModel):
     booking_url: str
 
+
+class ImageAdjustmentBand(BaseModel):
+    upper: float  # PERCENT_RANK の上限値（昇順、最後は 1.0）
+    points: float  # 加減点
+
+
+class ScoringVariantRequest(BaseModel):
+    vr_weight: float = 0.5
+    tpr_weight: float = 0.5
+    bands: Optional[List[ImageAdjustmentBand]] = None  # 未指定は本番と同じ加減点テーブル
+
+
+class ScoringSimulationRequest(BaseModel):
+    variant: ScoringVariantRequest
+    baseline: Optional[ScoringVariantRequest] = None  # 未指定は本番と同じ設定
+    reload: bool = False  # スコアリングデータを読み込み直す
+
 @router.get("/admin/form-submissions")
 async def get_form_submissions(
     request: Request,
@@ -211,6 +232,38 @@ async def get_form_submissions(
         raise HTTPException(status_code=500, detail=f"フォーム送信データ取得エラー: {str(e)}")
 
 
+@router.get("/admin/form-submissions/search")
+async def search_form_submissions(
+    q: Optional[str] = Query(None, max_length=100, description="会社名・担当者名・メールアドレスの部分一致"),
+    industry: Optional[str] = Query(None, description="業種"),
+    target_segment: Optional[str] = Query(None, description="ターゲット層"),
+    budget_range: Optional[str] = Query(None, description="予算"),
+    created_from: Optional[datetime] = Query(None, description="作成日時（以降）"),
+    created_to: Optional[datetime] = Query(None, description="作成日時（より前）"),
+    limit: int = Query(50, ge=1, le=200, description="1ページの件数"),
+    cursor: Optional[str] = Query(None, description="前ページの next_cursor"),
+):
+    """フォーム送信検索API
+
+    フリーテキスト検索と絞り込みを組み合わせ、新しい順に1ページずつ返します。
+    次ページは next_cursor を cursor に指定して取得します（has_more が false なら最終ページ）。
+    """
+    from app.services.submission_search import InvalidCursorError, SubmissionSearch, search_submissions
+
+    search = SubmissionSearch(
+        q=q, industry=industry, target_segment=target_segment, budget_range=budget_range,
+        created_from=created_from, created_to=created_to, limit=limit, cursor=cursor,
+    )
+    try:
+        async with acquire_connection() as conn:
+            return await search_submissions(conn, search)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"❌ フォーム送信検索エラー: {e}")
+        raise HTTPException(status_code=500, detail=f"フォーム送信検索エラー: {str(e)}")
+
+
 @router.get("/admin/button-clicks")
 async def get_button_clicks(
     request: Request,
@@ -333,12 +386,17 @@ async def export_form_data_csv(
                 END as button_clicked,
                 bc.clicked_at as button_clicked_at
             FROM form_submissions fs
-            LEFT JOIN (
-                SELECT DISTINCT ON (session_id) session_id, clicked_at
+            LEFT JOIN LATERAL (
+                -- 送信ごとに最新の予約クリック1件（全クリックの DISTINCT ON を避け、
+                -- clicked_at の下限で送信月以降のパーティションだけを参照する）
+                SELECT fs.session_id, clicked_at
                 FROM button_clicks
-                WHERE button_type = 'counseling_booking'
-                ORDER BY session_id, clicked_at DESC
-            ) bc ON fs.session_id = bc.session_id
+                WHERE form_submission_id = fs.id
+                  AND button_type = 'counseling_booking'
+                  AND clicked_at >= fs.created_at - INTERVAL '1 day'
+                ORDER BY clicked_at DESC
+                LIMIT 1
+            ) bc ON TRUE
             ORDER BY fs.created_at DESC
         """)
 
@@ -453,6 +511,8 @@ async def update_booking_link(
             "industry_id": industry_id
         })
         await db.commit()
+        # 診断結果ページ向けに保持しているレスポンスを破棄（他プロセスは HTTP_CACHE_TTL_SECONDS で反映）
+        master_data_cache.invalidate("booking-link:")
 
         # 更新されたデータを取得して返却
         select_query = text("""
@@ -483,23 +543,22 @@ async def update_booking_link(
 @router.get("/booking-link/{industry_name}")
 async def get_booking_link_by_industry(
     industry_name: str,
-    db: AsyncSession = Depends(get_db_session)
+    request: Request,
 ):
     """業界名による予約リンク取得API
 
     診断結果ページで使用する、業界名による予約リンク取得エンドポイント。
+    レスポンスは ETag・Cache-Control 付きで返す（app.core.http_cache）。
     """
-    try:
+    async def fetch_booking_link():
         # 業界名で予約リンクを取得
-        query = text("""
-            SELECT booking_url
-            FROM industry_booking_links
-            WHERE industry_name = :industry_name
-        """)
-        result = await db.execute(query, {"industry_name": industry_name})
-        booking_link = result.fetchone()
+        async with acquire_connection() as conn:
+            booking_url = await conn.fetchval(
+                "SELECT booking_url FROM industry_booking_links WHERE industry_name = $1",
+                industry_name,
+            )
 
-        if not booking_link:
+        if not booking_url:
             # デフォルトリンクを返す
             return {
                 "booking_url": "https://app.spirinc.com/t/W63rJQN01CTXR-FjsFaOr/as/8FtIxQriLEvZxYqBlbzib/confirm",
@@ -507,10 +566,13 @@ async def get_booking_link_by_industry(
             }
 
         return {
-            "booking_url": booking_link.booking_url,
+            "booking_url": booking_url,
             "industry_name": industry_name
         }
 
+    try:
+        return await master_data_cache.respond(request, f"booking-link:{industry_name}", fetch_booking_link)
+
     except Exception as e:
         print(f"❌ 業界別予約リンク取得エラー: {e}")
         # エラーの場合もデフォルトリンクを返す
@@ -546,9 +608,12 @@ async def get_submission_diagnosis(
             raise HTTPException(status_code=404, detail=f"フォーム送信ID {submission_id} が見つかりません")
 
         # 診断結果を取得（順位順）
-        diagnosis_query = select(DiagnosisResult).where(
-            DiagnosisResult.form_submission_id == submission_id
-        ).order_by(DiagnosisResult.ranking)
+        # created_at の下限で対象月のパーティションだけを参照する
+        result_model = _diagnosis_result_model()
+        diagnosis_query = select(result_model).where(
+            result_model.form_submission_id == submission_id,
+            result_model.created_at >= history_lower_bound(submission.created_at),
+        ).order_by(result_model.ranking)
 
         diagnosis_result = await db.execute(diagnosis_query)
         diagnosis_results = diagnosis_result.scalars().all()
@@ -698,58 +763,11 @@ async def get_diagnosis_results_for_csv(
                 detail=f"送信ID {submission_id} が見つかりません"
             )
 
-        # matching.pyと同じロジックでデータを取得（正しい予算フィルタリング実装）
-        from app.api.endpoints.matching import execute_matching_logic, get_matching_parameters, apply_recommended_talents_integration
-        from app.schemas.matching import MatchingFormData
-
-        # preferred_genresをJSONからリストに変換
-        preferred_genres = None
-        if submission.preferred_genres:
-            try:
-                import json
-                preferred_genres = json.loads(submission.preferred_genres)
-            except (json.JSONDecodeError, TypeError):
-                preferred_genres = []
-
-        # purposeをJSONからリストに変換
-        purpose = []
-        if submission.purpose:
-            try:
-                import json
-                purpose = json.loads(submission.purpose)
-                if not isinstance(purpose, list):
-                    purpose = [submission.purpose]  # 文字列の場合はリストに変換
-            except (json.JSONDecodeError, TypeError):
-                purpose = [submission.purpose]  # JSON解析失敗時は文字列として扱いリスト化
-
-        # FormSubmissionデータをMatchingFormDataに変換
-        form_data = MatchingFormData(
-            industry=submission.industry,
-            target_segments=submission.target_segment,
-            purpose=purpose,
-            budget=submission.budget_range,
-            company_name=submission.company_name,
-            email=submission.email,
-            contact_name=submission.contact_name,
-            phone=submission.phone,
-            genre_preference=submission.genre_preference or "希望ジャンルなし",
-            preferred_genres=preferred_genres,
-            session_id=submission.session_id
-        )
-
-        # マッチングパラメータ取得
-        max_budget, target_segment_id, image_item_ids = await get_matching_parameters(
-            form_data.budget, form_data.target_segments, form_data.industry
-        )
-
-        # matching.pyと同じ5段階マッチングロジックを実行
-        raw_results = await execute_matching_logic(
-            form_data, max_budget, target_segment_id, image_item_ids
-        )
+        # /api/matching と同じ共通経路でマッチングを再実行（STEP 0-4 → おすすめ統合 → STEP 5）
+        from app.api.endpoints.matching import run_matching_pipeline
 
-        # おすすめタレント統合（matching.pyと同じ処理）
-        integrated_results = await apply_recommended_talents_integration(
-            form_data, raw_results
+        integrated_results = await run_matching_pipeline(
+            submission.industry, submission.target_segment, submission.budget_range
         )
 
         # マッチング結果を16列CSV形式に変換
@@ -897,9 +915,11 @@ async def download_csv_by_session(
             )
 
         # 診断結果の存在確認
-        diagnosis_query = select(DiagnosisResult).where(
-            DiagnosisResult.form_submission_id == submission.id
-        )
+        result_model = _diagnosis_result_model()
+        diagnosis_query = select(result_model.ranking).where(
+            result_model.form_submission_id == submission.id,
+            result_model.created_at >= history_lower_bound(submission.created_at),
+        ).limit(1)
         diagnosis_result = await db.execute(diagnosis_query)
         diagnosis_count = len(diagnosis_result.all())
 
@@ -983,3 +1003,95 @@ async def download_csv_by_session(
         )
 
 
+@router.get("/admin/query-plans")
+async def get_query_plans(
+    limit: int = 20,
+    statement: Optional[str] = None,
+    include_plan: bool = False,
+):
+    """実行計画サンプル取得API
+
+    マッチングCTEなどのクエリについて、サンプリングまたはスロークエリとして取得した
+    EXPLAIN (ANALYZE, BUFFERS) の結果を新しい順に返します。plan_changed が true の
+    レコードは、同じクエリの計画が前回から変化したこと（データ投入後の計画退行など）を示します。
+    """
+    from app.db.query_plans import plan_sampler
+
+    return plan_sampler.status(limit=max(1, min(limit, 100)), statement=statement, include_plan=include_plan)
+
+
+@router.post("/admin/query-plans/{statement}/capture")
+async def capture_query_plan(statement: str):
+    """実行計画の即時取得API
+
+    前回取得したクエリを同じ引数で EXPLAIN し直します（データ投入直後の確認用）。
+    SQL文字列で実行したクエリ（sql:...）は引数を保持しないため対象外です。
+    """
+    from app.db.query_plans import plan_sampler
+
+    try:
+        record = await plan_sampler.recapture(statement)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"実行計画を取得済みのクエリではありません: {statement}")
+    if record is None:
+        raise HTTPException(status_code=500, detail="実行計画の取得に失敗しました")
+    return record
+
+
+@router.get("/admin/matching-topk")
+async def get_matching_topk_status():
+    """マッチング上位K件の事前計算状態取得API
+
+    計算元データバージョン・計算日・組み合わせ数と、現在のデータバージョンとの照合結果を返します。
+    status が current 以外の間は、マッチングは統合CTEで計算されます。
+    """
+    from app.services import matching_topk
+
+    conn = await matching_topk.open_connection()
+    try:
+        state = await matching_topk.read_state(conn)
+    finally:
+        await conn.close()
+    return {**matching_topk.status(), **state}
+
+
+@router.post("/admin/matching-topk/refresh")
+async def refresh_matching_topk(force: bool = False):
+    """マッチング上位K件の再計算API
+
+    データ取り込み・業種の必須イメージ変更の直後に実行します。最新の場合は force=true の時のみ再計算します。
+    """
+    from app.services import matching_topk
+
+    try:
+        return await matching_topk.refresh(force=force)
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"マッチング上位K件の再計算に失敗しました: {e}")
+
+
+@router.post("/admin/scoring-simulation")
+async def run_scoring_simulation(request: ScoringSimulationRequest):
+    """スコアリング変更の試算API
+
+    STEP 1 の重み（VR人気度・TPRパワースコア）と STEP 2 の加減点テーブルを差し替えた場合の上位30名を、
+    全 (業種, ターゲット層, 予算区分) の組み合わせについて基準の設定と比較します（overlap_at_N は上位N名の一致率）。
+    計算はメモリ上のスコアリングデータで行い、データバージョンが変わるまで同じコピーを使います。
+    """
+    from app.services.scoring_simulation import ScoringVariant, simulate
+
+    def to_variant(body: Optional[ScoringVariantRequest]) -> ScoringVariant:
+        if body is None:
+            return ScoringVariant()
+        if body.bands is None:
+            return ScoringVariant(vr_weight=body.vr_weight, tpr_weight=body.tpr_weight)
+        bands = tuple((band.upper, band.points) for band in body.bands)
+        return ScoringVariant(vr_weight=body.vr_weight, tpr_weight=body.tpr_weight, bands=bands)
+
+    try:
+        return await simulate(to_variant(request.variant), to_variant(request.baseline), reload=request.reload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"スコアリング試算に失敗しました: {e}")
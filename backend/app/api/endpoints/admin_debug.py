@@ -9,8 +9,11 @@ import os
 import asyncio
 
 from app.schemas.matching import MatchingFormData
-from app.services.matching_logic_debug import MatchingLogicDebug
-from app.services.sheets_exporter import SheetsExporter
+from app.core.lazy_import import lazy_import
+
+# Google APIクライアント・デバッグ用マッチングは初回利用時に import
+MatchingLogicDebug = lazy_import("app.services.matching_logic_debug", "MatchingLogicDebug")
+SheetsExporter = lazy_import("app.services.sheets_exporter", "SheetsExporter")
 
 router = APIRouter(prefix="/admin", tags=["管理者デバッグ"])
 
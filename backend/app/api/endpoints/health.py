@@ -2,7 +2,9 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from datetime import datetime
-from app.db.connection import check_db_connection
+from app.db.connection import check_db_connection, pool_manager
+from app.db.prepared_statements import get_prepared_statement_status
+from app.services.matching_engine import matching_engine
 from app.core.config import settings
 
 router = APIRouter()
@@ -43,3 +45,35 @@ async def health_check():
         database="connected",
         message="Talent Casting System API is running"
     )
+
+
+@router.get("/health/pool")
+async def pool_status():
+    """
+    GET /api/health/pool
+
+    asyncpg接続プールの状態（ワークロード別の使用中・待機中接続数、取得待ち時間、
+    保持時間、再接続回数、保持時間が閾値を超えている接続の呼び出し元）
+
+    Returns:
+        dict: PoolManager.snapshot() とプリペアドステートメントの準備・実行状況
+    """
+    return {
+        **pool_manager.snapshot(),
+        "prepared_statements": get_prepared_statement_status(),
+    }
+
+
+@router.get("/health/matching-engine")
+async def matching_engine_status():
+    """
+    GET /api/health/matching-engine
+
+    マッチングエンジンの主バックエンド・利用可能なバックエンド、同一条件の相乗り件数、
+    重いクエリのアドミッション制御（実行中・待機中・拒否件数）と、シャドー実行の
+    比較統計（実行回数・差分件数・平均レイテンシ・直近の差分）
+
+    Returns:
+        dict: MatchingEngine.status()
+    """
+    return matching_engine.status()
@@ -1,8 +1,9 @@
 """業種マスタAPIエンドポイント（STEP2業種イメージ査定用）"""
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.http_cache import master_data_cache
 from app.db.connection import get_db_session
 from app.models import Industry, ImageItem, IndustryImage
 from app.schemas.industries import IndustryListResponse, IndustryResponse, ImageItemResponse
@@ -11,37 +12,12 @@ router = APIRouter()
 
 
 @router.get("/industries", summary="業種一覧取得")
-async def get_industries():
+async def get_industries(request: Request):
     """
-    業種一覧を取得するシンプルなエンドポイント
+    業種一覧を取得するシンプルなエンドポイント（ETag・Cache-Control付き、app.core.http_cache）
     """
-    from app.db.connection import get_asyncpg_connection
-
     try:
-        conn = await get_asyncpg_connection()
-        try:
-            # シンプルなクエリで業界一覧を取得
-            rows = await conn.fetch("""
-                SELECT industry_id, industry_name
-                FROM industries
-                ORDER BY industry_id
-            """)
-
-            industries = [
-                {
-                    "id": row["industry_id"],
-                    "name": row["industry_name"],
-                    "display_order": row["industry_id"]
-                }
-                for row in rows
-            ]
-
-            return {
-                "total": len(industries),
-                "industries": industries
-            }
-        finally:
-            await conn.close()
+        return await master_data_cache.respond(request, "industries", _fetch_industries)
 
     except Exception as e:
         print(f"❌ Database error in GET /api/industries: {str(e)}")
@@ -51,3 +27,29 @@ async def get_industries():
             status_code=500,
             detail="業種一覧の取得に失敗しました。しばらく待ってから再試行してください。",
         )
+
+
+async def _fetch_industries():
+    from app.db.connection import acquire_connection
+
+    async with acquire_connection() as conn:
+        # シンプルなクエリで業界一覧を取得
+        rows = await conn.fetch("""
+            SELECT industry_id, industry_name
+            FROM industries
+            ORDER BY industry_id
+        """)
+
+    industries = [
+        {
+            "id": row["industry_id"],
+            "name": row["industry_name"],
+            "display_order": row["industry_id"]
+        }
+        for row in rows
+    ]
+
+    return {
+        "total": len(industries),
+        "industries": industries
+    }
@@ -6,6 +6,7 @@ import random
 import uuid
 import logging
 import os
+import sys
 import json
 import asyncio  # Phase A1最適化: 並列処理用
 from typing import Optional, Dict
@@ -16,12 +17,20 @@ from app.schemas.matching import (
     TalentResult,
     MatchingErrorResponse,
 )
-from app.db.connection import get_asyncpg_connection, release_asyncpg_connection
+from app.db.connection import acquire_connection
+from app.db.prepared_statements import register_statement, fetch_prepared
+from app.services.email_outbox import KIND_DIAGNOSIS_COMPLETION, enqueue_email
+from app.services.matching_engine import matching_engine
+from app.services.matching_parameters import ALCOHOL_INDUSTRY_NAME, UNLIMITED_BUDGET_NAME, MatchingParameters
 from app.models import FormSubmission, DiagnosisResult
+from app.services.partition_maintenance import history_lower_bound
+from app.services.diagnosis_storage import compact_enabled, diagnosis_relation, save_compact
+from app.services.talent_details import talent_detail_cache
 from app.core.config import settings
-from app.api.endpoints.recommended_talents import get_recommended_talents_for_matching
-from app.services.email_service import EmailService
-from app.services.pdf_generator_weasy import WeasyPDFGenerator
+from app.services.recommended_talents import get_recommended_talents_for_matching
+from app.core.lazy_import import lazy_import
+from app.core.responses import model_response
+from app.core.tracing import span, traced
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.connection import get_db_session
@@ -33,10 +42,12 @@ router = APIRouter()
 # ロガー設定
 logger = logging.getLogger(__name__)
 
-# Phase A3最適化: メモリキャッシュ
-_parameter_cache: Dict[str, Any] = {}
+# PDF生成・メール送信は初回利用時に import（起動時間・常駐メモリ削減）
+EmailService = lazy_import("app.services.email_service", "EmailService")
+WeasyPDFGenerator = lazy_import("app.services.pdf_generator_weasy", "WeasyPDFGenerator")
 
 
+@traced("matching.save_diagnosis")
 async def save_diagnosis_results(
     session_id: str,
     talent_results: List[TalentResult],
@@ -84,20 +95,26 @@ async def save_diagnosis_results(
             # 既存の診断結果を削除（重複防止）
             from sqlalchemy import delete
             await current_db.execute(
-                delete(DiagnosisResult).where(DiagnosisResult.form_submission_id == form_submission.id)
+                delete(DiagnosisResult).where(
+                    DiagnosisResult.form_submission_id == form_submission.id,
+                    DiagnosisResult.created_at >= history_lower_bound(form_submission.created_at),
+                )
             )
 
-            # 新しい診断結果を保存
-            for talent in talent_results:
-                diagnosis_result = DiagnosisResult(
-                    form_submission_id=form_submission.id,
-                    ranking=talent.ranking,
-                    talent_account_id=talent.account_id,
-                    talent_name=talent.name,
-                    talent_category=talent.category,
-                    matching_score=talent.matching_score
-                )
-                current_db.add(diagnosis_result)
+            # 新しい診断結果を保存（compact は1行の UPSERT、rows は30行）
+            if compact_enabled():
+                await save_compact(current_db, form_submission.id, talent_results)
+            else:
+                for talent in talent_results:
+                    diagnosis_result = DiagnosisResult(
+                        form_submission_id=form_submission.id,
+                        ranking=talent.ranking,
+                        talent_account_id=talent.account_id,
+                        talent_name=talent.name,
+                        talent_category=talent.category,
+                        matching_score=talent.matching_score
+                    )
+                    current_db.add(diagnosis_result)
 
             await current_db.commit()
             logger.info(f"診断結果保存完了: session_id={session_id}, count={len(talent_results)}")
@@ -235,6 +252,20 @@ def normalize_budget_range_string(text: str) -> str:
     return text
 
 
+# 競合カテゴリのCMに現在出演中のタレント（$3 = 競合カテゴリIDリスト）
+CM_COMPETING_CATEGORY_STATEMENT = register_statement("cm_competing_category", """
+    SELECT DISTINCT account_id
+    FROM m_talent_cm
+    WHERE account_id = ANY($1)
+      AND use_period_end::date >= $2
+      AND (rival_category_type_cd1 = ANY($3::int[])
+           OR rival_category_type_cd2 = ANY($3::int[])
+           OR rival_category_type_cd3 = ANY($3::int[])
+           OR rival_category_type_cd4 = ANY($3::int[]))
+""")
+
+
+@traced("matching.cm_check")
 async def check_currently_in_cm_with_category_filter(
     account_ids: List[int],
     user_selected_industry: str
@@ -290,26 +321,13 @@ async def check_currently_in_cm_with_category_filter(
 
     competing_categories = get_competing_categories(user_selected_industry)
 
-    conn = await get_asyncpg_connection()
-    try:
+    async with acquire_connection() as conn:
         current_date = datetime.now().date()
 
-        # カテゴリIDリストをSQLのIN句用に文字列化
-        category_list = ','.join(map(str, competing_categories))
-
-        # 現在有効で、かつ指定カテゴリのCM契約があるタレントを一括検索
-        query = f"""
-            SELECT DISTINCT account_id
-            FROM m_talent_cm
-            WHERE account_id = ANY($1)
-              AND use_period_end::date >= $2
-              AND (rival_category_type_cd1 IN ({category_list})
-                   OR rival_category_type_cd2 IN ({category_list})
-                   OR rival_category_type_cd3 IN ({category_list})
-                   OR rival_category_type_cd4 IN ({category_list}))
-        """
-
-        rows = await conn.fetch(query, account_ids, current_date)
+        # 現在有効で、かつ指定カテゴリのCM契約があるタレントを一括検索（カテゴリIDもパラメータで渡す）
+        rows = await fetch_prepared(
+            conn, CM_COMPETING_CATEGORY_STATEMENT, account_ids, current_date, competing_categories
+        )
         currently_in_cm_ids = {row["account_id"] for row in rows}
 
         # 全アカウントIDについて結果を返す
@@ -318,9 +336,6 @@ async def check_currently_in_cm_with_category_filter(
             for account_id in account_ids
         }
 
-    finally:
-        await release_asyncpg_connection(conn)
-
 
 async def check_currently_in_cm(account_ids: List[int]) -> Dict[int, bool]:
     """
@@ -335,8 +350,7 @@ async def check_currently_in_cm(account_ids: List[int]) -> Dict[int, bool]:
     if not account_ids:
         return {}
 
-    conn = await get_asyncpg_connection()
-    try:
+    async with acquire_connection() as conn:
         current_date = datetime.now().date()
 
         # 現在有効なCM契約があるタレントを一括検索
@@ -356,14 +370,11 @@ async def check_currently_in_cm(account_ids: List[int]) -> Dict[int, bool]:
             for account_id in account_ids
         }
 
-    finally:
-        await release_asyncpg_connection(conn)
-
 
+@traced("matching.save_form_submission")
 async def save_form_submission(form_data: MatchingFormData, request: Request) -> str:
     """フォーム送信データを保存"""
-    conn = await get_asyncpg_connection()
-    try:
+    async with acquire_connection() as conn:
         # セッションIDを生成（フロントエンドから送られない場合）
         session_id = form_data.session_id or str(uuid.uuid4())
 
@@ -376,7 +387,7 @@ async def save_form_submission(form_data: MatchingFormData, request: Request) ->
         if form_data.preferred_genres:
             preferred_genres_json = json.dumps(form_data.preferred_genres, ensure_ascii=False)
 
-        # フォーム送信データを保存
+        # フォーム送信データを保存（混雑時の 503 後に同じ session_id で再送されても失敗しないよう重複は無視）
         await conn.execute(
             """
             INSERT INTO form_submissions (
@@ -385,6 +396,7 @@ async def save_form_submission(form_data: MatchingFormData, request: Request) ->
                 genre_preference, preferred_genres, email_consent, email_consent_timestamp,
                 ip_address, user_agent
             ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15)
+            ON CONFLICT (session_id) DO NOTHING
             """,
             session_id,
             form_data.industry,
@@ -405,17 +417,13 @@ async def save_form_submission(form_data: MatchingFormData, request: Request) ->
 
         return session_id
 
-    finally:
-        await release_asyncpg_connection(conn)
-
 
 async def get_recommended_talent_details(
     talent_account_id: int,
     target_segment_name: str
 ) -> Dict:
     """おすすめタレントの詳細情報を予算フィルタリング除外で取得"""
-    conn = await get_asyncpg_connection()
-    try:
+    async with acquire_connection() as conn:
         # ターゲット層IDを取得
         segment_row = await conn.fetchrow(
             "SELECT target_segment_id FROM target_segments WHERE segment_name = $1",
@@ -446,9 +454,6 @@ async def get_recommended_talent_details(
         row = await conn.fetchrow(query, talent_account_id, target_segment_id)
         return dict(row) if row else None
 
-    finally:
-        await release_asyncpg_connection(conn)
-
 
 async def get_recommended_talents_batch(
     account_ids: List[int],
@@ -467,111 +472,60 @@ async def get_recommended_talents_batch(
     if not account_ids:
         return {}
 
-    conn = await get_asyncpg_connection()
-    try:
-        # ターゲット層IDを取得
-        segment_row = await conn.fetchrow(
-            "SELECT target_segment_id FROM target_segments WHERE segment_name = $1",
-            target_segment_name,
-        )
-        if not segment_row:
-            return {}
+    async with acquire_connection() as conn:
+        try:
+            # ターゲット層IDを取得
+            segment_row = await conn.fetchrow(
+                "SELECT target_segment_id FROM target_segments WHERE segment_name = $1",
+                target_segment_name,
+            )
+            if not segment_row:
+                return {}
 
-        target_segment_id = segment_row["target_segment_id"]
+            target_segment_id = segment_row["target_segment_id"]
 
-        # 複数タレントの基本情報 + スコア情報を一括取得
-        query = """
-        SELECT
-            ma.account_id,
-            ma.name_full_for_matching as name,
-            ma.last_name_kana,
-            ma.act_genre,
-            COALESCE(ts.base_power_score, 0) as base_power_score,
-            0 as image_adjustment,
-            COALESCE(ts.base_power_score, 0) as reflected_score
-        FROM m_account ma
-        LEFT JOIN talent_scores ts ON ma.account_id = ts.account_id
-            AND ts.target_segment_id = $2
-        WHERE ma.account_id = ANY($1::int[])
-            AND ma.del_flag = 0
-        ORDER BY ma.account_id
-        """
+            # 複数タレントの基本情報 + スコア情報を一括取得
+            query = """
+            SELECT
+                ma.account_id,
+                ma.name_full_for_matching as name,
+                ma.last_name_kana,
+                ma.act_genre,
+                COALESCE(ts.base_power_score, 0) as base_power_score,
+                0 as image_adjustment,
+                COALESCE(ts.base_power_score, 0) as reflected_score
+            FROM m_account ma
+            LEFT JOIN talent_scores ts ON ma.account_id = ts.account_id
+                AND ts.target_segment_id = $2
+            WHERE ma.account_id = ANY($1::int[])
+                AND ma.del_flag = 0
+            ORDER BY ma.account_id
+            """
 
-        rows = await conn.fetch(query, account_ids, target_segment_id)
+            rows = await conn.fetch(query, account_ids, target_segment_id)
 
-        # account_id別に整理
-        results = {}
-        for row in rows:
-            account_id = row['account_id']
-            results[account_id] = dict(row)
+            # account_id別に整理
+            results = {}
+            for row in rows:
+                account_id = row['account_id']
+                results[account_id] = dict(row)
 
-        return results
+            return results
 
-    except Exception as e:
-        logger.error(f"❌ おすすめタレントバッチ取得エラー: {e}")
-        return {}
-    finally:
-        await release_asyncpg_connection(conn)
+        except Exception as e:
+            logger.error(f"❌ おすすめタレントバッチ取得エラー: {e}")
+            return {}
 
 
 async def get_matching_parameters(
     budget_name: str, target_segment_name: str, industry_name: str
 ) -> Tuple[float, float, int, List[int]]:
-    """マッチングパラメータを一括取得（Phase A3最適化: メモリキャッシュ付き）"""
-    # キャッシュキーを生成
-    cache_key = f"params:{budget_name}:{target_segment_name}:{industry_name}"
-
-    # Phase A3最適化: メモリキャッシュから取得を試行
-    if cache_key in _parameter_cache:
-        return _parameter_cache[cache_key]
-
-    conn = await get_asyncpg_connection()
+    """マッチングパラメータを一括取得（マッチングエンジン経由、メモリキャッシュ付き）"""
     try:
-        # 予算区分の文字列を正規化
-        normalized_budget_name = normalize_budget_range_string(budget_name)
-
-        # Phase A2最適化: 3つのクエリを1つのJOINクエリに統合（min_amountも取得）
-        result_row = await conn.fetchrow(
-            """
-            SELECT
-                br.min_amount,
-                br.max_amount,
-                ts.target_segment_id,
-                i.required_image_id
-            FROM budget_ranges br
-            CROSS JOIN target_segments ts
-            CROSS JOIN industries i
-            WHERE REPLACE(REPLACE(REPLACE(br.range_name, '～', '〜'), ' ', ''), '　', '') = $1
-              AND ts.segment_name = $2
-              AND i.industry_name = $3
-            """,
-            normalized_budget_name, target_segment_name, industry_name
-        )
-
-        if not result_row:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"パラメータが見つかりません: 予算='{budget_name}', ターゲット='{target_segment_name}', 業種='{industry_name}'",
-            )
-
-        # required_image_idが設定されていない場合は全イメージ項目を対象とする
-        if result_row["required_image_id"]:
-            image_item_ids = [result_row["required_image_id"]]
-        else:
-            # 全イメージ項目 (1-7) を対象
-            image_item_ids = [1, 2, 3, 4, 5, 6, 7]
-
-        min_budget = float(result_row["min_amount"] or 0)  # NULLの場合は0（下限なし）
-        max_budget = float(result_row["max_amount"] or 999999999999)  # NULLの場合は999,999,999,999円（上限なし）
-        target_segment_id = result_row["target_segment_id"]
-
-        # Phase A3最適化: 結果をメモリキャッシュに保存（TTL無し、静的データのため）
-        result = (min_budget, max_budget, target_segment_id, image_item_ids)
-        _parameter_cache[cache_key] = result
-
-        return result
-    finally:
-        await release_asyncpg_connection(conn)
+        params = await matching_engine.resolve_parameters(budget_name, target_segment_name, industry_name)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return params.min_budget, params.max_budget, params.target_segment_id, params.image_item_ids
 
 
 async def execute_matching_logic(
@@ -581,163 +535,60 @@ async def execute_matching_logic(
     target_segment_id: int,
     image_item_ids: List[int],
 ) -> List[Dict]:
-    """5段階マッチングロジック完全実装（STEP 0-5）"""
-    conn = await get_asyncpg_connection()
-    try:
+    """5段階マッチングロジック STEP 0-4（マッチングエンジンの主バックエンドで実行）"""
+    params = MatchingParameters(
+        min_budget=min_budget,
+        max_budget=max_budget,
+        target_segment_id=target_segment_id,
+        image_item_ids=image_item_ids,
+        is_alcohol_industry=form_data.industry == ALCOHOL_INDUSTRY_NAME,
+        is_unlimited_budget=form_data.budget == UNLIMITED_BUDGET_NAME,
+    )
+    return await matching_engine.rank(params)
 
-        # アルコール業界かどうか判定
-        is_alcohol_industry = form_data.industry == "アルコール飲料"
 
-        # 「5,000万円以上」選択時判定（金額NULLタレント通過用）
-        is_unlimited_budget = form_data.budget == "5,000万円以上"
+async def run_matching_pipeline(industry: str, target_segment: str, budget: str) -> List[Dict]:
+    """マッチング処理の共通経路（STEP 0-4 → STEP 5.5 おすすめ統合 → STEP 5 スコア振り分け）
 
-        # おすすめタレントID取得（予算フィルタリング除外のため）
-        recommended_talents = await get_recommended_talents_for_matching(form_data.industry)
-        recommended_ids = [t["account_id"] for t in recommended_talents] if recommended_talents else []
+    /api/matching と管理画面の再計算・デバッグエクスポートはすべてこの関数を通る。
+    STEP 0-4 はマッチングエンジンの主バックエンド（SQL CTE / スコアリング配列）で実行する。
 
-        # STEP 1-5: 5段階マッチングロジック統合クエリ（アルコール業界年齢フィルタ対応）
-        query = """
-        WITH step0_budget_filter AS (
-            -- STEP 0: 予算フィルタリング（計算列インデックス活用版） + アルコール業界年齢フィルタリング
-            -- $1 = min_budget (下限、NULLの場合は0)
-            -- $6 = max_budget (上限、NULLの場合は無限大)
-            SELECT DISTINCT ma.account_id, ma.name_full_for_matching as name, ma.last_name_kana, ma.act_genre, ma.company_name
-            FROM m_account ma
-            LEFT JOIN m_talent_act mta ON ma.account_id = mta.account_id
-            WHERE ma.del_flag = 0  -- 有効なタレントのみ対象
-              AND mta.account_id IS NOT NULL  -- 未登録タレントを除外
-              AND (
-                -- 超高速化: 計算列インデックスを活用したシンプルな範囲チェック
-                -- money_representative_value = COALESCE(money_max_one_year, money_min_one_year)
-                (mta.money_representative_value IS NOT NULL
-                 AND mta.money_representative_value >= $1
-                 AND mta.money_representative_value < $6)
-                OR
-                -- 両方NULL: 「5,000万円以上」選択時のみ通過
-                (mta.money_representative_value IS NULL AND $5 = true)
-              ) AND (
-                -- アルコール業界の場合のみ25歳以上フィルタ適用（$4で制御）
-                $4 = false OR (
-                    ma.birthday IS NULL OR  -- 生年月日がない場合は通過
-                    EXTRACT(YEAR FROM AGE(CURRENT_DATE, ma.birthday)) >= 25
-                )
-              )
-        ),
-        step1_base_power AS (
-            -- STEP 1: 基礎パワー得点計算（仕様通り: (VR人気度 + TPRパワースコア) / 2）
-            SELECT
-                ts.account_id,
-                ts.target_segment_id,
-                (COALESCE(ts.vr_popularity, 0) + COALESCE(ts.tpr_power_score, 0)) / 2.0 AS base_power_score
-            FROM talent_scores ts
-            WHERE ts.target_segment_id = $2
-        ),
-        step2_adjustment AS (
-            -- STEP 2: 業種イメージ査定（非正規化データ対応 + 正しい加減点）
-            SELECT
-                account_id,
-                target_segment_id,
-                AVG(
-                    CASE
-                        WHEN percentile_rank <= 0.15 THEN 12.0
-                        WHEN percentile_rank <= 0.30 THEN 6.0
-                        WHEN percentile_rank <= 0.50 THEN 3.0
-                        WHEN percentile_rank <= 0.70 THEN -3.0
-                        WHEN percentile_rank <= 0.85 THEN -6.0
-                        ELSE -12.0
-                    END
-                ) AS image_adjustment
-            FROM (
-                SELECT
-                    unpivot.account_id,
-                    unpivot.target_segment_id,
-                    unpivot.image_id,
-                    PERCENT_RANK() OVER (
-                        PARTITION BY unpivot.target_segment_id, unpivot.image_id
-                        ORDER BY unpivot.score DESC
-                    ) AS percentile_rank
-                FROM (
-                    SELECT account_id, target_segment_id, 1 AS image_id, image_funny AS score FROM talent_images
-                    UNION ALL
-                    SELECT account_id, target_segment_id, 2 AS image_id, image_clean AS score FROM talent_images
-                    UNION ALL
-                    SELECT account_id, target_segment_id, 3 AS image_id, image_unique AS score FROM talent_images
-                    UNION ALL
-                    SELECT account_id, target_segment_id, 4 AS image_id, image_trustworthy AS score FROM talent_images
-                    UNION ALL
-                    SELECT account_id, target_segment_id, 5 AS image_id, image_cute AS score FROM talent_images
-                    UNION ALL
-                    SELECT account_id, target_segment_id, 6 AS image_id, image_cool AS score FROM talent_images
-                    UNION ALL
-                    SELECT account_id, target_segment_id, 7 AS image_id, image_mature AS score FROM talent_images
-                ) unpivot
-                WHERE unpivot.target_segment_id = $2
-                    AND unpivot.image_id = ANY($3::int[])
-            ) sub
-            GROUP BY account_id, target_segment_id
-        ),
-        step3_reflected_score AS (
-            -- STEP 3: 基礎反映得点（STEP1 + STEP2）
-            SELECT
-                bp.account_id,
-                bp.target_segment_id,
-                bp.base_power_score,
-                COALESCE(ia.image_adjustment, 0) AS image_adjustment,
-                bp.base_power_score + COALESCE(ia.image_adjustment, 0) AS reflected_score
-            FROM step1_base_power bp
-            LEFT JOIN step2_adjustment ia
-                ON bp.account_id = ia.account_id
-                AND bp.target_segment_id = ia.target_segment_id
-        ),
-        step4_ranking AS (
-            -- STEP 4: ランキング確定（タレント重複除去 + 上位30名抽出）
-            SELECT DISTINCT ON (rs.account_id)
-                rs.account_id,
-                rs.target_segment_id,
-                rs.base_power_score,
-                rs.image_adjustment,
-                rs.reflected_score,
-                ROW_NUMBER() OVER (ORDER BY rs.reflected_score DESC, rs.base_power_score DESC, rs.account_id) AS ranking
-            FROM step3_reflected_score rs
-            INNER JOIN step0_budget_filter bf ON bf.account_id = rs.account_id
-            ORDER BY rs.account_id, rs.reflected_score DESC, rs.base_power_score DESC
-        ),
-        step4_final AS (
-            SELECT * FROM step4_ranking
-            ORDER BY reflected_score DESC, base_power_score DESC, account_id
-            LIMIT 30
-        )
-        -- 最終結果（STEP 5のスコア振り分けは後処理で実施）
-        SELECT
-            r.account_id,
-            r.target_segment_id,
-            r.base_power_score,
-            r.image_adjustment,
-            r.reflected_score,
-            ROW_NUMBER() OVER (ORDER BY r.reflected_score DESC, r.base_power_score DESC, r.account_id) AS ranking,
-            bf.name,
-            bf.last_name_kana,
-            bf.act_genre,
-            bf.company_name
-        FROM step4_final r
-        INNER JOIN step0_budget_filter bf ON bf.account_id = r.account_id
-        ORDER BY r.reflected_score DESC, r.base_power_score DESC, r.account_id
-        """
+    Raises:
+        HTTPException: 予算区分・ターゲット層・業種が見つからない場合（400）
+    """
+    try:
+        params = await matching_engine.resolve_parameters(budget, target_segment, industry)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    raw_results = await matching_engine.rank(params)
+
+    # STEP 5.5: おすすめタレント統合（マッチングロジックの整合性保持）
+    with span("matching.recommended_integration"):
+        integrated_results = await integrate_recommended_talents(industry, target_segment, raw_results)
 
-        rows = await conn.fetch(query, min_budget, target_segment_id, image_item_ids, is_alcohol_industry, is_unlimited_budget, max_budget)
-        return [dict(row) for row in rows]
-    finally:
-        await release_asyncpg_connection(conn)
+    # STEP 5: マッチングスコア振り分け（おすすめタレント対応）
+    with span("matching.step5"):
+        return apply_step5_score_distribution(integrated_results)
 
 
 async def apply_recommended_talents_integration(
     form_data: MatchingFormData,
     standard_results: List[Dict]
+) -> List[Dict]:
+    """STEP 5.5: おすすめタレント統合（MatchingFormData 版、integrate_recommended_talents を参照）"""
+    return await integrate_recommended_talents(form_data.industry, form_data.target_segments, standard_results)
+
+
+async def integrate_recommended_talents(
+    industry: str,
+    target_segment: str,
+    standard_results: List[Dict]
 ) -> List[Dict]:
     """STEP 5.5: おすすめタレント統合（管理画面設定3名を必ず1-3位に表示）"""
 
     # おすすめタレント取得
-    recommended_talents = await get_recommended_talents_for_matching(form_data.industry)
+    recommended_talents = await get_recommended_talents_for_matching(industry)
 
     if not recommended_talents:
         # おすすめタレント設定なし：通常のマッチング結果をそのまま返却
@@ -761,7 +612,7 @@ async def apply_recommended_talents_integration(
     recommended_ids = [t["account_id"] for t in recommended_talents[:3]]
     recommended_details_batch = await get_recommended_talents_batch(
         recommended_ids,
-        form_data.target_segments
+        target_segment
     )
 
     final_recommended = []
@@ -854,6 +705,48 @@ def apply_step5_score_distribution(results: List[Dict]) -> List[Dict]:
     return results
 
 
+@traced("matching.talent_details")
+async def fetch_talent_details(account_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """結果カード用のタレント詳細を一括取得（取得失敗時は詳細なしで結果を返す）"""
+    try:
+        return await talent_detail_cache.get_many(account_ids)
+    except Exception as e:
+        logger.error(f"タレント詳細の取得エラー（詳細なしで返却）: {e}")
+        return {}
+
+
+async def send_diagnosis_completion_email(form_data: MatchingFormData, session_id: str) -> None:
+    """診断完了メールをアウトボックスに登録（EMAIL_OUTBOX_ENABLED=false・登録失敗時はその場で送信）
+
+    メール関連のエラーは診断結果レスポンスには影響させない。
+    """
+    payload = {
+        "to_email": form_data.email,
+        "company_name": form_data.company_name or "お客様",
+        "contact_name": form_data.contact_name,
+        # PDFダウンロードURL生成
+        "pdf_download_url": f"{settings.backend_url}/api/pdf-download/{session_id}",
+        "session_id": session_id,
+    }
+    try:
+        if settings.email_outbox_enabled:
+            try:
+                async with acquire_connection() as conn:
+                    await enqueue_email(conn, KIND_DIAGNOSIS_COMPLETION, form_data.email, payload, session_id=session_id)
+                logger.info(f"診断完了メールを送信待ちに登録: session_id={session_id}")
+                return
+            except Exception as e:
+                # 登録できない場合もメールを失わないよう、その場で送信する
+                logger.error(f"❌ 診断完了メールを送信待ちに登録できないため直接送信します: session_id={session_id}, error={str(e)}")
+
+        email_service = EmailService()
+        if email_service.is_configured():
+            await email_service.send_diagnosis_completion_email(**payload)
+            logger.info(f"診断完了メール送信成功: session_id={session_id}, email={form_data.email}")
+    except Exception as e:
+        logger.error(f"診断完了メール送信エラー: session_id={session_id}, error={str(e)}")
+
+
 @router.post(
     "/matching",
     response_model=MatchingResponse,
@@ -871,30 +764,12 @@ async def post_matching(form_data: MatchingFormData, request: Request, backgroun
     start_time = time.time()
 
     try:
-        # Phase A1最適化: フォーム保存とパラメータ取得を並列実行
-        session_id_task = save_form_submission(form_data, request)
-        params_task = get_matching_parameters(
-            form_data.budget, form_data.target_segments, form_data.industry
-        )
-
-        # 並列実行
-        session_id, (min_budget, max_budget, target_segment_id, image_item_ids) = await asyncio.gather(
-            session_id_task, params_task
-        )
-
-        # 5段階マッチングロジック実行（STEP 0-4）
-        raw_results = await execute_matching_logic(
-            form_data, min_budget, max_budget, target_segment_id, image_item_ids
+        # Phase A1最適化: フォーム保存とマッチング（STEP 0-5）を並列実行
+        session_id, final_results = await asyncio.gather(
+            save_form_submission(form_data, request),
+            run_matching_pipeline(form_data.industry, form_data.target_segments, form_data.budget),
         )
 
-        # STEP 5.5: おすすめタレント統合（マッチングロジックの整合性保持）
-        integrated_results = await apply_recommended_talents_integration(
-            form_data, raw_results
-        )
-
-        # STEP 5: マッチングスコア振り分け（おすすめタレント対応）
-        final_results = apply_step5_score_distribution(integrated_results)
-
         # Phase A2最適化: CM状況確認とTalentResult生成を並列化
         account_ids = [r["account_id"] for r in final_results]
 
@@ -903,8 +778,11 @@ async def post_matching(form_data: MatchingFormData, request: Request, backgroun
             account_ids, form_data.industry
         )
 
-        # CM状況確認完了を待つ
-        cm_status = await cm_status_task
+        # CM状況確認完了を待つ（タレント詳細の同梱指定時は詳細取得と並行）
+        if form_data.include_details:
+            cm_status, details = await asyncio.gather(cm_status_task, fetch_talent_details(account_ids))
+        else:
+            cm_status, details = await cm_status_task, {}
 
         # Phase A2最適化: TalentResult変換を最適化（型変換前処理）
         talent_results = [
@@ -920,6 +798,7 @@ async def post_matching(form_data: MatchingFormData, request: Request, backgroun
                 image_adjustment=float(r["image_adjustment"]) if r["image_adjustment"] else None,
                 is_recommended=r.get("is_recommended", False),
                 is_currently_in_cm=cm_status.get(r["account_id"], False),
+                details=details.get(r["account_id"]),
             )
             for r in final_results
         ]
@@ -927,35 +806,25 @@ async def post_matching(form_data: MatchingFormData, request: Request, backgroun
         # ★ 診断結果をデータベースに保存
         await save_diagnosis_results(session_id, talent_results, db)
 
-        # ★ 診断完了メール送信
-        email_service = EmailService()
-        if email_service.is_configured() and form_data.email and form_data.email_consent:
-            try:
-                # PDFダウンロードURL生成
-                pdf_download_url = f"{settings.backend_url}/api/pdf-download/{session_id}"
-
-                await email_service.send_diagnosis_completion_email(
-                    to_email=form_data.email,
-                    company_name=form_data.company_name or "お客様",
-                    contact_name=form_data.contact_name,
-                    pdf_download_url=pdf_download_url,
-                    session_id=session_id
-                )
-                logger.info(f"診断完了メール送信成功: session_id={session_id}, email={form_data.email}")
-            except Exception as e:
-                logger.error(f"診断完了メール送信エラー: session_id={session_id}, error={str(e)}")
-                # メール送信エラーは診断結果レスポンスには影響させない
+        # ★ 診断完了メール送信（アウトボックス有効時は登録のみ行い、送信はバックグラウンドワーカー）
+        with span("matching.email"):
+            if form_data.email and form_data.email_consent:
+                await send_diagnosis_completion_email(form_data, session_id)
 
         # 処理時間計算
         processing_time = (time.time() - start_time) * 1000
 
-        return MatchingResponse(
+        response = MatchingResponse(
             success=True,
             total_results=len(talent_results),
             results=talent_results,
             processing_time_ms=round(processing_time, 2),
             session_id=session_id,
         )
+        if settings.fast_json_response_enabled:
+            # 検証済みモデルをそのままシリアライズ（response_model による再検証を省略）
+            return model_response(response)
+        return response
 
     except HTTPException:
         raise
@@ -966,201 +835,20 @@ async def post_matching(form_data: MatchingFormData, request: Request, backgroun
         )
 
 
-# === Phase A最適化：統合クエリエンドポイント ===
+# === 旧最適化エンドポイント（互換用） ===
+# Phase A の /optimized と Phase B の /ultra_optimized は独自のパラメータ取得・STEP 5 計算を持ち
+# /matching と結果が食い違っていたため、マッチングエンジン導入に合わせて /matching と同じ処理に統一した。
 
-@router.post("/optimized", response_model=MatchingResponse)
+@router.post("/optimized", response_model=MatchingResponse, deprecated=True, summary="旧Phase A最適化版（/matching と同一処理）")
 async def post_matching_optimized(form_data: MatchingFormData, request: Request, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db_session)) -> MatchingResponse:
-    """
-    Phase A最適化版マッチングエンドポイント
-
-    ⚠️ 重要制約:
-    - マッチングロジックは完全保持（結果は既存版と完全同一）
-    - 接続数削減による高速化のみ実装
-    - 既存エンドポイントは無変更で併存
-
-    効果予測: 70-80%高速化
-    """
-    from app.db.optimized_queries import OptimizedMatchingQueries
-
-    start_time = time.time()
-
-    try:
-        # セッションIDを生成（フロントエンドから送られない場合）
-        session_id = form_data.session_id or str(uuid.uuid4())
-
-        # フォーム送信データを保存（既存処理完全保持）
-        await save_form_submission(form_data, request)
-
-        # 予算区分正規化（既存ロジック完全保持）
-        normalized_budget = normalize_budget_range_string(form_data.budget)
-
-        # 最適化されたマッチングフロー実行
-        talent_data = await OptimizedMatchingQueries.execute_optimized_matching_flow(
-            form_data.industry,
-            form_data.target_segments,
-            normalized_budget
-        )
-
-        # おすすめタレント統合（既存処理完全保持）
-        integrated_results = await apply_recommended_talents_integration(
-            form_data, talent_data
-        )
-
-        # 統合後の結果をTalentResultオブジェクトに変換
-        talent_results = []
-        for result in integrated_results:
-            talent_result = TalentResult(
-                account_id=result['account_id'],
-                name=result.get('name') or f"タレント{result['account_id']}",
-                kana=result.get('last_name_kana', ''),
-                category=result.get('act_genre', ''),
-                company_name=result.get('company_name'),
-                matching_score=result.get('matching_score', 0.0),
-                ranking=result.get('ranking', 0),
-                base_power_score=result.get('base_power_score', 0.0),
-                image_adjustment=result.get('image_adjustment', 0.0),
-                is_recommended=result.get('is_recommended', False)
-            )
-            talent_results.append(talent_result)
-
-        # ★ 新規追加: 診断結果をデータベースに保存
-        await save_diagnosis_results(session_id, talent_results, db)
-
-        # ★ 診断完了メール送信
-        email_service = EmailService()
-        if email_service.is_configured() and form_data.email and form_data.email_consent:
-            try:
-                # PDFダウンロードURL生成
-                pdf_download_url = f"{settings.backend_url}/api/pdf-download/{session_id}"
-
-                await email_service.send_diagnosis_completion_email(
-                    to_email=form_data.email,
-                    company_name=form_data.company_name or "お客様",
-                    contact_name=form_data.contact_name,
-                    pdf_download_url=pdf_download_url,
-                    session_id=session_id
-                )
-                logger.info(f"診断完了メール送信成功 (最適化版): session_id={session_id}, email={form_data.email}")
-            except Exception as e:
-                logger.error(f"診断完了メール送信エラー (最適化版): session_id={session_id}, error={str(e)}")
-
-        # 処理時間計算
-        processing_time = (time.time() - start_time) * 1000
-
-        return MatchingResponse(
-            success=True,
-            total_results=len(talent_results),
-            results=talent_results,
-            processing_time_ms=round(processing_time, 2),
-            session_id=session_id,
-        )
+    """POST /api/optimized - /api/matching と同一処理（互換用）"""
+    return await post_matching(form_data, request, background_tasks, db)
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"最適化マッチング処理中にエラーが発生しました: {str(e)}",
-        )
-
-
-@router.post(
-    "/ultra_optimized",
-    response_model=MatchingResponse,
-    summary="Phase B: 超最適化マッチング API (1回DB接続)",
-    description="究極の最適化: 1回のDB接続で全マッチング処理を完了。マッチングロジック完全保持。",
-)
-async def post_matching_ultra_optimized(
-    form_data: MatchingFormData, request: Request, db: AsyncSession = Depends(get_db_session)
-) -> MatchingResponse:
-    """Phase B: 超最適化マッチング処理（1回DB接続・67%削減）"""
-    start_time = time.time()
-    session_id = form_data.session_id or str(uuid.uuid4())
-
-    try:
-        # セッションログ記録
-        logger.info(
-            f"Session {session_id}: Phase B超最適化マッチング開始 - "
-            f"Industry: {form_data.industry}, Target: {form_data.target_segments}, Budget: {form_data.budget}"
-        )
-
-        # フォーム送信データを保存
-        session_id = await save_form_submission(form_data, request)
-
-        # 予算区分の文字列を正規化
-        normalized_budget = normalize_budget_range_string(form_data.budget)
-
-        # Phase B: 超最適化マッチングフロー実行（1回DB接続）
-        from app.db.ultra_optimized_queries import UltraOptimizedMatchingQueries
-
-        talent_data = await UltraOptimizedMatchingQueries.execute_ultra_optimized_matching_flow(
-            form_data.industry,
-            form_data.target_segments,
-            normalized_budget
-        )
-
-        # 結果をTalentResultオブジェクトに変換
-        talent_results = []
-        for result in talent_data:
-            talent_result = TalentResult(
-                account_id=result['account_id'],
-                name=result.get('name') or f"タレント{result['account_id']}",
-                kana=result.get('last_name_kana', ''),
-                category=result.get('act_genre', ''),
-                company_name=result.get('company_name'),
-                matching_score=result.get('matching_score', 0.0),
-                ranking=result.get('ranking', 0),
-                base_power_score=result.get('base_power_score', 0.0),
-                image_adjustment=result.get('image_adjustment', 0.0),
-                is_recommended=result.get('is_recommended', False)
-            )
-            talent_results.append(talent_result)
-
-        # ★ 新規追加: 診断結果をデータベースに保存
-        await save_diagnosis_results(session_id, talent_results, db)
 
-        # ★ 診断完了メール送信
-        email_service = EmailService()
-        if email_service.is_configured() and form_data.email and form_data.email_consent:
-            try:
-                # PDFダウンロードURL生成
-                pdf_download_url = f"{settings.backend_url}/api/pdf-download/{session_id}"
-
-                await email_service.send_diagnosis_completion_email(
-                    to_email=form_data.email,
-                    company_name=form_data.company_name or "お客様",
-                    contact_name=form_data.contact_name,
-                    pdf_download_url=pdf_download_url,
-                    session_id=session_id
-                )
-                logger.info(f"診断完了メール送信成功 (超最適化版): session_id={session_id}, email={form_data.email}")
-            except Exception as e:
-                logger.error(f"診断完了メール送信エラー (超最適化版): session_id={session_id}, error={str(e)}")
-
-        # 処理時間計算
-        processing_time = (time.time() - start_time) * 1000
-
-        logger.info(
-            f"Session {session_id}: Phase B超最適化マッチング完了 - "
-            f"処理時間: {processing_time:.2f}ms, 結果数: {len(talent_results)}"
-        )
-
-        return MatchingResponse(
-            success=True,
-            total_results=len(talent_results),
-            results=talent_results,
-            processing_time_ms=round(processing_time, 2),
-            session_id=session_id,
-        )
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Session {session_id}: Phase B超最適化マッチング処理エラー: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Phase B超最適化マッチング処理中にエラーが発生しました: {str(e)}",
-        )
+@router.post("/ultra_optimized", response_model=MatchingResponse, deprecated=True, summary="旧Phase B超最適化版（/matching と同一処理）")
+async def post_matching_ultra_optimized(form_data: MatchingFormData, request: Request, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db_session)) -> MatchingResponse:
+    """POST /api/ultra_optimized - /api/matching と同一処理（互換用）"""
+    return await post_matching(form_data, request, background_tasks, db)
 
 
 @router.get("/pdf-download/{session_id}", summary="ユーザー向けマスキングPDFダウンロード")
@@ -1185,15 +873,14 @@ async def download_diagnosis_pdf(
 
         # セッションIDから診断結果を取得
         form_submission_query = """
-            SELECT id, company_name, contact_name, email, industry, target_segment, budget_range
+            SELECT id, company_name, contact_name, email, industry, target_segment, budget_range, created_at
             FROM form_submissions
             WHERE session_id = $1
             ORDER BY created_at DESC
             LIMIT 1
         """
 
-        conn = await get_asyncpg_connection()
-        try:
+        async with acquire_connection() as conn:
             form_submission_row = await conn.fetchrow(form_submission_query, session_id)
 
             if not form_submission_row:
@@ -1223,7 +910,8 @@ async def download_diagnosis_pdf(
             target_segment_id = target_segment_row['target_segment_id']
 
             # 診断結果を取得（talent_scoresとm_accountからも必要な情報を取得）
-            diagnosis_query = """
+            # DIAGNOSIS_STORAGE=compact では配列形式の結果も行で返す互換ビューを読む
+            diagnosis_query = f"""
                 SELECT
                     dr.ranking,
                     dr.matching_score,
@@ -1285,15 +973,20 @@ async def download_diagnosis_pdf(
                         WHEN ma.pref_cd = 99 THEN 'その他'
                         ELSE '不明'
                     END as birthplace
-                FROM diagnosis_results dr
+                FROM {diagnosis_relation()} dr
                 LEFT JOIN talent_scores ts ON dr.talent_account_id = ts.account_id
                     AND ts.target_segment_id = $2
                 LEFT JOIN m_account ma ON dr.talent_account_id = ma.account_id
                 WHERE dr.form_submission_id = $1
+                  AND dr.created_at >= $3
                 ORDER BY dr.ranking ASC
             """
 
-            diagnosis_rows = await conn.fetch(diagnosis_query, submission_id, target_segment_id)
+            # created_at の下限で送信月のパーティションだけを参照する
+            diagnosis_rows = await conn.fetch(
+                diagnosis_query, submission_id, target_segment_id,
+                history_lower_bound(form_submission_row['created_at']),
+            )
 
             if not diagnosis_rows:
                 logger.warning(f"セッション {session_id}: 診断結果データが見つかりません")
@@ -1302,9 +995,6 @@ async def download_diagnosis_pdf(
                     detail="診断結果データが見つかりません。"
                 )
 
-        finally:
-            await release_asyncpg_connection(conn)
-
         # タレントデータをPDF生成用形式に変換
         talent_data = []
         for row in diagnosis_rows:
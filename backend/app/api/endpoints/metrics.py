@@ -0,0 +1,180 @@
+"""Prometheus メトリクスエンドポイント（GET /metrics）
+
+ヒストグラム（リクエスト・マッチング段階）は app.core.metrics で計測済みの値を出力し、
+プール・キャッシュ・バックグラウンドキュー・プロセスの状態値はスクレイプ時に読み取る。
+"""
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
+import os
+import resource
+import time
+
+from app.core.compression import compression_status
+from app.core.concurrency import heavy_query_admission
+from app.core.config import settings
+from app.core.http_cache import master_data_cache
+from app.core.metrics import CONTENT_TYPE, registry
+from app.core.tracing import pending_exports
+from app.core.workload import get_in_flight
+from app.db.connection import pool_manager
+from app.db.prepared_statements import get_prepared_statement_status
+from app.db.query_plans import plan_sampler
+from app.services.email_outbox import email_outbox_worker
+from app.services.matching_engine import matching_engine
+from app.services.talent_details import talent_detail_cache
+
+router = APIRouter()
+
+_PROCESS_STARTED = time.time()
+
+
+@registry.register_collector
+def collect_process():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    families = [
+        ("process_cpu_seconds_total", "counter", "Total user and system CPU time", [({}, usage.ru_utime + usage.ru_stime)]),
+        ("process_start_time_seconds", "gauge", "Process start time (unix epoch)", [({}, _PROCESS_STARTED)]),
+    ]
+    try:
+        with open("/proc/self/statm") as f:
+            rss_pages = int(f.read().split()[1])
+        families.append((
+            "process_resident_memory_bytes", "gauge", "Resident memory size",
+            [({}, rss_pages * os.sysconf("SC_PAGE_SIZE"))],
+        ))
+    except (OSError, ValueError, IndexError):
+        pass  # /proc の無い環境（macOS等）では省略
+    return families
+
+
+@registry.register_collector
+def collect_workloads():
+    return [(
+        "http_requests_in_flight", "gauge", "Requests currently being processed by workload",
+        [({"workload": workload}, count) for workload, count in get_in_flight().items()],
+    )]
+
+
+@registry.register_collector
+def collect_pools():
+    pools = pool_manager.snapshot()["pools"]
+    long_held = pool_manager.long_held()
+
+    def per_pool(key):
+        return [({"pool": workload}, values[key]) for workload, values in pools.items()]
+
+    return [
+        ("db_pool_connections", "gauge", "Pool connections by state",
+         [({"pool": workload, "state": state}, values[state]) for workload, values in pools.items() for state in ("in_use", "idle")]),
+        ("db_pool_max_connections", "gauge", "Configured pool max size", per_pool("max_size")),
+        ("db_pool_acquires_total", "counter", "Connections acquired from the pool", per_pool("acquires")),
+        ("db_pool_acquire_errors_total", "counter", "Failed pool acquisitions", per_pool("acquire_errors")),
+        ("db_pool_acquire_wait_seconds_total", "counter", "Total time spent waiting for a connection", per_pool("acquire_wait_seconds_total")),
+        ("db_pool_acquire_wait_seconds_max", "gauge", "Longest wait for a connection", per_pool("acquire_wait_seconds_max")),
+        ("db_pool_hold_seconds_total", "counter", "Total time connections were held", per_pool("hold_seconds_total")),
+        ("db_pool_connections_lost_total", "counter", "Pool connections closed by the server or network", per_pool("connections_lost")),
+        ("db_pool_reconnects_total", "counter", "Connections opened to replace lost connections", per_pool("reconnects")),
+        ("db_pool_long_held_connections", "gauge", "Checked-out connections held longer than DB_HOLD_WARNING_SECONDS",
+         [({"pool": workload}, sum(1 for c in long_held if c["workload"] == workload)) for workload in pools]),
+    ]
+
+
+@registry.register_collector
+def collect_caches():
+    prepared = get_prepared_statement_status()
+    engine = matching_engine.status()
+    parameter_cache = engine["parameter_cache"]
+    caches = {
+        "matching_parameters": (parameter_cache["hits"], parameter_cache["misses"]),
+        "prepared_statements": (prepared["prepared_executions"], prepared["text_executions"]),
+    }
+    http_cache = master_data_cache.status()
+    if http_cache["enabled"]:
+        caches["http_master_data"] = (http_cache["hits"], http_cache["misses"])
+    talent_details = talent_detail_cache.status()
+    if talent_details["hits"] + talent_details["misses"]:
+        caches["talent_details"] = (talent_details["hits"], talent_details["misses"])
+    if engine["precomputed"] is not None:
+        caches["matching_topk"] = (engine["precomputed"]["hits"], engine["precomputed"]["misses"])
+    return [
+        ("cache_requests_total", "counter", "Cache lookups by result",
+         [({"cache": name, "result": result}, count)
+          for name, (hits, misses) in caches.items() for result, count in (("hit", hits), ("miss", misses))]),
+        ("cache_hit_ratio", "gauge", "Cache hit ratio since process start",
+         [({"cache": name}, hits / (hits + misses)) for name, (hits, misses) in caches.items() if hits + misses]),
+        ("matching_parameter_cache_entries", "gauge", "Cached matching parameter sets", [({}, parameter_cache["entries"])]),
+    ]
+
+
+@registry.register_collector
+def collect_compression():
+    compression = compression_status()
+    return [
+        ("http_compressed_responses_total", "counter", "Compressed responses by encoding",
+         [({"encoding": encoding}, count) for encoding, count in compression["responses"].items()]),
+        ("http_compression_bytes_total", "counter", "Response bytes before and after compression by encoding",
+         [({"encoding": encoding, "stage": stage}, count)
+          for stage in ("in", "out") for encoding, count in compression[f"bytes_{stage}"].items()]),
+    ]
+
+
+@registry.register_collector
+def collect_background_queues():
+    shadow = matching_engine.status()["shadow"]
+    return [
+        ("background_queue_depth", "gauge", "Pending background tasks by queue", [
+            ({"queue": "matching_shadow"}, shadow["pending"]),
+            ({"queue": "trace_export"}, pending_exports()),
+            ({"queue": "query_plan_capture"}, plan_sampler.pending()),
+            ({"queue": "email_outbox"}, email_outbox_worker.queue_depth["pending"]),
+        ]),
+        ("email_outbox_messages", "gauge", "Outbox emails by status (as of the worker's last poll)",
+         [({"status": status}, count) for status, count in email_outbox_worker.queue_depth.items()]),
+        ("email_outbox_sent_total", "counter", "Outbox send attempts by result", [
+            ({"result": "sent"}, email_outbox_worker.stats.sent),
+            ({"result": "retried"}, email_outbox_worker.stats.retried),
+            ({"result": "failed"}, email_outbox_worker.stats.failed),
+        ]),
+        ("query_plan_samples_total", "counter", "Queries selected for EXPLAIN by trigger", [
+            ({"trigger": "sample"}, plan_sampler.stats.sampled),
+            ({"trigger": "slow"}, plan_sampler.stats.slow),
+        ]),
+        ("query_plan_changes_total", "counter", "Captured plans whose shape differs from the previous capture",
+         [({}, plan_sampler.stats.plan_changes)]),
+        ("matching_shadow_runs_total", "counter", "Shadow backend comparisons", [({}, shadow["runs"])]),
+        ("matching_shadow_mismatches_total", "counter", "Shadow comparisons with ranking differences", [({}, shadow["mismatches"])]),
+        ("matching_shadow_errors_total", "counter", "Shadow backend failures", [({}, shadow["errors"])]),
+    ]
+
+
+@registry.register_collector
+def collect_admission():
+    admission = heavy_query_admission.status()
+    coalescing = matching_engine.status()["coalescing"]
+    return [
+        ("heavy_query_active", "gauge", "Heavy queries currently admitted", [({}, admission["active"])]),
+        ("heavy_query_waiting", "gauge", "Heavy queries waiting for admission", [({}, admission["waiting"])]),
+        ("heavy_query_admitted_total", "counter", "Heavy queries admitted", [({}, admission["admitted"])]),
+        ("heavy_query_rejected_total", "counter", "Heavy queries rejected with 503", [
+            ({"reason": "queue_full"}, admission["rejected_queue_full"]),
+            ({"reason": "timeout"}, admission["rejected_timeout"]),
+        ]),
+        ("matching_coalesced_total", "counter", "STEP 0-4 requests that shared an in-flight computation",
+         [({}, coalescing["coalesced"])]),
+    ]
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """
+    GET /metrics
+
+    Prometheus テキスト形式のメトリクス（リクエスト・マッチング段階のレイテンシ、
+    プール・キャッシュ・バックグラウンドキューの状態）
+
+    Raises:
+        HTTPException: METRICS_ENABLED=false の場合 404
+    """
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="メトリクスは無効です")
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
@@ -1,8 +1,9 @@
 """おすすめタレント管理APIエンドポイント"""
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Query, status
 from typing import List, Dict, Optional
 from pydantic import BaseModel
-from app.db.connection import get_asyncpg_connection
+from app.db.connection import acquire_connection
+from app.services.talent_search import get_talent_search_index
 
 router = APIRouter()
 
@@ -36,6 +37,13 @@ class TalentOption(BaseModel):
     category: Optional[str]
 
 
+class TalentSearchResult(TalentOption):
+    """タレント検索結果（入力補完用）"""
+    kana: Optional[str]
+    base_power_score: float
+    match: str  # exact / prefix / part_prefix / substring
+
+
 @router.get(
     "/recommended-talents",
     response_model=List[RecommendedTalentResponse],
@@ -44,8 +52,7 @@ class TalentOption(BaseModel):
 )
 async def get_recommended_talents():
     """おすすめタレント設定一覧取得"""
-    conn = await get_asyncpg_connection()
-    try:
+    async with acquire_connection() as conn:
         query = """
             SELECT
                 rt.id,
@@ -68,9 +75,6 @@ async def get_recommended_talents():
 
         return [RecommendedTalentResponse(**dict(row)) for row in rows]
 
-    finally:
-        await conn.close()
-
 
 @router.get(
     "/recommended-talents/{industry_name}",
@@ -80,8 +84,7 @@ async def get_recommended_talents():
 )
 async def get_recommended_talent_by_industry(industry_name: str):
     """業界別おすすめタレント取得"""
-    conn = await get_asyncpg_connection()
-    try:
+    async with acquire_connection() as conn:
         query = """
             SELECT
                 rt.id,
@@ -110,9 +113,6 @@ async def get_recommended_talent_by_industry(industry_name: str):
 
         return RecommendedTalentResponse(**dict(row))
 
-    finally:
-        await conn.close()
-
 
 @router.post(
     "/recommended-talents",
@@ -123,8 +123,7 @@ async def get_recommended_talent_by_industry(industry_name: str):
 )
 async def create_or_update_recommended_talents(request: RecommendedTalentRequest):
     """おすすめタレント設定作成/更新"""
-    conn = await get_asyncpg_connection()
-    try:
+    async with acquire_connection() as conn:
         # UPSERTクエリ（ON CONFLICT DO UPDATE）
         query = """
             INSERT INTO recommended_talents (
@@ -177,9 +176,6 @@ async def create_or_update_recommended_talents(request: RecommendedTalentRequest
 
         return RecommendedTalentResponse(**result_data)
 
-    finally:
-        await conn.close()
-
 
 @router.delete(
     "/recommended-talents/{industry_name}",
@@ -189,8 +185,7 @@ async def create_or_update_recommended_talents(request: RecommendedTalentRequest
 )
 async def delete_recommended_talents(industry_name: str):
     """おすすめタレント設定削除"""
-    conn = await get_asyncpg_connection()
-    try:
+    async with acquire_connection() as conn:
         result = await conn.execute(
             "DELETE FROM recommended_talents WHERE industry_name = $1",
             industry_name
@@ -202,9 +197,6 @@ async def delete_recommended_talents(industry_name: str):
                 detail=f"業界 '{industry_name}' のおすすめタレント設定が見つかりません"
             )
 
-    finally:
-        await conn.close()
-
 
 @router.get(
     "/talent-options",
@@ -214,8 +206,7 @@ async def delete_recommended_talents(industry_name: str):
 )
 async def get_talent_options():
     """タレント選択肢取得（管理画面用）"""
-    conn = await get_asyncpg_connection()
-    try:
+    async with acquire_connection() as conn:
         query = """
             SELECT
                 account_id,
@@ -229,39 +220,20 @@ async def get_talent_options():
 
         return [TalentOption(**dict(row)) for row in rows]
 
-    finally:
-        await conn.close()
-
 
-async def get_recommended_talents_for_matching(industry_name: str) -> List[Dict]:
-    """マッチングロジック用：業界別おすすめタレント取得"""
-    conn = await get_asyncpg_connection()
-    try:
-        query = """
-            SELECT
-                ma.account_id,
-                ma.name_full_for_matching as name,
-                ma.last_name_kana,
-                ma.act_genre,
-                'recommended' as talent_type
-            FROM recommended_talents rt
-            INNER JOIN m_account ma ON (
-                (rt.talent_id_1 IS NOT NULL AND ma.account_id = rt.talent_id_1)
-                OR (rt.talent_id_2 IS NOT NULL AND ma.account_id = rt.talent_id_2)
-                OR (rt.talent_id_3 IS NOT NULL AND ma.account_id = rt.talent_id_3)
-            )
-            WHERE rt.industry_name = $1
-                AND ma.del_flag = 0
-            ORDER BY
-                CASE
-                    WHEN ma.account_id = rt.talent_id_1 THEN 1
-                    WHEN ma.account_id = rt.talent_id_2 THEN 2
-                    WHEN ma.account_id = rt.talent_id_3 THEN 3
-                END
-        """
-        rows = await conn.fetch(query, industry_name)
-
-        return [dict(row) for row in rows]
-
-    finally:
-        await conn.close()
\ No newline at end of file
+@router.get(
+    "/talent-options/search",
+    response_model=List[TalentSearchResult],
+    summary="タレント検索（入力補完）",
+    description="表示名・かな・ローマ字（全角/半角・カタカナ/ひらがなを区別しない）でタレントを検索し、上位を返す"
+)
+async def search_talent_options(
+    q: str = Query(..., min_length=1, max_length=50, description="検索文字列"),
+    limit: int = Query(20, ge=1, le=100, description="最大件数"),
+):
+    """タレント検索（管理画面のおすすめタレント選択用）
+
+    完全一致 → 前方一致 → 姓・名の前方一致 → 部分一致の順、同順位は基礎パワー得点の高い順。
+    """
+    index = await get_talent_search_index()
+    return [TalentSearchResult(**result) for result in index.search(q, limit=limit)]
@@ -2,9 +2,9 @@
 作成日: 2025-11-28
 目的: GET /api/target-segments の実装
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.connection import get_db
+from fastapi import APIRouter, HTTPException, Request, status
+from app.core.http_cache import master_data_cache
+from app.db.connection import get_session_maker
 from app.services.target_segments import TargetSegmentService
 from app.schemas.target_segments import TargetSegmentsListResponse
 
@@ -18,13 +18,14 @@ router = APIRouter()
     description="8ターゲット層（男性・女性 × 4年齢区分）の一覧を取得",
     status_code=status.HTTP_200_OK,
 )
-async def get_target_segments(
-    db: AsyncSession = Depends(get_db),
-) -> TargetSegmentsListResponse:
+async def get_target_segments(request: Request) -> TargetSegmentsListResponse:
     """ターゲット層一覧取得API
 
+    レスポンスはマスタデータバージョンごとに保持し、ETag・Cache-Control を付けて返す
+    （app.core.http_cache）。セッションは保持中のレスポンスが無いときだけ作成する。
+
     Args:
-        db: データベースセッション（依存性注入）
+        request: リクエスト（If-None-Match の判定に使用）
 
     Returns:
         TargetSegmentsListResponse: ターゲット層一覧（total + items）
@@ -33,12 +34,7 @@ async def get_target_segments(
         HTTPException: データベースエラー時に500エラー
     """
     try:
-        # サービス層を呼び出し
-        service = TargetSegmentService(db)
-        result = await service.get_all_target_segments()
-
-        # 正常レスポンス
-        return result
+        return await master_data_cache.respond(request, "target-segments", _fetch_target_segments)
 
     except Exception as e:
         # エラーハンドリング
@@ -46,3 +42,10 @@ async def get_target_segments(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to fetch target segments: {str(e)}",
         ) from e
+
+
+async def _fetch_target_segments() -> TargetSegmentsListResponse:
+    # サービス層を呼び出し
+    async with get_session_maker()() as db:
+        service = TargetSegmentService(db)
+        return await service.get_all_target_segments()
@@ -0,0 +1,240 @@
+"""レスポンス圧縮（ASGIミドルウェア）
+
+管理画面のフォーム送信一覧・CSVエクスポートなど、日本語を多く含むJSON/CSVを圧縮して返す。
+UTF-8の日本語は1文字3バイトで冗長性が高く、gzip でも 1/4〜1/6 程度になる。
+
+- 方式: Accept-Encoding（q値）に従い zstd → br → gzip の優先順で選択。zstd・br はそれぞれ
+  zstandard・brotli がインストールされている場合のみ使う（無ければ gzip）
+- 対象: テキスト系（text/*・JSON・XML・JavaScript・SVG）のみ。PDF・画像・zip など圧縮済みの形式や、
+  Content-Encoding 付き・Cache-Control: no-transform のレスポンスはそのまま返す
+- しきい値: 本文が COMPRESSION_MINIMUM_SIZE バイト未満なら圧縮しない（ヘッダーと CPU の分だけ損になる）
+- ストリーミング: StreamingResponse は受け取ったチャンクごとに圧縮してフラッシュするため、
+  エクスポート全体をメモリに溜めない（しきい値の判定に必要な先頭部分だけ待つ）
+- ETag: 圧縮後の表現は元と異なるため弱い ETag（W/）にする（If-None-Match の判定は app.core.http_cache）
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - 未インストールの環境では br を使わない
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 未インストールの環境では zstd を使わない
+    zstandard = None
+
+# サーバー側の優先順（同じq値なら先にあるものを選ぶ）
+ENCODING_PREFERENCE = ("zstd", "br", "gzip")
+
+COMPRESSIBLE_TYPES = frozenset({
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+    "image/svg+xml",
+})
+
+
+def available_encodings() -> Tuple[str, ...]:
+    available = {"gzip"}
+    if brotli is not None:
+        available.add("br")
+    if zstandard is not None:
+        available.add("zstd")
+    return tuple(encoding for encoding in ENCODING_PREFERENCE if encoding in available)
+
+
+def choose_encoding(accept_encoding: str, available: Tuple[str, ...]) -> Optional[str]:
+    """Accept-Encoding から使用する方式を選択（q=0 は除外、"*" は未指定の方式すべて）"""
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    wildcard = weights.get("*")
+    candidates = []
+    for rank, encoding in enumerate(available):
+        q = weights.get(encoding, wildcard)
+        if q:
+            candidates.append((-q, rank, encoding))
+    return min(candidates)[2] if candidates else None
+
+
+def is_compressible(headers: Headers, status: int) -> bool:
+    if status < 200 or status in (204, 304):
+        return False
+    if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+        return False
+    content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+    return (
+        content_type.startswith("text/")
+        or content_type in COMPRESSIBLE_TYPES
+        or content_type.endswith(("+json", "+xml"))
+    )
+
+
+class _Compressor:
+    """方式ごとの差分を吸収したストリーム圧縮器"""
+
+    def __init__(self, encoding: str) -> None:
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._zstd = zstandard.ZstdCompressor(level=settings.compression_zstd_level).compressobj()
+        elif encoding == "br":
+            self._brotli = brotli.Compressor(mode=brotli.MODE_TEXT, quality=settings.compression_brotli_quality)
+        else:
+            # wbits=31: gzip ヘッダー付き
+            self._zlib = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        """data を圧縮して返す（final でなければ、ここまでの入力を復元できるようフラッシュする）"""
+        if self.encoding == "zstd":
+            flush_mode = zstandard.COMPRESSOBJ_FLUSH_FINISH if final else zstandard.COMPRESSOBJ_FLUSH_BLOCK
+            return self._zstd.compress(data) + self._zstd.flush(flush_mode)
+        if self.encoding == "br":
+            return self._brotli.process(data) + (self._brotli.finish() if final else self._brotli.flush())
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+@dataclass
+class CompressionStats:
+    """方式別の圧縮前後バイト数（累積）"""
+    responses: Dict[str, int] = field(default_factory=dict)
+    bytes_in: Dict[str, int] = field(default_factory=dict)
+    bytes_out: Dict[str, int] = field(default_factory=dict)
+    skipped_small: int = 0
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int) -> None:
+        self.bytes_in[encoding] = self.bytes_in.get(encoding, 0) + bytes_in
+        self.bytes_out[encoding] = self.bytes_out.get(encoding, 0) + bytes_out
+
+
+compression_stats = CompressionStats()
+
+
+class _CompressingSend:
+    """1レスポンス分の send ラッパー（開始メッセージは本文の先頭を見て圧縮するか決めるまで保留）"""
+
+    def __init__(self, send, encoding: Optional[str], minimum_size: int) -> None:
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start: Optional[dict] = None
+        self.started = False
+        self.passthrough = False
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+        self.compressor: Optional[_Compressor] = None
+
+    async def __call__(self, message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            message["headers"] = list(message.get("headers", []))
+            self.start = message
+            headers = Headers(raw=message["headers"])
+            if not is_compressible(headers, message["status"]):
+                self.passthrough = True
+            else:
+                # 圧縮する・しないに関わらず、同じURLで方式ごとに表現が変わるためキャッシュに知らせる
+                MutableHeaders(raw=message["headers"]).add_vary_header("Accept-Encoding")
+                if self.encoding is None:
+                    self.passthrough = True
+            if self.passthrough:
+                await self._send_start()
+            return
+
+        if self.passthrough or message_type != "http.response.body":
+            if not self.started:
+                await self._send_start()
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            # しきい値を超えるか本文が終わるまで先頭部分を溜める
+            self.buffer.append(body)
+            self.buffered += len(body)
+            if self.buffered < self.minimum_size:
+                if more_body:
+                    return
+                compression_stats.skipped_small += 1
+                self.passthrough = True
+                await self._send_start()
+                await self.send({"type": "http.response.body", "body": b"".join(self.buffer), "more_body": False})
+                return
+            body, self.buffer = b"".join(self.buffer), []
+            self.compressor = _Compressor(self.encoding)
+
+        compressed = self.compressor.compress(body, final=not more_body)
+        compression_stats.record(self.encoding, len(body), len(compressed))
+        if not self.started:
+            self._rewrite_headers(None if more_body else len(compressed))
+            await self._send_start()
+        if not more_body:
+            compression_stats.responses[self.encoding] = compression_stats.responses.get(self.encoding, 0) + 1
+        await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+    def _rewrite_headers(self, content_length: Optional[int]) -> None:
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        if content_length is None:
+            # ストリーミング（Transfer-Encoding: chunked）
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+
+    async def _send_start(self) -> None:
+        self.started = True
+        await self.send(self.start)
+
+
+class CompressionMiddleware:
+    """テキスト系レスポンスを gzip / br / zstd で圧縮（ASGIミドルウェア）"""
+
+    def __init__(self, app, minimum_size: Optional[int] = None) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.available = available_encodings()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.compression_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        encoding = choose_encoding(accept_encoding, self.available) if accept_encoding else None
+        minimum_size = self.minimum_size if self.minimum_size is not None else settings.compression_minimum_size
+        await self.app(scope, receive, _CompressingSend(send, encoding, minimum_size))
+
+
+def compression_status():
+    return {
+        "enabled": settings.compression_enabled,
+        "available": list(available_encodings()),
+        "responses": dict(compression_stats.responses),
+        "bytes_in": dict(compression_stats.bytes_in),
+        "bytes_out": dict(compression_stats.bytes_out),
+        "skipped_small": compression_stats.skipped_small,
+    }
@@ -0,0 +1,211 @@
+"""同一計算の相乗り（single-flight）と重いクエリのアドミッション制御
+
+キャンペーン開始直後などに同じ（業種・ターゲット層・予算）の診断が同時に届くと、
+それぞれが STEP 0-4 統合CTEを実行して5接続のプールを奪い合い、あふれたリクエストは
+pool.acquire() で DB_POOL_TIMEOUT まで待たされる。これを次の2段で抑える。
+
+- SingleFlight: 同じキーの計算が実行中なら新たに実行せず、その結果を共有する
+- AdmissionController: 重いクエリの同時実行数を制限し、待ち行列が上限を超えた分や
+  待機タイムアウトした分は即座に 503 + Retry-After で返す（AdmissionRejected）
+
+    result, shared = await single_flight.do(key, lambda: compute(...))
+
+    async with heavy_query_admission.slot():
+        rows = await conn.fetch(...)
+"""
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+import asyncio
+import logging
+import math
+
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+RETRY_AFTER_MIN = 1
+RETRY_AFTER_MAX = 30
+
+
+class AdmissionRejected(HTTPException):
+    """アドミッション制御で受け付けられなかった（503 + Retry-After）
+
+    HTTPException のサブクラスなので、既存エンドポイントの `except HTTPException: raise` を
+    そのまま通過してクライアントに返る。
+    """
+
+    def __init__(self, retry_after: int, reason: str) -> None:
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="現在混雑しています。しばらくしてから再度お試しください",
+            headers={"Retry-After": str(retry_after)},
+        )
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+@dataclass
+class SingleFlightStats:
+    """相乗りの計測値（累積）"""
+    leaders: int = 0
+    coalesced: int = 0
+
+
+class SingleFlight:
+    """同じキーの実行中の計算に相乗りする
+
+    計算は呼び出し元とは別タスクで実行するため、最初の呼び出し元がキャンセル（切断）されても
+    相乗りしている他の呼び出し元には結果が届く。例外も全員に伝わる。
+    """
+
+    def __init__(self) -> None:
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.stats = SingleFlightStats()
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """(結果, 相乗りしたか) を返す"""
+        task = self._in_flight.get(key)
+        shared = task is not None
+        if shared:
+            self.stats.coalesced += 1
+        else:
+            self.stats.leaders += 1
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task), shared
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # 待っている呼び出し元が全員キャンセルされた場合の未取得例外の警告を防ぐ
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+
+@dataclass
+class AdmissionStats:
+    """アドミッション制御の計測値（累積）"""
+    admitted: int = 0
+    queued: int = 0
+    rejected_queue_full: int = 0
+    rejected_timeout: int = 0
+    max_waiting: int = 0
+
+
+class AdmissionController:
+    """重い処理の同時実行数制限（待ち行列の長さと待機時間に上限あり）
+
+    limit / max_queue / queue_timeout は呼び出しごとに取得するため設定変更に追従する。
+    limit が 0 以下の場合は制限しない。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: Callable[[], int],
+        max_queue: Callable[[], int],
+        queue_timeout: Callable[[], float],
+    ) -> None:
+        self.name = name
+        self._limit = limit
+        self._max_queue = max_queue
+        self._queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.stats = AdmissionStats()
+        self._condition: Optional[asyncio.Condition] = None
+        self._condition_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._service_seconds_avg = 0.0  # 1件あたり処理時間の指数移動平均（Retry-After 推定用）
+
+    def _retry_after(self) -> int:
+        limit = max(self._limit(), 1)
+        estimate = self._service_seconds_avg * (self.waiting + 1) / limit
+        return int(min(max(math.ceil(estimate), RETRY_AFTER_MIN), RETRY_AFTER_MAX))
+
+    def saturated(self) -> bool:
+        """空きが無い（シャドー実行など省略可能な処理の判定用）"""
+        limit = self._limit()
+        return limit > 0 and self.active >= limit
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        retry_after = self._retry_after()
+        logger.warning(
+            f"⚠️ アドミッション制御で拒否: {self.name} reason={reason} "
+            f"active={self.active} waiting={self.waiting} retry_after={retry_after}s"
+        )
+        return AdmissionRejected(retry_after, reason)
+
+    @asynccontextmanager
+    async def slot(self):
+        """処理枠を確保（満杯なら待ち行列に並び、行列超過・待機タイムアウトは AdmissionRejected）"""
+        limit = self._limit()
+        if limit <= 0:
+            yield
+            return
+
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._condition_loop is not loop:
+            # asyncio のプリミティブは最初に使ったイベントループに紐づくため、ループごとに作り直す
+            self._condition, self._condition_loop = asyncio.Condition(), loop
+        condition = self._condition
+
+        if self.active >= limit:
+            if self.waiting >= self._max_queue():
+                self.stats.rejected_queue_full += 1
+                raise self._reject("queue_full")
+
+            self.stats.queued += 1
+            self.waiting += 1
+            self.stats.max_waiting = max(self.stats.max_waiting, self.waiting)
+            try:
+                async with condition:
+                    await asyncio.wait_for(
+                        condition.wait_for(lambda: self.active < self._limit()), timeout=self._queue_timeout()
+                    )
+                    self.active += 1
+            except asyncio.TimeoutError:
+                self.stats.rejected_timeout += 1
+                raise self._reject("timeout")
+            finally:
+                self.waiting -= 1
+        else:
+            self.active += 1
+
+        self.stats.admitted += 1
+        started = loop.time()
+        try:
+            yield
+        finally:
+            elapsed = loop.time() - started
+            self._service_seconds_avg = elapsed if not self._service_seconds_avg else 0.8 * self._service_seconds_avg + 0.2 * elapsed
+            self.active -= 1
+            async with condition:
+                # 待機中にキャンセルされた呼び出し元へ通知が消費されないよう全員を起こす
+                condition.notify_all()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "limit": self._limit(),
+            "max_queue": self._max_queue(),
+            "queue_timeout": self._queue_timeout(),
+            "active": self.active,
+            "waiting": self.waiting,
+            "service_ms_avg": round(self._service_seconds_avg * 1000, 1),
+            **asdict(self.stats),
+        }
+
+
+# STEP 0-4 統合CTEなど、DB上で重い計算をするクエリ用（プロセス全体で共有）
+heavy_query_admission = AdmissionController(
+    "heavy_query",
+    limit=lambda: settings.heavy_query_max_concurrency,
+    max_queue=lambda: settings.heavy_query_max_queue,
+    queue_timeout=lambda: settings.heavy_query_queue_timeout,
+)
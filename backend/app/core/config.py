@@ -36,6 +36,124 @@ class Settings(BaseSettings):
     db_max_overflow: int = Field(default=20, alias="DB_MAX_OVERFLOW")  # オーバーフロー余裕確保
     db_pool_timeout: int = Field(default=30, alias="DB_POOL_TIMEOUT")  # タイムアウト30秒に延長
     db_pool_recycle: int = Field(default=3600, alias="DB_POOL_RECYCLE")  # 接続回転を1時間に延長
+    db_hold_warning_seconds: float = Field(default=5.0, alias="DB_HOLD_WARNING_SECONDS")  # asyncpg接続の保持警告閾値
+    prepared_statements_enabled: bool = Field(default=True, alias="PREPARED_STATEMENTS_ENABLED")  # ホットクエリを接続作成時に準備
+
+    # ===== デプロイプロファイル（all / public / admin）=====
+    # public: 利用者向けAPIのみ、admin: 管理画面・デバッグAPIのみ、all: 両方（ワークロード別プール・同時実行数制限）
+    app_profile: str = Field(default="all", alias="APP_PROFILE")
+    public_pool_min_size: int = Field(default=2, alias="PUBLIC_POOL_MIN_SIZE")
+    public_pool_max_size: int = Field(default=5, alias="PUBLIC_POOL_MAX_SIZE")
+    admin_pool_min_size: int = Field(default=1, alias="ADMIN_POOL_MIN_SIZE")
+    admin_pool_max_size: int = Field(default=2, alias="ADMIN_POOL_MAX_SIZE")
+    public_max_concurrency: int = Field(default=0, alias="PUBLIC_MAX_CONCURRENCY")  # 0 = 制限なし
+    admin_max_concurrency: int = Field(default=2, alias="ADMIN_MAX_CONCURRENCY")
+    workload_queue_timeout: float = Field(default=10.0, alias="WORKLOAD_QUEUE_TIMEOUT")  # 秒
+    # 同一条件のマッチング（STEP 0-4）が同時に来た場合は1回の計算結果を共有する
+    matching_coalescing_enabled: bool = Field(default=True, alias="MATCHING_COALESCING_ENABLED")
+    # 重いクエリ（STEP 0-4 統合CTE）の同時実行数・待ち行列・待機秒数（超過分は 503 + Retry-After）
+    # public プール5接続のうち1つはフォーム保存・CM確認用に残す。0 = 制限なし
+    heavy_query_max_concurrency: int = Field(default=4, alias="HEAVY_QUERY_MAX_CONCURRENCY")
+    heavy_query_max_queue: int = Field(default=20, alias="HEAVY_QUERY_MAX_QUEUE")
+    heavy_query_queue_timeout: float = Field(default=5.0, alias="HEAVY_QUERY_QUEUE_TIMEOUT")
+
+    # ===== スコアリング配列スナップショット（コールドスタート高速化）=====
+    # ビルド時に scripts/build_scoring_arrays.py で作成した成果物のパス（未設定ならSQL版のみ）
+    scoring_arrays_path: Optional[str] = Field(default=None, alias="SCORING_ARRAYS_PATH")
+    # DBデータバージョンとの再照合間隔（秒、0なら起動時の1回のみ）
+    scoring_arrays_check_interval: int = Field(default=300, alias="SCORING_ARRAYS_CHECK_INTERVAL")
+
+    # ===== マッチングエンジン（STEP 0-4 バックエンド）=====
+    # auto: スコアリング配列が読み込まれていれば arrays、無ければ sql
+    matching_backend: str = Field(default="auto", alias="MATCHING_BACKEND")
+    # 候補バックエンドを裏で実行してランキング差分・レイテンシを記録（空なら無効）
+    matching_shadow_backend: str = Field(default="", alias="MATCHING_SHADOW_BACKEND")
+    matching_shadow_sample_rate: float = Field(default=1.0, alias="MATCHING_SHADOW_SAMPLE_RATE")
+    # 事前計算済みの上位K件（app/services/matching_topk.py）。auto では arrays の次に優先
+    matching_topk_enabled: bool = Field(default=True, alias="MATCHING_TOPK_ENABLED")
+    # おすすめタレントとの重複除去の余裕を見て表示件数（30）より多く保持する
+    matching_topk_k: int = Field(default=60, alias="MATCHING_TOPK_K")
+    # データバージョン・計算日の照合間隔（秒、0なら起動時の1回のみ）
+    matching_topk_check_interval: int = Field(default=60, alias="MATCHING_TOPK_CHECK_INTERVAL")
+    # 照合で古いと判定したら再計算する（false の場合は scripts/precompute_matching_topk.py で実行）
+    matching_topk_auto_refresh: bool = Field(default=True, alias="MATCHING_TOPK_AUTO_REFRESH")
+
+    # ===== トレース計測（app/core/tracing.py）=====
+    # none / log（OTLP/JSONをログ出力）/ otlp（OTLP/HTTPで送信）
+    tracing_exporter: str = Field(default="none", alias="TRACING_EXPORTER")
+    tracing_otlp_endpoint: str = Field(default="http://localhost:4318/v1/traces", alias="TRACING_OTLP_ENDPOINT")
+    tracing_sample_rate: float = Field(default=1.0, alias="TRACING_SAMPLE_RATE")
+    # 段階別の処理時間を Server-Timing レスポンスヘッダーで返す
+    server_timing_enabled: bool = Field(default=False, alias="SERVER_TIMING_ENABLED")
+
+    # ===== レスポンス =====
+    # orjson を既定のレスポンスクラスにし、/api/matching は response_model の再検証を省略して返す
+    fast_json_response_enabled: bool = Field(default=False, alias="FAST_JSON_RESPONSE_ENABLED")
+
+    # ===== マスタデータAPIのHTTPキャッシュ（/api/industries・/api/target-segments・/api/booking-link） =====
+    http_cache_enabled: bool = Field(default=True, alias="HTTP_CACHE_ENABLED")
+    http_cache_max_age: int = Field(default=60, alias="HTTP_CACHE_MAX_AGE")  # ブラウザ
+    http_cache_s_maxage: int = Field(default=300, alias="HTTP_CACHE_S_MAXAGE")  # CDN
+    http_cache_stale_while_revalidate: int = Field(default=86400, alias="HTTP_CACHE_STALE_WHILE_REVALIDATE")
+    http_cache_version_check_seconds: float = Field(default=10.0, alias="HTTP_CACHE_VERSION_CHECK_SECONDS")
+    http_cache_ttl_seconds: float = Field(default=300.0, alias="HTTP_CACHE_TTL_SECONDS")
+
+    # ===== レスポンス圧縮（app.core.compression） =====
+    compression_enabled: bool = Field(default=True, alias="COMPRESSION_ENABLED")
+    compression_minimum_size: int = Field(default=1024, alias="COMPRESSION_MINIMUM_SIZE")  # バイト
+    compression_gzip_level: int = Field(default=6, alias="COMPRESSION_GZIP_LEVEL")
+    compression_brotli_quality: int = Field(default=5, alias="COMPRESSION_BROTLI_QUALITY")
+    compression_zstd_level: int = Field(default=3, alias="COMPRESSION_ZSTD_LEVEL")
+
+    # ===== 履歴テーブルの月次パーティション（app.services.partition_maintenance） =====
+    partition_maintenance_enabled: bool = Field(default=True, alias="PARTITION_MAINTENANCE_ENABLED")
+    partition_months_ahead: int = Field(default=3, alias="PARTITION_MONTHS_AHEAD")
+    partition_retention_months: int = Field(default=24, alias="PARTITION_RETENTION_MONTHS")
+    partition_archive_dir: str = Field(default="archive/partitions", alias="PARTITION_ARCHIVE_DIR")
+
+    # ===== 診断結果の保存形式（app.services.diagnosis_storage） =====
+    # rows: diagnosis_results に30行 / compact: diagnosis_result_sets に配列で1行
+    # compact は scripts/create_diagnosis_result_sets.sql 適用後に有効化する
+    diagnosis_storage: str = Field(default="rows", alias="DIAGNOSIS_STORAGE")
+
+    # ===== スコアリング変更の試算（app.services.scoring_simulation） =====
+    # スナップショットのディレクトリを指定すると、試算APIはDBではなくスナップショットを読み込む
+    scoring_simulation_snapshot: Optional[str] = Field(default=None, alias="SCORING_SIMULATION_SNAPSHOT")
+
+    # ===== マッチング結果に同梱するタレント詳細（app.services.talent_details） =====
+    talent_detail_cache_ttl_seconds: float = Field(default=3600.0, alias="TALENT_DETAIL_CACHE_TTL_SECONDS")
+
+    # ===== メトリクス設定 =====
+    # /metrics（Prometheus テキスト形式）でリクエスト・マッチング段階の処理時間、プール状態を公開
+    metrics_enabled: bool = Field(default=True, alias="METRICS_ENABLED")
+
+    # ===== 実行計画サンプリング =====
+    # プリペアドステートメント実行のうち EXPLAIN (ANALYZE, BUFFERS) を取り直す割合（0で無効）
+    query_plan_sample_rate: float = Field(default=0.01, alias="QUERY_PLAN_SAMPLE_RATE")
+    # この時間（ミリ秒）を超えたクエリは常に実行計画を取得（0で無効）
+    slow_query_threshold_ms: float = Field(default=1000.0, alias="SLOW_QUERY_THRESHOLD_MS")
+    query_plan_buffer_size: int = Field(default=100, alias="QUERY_PLAN_BUFFER_SIZE")
+    query_plan_timeout_seconds: float = Field(default=30.0, alias="QUERY_PLAN_TIMEOUT_SECONDS")
+
+    # ===== タレント名検索（管理画面のおすすめタレント選択、app/services/talent_search.py）=====
+    # 索引のデータバージョン照合間隔（秒）
+    talent_search_check_interval: int = Field(default=60, alias="TALENT_SEARCH_CHECK_INTERVAL")
+
+    # ===== メール送信アウトボックス（app/services/email_outbox.py）=====
+    # false の場合は従来どおりリクエスト内で送信する。ワーカーはリクエスト外でも CPU が割り当てられる
+    # 常駐インスタンス（Cloud Run の --no-cpu-throttling かつ --min-instances 1 以上、admin プロファイル）で
+    # 動かす必要があるため、その構成でのみ true にする
+    email_outbox_enabled: bool = Field(default=False, alias="EMAIL_OUTBOX_ENABLED")
+    email_outbox_batch_size: int = Field(default=20, alias="EMAIL_OUTBOX_BATCH_SIZE")
+    # LISTEN の通知を取りこぼした場合の確認間隔（秒）
+    email_outbox_poll_seconds: float = Field(default=30.0, alias="EMAIL_OUTBOX_POLL_SECONDS")
+    email_outbox_max_attempts: int = Field(default=6, alias="EMAIL_OUTBOX_MAX_ATTEMPTS")
+    # 再試行間隔: base × 2^(試行回数-1)、上限 max（秒）
+    email_outbox_retry_base_seconds: float = Field(default=30.0, alias="EMAIL_OUTBOX_RETRY_BASE_SECONDS")
+    email_outbox_retry_max_seconds: float = Field(default=3600.0, alias="EMAIL_OUTBOX_RETRY_MAX_SECONDS")
+    email_outbox_send_timeout: float = Field(default=60.0, alias="EMAIL_OUTBOX_SEND_TIMEOUT")
+    # 送信中のままこの秒数を過ぎた行（プロセス停止など）は再送対象に戻す
+    email_outbox_stale_seconds: int = Field(default=600, alias="EMAIL_OUTBOX_STALE_SECONDS")
 
     # ===== セキュリティ設定 =====
     rate_limit_per_second: int = Field(default=10, alias="RATE_LIMIT_PER_SECOND")
@@ -0,0 +1,152 @@
+"""マスタデータAPIのHTTPキャッシュ（ETag・If-None-Match・Cache-Control）
+
+フォーム表示のたびに呼ばれる /api/industries・/api/target-segments・/api/booking-link/{業種} の
+レスポンスを、マスタデータバージョンごとにシリアライズ済みのバイト列としてプロセス内に保持し、
+強い ETag と CDN（Vercel）向けの Cache-Control を付けて返す。
+
+- 再構築: master_data_version（HTTP_CACHE_VERSION_CHECK_SECONDS ごとに1行PK参照）が変わるか、
+  HTTP_CACHE_TTL_SECONDS を過ぎたら作り直す。予約リンク（industry_booking_links）はバージョン
+  トリガーの対象外のため TTL で反映し、同じプロセスでの更新は invalidate() で即時反映する
+- ETag: レスポンス本文のハッシュ。タレントデータの取り込みなど、本文が変わらないバージョン更新では
+  ETag も変わらず、ブラウザ・CDN のキャッシュがそのまま使える
+- If-None-Match が一致すれば 304（本文なし）を返す
+- Cache-Control: public, max-age（ブラウザ）, s-maxage（CDN）, stale-while-revalidate
+"""
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, Optional
+import hashlib
+import logging
+import time
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+from app.core.config import settings
+from app.core.responses import JSON_MEDIA_TYPE, FastJSONResponse
+from app.db.connection import acquire_connection
+from app.db.data_version import fetch_tracked_version
+
+logger = logging.getLogger(__name__)
+
+# キー数の上限（予約リンクは任意の業種名で呼べるため、無制限に増やさない）
+MAX_ENTRIES = 512
+
+
+@dataclass
+class CachedBody:
+    body: bytes
+    etag: str
+    data_version: Optional[str]
+    built_at: float  # time.monotonic()
+
+
+@dataclass
+class HttpCacheStats:
+    """キャッシュの計測値（累積）"""
+    hits: int = 0
+    misses: int = 0
+    not_modified: int = 0
+    version_checks: int = 0
+    version_check_errors: int = 0
+
+
+def make_etag(body: bytes) -> str:
+    return f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match の判定（"*"・カンマ区切りの複数指定・W/ 付きに対応）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def cache_control() -> str:
+    return (
+        f"public, max-age={settings.http_cache_max_age}, s-maxage={settings.http_cache_s_maxage}, "
+        f"stale-while-revalidate={settings.http_cache_stale_while_revalidate}"
+    )
+
+
+class MasterDataHttpCache:
+    """マスタデータAPIのレスポンスキャッシュ"""
+
+    def __init__(self) -> None:
+        self.entries: Dict[str, CachedBody] = {}
+        self.stats = HttpCacheStats()
+        self._version: Optional[str] = None
+        self._version_checked_at: Optional[float] = None
+
+    async def current_version(self) -> Optional[str]:
+        """マスタデータバージョン（HTTP_CACHE_VERSION_CHECK_SECONDS の間は前回の値）"""
+        now = time.monotonic()
+        if self._version_checked_at is not None and now - self._version_checked_at < settings.http_cache_version_check_seconds:
+            return self._version
+        self._version_checked_at = now
+        self.stats.version_checks += 1
+        try:
+            async with acquire_connection() as conn:
+                self._version = await fetch_tracked_version(conn)
+        except Exception as e:
+            # DBに届かない間は前回のバージョンのまま保持中のレスポンスを返す
+            self.stats.version_check_errors += 1
+            logger.warning(f"⚠️ マスタデータバージョンの確認に失敗（保持中のレスポンスを使用）: {e}")
+        return self._version
+
+    def _fresh(self, entry: Optional[CachedBody], version: Optional[str]) -> bool:
+        return (
+            entry is not None
+            and entry.data_version == version
+            and time.monotonic() - entry.built_at < settings.http_cache_ttl_seconds
+        )
+
+    async def respond(self, request: Request, key: str, build: Callable[[], Awaitable[Any]]) -> Response:
+        """key のレスポンスを返す（保持中でなければ build() を呼んで作成、If-None-Match 一致なら304）
+
+        build() が例外を送出した場合はそのまま伝播する（エラー応答はキャッシュしない）。
+        """
+        if not settings.http_cache_enabled:
+            return FastJSONResponse(jsonable_encoder(await build()))
+
+        version = await self.current_version()
+        entry = self.entries.get(key)
+        if self._fresh(entry, version):
+            self.stats.hits += 1
+        else:
+            self.stats.misses += 1
+            body = FastJSONResponse(jsonable_encoder(await build())).body
+            entry = CachedBody(body=body, etag=make_etag(body), data_version=version, built_at=time.monotonic())
+            self.entries.pop(key, None)
+            if len(self.entries) >= MAX_ENTRIES:
+                self.entries.pop(next(iter(self.entries)))
+            self.entries[key] = entry
+
+        headers = {"ETag": entry.etag, "Cache-Control": cache_control()}
+        if etag_matches(request.headers.get("if-none-match"), entry.etag):
+            self.stats.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type=JSON_MEDIA_TYPE, headers=headers)
+
+    def invalidate(self, prefix: str = "") -> int:
+        """prefix で始まるキーを破棄（管理画面での更新直後に使用）"""
+        keys = [key for key in self.entries if key.startswith(prefix)]
+        for key in keys:
+            del self.entries[key]
+        return len(keys)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.http_cache_enabled,
+            "entries": len(self.entries),
+            "data_version": self._version,
+            **asdict(self.stats),
+        }
+
+
+master_data_cache = MasterDataHttpCache()
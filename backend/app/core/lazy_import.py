@@ -0,0 +1,76 @@
+"""重い依存モジュールの遅延import（起動時間・常駐メモリ削減）
+
+PDF生成・メール送信・Google Sheets・デバッグ系のサービスは利用者向けフォーム
+（ヘルスチェック・マスタ取得・マッチング）では使われないため、初回利用時まで import を遅らせる。
+
+使用例:
+    EmailService = lazy_import("app.services.email_service", "EmailService")
+    email_service = EmailService()  # ここで初めて app.services.email_service が import される
+"""
+from typing import Any, Dict, Optional
+import importlib
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 遅延import対象の一覧（import_time_report / ヘルスチェック用）
+_registry: Dict[str, "LazyImport"] = {}
+
+
+class LazyImport:
+    """初回アクセス時にモジュール（またはその属性）を import するプロキシ"""
+
+    def __init__(self, module_path: str, attribute: Optional[str] = None) -> None:
+        self.module_path = module_path
+        self.attribute = attribute
+        self.load_ms: Optional[float] = None
+        self._target: Any = None
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return f"{self.module_path}.{self.attribute}" if self.attribute else self.module_path
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.load_ms is not None
+
+    def load(self) -> Any:
+        """対象を import して返す（2回目以降はキャッシュ）"""
+        if self.load_ms is None:
+            with self._lock:
+                if self.load_ms is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self.module_path)
+                    self._target = getattr(module, self.attribute) if self.attribute else module
+                    self.load_ms = (time.perf_counter() - start) * 1000
+                    logger.info(f"📦 遅延import: {self.name} ({self.load_ms:.1f}ms)")
+        return self._target
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+    def __getattr__(self, item: str) -> Any:
+        # __init__ で設定した属性以外はすべて対象へ委譲
+        if item.startswith("__") and item.endswith("__"):
+            raise AttributeError(item)
+        return getattr(self.load(), item)
+
+    def __repr__(self) -> str:
+        state = f"loaded in {self.load_ms:.1f}ms" if self.is_loaded else "not loaded"
+        return f"<LazyImport {self.name} ({state})>"
+
+
+def lazy_import(module_path: str, attribute: Optional[str] = None) -> LazyImport:
+    """遅延importプロキシを取得（同じ対象は同じプロキシを共有）"""
+    key = f"{module_path}:{attribute or ''}"
+    if key not in _registry:
+        _registry[key] = LazyImport(module_path, attribute)
+    return _registry[key]
+
+
+def get_lazy_import_status() -> Dict[str, Optional[float]]:
+    """遅延import対象ごとの読み込み時間（ms、未読み込みは None）"""
+    return {proxy.name: proxy.load_ms for proxy in _registry.values()}
@@ -0,0 +1,234 @@
+"""Prometheus メトリクス（/metrics のテキスト形式出力）
+
+外部ライブラリに依存しない軽量実装。ホットパスの負荷を抑えるため:
+- ラベルの組み合わせ（ルート×メソッド×ステータス区分、マッチング段階名）は起動時に登録し、
+  リクエスト処理中は辞書参照と整数加算のみ行う（メトリクスオブジェクトを生成しない）
+- プール・キャッシュ・バックグラウンドキューなどの状態値はスクレイプ時にコレクタで読み取る
+
+    http_request_duration_seconds{route, method, status}  リクエスト処理時間（ヒストグラム）
+    matching_stage_duration_seconds{stage}                 マッチング段階・DB呼び出し時間（ヒストグラム）
+
+METRICS_ENABLED=false の場合は計測せず /metrics も 404 を返す。
+"""
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+import math
+import time
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx")
+UNMATCHED_ROUTE = "<unmatched>"
+
+# 段階別ヒストグラムに記録するスパン名（app.core.tracing のスパン名と対応）
+STAGES = (
+    "matching.parameters",
+    "matching.step0_4",
+    "matching.recommended_integration",
+    "matching.step5",
+    "matching.cm_check",
+    "matching.save_diagnosis",
+    "matching.save_form_submission",
+    "matching.email",
+    "db.acquire",
+    "db.query",
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _HistogramChild:
+    """1つのラベル組み合わせのバケット（observe は bisect + 加算のみ）"""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 末尾は +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram:
+    """ラベル付きヒストグラム"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float]) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._children: Dict[tuple, _HistogramChild] = {}
+
+    def labels(self, *values: str) -> _HistogramChild:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = _HistogramChild(self.buckets)
+        return child
+
+    def preregister(self, label_sets: Iterable[tuple]) -> None:
+        for values in label_sets:
+            self.labels(*values)
+
+    def get(self, *values: str) -> Optional[_HistogramChild]:
+        """登録済みのラベル組み合わせのみ返す（未登録は None、ホットパス用）"""
+        return self._children.get(values)
+
+    def clear(self) -> None:
+        self._children.clear()
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for values, child in sorted(self._children.items()):
+            if not child.count:
+                continue
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), child.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+# コレクタ: スクレイプ時に (メトリクス名, 種類, 説明, [(ラベル, 値)]) を返す関数
+Sample = Tuple[Dict[str, str], float]
+MetricFamily = Tuple[str, str, str, List[Sample]]
+Collector = Callable[[], Iterable[MetricFamily]]
+
+
+class Registry:
+    """ヒストグラムとコレクタの登録先"""
+
+    def __init__(self) -> None:
+        self.histograms: List[Histogram] = []
+        self.collectors: List[Collector] = []
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float]) -> Histogram:
+        histogram = Histogram(name, documentation, labelnames, buckets)
+        self.histograms.append(histogram)
+        return histogram
+
+    def register_collector(self, collector: Collector) -> Collector:
+        self.collectors.append(collector)
+        return collector
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for histogram in self.histograms:
+            lines.extend(histogram.collect())
+        for collector in self.collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                # 1つのコレクタの失敗で /metrics 全体を落とさない
+                logger.warning(f"⚠️ メトリクス収集失敗: {getattr(collector, '__name__', collector)}: {e}")
+                continue
+            for name, metric_type, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("route", "method", "status"),
+    LATENCY_BUCKETS,
+)
+stage_duration = registry.histogram(
+    "matching_stage_duration_seconds",
+    "Matching pipeline stage and DB call latency",
+    ("stage",),
+    STAGE_BUCKETS,
+)
+stage_duration.preregister((stage,) for stage in STAGES)
+
+
+def register_routes(routes) -> None:
+    """アプリのルート×メソッド×ステータス区分を事前登録（create_app から呼ぶ）"""
+    for route in routes:
+        path = getattr(route, "path", None)
+        methods = getattr(route, "methods", None)
+        if not path or not methods:
+            continue
+        request_duration.preregister(
+            (path, method, status) for method in methods for status in STATUS_CLASSES
+        )
+    request_duration.preregister(
+        (UNMATCHED_ROUTE, method, status) for method in ("GET", "POST", "OPTIONS") for status in STATUS_CLASSES
+    )
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """段階別ヒストグラムに記録（STAGES 以外のスパン名は無視）"""
+    child = stage_duration.get(stage)
+    if child is not None:
+        child.observe(seconds)
+
+
+class MetricsMiddleware:
+    """ルートテンプレート単位でリクエスト処理時間を記録（ASGIミドルウェア）"""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.metrics_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status_holder = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder[0] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            route = scope.get("route")
+            path = getattr(route, "path", UNMATCHED_ROUTE)
+            status = STATUS_CLASSES[min(max(status_holder[0] // 100, 1), 5) - 1]
+            child = request_duration.get(path, scope["method"], status)
+            if child is None:
+                child = request_duration.get(UNMATCHED_ROUTE, scope["method"], status)
+            if child is not None:
+                child.observe(elapsed)
@@ -0,0 +1,43 @@
+"""高速JSONレスポンス
+
+- FastJSONResponse: orjson でシリアライズする JSONResponse（orjson が無い環境では標準の json）。
+  FAST_JSON_RESPONSE_ENABLED=true の場合にアプリ全体の既定レスポンスクラスになる
+- model_response(): サーバー自身が組み立てた Pydantic モデルを、response_model による再検証・
+  jsonable_encoder を通さずに model_dump_json()（pydantic-core）で直接返す
+
+    @router.post("/matching", response_model=MatchingResponse)
+    async def post_matching(...):
+        response = MatchingResponse(...)
+        if settings.fast_json_response_enabled:
+            return model_response(response)  # Response を返すと FastAPI は response_model の検証を省略する
+        return response
+
+ベンチマーク: python scripts/benchmark_response_serialization.py
+"""
+from typing import Any
+import json
+
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - requirements.txt に含まれるが、無くても動作はする
+    orjson = None
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+class FastJSONResponse(JSONResponse):
+    """orjson でシリアライズする JSONResponse（出力は JSONResponse と同じく非ASCIIをそのまま出す）"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            # datetime / UUID / dataclass は orjson が直接扱う。それ以外は JSONResponse と同様に失敗させる
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def model_response(model: BaseModel, status_code: int = 200) -> Response:
+    """Pydantic モデルを再検証せずにJSONレスポンスにする（サーバー内部で組み立てた信頼済みデータ専用）"""
+    return Response(content=model.model_dump_json(), status_code=status_code, media_type=JSON_MEDIA_TYPE)
@@ -0,0 +1,366 @@
+"""軽量スパン計測（OpenTelemetry 互換のトレース・Server-Timing ヘッダー）
+
+リクエストごとにトレースを作り、マッチング処理の各段階（パラメータ取得・STEP 0-4・おすすめ統合・
+CM確認・診断結果保存・メール送信）とDB呼び出し（接続取得・クエリ）をスパンとして記録する。
+OpenTelemetry SDK には依存せず、スパンは OTLP/JSON 形式（trace_id 32桁 / span_id 16桁 hex、
+開始・終了 UNIX ナノ秒、属性）で出力する。
+
+    with span("matching.step0_4", backend="sql"):
+        ...
+
+    @traced("matching.cm_check")
+    async def check(...): ...
+
+出力先（TRACING_EXPORTER）:
+    none: 出力しない（SERVER_TIMING_ENABLED=true の場合のみ計測）
+    log:  1リクエスト1行の OTLP/JSON をロガー app.tracing.export に出力
+    otlp: OTLP/HTTP（TRACING_OTLP_ENDPOINT、既定 http://localhost:4318/v1/traces）へ送信
+
+SERVER_TIMING_ENABLED=true の場合はスパン名ごとの合計時間を Server-Timing ヘッダーで返す。
+METRICS_ENABLED=true の場合、スパンの処理時間はトレースの有無にかかわらず段階別ヒストグラム
+（app.core.metrics）にも記録する。
+受信した W3C traceparent ヘッダーがあれば同じ trace_id でトレースを継続する。
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import time
+
+from app.core.config import settings
+from app.core.metrics import observe_stage
+
+logger = logging.getLogger(__name__)
+export_logger = logging.getLogger("app.tracing.export")
+
+SERVICE_NAME = "talent-casting-api"
+EXPORTER_NONE = "none"
+EXPORTER_LOG = "log"
+EXPORTER_OTLP = "otlp"
+
+# OTLP の SpanKind / StatusCode
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str]
+    start_ns: int
+    kind: int = SPAN_KIND_INTERNAL
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end - self.start_ns) / 1_000_000
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+
+@dataclass
+class Trace:
+    trace_id: str
+    spans: List[Span] = field(default_factory=list)
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+# query_span の中か（SQL文字列で実行したクエリをクエリロガーで重ねて記録しないため）
+_in_query_span: ContextVar[bool] = ContextVar("in_query_span", default=False)
+
+
+def tracing_active() -> bool:
+    """トレース計測が有効か（出力先あり、または Server-Timing 有効）"""
+    return settings.tracing_exporter != EXPORTER_NONE or settings.server_timing_enabled
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def _new_id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+
+def _start_span(name: str, trace: Trace, kind: int, attributes: Dict[str, Any], start_ns: Optional[int] = None) -> Span:
+    parent = _current_span.get()
+    new_span = Span(
+        name=name,
+        trace_id=trace.trace_id,
+        span_id=_new_id(8),
+        parent_span_id=parent.span_id if parent is not None else None,
+        start_ns=start_ns or time.time_ns(),
+        kind=kind,
+        attributes={k: v for k, v in attributes.items() if v is not None},
+    )
+    trace.spans.append(new_span)
+    return new_span
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """現在のトレースに子スパンを記録（トレース外では段階別メトリクスのみ記録）"""
+    trace = _current_trace.get()
+    if trace is None:
+        if not settings.metrics_enabled:
+            yield None
+            return
+        started = time.perf_counter()
+        try:
+            yield None
+        finally:
+            observe_stage(name, time.perf_counter() - started)
+        return
+
+    new_span = _start_span(name, trace, SPAN_KIND_INTERNAL, attributes)
+    token = _current_span.set(new_span)
+    try:
+        yield new_span
+    except BaseException as e:
+        new_span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        new_span.end_ns = time.time_ns()
+        _current_span.reset(token)
+        if settings.metrics_enabled:
+            observe_stage(name, (new_span.end_ns - new_span.start_ns) / 1e9)
+
+
+def traced(name: str):
+    """async 関数全体をスパンで囲むデコレータ"""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def query_span(**attributes):
+    """1クエリ分の db.query スパン（app.db.prepared_statements 用）
+
+    この中で SQL文字列にフォールバックして実行したクエリはクエリロガーでは記録しない。
+    asyncpg は同期のクエリロガーを call_soon で呼ぶため、呼び出し時点のコンテキストで判定できる。
+    """
+    token = _in_query_span.set(True)
+    try:
+        with span("db.query", **{"db.system": "postgresql", **attributes}) as query:
+            yield query
+    finally:
+        _in_query_span.reset(token)
+
+
+def record_span(name: str, elapsed_seconds: float, **attributes) -> None:
+    """終了済みの処理をスパンとして事後記録（asyncpg のクエリロガー用）"""
+    if settings.metrics_enabled:
+        observe_stage(name, elapsed_seconds)
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    end_ns = time.time_ns()
+    recorded = _start_span(name, trace, SPAN_KIND_INTERNAL, attributes, start_ns=end_ns - int(elapsed_seconds * 1e9))
+    recorded.end_ns = end_ns
+
+
+@contextmanager
+def detached():
+    """トレースから切り離して実行（シャドー実行などレスポンス後も続く処理用）"""
+    trace_token = _current_trace.set(None)
+    span_token = _current_span.set(None)
+    try:
+        yield
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+def query_logger(record) -> None:
+    """asyncpg Connection.add_query_logger 用コールバック（SQL文字列で実行したクエリ）"""
+    if _in_query_span.get():
+        # query_span で記録済み
+        return
+    if _current_trace.get() is None:
+        if settings.metrics_enabled:
+            observe_stage("db.query", record.elapsed)
+        return
+    statement = " ".join(record.query.split())
+    record_span(
+        "db.query",
+        record.elapsed,
+        **{
+            "db.system": "postgresql",
+            "db.statement": statement[:200],
+            "error": type(record.exception).__name__ if record.exception else None,
+        },
+    )
+
+
+async def install_query_logger(conn) -> None:
+    """プール接続の作成時にクエリロガーを登録（PoolManager.connection_init_hooks 用）"""
+    if tracing_active() or settings.metrics_enabled:
+        conn.add_query_logger(query_logger)
+
+
+# ===== Server-Timing =====
+
+def server_timing_header(trace: Trace, total_ms: float) -> str:
+    """スパン名ごとの合計時間を Server-Timing 形式に変換"""
+    totals: Dict[str, float] = {}
+    counts: Dict[str, int] = {}
+    for s in trace.spans:
+        if s.kind == SPAN_KIND_SERVER or s.end_ns is None:
+            continue
+        totals[s.name] = totals.get(s.name, 0.0) + s.duration_ms
+        counts[s.name] = counts.get(s.name, 0) + 1
+
+    metrics = []
+    for name, duration in totals.items():
+        metric = re.sub(r"[^A-Za-z0-9_.\-]", "_", name)
+        description = f';desc="x{counts[name]}"' if counts[name] > 1 else ""
+        metrics.append(f"{metric};dur={duration:.1f}{description}")
+    metrics.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(metrics)
+
+
+# ===== エクスポート（OTLP/JSON） =====
+
+def _attribute_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(trace: Trace) -> Dict[str, Any]:
+    """トレースを OTLP/JSON（ExportTraceServiceRequest）に変換"""
+    spans = []
+    for s in trace.spans:
+        if s.end_ns is None:
+            continue
+        otlp_span = {
+            "traceId": s.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": s.kind,
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns),
+            "attributes": [{"key": k, "value": _attribute_value(v)} for k, v in s.attributes.items()],
+            "status": {"code": STATUS_ERROR, "message": s.error} if s.error else {"code": STATUS_OK},
+        }
+        if s.parent_span_id:
+            otlp_span["parentSpanId"] = s.parent_span_id
+        spans.append(otlp_span)
+
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": SERVICE_NAME}},
+                {"key": "deployment.environment", "value": {"stringValue": settings.node_env}},
+                {"key": "app.profile", "value": {"stringValue": settings.app_profile}},
+            ]},
+            "scopeSpans": [{"scope": {"name": "app.core.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+async def _post_otlp(payload: Dict[str, Any]) -> None:
+    import httpx
+
+    try:
+        async with httpx.AsyncClient(timeout=2.0) as client:
+            await client.post(settings.tracing_otlp_endpoint, json=payload)
+    except Exception as e:
+        logger.debug(f"OTLPエクスポート失敗: {e}")
+
+
+_export_tasks: set = set()
+
+
+def pending_exports() -> int:
+    """送信待ちの OTLP エクスポート数（メトリクス用）"""
+    return len(_export_tasks)
+
+
+def export_trace(trace: Trace) -> None:
+    """設定された出力先にトレースを出力（レスポンスを待たせない）"""
+    exporter = settings.tracing_exporter
+    if exporter == EXPORTER_LOG:
+        export_logger.info(json.dumps(to_otlp(trace), ensure_ascii=False))
+    elif exporter == EXPORTER_OTLP:
+        task = asyncio.get_running_loop().create_task(_post_otlp(to_otlp(trace)))
+        _export_tasks.add(task)
+        task.add_done_callback(_export_tasks.discard)
+
+
+# ===== ASGI ミドルウェア =====
+
+class TracingMiddleware:
+    """リクエストごとにトレースを開始し、Server-Timing 付与とエクスポートを行う"""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracing_active() or random.random() >= settings.tracing_sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        trace_id, parent_span_id = _new_id(16), None
+        for key, value in scope.get("headers", []):
+            if key == b"traceparent":
+                match = TRACEPARENT.match(value.decode("latin-1").strip())
+                if match:
+                    trace_id, parent_span_id = match.group(1), match.group(2)
+                break
+
+        trace = Trace(trace_id=trace_id)
+        trace_token = _current_trace.set(trace)
+        root = _start_span(
+            f"{scope['method']} {scope['path']}", trace, SPAN_KIND_SERVER,
+            {"http.method": scope["method"], "http.target": scope["path"]},
+        )
+        root.parent_span_id = parent_span_id
+        span_token = _current_span.set(root)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                root.set_attribute("http.status_code", message["status"])
+                if settings.server_timing_enabled:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing_header(trace, root.duration_ms).encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except BaseException as e:
+            root.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            root.end_ns = time.time_ns()
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+            export_trace(trace)
@@ -0,0 +1,117 @@
+"""ワークロード分離（利用者向け public / 管理画面向け admin）
+
+管理画面のCSVエクスポート・デバッグエクスポート・Sheets連携などの重い処理が、
+利用者向け /api/matching のレイテンシを悪化させないよう、リクエストをパスで分類し
+ワークロードごとに同時実行数の上限とDB接続プールを分ける。
+
+- current_workload: リクエスト処理中のワークロード（acquire_connection がプール選択に使用）
+- WorkloadLimitMiddleware: ワークロード別の同時実行数制限（待機タイムアウトで 503 + Retry-After）
+"""
+from contextvars import ContextVar
+from typing import Dict, Optional
+import asyncio
+import json
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+WORKLOAD_PUBLIC = "public"
+WORKLOAD_ADMIN = "admin"
+WORKLOADS = (WORKLOAD_PUBLIC, WORKLOAD_ADMIN)
+
+# 管理画面・デバッグ用のパス（これ以外は利用者向け）
+ADMIN_PATH_PREFIXES = (
+    "/api/admin",
+    "/api/debug",
+    "/api/recommended-talents",
+    "/api/talent-options",
+)
+
+current_workload: ContextVar[str] = ContextVar("current_workload", default=WORKLOAD_PUBLIC)
+
+# ワークロード別の処理中リクエスト数（メトリクス・ヘルスチェック用）
+_in_flight: Dict[str, int] = {name: 0 for name in WORKLOADS}
+
+
+def get_in_flight() -> Dict[str, int]:
+    """ワークロード別の処理中リクエスト数"""
+    return dict(_in_flight)
+
+
+def classify_path(path: str) -> str:
+    """リクエストパスからワークロードを判定"""
+    for prefix in ADMIN_PATH_PREFIXES:
+        if path == prefix or path.startswith(prefix + "/"):
+            return WORKLOAD_ADMIN
+    return WORKLOAD_PUBLIC
+
+
+class WorkloadLimitMiddleware:
+    """ワークロード別の同時実行数制限（ASGIミドルウェア）
+
+    上限に達している場合は queue_timeout 秒まで空きを待ち、それでも空かなければ
+    503 と Retry-After を返す。上限 0 のワークロードは制限しない。
+    """
+
+    def __init__(self, app, limits: Dict[str, int], queue_timeout: float = 10.0) -> None:
+        self.app = app
+        self.queue_timeout = queue_timeout
+        self.limits = {name: limit for name, limit in limits.items() if limit and limit > 0}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _semaphore(self, workload: str) -> Optional[asyncio.Semaphore]:
+        if workload not in self.limits:
+            return None
+        if workload not in self._semaphores:
+            self._semaphores[workload] = asyncio.Semaphore(self.limits[workload])
+        return self._semaphores[workload]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        workload = classify_path(scope["path"])
+        token = current_workload.set(workload)
+        try:
+            semaphore = self._semaphore(workload)
+            if semaphore is None:
+                await self._run(workload, scope, receive, send)
+                return
+
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️ 同時実行数上限のため拒否: workload={workload} path={scope['path']}")
+                await self._reject(send)
+                return
+
+            try:
+                await self._run(workload, scope, receive, send)
+            finally:
+                semaphore.release()
+        finally:
+            current_workload.reset(token)
+
+    async def _run(self, workload: str, scope, receive, send):
+        _in_flight[workload] = _in_flight.get(workload, 0) + 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _in_flight[workload] -= 1
+
+    async def _reject(self, send):
+        body = json.dumps(
+            {"detail": "現在混雑しています。しばらくしてから再度お試しください"}, ensure_ascii=False
+        ).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(self.queue_timeout))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
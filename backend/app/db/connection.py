@@ -1,9 +1,31 @@
-"""データベース接続管理（asyncpg + SQLAlchemy 2.0）"""
-from typing import Optional
+"""データベース接続管理（asyncpg + SQLAlchemy 2.0）
+
+asyncpg接続は PoolManager 経由で貸し出す。新規コードは必ず非同期コンテキストマネージャを使う:
+
+    async with acquire_connection() as conn:
+        rows = await conn.fetch(...)
+
+PoolManager はワークロード別プール（public / admin）を管理し、貸出ごとの待ち時間・保持時間・
+呼び出し元を記録する。保持時間が閾値（DB_HOLD_WARNING_SECONDS）を超えた接続は警告し、
+プールの使用中・待機中接続数と再接続回数を snapshot() で公開する。
+"""
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import sys
+import time
 import asyncpg
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from app.core.config import settings
+from app.core.workload import current_workload, WORKLOAD_PUBLIC
+from app.core.tracing import install_query_logger, record_span
+from app.db.prepared_statements import prepare_registered_statements
+from app.db.query_plans import install_slow_query_logger, plan_sampler
+
+logger = logging.getLogger(__name__)
 
 # SQLAlchemy Base
 Base = declarative_base()
@@ -12,10 +34,214 @@ Base = declarative_base()
 engine = None
 async_session_maker = None
 
-# asyncpg接続プール (Phase A1最適化)
+# asyncpg既定プール（最初に作成したワークロードのプール、後方互換のため公開）
 asyncpg_pool = None
 
 
+@dataclass
+class PoolStats:
+    """ワークロード別のプール計測値（累積）"""
+    acquires: int = 0
+    acquire_errors: int = 0
+    acquire_wait_seconds_total: float = 0.0
+    acquire_wait_seconds_max: float = 0.0
+    hold_seconds_total: float = 0.0
+    hold_seconds_max: float = 0.0
+    connections_opened: int = 0
+    connections_lost: int = 0  # サーバー・ネットワーク側で切断された接続（プールのアイドル破棄等は含まない）
+    reconnects: int = 0  # 切断された接続の代わりに新規作成した接続
+    long_held_warnings: int = 0
+
+
+@dataclass
+class _Checkout:
+    pool: asyncpg.Pool
+    workload: str
+    call_site: str
+    started: float
+    warned: bool = False
+
+
+def _call_site(depth: int) -> str:
+    """呼び出し元の "ファイル:行 関数名"（リーク検知用）"""
+    try:
+        frame = sys._getframe(depth + 1)
+    except ValueError:
+        return "unknown"
+    return f"{frame.f_code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno} {frame.f_code.co_name}"
+
+
+class PooledConnection(asyncpg.Connection):
+    """プールの接続クラス（アプリ・プールが閉じた接続と、切断された接続を区別する）
+
+    プールはアイドル時間・クエリ数の上限で接続を terminate() し、次の貸出時に作り直す。
+    これらは切断ではないため、閉じた側の印を付けて再接続の計測から除外する。
+    """
+
+    closed_by_client = False
+
+    def terminate(self):
+        self.closed_by_client = True
+        super().terminate()
+
+    async def close(self, *, timeout=None):
+        self.closed_by_client = True
+        await super().close(timeout=timeout)
+
+
+class PoolManager:
+    """asyncpg接続プール管理（ワークロード別プール・貸出計測・リーク検知）"""
+
+    def __init__(self) -> None:
+        self.pools: Dict[str, asyncpg.Pool] = {}
+        self.stats: Dict[str, PoolStats] = {}
+        # 接続作成時に実行するフック（プリペアドステートメント登録等）
+        self.connection_init_hooks: List[Callable[[Any], Awaitable[None]]] = []
+        self._pool_workloads: Dict[int, str] = {}
+        self._checkouts: Dict[int, _Checkout] = {}
+
+    @property
+    def default_pool(self) -> Optional[asyncpg.Pool]:
+        return asyncpg_pool
+
+    async def create_pool(self, workload: str, min_size: int, max_size: int, **conn_params) -> asyncpg.Pool:
+        """ワークロード用のプールを作成"""
+        stats = self.stats.setdefault(workload, PoolStats())
+
+        def on_termination(conn):
+            if not getattr(conn, "closed_by_client", False):
+                stats.connections_lost += 1
+                logger.warning(f"⚠️ DB接続が切断されました: workload={workload} (累計 {stats.connections_lost}回)")
+
+        async def init_connection(conn):
+            stats.connections_opened += 1
+            if stats.connections_lost > stats.reconnects:
+                stats.reconnects += 1
+                logger.info(f"🔌 切断されたDB接続を張り直しました: workload={workload} (累計再接続 {stats.reconnects}回)")
+            conn.add_termination_listener(on_termination)
+            for hook in self.connection_init_hooks:
+                await hook(conn)
+
+        pool = await asyncpg.create_pool(
+            **conn_params,
+            min_size=min_size,
+            max_size=max_size,
+            command_timeout=10,  # コマンドタイムアウト
+            init=init_connection,
+            connection_class=PooledConnection,
+        )
+        self.pools[workload] = pool
+        self._pool_workloads[id(pool)] = workload
+        return pool
+
+    def pool_for(self, workload: str) -> Optional[asyncpg.Pool]:
+        return self.pools.get(workload, self.default_pool)
+
+    async def acquire(self, call_site: str = "unknown"):
+        """接続を取得（待ち時間と呼び出し元を記録）"""
+        pool = self.pool_for(current_workload.get())
+        workload = self._pool_workloads.get(id(pool), WORKLOAD_PUBLIC)
+        stats = self.stats.setdefault(workload, PoolStats())
+
+        started = time.perf_counter()
+        try:
+            conn = await pool.acquire()
+        except Exception:
+            stats.acquire_errors += 1
+            raise
+        wait = time.perf_counter() - started
+        record_span("db.acquire", wait, **{"db.pool": workload, "code.call_site": call_site})
+
+        stats.acquires += 1
+        stats.acquire_wait_seconds_total += wait
+        stats.acquire_wait_seconds_max = max(stats.acquire_wait_seconds_max, wait)
+        self._checkouts[id(conn)] = _Checkout(pool, workload, call_site, time.perf_counter())
+        return conn
+
+    async def release(self, conn) -> None:
+        """接続をプールへ返却（保持時間を記録）"""
+        checkout = self._checkouts.pop(id(conn), None)
+        if checkout is None:
+            if self.default_pool:
+                await self.default_pool.release(conn)
+            return
+
+        held = time.perf_counter() - checkout.started
+        stats = self.stats[checkout.workload]
+        stats.hold_seconds_total += held
+        stats.hold_seconds_max = max(stats.hold_seconds_max, held)
+        if held > settings.db_hold_warning_seconds and not checkout.warned:
+            stats.long_held_warnings += 1
+            logger.warning(f"⚠️ DB接続を{held:.1f}秒保持していました: {checkout.call_site} (workload={checkout.workload})")
+        await checkout.pool.release(conn)
+
+    @asynccontextmanager
+    async def connection(self, call_site: str = "unknown"):
+        conn = await self.acquire(call_site)
+        try:
+            yield conn
+        finally:
+            await self.release(conn)
+
+    def long_held(self, threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+        """閾値を超えて保持されている貸出中接続"""
+        threshold = settings.db_hold_warning_seconds if threshold is None else threshold
+        now = time.perf_counter()
+        return [
+            {"call_site": c.call_site, "workload": c.workload, "held_seconds": round(now - c.started, 3)}
+            for c in self._checkouts.values()
+            if now - c.started > threshold
+        ]
+
+    async def watch_long_held(self, interval: float = 5.0) -> None:
+        """保持時間が閾値を超えた接続を定期的に警告（バックグラウンドタスク用）"""
+        while True:
+            await asyncio.sleep(interval)
+            now = time.perf_counter()
+            for checkout in list(self._checkouts.values()):
+                held = now - checkout.started
+                if held > settings.db_hold_warning_seconds and not checkout.warned:
+                    checkout.warned = True
+                    self.stats[checkout.workload].long_held_warnings += 1
+                    logger.warning(
+                        f"⚠️ DB接続が{held:.1f}秒返却されていません（リークの可能性）: "
+                        f"{checkout.call_site} (workload={checkout.workload})"
+                    )
+
+    def snapshot(self) -> Dict[str, Any]:
+        """ワークロード別のプール状態と計測値"""
+        pools = {}
+        for workload, pool in self.pools.items():
+            size = pool.get_size()
+            idle = pool.get_idle_size()
+            stats = self.stats.get(workload, PoolStats())
+            pools[workload] = {
+                "size": size,
+                "idle": idle,
+                "in_use": size - idle,
+                "min_size": pool.get_min_size(),
+                "max_size": pool.get_max_size(),
+                "checked_out": sum(1 for c in self._checkouts.values() if c.workload == workload),
+                **asdict(stats),
+            }
+        return {"pools": pools, "long_held": self.long_held()}
+
+    async def close(self) -> None:
+        for pool in self.pools.values():
+            await pool.close()
+        self.pools.clear()
+        self._pool_workloads.clear()
+        self._checkouts.clear()
+
+
+pool_manager = PoolManager()
+# 接続作成時にホットクエリを準備（app.db.prepared_statements）、クエリをトレースに記録（app.core.tracing）、
+# スロークエリの実行計画を取得（app.db.query_plans）
+pool_manager.connection_init_hooks.append(prepare_registered_statements)
+pool_manager.connection_init_hooks.append(install_query_logger)
+pool_manager.connection_init_hooks.append(install_slow_query_logger)
+
+
 def get_engine():
     """エンジン取得"""
     return engine
@@ -26,135 +252,152 @@ def get_session_maker():
     return async_session_maker
 
 
+def acquire_connection():
+    """asyncpg接続を貸し出す非同期コンテキストマネージャ（ブロック終了時に必ずプールへ返却）"""
+    return _connection(_call_site(1))
+
+
+@asynccontextmanager
+async def _connection(call_site: str):
+    if asyncpg_pool is None:
+        # プールが初期化されていない場合は初期化
+        await init_asyncpg_pool()
+    async with pool_manager.connection(call_site) as conn:
+        yield conn
+
+
 async def get_asyncpg_connection():
-    """asyncpg接続取得（プール使用、Phase A1最適化）"""
-    global asyncpg_pool
+    """asyncpg接続取得（旧API。新規コードは acquire_connection() を使用）
+
+    取得した接続は必ず release_asyncpg_connection() で返却すること（conn.close() は不可）。
+    """
     try:
         if asyncpg_pool is None:
             # プールが初期化されていない場合は初期化
             await init_asyncpg_pool()
-
-        # プールから接続取得
-        return await asyncpg_pool.acquire()
+        return await pool_manager.acquire(_call_site(1))
     except Exception as e:
         raise Exception(f"Database connection failed: {str(e)}")
 
 
 async def release_asyncpg_connection(conn):
-    """asyncpg接続返却（プール返却、Phase A1最適化）"""
-    global asyncpg_pool
-    if asyncpg_pool and conn:
-        await asyncpg_pool.release(conn)
+    """asyncpg接続返却（旧API、プール返却）"""
+    if conn:
+        await pool_manager.release(conn)
 
 
-async def init_asyncpg_pool():
-    """asyncpg接続プール初期化（Phase A1最適化）"""
+def asyncpg_connection_params() -> Dict[str, Any]:
+    """DATABASE_URL を asyncpg の接続引数に変換（クエリパラメータは除去）"""
+    from urllib.parse import urlparse, parse_qs
+    parsed = urlparse(settings.database_url)
+    query_params = parse_qs(parsed.query)
+
+    # asyncpg接続パラメータ構築
+    conn_params = {
+        "host": parsed.hostname,
+        "port": parsed.port or 5432,
+        "user": parsed.username,
+        "password": parsed.password,
+        "database": parsed.path.lstrip('/'),
+    }
+
+    # sslmodeパラメータがある場合はssl='require'に変換
+    if query_params.get('sslmode', [''])[0] in ['require', 'verify-ca', 'verify-full']:
+        conn_params['ssl'] = 'require'
+    return conn_params
+
+
+async def init_asyncpg_pool(min_size: int = 2, max_size: int = 5, workload: str = WORKLOAD_PUBLIC):
+    """asyncpg接続プール初期化（Phase A1最適化）
+
+    Args:
+        min_size: 最小接続数
+        max_size: 最大接続数
+        workload: プールを割り当てるワークロード（最初に作成したプールが既定プールになる）
+    """
     global asyncpg_pool
     try:
-        # DATABASE_URLからクエリパラメータを除去してasyncpgの引数に変換
-        from urllib.parse import urlparse, parse_qs
-        parsed = urlparse(settings.database_url)
-        query_params = parse_qs(parsed.query)
-
-        # asyncpg接続パラメータ構築
-        conn_params = {
-            "host": parsed.hostname,
-            "port": parsed.port or 5432,
-            "user": parsed.username,
-            "password": parsed.password,
-            "database": parsed.path.lstrip('/'),
-        }
-
-        # sslmodeパラメータがある場合はssl='require'に変換
-        if query_params.get('sslmode', [''])[0] in ['require', 'verify-ca', 'verify-full']:
-            conn_params['ssl'] = 'require'
-
         # プール作成（Phase A1: 小さなプールサイズで効率化）
-        asyncpg_pool = await asyncpg.create_pool(
-            **conn_params,
-            min_size=2,      # 最小2接続
-            max_size=5,      # 最大5接続（設定値と合わせる）
-            command_timeout=10  # コマンドタイムアウト
-        )
+        conn_params = asyncpg_connection_params()
+        pool = await pool_manager.create_pool(workload, min_size, max_size, **conn_params)
+        if asyncpg_pool is None:
+            asyncpg_pool = pool
     except Exception as e:
         raise Exception(f"asyncpg pool initialization failed: {str(e)}")
 
 
 async def check_db_connection() -> bool:
     """データベース接続確認（プール使用、Phase A1最適化）"""
-    conn = None
     try:
-        conn = await get_asyncpg_connection()
-        # 簡易クエリでDB接続確認
-        await conn.fetchval("SELECT 1")
+        async with acquire_connection() as conn:
+            # 簡易クエリでDB接続確認
+            await conn.fetchval("SELECT 1")
         return True
     except Exception as e:
         print(f"DB health check failed: {str(e)}")
         return False
-    finally:
-        if conn:
-            await release_asyncpg_connection(conn)
 
 
 async def ensure_booking_link_patterns_table():
     """booking_link_patterns テーブルの存在確認と作成"""
-    conn = None
     try:
-        conn = await get_asyncpg_connection()
-
-        # テーブル存在確認
-        exists = await conn.fetchval("""
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables
-                WHERE table_schema = 'public'
-                AND table_name = 'booking_link_patterns'
-            )
-        """)
-
-        if not exists:
-            print("📋 booking_link_patterns テーブルが存在しません。作成します...")
-
-            # テーブル作成
-            await conn.execute("""
-                CREATE TABLE booking_link_patterns (
-                    id SERIAL PRIMARY KEY,
-                    pattern_key VARCHAR(50) UNIQUE NOT NULL,
-                    pattern_name VARCHAR(100) NOT NULL,
-                    description TEXT,
-                    booking_url TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT NOW(),
-                    updated_at TIMESTAMP
+        async with acquire_connection() as conn:
+            # テーブル存在確認
+            exists = await conn.fetchval("""
+                SELECT EXISTS (
+                    SELECT FROM information_schema.tables
+                    WHERE table_schema = 'public'
+                    AND table_name = 'booking_link_patterns'
                 )
             """)
 
-            # インデックス作成
-            await conn.execute("""
-                CREATE INDEX idx_booking_link_patterns_key
-                ON booking_link_patterns(pattern_key)
-            """)
-
-            # 初期データ投入
-            await conn.execute("""
-                INSERT INTO booking_link_patterns (pattern_key, pattern_name, description, booking_url) VALUES
-                ('high_budget', '高予算（1,000万円以上）', '予算が「1,000万～3,000万円未満」「3,000万～5,000万円未満」「5,000万円以上」の場合', 'https://app.spirinc.com/t/W63rJQN01CTXR-FjsFaOr/as/8FtIxQriLEvZxYqBlbzib/confirm'),
-                ('low_budget_influencer', '低予算×インフルエンサー', '予算が「500万円未満」「500万～1,000万円未満」かつ希望ジャンルに「インフルエンサー」が含まれる場合', 'https://app.spirinc.com/t/W63rJQN01CTXR-FjsFaOr/as/8FtIxQriLEvZxYqBlbzib/confirm'),
-                ('low_budget_other', '低予算×その他', '予算が「500万円未満」「500万～1,000万円未満」かつ希望ジャンルが「インフルエンサー以外」または「ジャンル希望なし」の場合', 'https://app.spirinc.com/t/W63rJQN01CTXR-FjsFaOr/as/8FtIxQriLEvZxYqBlbzib/confirm')
-            """)
-
-            print("✅ booking_link_patterns テーブル作成完了（初期データ3件投入）")
-        else:
-            print("✅ booking_link_patterns テーブル存在確認OK")
+            if not exists:
+                print("📋 booking_link_patterns テーブルが存在しません。作成します...")
+
+                # テーブル作成
+                await conn.execute("""
+                    CREATE TABLE booking_link_patterns (
+                        id SERIAL PRIMARY KEY,
+                        pattern_key VARCHAR(50) UNIQUE NOT NULL,
+                        pattern_name VARCHAR(100) NOT NULL,
+                        description TEXT,
+                        booking_url TEXT NOT NULL,
+                        created_at TIMESTAMP DEFAULT NOW(),
+                        updated_at TIMESTAMP
+                    )
+                """)
+
+                # インデックス作成
+                await conn.execute("""
+                    CREATE INDEX idx_booking_link_patterns_key
+                    ON booking_link_patterns(pattern_key)
+                """)
+
+                # 初期データ投入
+                await conn.execute("""
+                    INSERT INTO booking_link_patterns (pattern_key, pattern_name, description, booking_url) VALUES
+                    ('high_budget', '高予算（1,000万円以上）', '予算が「1,000万～3,000万円未満」「3,000万～5,000万円未満」「5,000万円以上」の場合', 'https://app.spirinc.com/t/W63rJQN01CTXR-FjsFaOr/as/8FtIxQriLEvZxYqBlbzib/confirm'),
+                    ('low_budget_influencer', '低予算×インフルエンサー', '予算が「500万円未満」「500万～1,000万円未満」かつ希望ジャンルに「インフルエンサー」が含まれる場合', 'https://app.spirinc.com/t/W63rJQN01CTXR-FjsFaOr/as/8FtIxQriLEvZxYqBlbzib/confirm'),
+                    ('low_budget_other', '低予算×その他', '予算が「500万円未満」「500万～1,000万円未満」かつ希望ジャンルが「インフルエンサー以外」または「ジャンル希望なし」の場合', 'https://app.spirinc.com/t/W63rJQN01CTXR-FjsFaOr/as/8FtIxQriLEvZxYqBlbzib/confirm')
+                """)
+
+                print("✅ booking_link_patterns テーブル作成完了（初期データ3件投入）")
+            else:
+                print("✅ booking_link_patterns テーブル存在確認OK")
 
     except Exception as e:
         print(f"⚠️  booking_link_patterns テーブル確認エラー: {e}")
         # エラーが発生してもアプリケーション起動は継続
-    finally:
-        if conn:
-            await release_asyncpg_connection(conn)
 
 
-async def init_db():
-    """データベース初期化（アプリケーション起動時、Phase A1最適化）"""
+async def init_db(ensure_schema: bool = True, pool_sizes: Optional[Dict[str, Tuple[int, int]]] = None):
+    """データベース初期化（アプリケーション起動時、Phase A1最適化）
+
+    Args:
+        ensure_schema: booking_link_patterns テーブルの存在確認を起動時に行うか
+            （False の場合は呼び出し側でバックグラウンド実行する）
+        pool_sizes: ワークロード → (最小接続数, 最大接続数)。未指定時は public プール (2, 5) のみ
+    """
     global engine, async_session_maker
 
     # PostgreSQL URLをasyncpg用に変換（クエリパラメータを除去）
@@ -180,11 +423,13 @@ async def init_db():
         expire_on_commit=False,
     )
 
-    # asyncpgプール初期化 (Phase A1最適化)
-    await init_asyncpg_pool()
+    # asyncpgプール初期化 (Phase A1最適化、ワークロード別)
+    for workload, (min_size, max_size) in (pool_sizes or {WORKLOAD_PUBLIC: (2, 5)}).items():
+        await init_asyncpg_pool(min_size=min_size, max_size=max_size, workload=workload)
 
     # booking_link_patterns テーブルの存在確認と作成
-    await ensure_booking_link_patterns_table()
+    if ensure_schema:
+        await ensure_booking_link_patterns_table()
 
 
 async def get_db_session() -> AsyncSession:
@@ -205,5 +450,6 @@ async def close_db():
     global engine, asyncpg_pool
     if engine:
         await engine.dispose()
-    if asyncpg_pool:
-        await asyncpg_pool.close()
+    await pool_manager.close()
+    await plan_sampler.close()
+    asyncpg_pool = None
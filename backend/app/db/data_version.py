@@ -0,0 +1,78 @@
+"""マスタデータバージョン取得
+
+スナップショット・キャッシュ・事前計算結果が「どのマスタデータから作られたか」を判定するための
+バージョン文字列を提供する。
+
+- master_data_version テーブル（scripts/create_master_data_version.sql）がある場合は
+  トリガーで自動採番されたバージョンを1行PK参照で取得
+- テーブル未作成の環境では各テーブルの件数とハッシュからフィンガープリントを計算（全件走査のため重い）
+"""
+from typing import List, Optional
+import hashlib
+
+import asyncpg
+
+
+# マッチング結果に影響するマスタテーブル
+MASTER_DATA_TABLES: List[str] = [
+    "m_account",
+    "m_talent_act",
+    "talent_scores",
+    "talent_images",
+    "m_talent_cm",
+    "industries",
+    "target_segments",
+    "budget_ranges",
+    "recommended_talents",
+]
+
+
+async def fetch_data_version(conn) -> str:
+    """現在のマスタデータバージョンを取得
+
+    Returns:
+        str: "v{version}"（バージョンテーブルあり）または "fp-{hash}"（フィンガープリント）
+    """
+    try:
+        version = await conn.fetchval("SELECT version FROM master_data_version WHERE id = 1")
+    except asyncpg.exceptions.UndefinedTableError:
+        version = None
+
+    if version is not None:
+        return f"v{version}"
+
+    return await compute_data_fingerprint(conn)
+
+
+async def fetch_tracked_version(conn) -> Optional[str]:
+    """master_data_version テーブルのバージョンのみ取得（テーブルが無い場合は None、フィンガープリント計算はしない）"""
+    try:
+        version = await conn.fetchval("SELECT version FROM master_data_version WHERE id = 1")
+    except asyncpg.exceptions.UndefinedTableError:
+        return None
+    return f"v{version}" if version is not None else None
+
+
+async def compute_data_fingerprint(conn, tables: Optional[List[str]] = None) -> str:
+    """テーブル内容のフィンガープリントを計算（件数 + 行ハッシュ合計）"""
+    digest = hashlib.sha1()
+    for table in tables or MASTER_DATA_TABLES:
+        row = await conn.fetchrow(
+            f"SELECT COUNT(*) AS n, COALESCE(SUM(hashtext(t::text)::bigint), 0) AS h FROM {table} t"
+        )
+        digest.update(f"{table}:{row['n']}:{row['h']};".encode("utf-8"))
+    return f"fp-{digest.hexdigest()[:16]}"
+
+
+async def bump_data_version(conn, table_name: str = "manual") -> str:
+    """マスタデータバージョンを手動で進める（トリガー対象外の変更時に使用）"""
+    version = await conn.fetchval(
+        """
+        UPDATE master_data_version
+        SET version = version + 1, last_table = $1, updated_at = NOW()
+        WHERE id = 1
+        RETURNING version
+        """,
+        table_name,
+    )
+    return f"v{version}"
@@ -1,189 +0,0 @@
-"""Phase A最適化：統合クエリ実装
-マッチングロジック完全保持・接続数削減
-"""
-import asyncio
-import asyncpg
-from typing import List, Dict, Any
-from app.db.connection import get_asyncpg_connection
-
-
-class OptimizedMatchingQueries:
-    """最適化済みマッチングクエリ"""
-
-    @staticmethod
-    async def execute_unified_matching_query(
-        budget_max: int,
-        target_segment_id: int,
-        image_item_ids: List[int],
-        industry_name: str,
-        target_segment_name: str,
-        budget_range: str
-    ) -> List[Dict[str, Any]]:
-        """
-        統合クエリによる5段階マッチング処理
-
-        ⚠️ 重要: マッチングロジックは完全保持
-        - STEP 0-5の計算式は一切変更なし
-        - PERCENT_RANK()による業界イメージ査定維持
-        - ソート順序完全保持
-        """
-
-        # For now, let's just call the existing logic to ensure compatibility
-        # This is a temporary implementation - just use the existing function but with optimized connection handling
-        from app.api.endpoints.matching import execute_matching_logic
-        from app.schemas.matching import MatchingFormData
-
-        # Create a form data object with the actual parameters
-        form_data = MatchingFormData(
-            company_name="Test Company",
-            industry=industry_name,
-            target_segments=target_segment_name,
-            purpose="Test purpose",
-            budget=budget_range,
-            email="test@example.com"
-        )
-
-        # Call the existing implementation for now
-        results = await execute_matching_logic(
-            form_data,
-            budget_max,
-            target_segment_id,
-            image_item_ids
-        )
-
-        return results
-
-    @staticmethod
-    async def get_matching_parameters_optimized(
-        industry_name: str,
-        target_segment_name: str
-    ) -> tuple:
-        """
-        マッチングパラメータ取得（最適化版）
-        既存実装と完全一致：target_segment_idとimage_item_idsを取得
-        """
-
-        conn = await get_asyncpg_connection()
-        try:
-            # ターゲット層ID取得
-            segment_row = await conn.fetchrow(
-                "SELECT target_segment_id FROM target_segments WHERE segment_name = $1",
-                target_segment_name,
-            )
-            if not segment_row:
-                raise ValueError(f"指定されたターゲット層 '{target_segment_name}' が見つかりません")
-
-            # 業種に紐づくrequired_image_id取得（既存ロジック完全保持）
-            image_row = await conn.fetchrow(
-                "SELECT required_image_id FROM industries WHERE industry_name = $1",
-                industry_name,
-            )
-            # required_image_idが設定されていない場合は全イメージ項目を対象とする
-            if image_row and image_row["required_image_id"]:
-                image_item_ids = [image_row["required_image_id"]]
-            else:
-                # 全イメージ項目 (1-7) を対象
-                image_item_ids = [1, 2, 3, 4, 5, 6, 7]
-
-            target_segment_id = segment_row["target_segment_id"]
-
-            return target_segment_id, image_item_ids
-        finally:
-            await conn.close()
-
-    @staticmethod
-    async def get_budget_max_optimized(budget_range: str) -> float:
-        """
-        予算上限取得（最適化版）
-        既存実装と完全一致させるため正規化処理を含む
-        """
-        def normalize_budget_range_string(text: str) -> str:
-            """予算区分文字列を正規化（既存ロジック完全保持）"""
-            # 波ダッシュ(U+301C) → 長音記号(U+FF5E)
-            text = text.replace("～", "〜")
-            # 全角チルダ(U+FF5E) → 長音記号(U+FF5E)（念のため）
-            text = text.replace("〜", "〜")
-            # 空白を除去
-            text = text.replace(" ", "").replace("　", "")
-            return text
-
-        normalized_budget_name = normalize_budget_range_string(budget_range)
-
-        budget_query = """
-        SELECT max_amount FROM budget_ranges
-        WHERE REPLACE(REPLACE(REPLACE(range_name, '～', '〜'), ' ', ''), '　', '') = $1
-        """
-
-        conn = await get_asyncpg_connection()
-        try:
-            result = await conn.fetchrow(budget_query, normalized_budget_name)
-            return float(result['max_amount'] or 999999999999) if result else 0.0
-        finally:
-            await conn.close()
-
-    @staticmethod
-    async def apply_matching_scores_optimized(
-        talent_results: List[Dict[str, Any]]
-    ) -> List[Dict[str, Any]]:
-        """
-        STEP 5: マッチングスコア振り分け（完全保持）
-        """
-        import random
-
-        for talent in talent_results:
-            ranking = talent['ranking']
-
-            # 既存ロジック完全保持
-            if 1 <= ranking <= 3:
-                matching_score = random.uniform(97.0, 99.7)
-            elif 4 <= ranking <= 10:
-                matching_score = random.uniform(93.0, 96.9)
-            elif 11 <= ranking <= 20:
-                matching_score = random.uniform(89.0, 92.9)
-            else:  # 21-30位
-                matching_score = random.uniform(86.0, 88.9)
-
-            talent['matching_score'] = round(matching_score, 1)
-
-        return talent_results
-
-    @staticmethod
-    async def execute_optimized_matching_flow(
-        industry_name: str,
-        target_segment_name: str,
-        budget_range: str
-    ) -> List[Dict[str, Any]]:
-        """
-        最適化されたマッチングフロー実行
-
-        効果予測: 接続数 5+回 → 3回（60%削減）
-        """
-
-        # 並行実行でパラメータ取得
-        params_task = OptimizedMatchingQueries.get_matching_parameters_optimized(
-            industry_name, target_segment_name
-        )
-        budget_task = OptimizedMatchingQueries.get_budget_max_optimized(budget_range)
-
-        # 並行実行完了待ち
-        params, budget_max = await asyncio.gather(params_task, budget_task)
-
-        target_segment_id, image_item_ids = params
-
-        if not target_segment_id:
-            raise ValueError("無効なターゲット層です")
-
-        if budget_max <= 0:
-            raise ValueError("無効な予算区分です")
-
-        # 統合クエリでメインマッチング実行 - use actual parameters from the test
-        talent_results = await OptimizedMatchingQueries.execute_unified_matching_query(
-            budget_max, target_segment_id, image_item_ids, industry_name, target_segment_name, budget_range
-        )
-
-        # STEP 5: マッチングスコア振り分け
-        final_results = await OptimizedMatchingQueries.apply_matching_scores_optimized(
-            talent_results
-        )
-
-        return final_results
\ No newline at end of file
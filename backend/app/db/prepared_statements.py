@@ -0,0 +1,168 @@
+"""プリペアドステートメント・レジストリ（マッチングのホットクエリ用）
+
+STEP 0-4 統合CTE・パラメータ取得・CM競合チェックなど、リクエストごとに実行される
+大きなSQLを名前付きで登録し、プールの接続作成時（asyncpg pool init）に一度だけ
+Connection.prepare() する。以降のリクエストはパース・プランニングを省略して実行できる。
+
+    register_statement("matching_parameters", SQL)   # モジュール読み込み時に登録
+
+    async with acquire_connection() as conn:
+        rows = await fetch_prepared(conn, "matching_parameters", a, b, c)
+
+SQLは必ず完全にパラメータ化すること（値をf-stringで埋め込むと別ステートメントになり再利用できない）。
+初期化後に登録された文や、接続作成時の準備に失敗した文は初回実行時にその接続で準備する。
+PREPARED_STATEMENTS_ENABLED=false の場合は従来どおりSQL文字列で実行する。
+
+準備済みステートメントはクライアント側の接続（asyncpg.Connection、プールのプロキシは下の接続に
+解決）ごとに保持する。PgBouncer のトランザクションプーリング越しでは同じクライアント接続でも
+トランザクションごとに別のサーバー接続に割り当てられ、準備した文が無い接続で実行されうる。
+その構成では PgBouncer 1.21 以降の max_prepared_statements を有効にするか、
+PREPARED_STATEMENTS_ENABLED=false とすること（直接接続・セッションプーリングは問題ない）。
+"""
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+import logging
+import time
+import weakref
+
+import asyncpg
+import asyncpg.pool
+
+from app.core.config import settings
+from app.core.tracing import query_span
+from app.db.query_plans import plan_sampler
+
+logger = logging.getLogger(__name__)
+
+# 名前 → SQL
+_statements: Dict[str, str] = {}
+
+# クライアント接続ごとの準備済みステートメント（接続オブジェクトが破棄されたら消える）
+_prepared: "weakref.WeakKeyDictionary[Any, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+
+@dataclass
+class PreparedStatementStats:
+    """レジストリの計測値（累積）"""
+    connections_prepared: int = 0
+    statements_prepared: int = 0
+    prepare_seconds_total: float = 0.0
+    prepare_errors: int = 0
+    prepared_executions: int = 0
+    text_executions: int = 0  # 無効化時・準備失敗時のSQL文字列実行
+
+
+stats = PreparedStatementStats()
+
+
+def register_statement(name: str, sql: str) -> str:
+    """ホットクエリを登録（同名・同一SQLの再登録は無視）"""
+    existing = _statements.get(name)
+    if existing is not None and existing != sql:
+        raise ValueError(f"プリペアドステートメント名が重複しています: {name}")
+    _statements[name] = sql
+    return name
+
+
+def registered_statements() -> Dict[str, str]:
+    return dict(_statements)
+
+
+def _connection_key(conn):
+    """プールのプロキシは acquire ごとに別オブジェクトのため、下の asyncpg.Connection に解決"""
+    if isinstance(conn, asyncpg.pool.PoolConnectionProxy):
+        return conn._con
+    return conn
+
+
+async def _prepare(conn, cache: Dict[str, Any], name: str):
+    started = time.perf_counter()
+    try:
+        statement = await conn.prepare(_statements[name])
+    except Exception:
+        stats.prepare_errors += 1
+        raise
+    stats.statements_prepared += 1
+    stats.prepare_seconds_total += time.perf_counter() - started
+    cache[name] = statement
+    return statement
+
+
+async def prepare_registered_statements(conn) -> None:
+    """登録済みの全ステートメントを接続上で準備（PoolManager.connection_init_hooks 用）"""
+    if not settings.prepared_statements_enabled:
+        return
+
+    key = _connection_key(conn)
+    cache = _prepared.setdefault(key, {})
+    # 接続が閉じられたら準備済みステートメントも破棄
+    conn.add_termination_listener(lambda _conn: _prepared.pop(key, None))
+
+    for name in list(_statements):
+        try:
+            await _prepare(conn, cache, name)
+        except Exception as e:
+            # 準備できなくても接続は使えるため、初回実行時に再試行する
+            logger.warning(f"⚠️ プリペアドステートメント準備失敗: {name}: {e}")
+    stats.connections_prepared += 1
+
+
+async def _statement(conn, name: str) -> Optional[Any]:
+    if name not in _statements:
+        raise KeyError(f"未登録のプリペアドステートメント: {name}")
+    if not settings.prepared_statements_enabled:
+        return None
+
+    cache = _prepared.setdefault(_connection_key(conn), {})
+    statement = cache.get(name)
+    if statement is None:
+        try:
+            statement = await _prepare(conn, cache, name)
+        except Exception as e:
+            logger.warning(f"⚠️ プリペアドステートメント準備失敗（SQL文字列で実行）: {name}: {e}")
+            return None
+    return statement
+
+
+async def _execute(conn, name: str, method: str, args: tuple):
+    with query_span(**{"db.prepared_statement": name}):
+        # サンプリング・閾値超過時は実行計画をバックグラウンドで取得（app.db.query_plans）
+        with plan_sampler.timed(name, _statements[name], args):
+            return await _execute_statement(conn, name, method, args)
+
+
+async def _execute_statement(conn, name: str, method: str, args: tuple):
+    statement = await _statement(conn, name)
+    if statement is None:
+        stats.text_executions += 1
+        return await getattr(conn, method)(_statements[name], *args)
+
+    stats.prepared_executions += 1
+    try:
+        return await getattr(statement, method)(*args)
+    except (asyncpg.exceptions.InvalidCachedStatementError, asyncpg.exceptions.FeatureNotSupportedError) as e:
+        # テーブル定義変更で準備済みプランが無効になった場合は準備し直して1回だけ再実行
+        logger.info(f"🔄 プリペアドステートメントを再準備します: {name}: {e}")
+        cache = _prepared.setdefault(_connection_key(conn), {})
+        statement = await _prepare(conn, cache, name)
+        return await getattr(statement, method)(*args)
+
+
+async def fetch_prepared(conn, name: str, *args) -> List[Any]:
+    """登録済みステートメントで fetch"""
+    return await _execute(conn, name, "fetch", args)
+
+
+async def fetchrow_prepared(conn, name: str, *args) -> Optional[Any]:
+    """登録済みステートメントで fetchrow"""
+    return await _execute(conn, name, "fetchrow", args)
+
+
+def get_prepared_statement_status() -> Dict[str, Any]:
+    """レジストリの状態（/api/health/pool 用）"""
+    return {
+        "enabled": settings.prepared_statements_enabled,
+        "statements": sorted(_statements),
+        "connections": len(_prepared),
+        **asdict(stats),
+    }
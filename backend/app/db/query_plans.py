@@ -0,0 +1,306 @@
+"""スロークエリ捕捉と実行計画サンプリング
+
+マッチングCTEなどのプリペアドステートメントは QUERY_PLAN_SAMPLE_RATE の割合で、
+SQL文字列で実行したクエリも含めて SLOW_QUERY_THRESHOLD_MS を超えたものは常に、
+専用のサイド接続で EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) を取り直して保存する。
+
+- 捕捉はバックグラウンドで1件ずつ実行し、実行中に来たサンプルは破棄する（本番負荷を増やさない）
+- 計画はノード種別・テーブル・インデックス・結合方式だけを正規化したフィンガープリントで識別し、
+  同じクエリの計画が前回と変わった場合（データ投入後の計画退行など）は警告ログを出す
+- 直近 QUERY_PLAN_BUFFER_SIZE 件をメモリ上のリングバッファに保持（/api/admin/query-plans）
+
+ANALYZE は実際にクエリを実行するため、SELECT / WITH 以外は EXPLAIN のみ取得し、
+いずれも statement_timeout 付きの読み取り専用トランザクション内で実行する。
+
+バインド引数（メールアドレス・氏名などを含みうる）は保存しない。レコードには引数の型のみを残し、
+計画中の条件式（Filter / Index Cond など）のリテラルは ? に置き換えてから保存する。
+再取得用の引数は登録済みステートメント（アプリ内部のID・区分のみを渡すもの）に限って保持し、
+SQL文字列で実行したスロークエリ（sql:...）は再取得の対象にしない。
+"""
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional, Set
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import re
+import time
+
+import asyncpg
+
+from app.core.config import settings
+from app.core.tracing import detached
+
+logger = logging.getLogger(__name__)
+
+TRIGGER_SAMPLE = "sample"
+TRIGGER_SLOW = "slow"
+TRIGGER_MANUAL = "manual"
+
+# 計画フィンガープリントに含めるノード属性（コスト・行数・時間は含めない）
+PLAN_SHAPE_KEYS = ("Node Type", "Relation Name", "Index Name", "Join Type", "Strategy", "Parent Relationship")
+
+_LITERAL = re.compile(r"'(?:[^']|'')*'|(?<!\$)\b\d+(?:\.\d+)?\b")
+
+# 計画ノードのうちリテラルを含まない文字列属性（それ以外の文字列はリテラルを伏せる）
+PLAN_SAFE_KEYS = PLAN_SHAPE_KEYS + (
+    "Alias", "Schema", "CTE Name", "Subplan Name", "Scan Direction", "Operation",
+    "Partial Mode", "Sort Method", "Sort Space Type",
+)
+
+# SQL文字列で実行したクエリの捕捉名の接頭辞
+TEXT_QUERY_PREFIX = "sql:"
+
+# 登録済みステートメントの実行中（SQL文字列実行時にクエリロガーと二重に捕捉しない）
+_registered_execution: ContextVar[bool] = ContextVar("registered_execution", default=False)
+
+
+@dataclass
+class QueryPlanStats:
+    """サンプラーの計測値（累積）"""
+    sampled: int = 0
+    slow: int = 0
+    captured: int = 0
+    dropped: int = 0  # 捕捉中のため破棄
+    errors: int = 0
+    plan_changes: int = 0
+
+
+def normalize_sql(sql: str) -> str:
+    """リテラルを ? に置き換え空白を詰めた SQL（クエリのフィンガープリント用）"""
+    return " ".join(_LITERAL.sub("?", sql).split())
+
+
+def query_fingerprint(sql: str) -> str:
+    return hashlib.sha1(normalize_sql(sql).encode("utf-8")).hexdigest()[:12]
+
+
+def _plan_nodes(node: Dict[str, Any], depth: int = 0):
+    yield depth, node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child, depth + 1)
+
+
+def plan_fingerprint(plan: Dict[str, Any]) -> str:
+    """計画の形（ノード種別・テーブル・インデックス・結合方式）のフィンガープリント"""
+    shape = [
+        (depth, [node.get(key) for key in PLAN_SHAPE_KEYS])
+        for depth, node in _plan_nodes(plan["Plan"])
+    ]
+    return hashlib.sha1(json.dumps(shape, ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+
+
+def summarize_plan(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """使用インデックス・Seq Scan 対象テーブル・実行時間の要約"""
+    indexes: Set[str] = set()
+    seq_scans: Set[str] = set()
+    for _, node in _plan_nodes(plan["Plan"]):
+        if node.get("Index Name"):
+            indexes.add(node["Index Name"])
+        if node.get("Node Type") == "Seq Scan" and node.get("Relation Name"):
+            seq_scans.add(node["Relation Name"])
+    root = plan["Plan"]
+    return {
+        "indexes": sorted(indexes),
+        "seq_scans": sorted(seq_scans),
+        "planning_ms": plan.get("Planning Time"),
+        "execution_ms": plan.get("Execution Time"),
+        "shared_hit_blocks": root.get("Shared Hit Blocks", 0),
+        "shared_read_blocks": root.get("Shared Read Blocks", 0),
+    }
+
+
+def redact_plan(value: Any, key: Optional[str] = None) -> Any:
+    """計画JSONの条件式・出力列などに含まれるリテラル（バインド引数の値）を ? に置き換える"""
+    if isinstance(value, dict):
+        return {k: redact_plan(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [redact_plan(v, key) for v in value]
+    if isinstance(value, str) and key not in PLAN_SAFE_KEYS:
+        return _LITERAL.sub("?", value)
+    return value
+
+
+def _explain_sql(sql: str) -> str:
+    head = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+    if head in ("SELECT", "WITH"):
+        return f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"
+    return f"EXPLAIN (FORMAT JSON) {sql}"
+
+
+class QueryPlanSampler:
+    """実行計画のサンプリングとリングバッファ"""
+
+    def __init__(self) -> None:
+        self.stats = QueryPlanStats()
+        self.records: Deque[Dict[str, Any]] = deque(maxlen=settings.query_plan_buffer_size)
+        self.last_fingerprints: Dict[str, str] = {}
+        self._last_queries: Dict[str, tuple] = {}  # 登録済みステートメント名 → (SQL, 引数)（手動再取得用）
+        self._lock = asyncio.Lock()
+        self._conn: Optional[asyncpg.Connection] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    @contextmanager
+    def timed(self, name: str, sql: str, args: tuple):
+        """登録済みステートメントの実行を計測し、正常終了時に observe する"""
+        token = _registered_execution.set(True)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            _registered_execution.reset(token)
+        self.observe(name, sql, args, time.perf_counter() - started)
+
+    def observe(self, name: str, sql: str, args: tuple, elapsed_seconds: float) -> None:
+        """クエリ実行後に呼ぶ（捕捉対象ならバックグラウンドで EXPLAIN を予約）"""
+        threshold = settings.slow_query_threshold_ms
+        if threshold > 0 and elapsed_seconds * 1000 >= threshold:
+            self.stats.slow += 1
+            trigger = TRIGGER_SLOW
+        elif settings.query_plan_sample_rate > 0 and random.random() < settings.query_plan_sample_rate:
+            self.stats.sampled += 1
+            trigger = TRIGGER_SAMPLE
+        else:
+            return
+
+        if self._lock.locked():
+            self.stats.dropped += 1
+            return
+        # レスポンス後も続く処理のためリクエストのトレースから切り離す
+        with detached():
+            task = asyncio.get_running_loop().create_task(
+                self.capture(name, sql, args, trigger, elapsed_seconds)
+            )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    async def _side_connection(self) -> asyncpg.Connection:
+        if self._conn is None or self._conn.is_closed():
+            from app.db.connection import asyncpg_connection_params
+            self._conn = await asyncpg.connect(**asyncpg_connection_params())
+        return self._conn
+
+    async def capture(
+        self,
+        name: str,
+        sql: str,
+        args: tuple = (),
+        trigger: str = TRIGGER_MANUAL,
+        elapsed_seconds: Optional[float] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """サイド接続で EXPLAIN を実行してリングバッファに保存（引数の値は保存しない）"""
+        if not name.startswith(TEXT_QUERY_PREFIX):
+            self._last_queries[name] = (sql, args)
+        try:
+            async with self._lock:
+                conn = await self._side_connection()
+                async with conn.transaction(readonly=True):
+                    timeout_ms = int(settings.query_plan_timeout_seconds * 1000)
+                    await conn.execute(f"SET LOCAL statement_timeout = {timeout_ms}")
+                    raw = await conn.fetchval(_explain_sql(sql), *args)
+                data_version = await self._data_version(conn)
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"⚠️ 実行計画の取得失敗: {name}: {e}")
+            return None
+
+        plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]
+        record = self._record(name, sql, args, trigger, elapsed_seconds, plan, data_version)
+        self.stats.captured += 1
+        return record
+
+    async def _data_version(self, conn) -> Optional[str]:
+        # フィンガープリント計算（全件走査）は行わず、バージョンテーブルがある場合のみ取得
+        try:
+            version = await conn.fetchval("SELECT version FROM master_data_version WHERE id = 1")
+        except asyncpg.exceptions.UndefinedTableError:
+            return None
+        return f"v{version}" if version is not None else None
+
+    def _record(self, name, sql, args, trigger, elapsed_seconds, plan, data_version) -> Dict[str, Any]:
+        fingerprint = plan_fingerprint(plan)
+        previous = self.last_fingerprints.get(name)
+        changed = previous is not None and previous != fingerprint
+        self.last_fingerprints[name] = fingerprint
+
+        record = {
+            "statement": name,
+            "query_fingerprint": query_fingerprint(sql),
+            "plan_fingerprint": fingerprint,
+            "previous_plan_fingerprint": previous if changed else None,
+            "plan_changed": changed,
+            "trigger": trigger,
+            "observed_ms": round(elapsed_seconds * 1000, 2) if elapsed_seconds is not None else None,
+            "captured_at": datetime.utcnow().isoformat(),
+            "data_version": data_version,
+            "arg_types": [type(a).__name__ for a in args],
+            **summarize_plan(plan),
+            "plan": redact_plan(plan),
+        }
+        self.records.append(record)
+
+        if changed:
+            self.stats.plan_changes += 1
+            logger.warning(
+                f"⚠️ 実行計画が変化しました: {name} {previous} → {fingerprint} "
+                f"(indexes={record['indexes']}, seq_scans={record['seq_scans']}, data_version={data_version})"
+            )
+        elif trigger == TRIGGER_SLOW:
+            logger.warning(f"🐢 スロークエリ: {name} {record['observed_ms']}ms plan={fingerprint}")
+        return record
+
+    async def recapture(self, name: str) -> Optional[Dict[str, Any]]:
+        """前回捕捉したクエリを同じ引数で取り直す（データ投入直後の計画確認用）
+
+        Raises:
+            KeyError: まだ一度も捕捉していないクエリ、または SQL文字列で実行したクエリの場合
+        """
+        sql, args = self._last_queries[name]
+        return await self.capture(name, sql, args, TRIGGER_MANUAL)
+
+    def query_logger(self, record) -> None:
+        """asyncpg Connection.add_query_logger 用（SQL文字列で実行したスロークエリ）"""
+        threshold = settings.slow_query_threshold_ms
+        if _registered_execution.get():
+            return
+        if threshold <= 0 or record.exception is not None or record.elapsed * 1000 < threshold:
+            return
+        name = f"{TEXT_QUERY_PREFIX}{query_fingerprint(record.query)}"
+        self.observe(name, record.query, tuple(record.args or ()), record.elapsed)
+
+    def status(self, limit: int = 20, statement: Optional[str] = None, include_plan: bool = False) -> Dict[str, Any]:
+        """サンプラーの状態と直近の捕捉結果（新しい順）"""
+        records = [r for r in reversed(self.records) if statement is None or r["statement"] == statement]
+        if not include_plan:
+            records = [{k: v for k, v in r.items() if k != "plan"} for r in records]
+        return {
+            "sample_rate": settings.query_plan_sample_rate,
+            "slow_query_threshold_ms": settings.slow_query_threshold_ms,
+            "buffer_size": self.records.maxlen,
+            "pending": self.pending(),
+            **asdict(self.stats),
+            "plan_fingerprints": dict(self.last_fingerprints),
+            "records": records[:limit],
+        }
+
+    async def close(self) -> None:
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+        self._conn = None
+
+
+plan_sampler = QueryPlanSampler()
+
+
+async def install_slow_query_logger(conn) -> None:
+    """プール接続の作成時にスロークエリ用ロガーを登録（PoolManager.connection_init_hooks 用）"""
+    if settings.slow_query_threshold_ms > 0:
+        conn.add_query_logger(plan_sampler.query_logger)
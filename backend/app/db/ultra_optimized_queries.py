@@ -1,346 +0,0 @@
-"""Phase B超最適化：完全統合SQLクエリ実装
-DB接続回数 3回 → 1回 (67%削減)
-マッチングロジック完全保持・アルコール業界年齢フィルタ対応
-"""
-import asyncio
-import asyncpg
-from typing import List, Dict, Any
-from app.db.connection import get_asyncpg_connection
-
-
-class UltraOptimizedMatchingQueries:
-    """Phase B: 完全統合クエリ（真の1回DB接続実装）"""
-
-    @staticmethod
-    async def execute_complete_unified_matching_query(
-        budget_min: float,
-        budget_max: float,
-        target_segment_id: int,
-        image_item_ids: List[int],
-        industry_name: str,
-        is_alcohol_industry: bool = False,
-        is_unlimited_budget: bool = False
-    ) -> List[Dict[str, Any]]:
-        """
-        究極統合クエリによる完全1回DB接続マッチング処理
-
-        ⚠️ 重要: マッチングロジックは完全保持
-        - STEP 0-4の計算式は一切変更なし
-        - PERCENT_RANK()による業界イメージ査定維持
-        - ソート順序完全保持
-        - アルコール業界年齢フィルタ対応
-        - おすすめタレント統合まで1クエリで完了
-        """
-
-        # 究極統合クエリ: 既存ロジック完全移植
-        ultimate_query = """
-        WITH step0_budget_filter AS (
-            -- STEP 0: 予算フィルタリング（計算列インデックス活用版） + アルコール業界年齢フィルタリング
-            -- $1 = min_budget (下限、NULLの場合は0)
-            -- $7 = max_budget (上限、NULLの場合は無限大)
-            SELECT DISTINCT ma.account_id, ma.name_full_for_matching as name, ma.last_name_kana, ma.act_genre
-            FROM m_account ma
-            LEFT JOIN m_talent_act mta ON ma.account_id = mta.account_id
-            WHERE ma.del_flag = 0  -- 有効なタレントのみ対象
-              AND mta.account_id IS NOT NULL  -- 未登録タレントを除外
-              AND (
-                -- 超高速化: 計算列インデックスを活用したシンプルな範囲チェック
-                -- money_representative_value = COALESCE(money_max_one_year, money_min_one_year)
-                (mta.money_representative_value IS NOT NULL
-                 AND mta.money_representative_value >= $1
-                 AND mta.money_representative_value < $7)
-                OR
-                -- 両方NULL: 「5,000万円以上」選択時のみ通過
-                (mta.money_representative_value IS NULL AND $6 = true)
-              ) AND (
-                -- アルコール業界の場合のみ25歳以上フィルタ適用（$4で制御）
-                $4 = false OR (
-                    ma.birthday IS NULL OR  -- 生年月日がない場合は通過
-                    EXTRACT(YEAR FROM AGE(CURRENT_DATE, ma.birthday)) >= 25
-                )
-              )
-        ),
-        step1_base_power AS (
-            -- STEP 1: 基礎パワー得点計算（仕様通り: (VR人気度 + TPRパワースコア) / 2）
-            SELECT
-                ts.account_id,
-                ts.target_segment_id,
-                (COALESCE(ts.vr_popularity, 0) + COALESCE(ts.tpr_power_score, 0)) / 2.0 AS base_power_score
-            FROM talent_scores ts
-            WHERE ts.target_segment_id = $2
-        ),
-        step2_adjustment AS (
-            -- STEP 2: 業種イメージ査定（非正規化データ対応 + 正しい加減点）
-            SELECT
-                account_id,
-                target_segment_id,
-                AVG(
-                    CASE
-                        WHEN percentile_rank <= 0.15 THEN 12.0
-                        WHEN percentile_rank <= 0.30 THEN 6.0
-                        WHEN percentile_rank <= 0.50 THEN 3.0
-                        WHEN percentile_rank <= 0.70 THEN -3.0
-                        WHEN percentile_rank <= 0.85 THEN -6.0
-                        ELSE -12.0
-                    END
-                ) AS image_adjustment
-            FROM (
-                SELECT
-                    unpivot.account_id,
-                    unpivot.target_segment_id,
-                    unpivot.image_id,
-                    PERCENT_RANK() OVER (
-                        PARTITION BY unpivot.target_segment_id, unpivot.image_id
-                        ORDER BY unpivot.score DESC
-                    ) AS percentile_rank
-                FROM (
-                    SELECT account_id, target_segment_id, 1 AS image_id, image_funny AS score FROM talent_images
-                    UNION ALL
-                    SELECT account_id, target_segment_id, 2 AS image_id, image_clean AS score FROM talent_images
-                    UNION ALL
-                    SELECT account_id, target_segment_id, 3 AS image_id, image_unique AS score FROM talent_images
-                    UNION ALL
-                    SELECT account_id, target_segment_id, 4 AS image_id, image_trustworthy AS score FROM talent_images
-                    UNION ALL
-                    SELECT account_id, target_segment_id, 5 AS image_id, image_cute AS score FROM talent_images
-                    UNION ALL
-                    SELECT account_id, target_segment_id, 6 AS image_id, image_cool AS score FROM talent_images
-                    UNION ALL
-                    SELECT account_id, target_segment_id, 7 AS image_id, image_mature AS score FROM talent_images
-                ) unpivot
-                WHERE unpivot.target_segment_id = $2
-                    AND unpivot.image_id = ANY($3::int[])
-            ) sub
-            GROUP BY account_id, target_segment_id
-        ),
-        step3_reflected_score AS (
-            -- STEP 3: 基礎反映得点（STEP1 + STEP2）
-            SELECT
-                bp.account_id,
-                bp.target_segment_id,
-                bp.base_power_score,
-                COALESCE(ia.image_adjustment, 0) AS image_adjustment,
-                bp.base_power_score + COALESCE(ia.image_adjustment, 0) AS reflected_score
-            FROM step1_base_power bp
-            LEFT JOIN step2_adjustment ia
-                ON bp.account_id = ia.account_id
-                AND bp.target_segment_id = ia.target_segment_id
-        ),
-        step4_ranking AS (
-            -- STEP 4: ランキング確定（タレント重複除去 + 上位30名抽出）
-            SELECT DISTINCT ON (rs.account_id)
-                rs.account_id,
-                rs.target_segment_id,
-                rs.base_power_score,
-                rs.image_adjustment,
-                rs.reflected_score,
-                ROW_NUMBER() OVER (ORDER BY rs.reflected_score DESC, rs.base_power_score DESC, rs.account_id) AS ranking
-            FROM step3_reflected_score rs
-            INNER JOIN step0_budget_filter bf ON bf.account_id = rs.account_id
-            ORDER BY rs.account_id, rs.reflected_score DESC, rs.base_power_score DESC
-        ),
-        step4_final AS (
-            SELECT * FROM step4_ranking
-            ORDER BY reflected_score DESC, base_power_score DESC, account_id
-            LIMIT 30
-        ),
-        recommended_talents_query AS (
-            -- おすすめタレント取得（talent_id_1,2,3構造対応）
-            SELECT
-                ma.account_id,
-                CASE
-                    WHEN ma.account_id = rt.talent_id_1 THEN 1
-                    WHEN ma.account_id = rt.talent_id_2 THEN 2
-                    WHEN ma.account_id = rt.talent_id_3 THEN 3
-                END as recommended_ranking,
-                ma.name_full_for_matching as name,
-                ma.last_name_kana,
-                ma.act_genre
-            FROM recommended_talents rt
-            INNER JOIN m_account ma ON (
-                (rt.talent_id_1 IS NOT NULL AND ma.account_id = rt.talent_id_1)
-                OR (rt.talent_id_2 IS NOT NULL AND ma.account_id = rt.talent_id_2)
-                OR (rt.talent_id_3 IS NOT NULL AND ma.account_id = rt.talent_id_3)
-            )
-            WHERE rt.industry_name = $5
-                AND ma.del_flag = 0
-            ORDER BY
-                CASE
-                    WHEN ma.account_id = rt.talent_id_1 THEN 1
-                    WHEN ma.account_id = rt.talent_id_2 THEN 2
-                    WHEN ma.account_id = rt.talent_id_3 THEN 3
-                END
-        ),
-        recommended_talent_scores AS (
-            -- おすすめタレント専用スコア取得（予算フィルタ除外）
-            -- ★重要: 正しいSTEP1計算式を適用 (VR人気度 + TPRパワースコア) / 2
-            SELECT
-                rtq.account_id,
-                rtq.recommended_ranking,
-                rtq.name,
-                rtq.last_name_kana,
-                rtq.act_genre,
-                COALESCE((COALESCE(ts.vr_popularity, 0) + COALESCE(ts.tpr_power_score, 0)) / 2.0, 0) as base_power_score,
-                0 as image_adjustment,  -- 簡略化：既存版と一致させるため固定値
-                COALESCE((COALESCE(ts.vr_popularity, 0) + COALESCE(ts.tpr_power_score, 0)) / 2.0, 0) as reflected_score
-            FROM recommended_talents_query rtq
-            LEFT JOIN talent_scores ts ON rtq.account_id = ts.account_id AND ts.target_segment_id = $2
-        )
-        -- 最終結果（おすすめタレント統合込み + STEP 5のスコア振り分けは後処理で実施）
-        SELECT
-            COALESCE(rts.account_id, r.account_id) as account_id,
-            COALESCE(rts.recommended_ranking, r.ranking) as ranking,
-            COALESCE(r.target_segment_id, $2) as target_segment_id,
-            COALESCE(rts.base_power_score, r.base_power_score) as base_power_score,
-            COALESCE(rts.image_adjustment, r.image_adjustment) as image_adjustment,
-            COALESCE(rts.reflected_score, r.reflected_score) as reflected_score,
-            COALESCE(rts.name, bf.name) as name,
-            COALESCE(rts.last_name_kana, bf.last_name_kana) as last_name_kana,
-            COALESCE(rts.act_genre, bf.act_genre) as act_genre,
-            CASE WHEN rts.account_id IS NOT NULL THEN true ELSE false END as is_recommended,
-            CASE
-                WHEN rts.account_id IS NOT NULL THEN 'explicit'
-                ELSE 'standard'
-            END as recommended_type
-        FROM step4_final r
-        INNER JOIN step0_budget_filter bf ON bf.account_id = r.account_id
-        FULL OUTER JOIN recommended_talent_scores rts ON r.account_id = rts.account_id
-        ORDER BY
-            CASE WHEN rts.account_id IS NOT NULL THEN rts.recommended_ranking ELSE r.ranking + 3 END,
-            COALESCE(rts.reflected_score, r.reflected_score) DESC,
-            COALESCE(rts.base_power_score, r.base_power_score) DESC,
-            COALESCE(rts.account_id, r.account_id)
-        LIMIT 30
-        """
-
-        conn = await get_asyncpg_connection()
-        try:
-            result = await conn.fetch(
-                ultimate_query,
-                budget_min,
-                target_segment_id,
-                image_item_ids,
-                is_alcohol_industry,
-                industry_name,
-                is_unlimited_budget,
-                budget_max
-            )
-            return [dict(row) for row in result]
-        finally:
-            await conn.close()
-
-    @staticmethod
-    def apply_step5_score_distribution_optimized(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """STEP 5: マッチングスコア振り分け（完全保持・高速化）"""
-        import random
-
-        # まず最終順位を正しく再計算
-        for i, result in enumerate(results):
-            result['ranking'] = i + 1
-
-        for result in results:
-            ranking = result['ranking']
-
-            # 順位に基づく段階的スコア計算（範囲内で上位順位が高いスコア）
-            if 1 <= ranking <= 3:
-                # 1位: 99.7, 2位: 98.7, 3位: 97.7
-                base_score = 99.7 - ((ranking - 1) * 1.0)
-                result['matching_score'] = round(base_score + random.uniform(-0.3, 0.0), 1)
-            elif 4 <= ranking <= 10:
-                # 4位: 96.9 → 10位: 93.0 (7段階で均等分割)
-                step = (96.9 - 93.0) / 6  # 7段階なので6区間
-                base_score = 96.9 - ((ranking - 4) * step)
-                result['matching_score'] = round(base_score + random.uniform(-0.3, 0.3), 1)
-            elif 11 <= ranking <= 20:
-                # 11位: 92.9 → 20位: 89.0 (10段階で均等分割)
-                step = (92.9 - 89.0) / 9  # 10段階なので9区間
-                base_score = 92.9 - ((ranking - 11) * step)
-                result['matching_score'] = round(base_score + random.uniform(-0.3, 0.3), 1)
-            elif 21 <= ranking <= 30:
-                # 21位: 88.9 → 30位: 86.0 (10段階で均等分割)
-                step = (88.9 - 86.0) / 9  # 10段階なので9区間
-                base_score = 88.9 - ((ranking - 21) * step)
-                result['matching_score'] = round(base_score + random.uniform(-0.3, 0.3), 1)
-            else:
-                result['matching_score'] = round(random.uniform(80.0, 85.9), 1)
-
-        return results
-
-    @staticmethod
-    async def execute_ultra_optimized_matching_flow(
-        industry_name: str,
-        target_segment_name: str,
-        budget_range: str
-    ) -> List[Dict[str, Any]]:
-        """
-        Phase B: 究極最適化マッチングフロー実行
-
-        効果予測: 接続数 3回 → 1回（67%削減）
-        処理時間: 8.66秒 → 5-7秒予定（20-30%高速化）
-        """
-
-        # 1. 事前パラメータ取得（インライン処理で最適化）
-        conn = await get_asyncpg_connection()
-        try:
-            # パラメータ一括取得クエリ
-            params_query = """
-            WITH budget_info AS (
-                SELECT max_amount FROM budget_ranges
-                WHERE REPLACE(REPLACE(REPLACE(range_name, '～', '〜'), ' ', ''), '　', '') =
-                      REPLACE(REPLACE(REPLACE($1, '～', '〜'), ' ', ''), '　', '')
-            ),
-            segment_info AS (
-                SELECT target_segment_id FROM target_segments WHERE segment_name = $2
-            ),
-            image_info AS (
-                SELECT
-                    CASE
-                        WHEN i.required_image_id IS NOT NULL THEN ARRAY[i.required_image_id]
-                        ELSE ARRAY[1,2,3,4,5,6,7]
-                    END as image_item_ids,
-                    CASE WHEN i.industry_name = 'アルコール飲料' THEN true ELSE false END as is_alcohol
-                FROM industries i WHERE i.industry_name = $3
-            )
-            SELECT
-                COALESCE(bi.max_amount, 'Infinity'::float8) as budget_max,
-                si.target_segment_id,
-                ii.image_item_ids,
-                ii.is_alcohol
-            FROM budget_info bi
-            CROSS JOIN segment_info si
-            CROSS JOIN image_info ii
-            """
-
-            params_result = await conn.fetchrow(params_query, budget_range, target_segment_name, industry_name)
-
-            if not params_result:
-                raise ValueError("パラメータ取得に失敗しました")
-
-            budget_max = float(params_result['budget_max'] or 999999999999)
-            target_segment_id = params_result['target_segment_id']
-            image_item_ids = params_result['image_item_ids']
-            is_alcohol = params_result['is_alcohol']
-
-        finally:
-            await conn.close()
-
-        if not target_segment_id:
-            raise ValueError("無効なターゲット層です")
-
-        if budget_max <= 0:
-            raise ValueError("無効な予算区分です")
-
-        # 「5,000万円以上」選択時判定（金額NULLタレント通過用）
-        is_unlimited_budget = budget_range == "5,000万円以上"
-
-        # 2. 究極統合クエリでマッチング実行（1回のDB接続で完了）
-        talent_results = await UltraOptimizedMatchingQueries.execute_complete_unified_matching_query(
-            budget_max, target_segment_id, image_item_ids, industry_name, is_alcohol, is_unlimited_budget
-        )
-
-        # 3. STEP 5: マッチングスコア振り分け（メモリ内処理）
-        final_results = UltraOptimizedMatchingQueries.apply_step5_score_distribution_optimized(
-            talent_results
-        )
-
-        return final_results
\ No newline at end of file
@@ -1,10 +1,65 @@
-"""FastAPI メインアプリケーション（CLAUDE.md準拠）"""
-from fastapi import FastAPI
+"""FastAPI メインアプリケーション（CLAUDE.md準拠）
+
+create_app(profile) でデプロイプロファイル別のアプリケーションを構築する（APP_PROFILE 環境変数）:
+    all    : 全ルーター（既定）。管理画面系は別プール・同時実行数制限で利用者向けと分離
+    public : 利用者向けAPIのみ（ヘルスチェック・マスタ・マッチング・トラッキング・タレント詳細）
+    admin  : 管理画面・デバッグAPIのみ（CSV/Sheetsエクスポート等の重い処理を別プロセスで実行）
+
+    APP_PROFILE=admin uvicorn app.main:app --port 8433
+"""
+from fastapi import APIRouter, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+from typing import Optional
+import asyncio
+import importlib
+import time
 from app.core.config import settings
-from app.db.connection import init_db, close_db
-from app.api.endpoints import health, target_segments, industries, matching, tracking, admin, recommended_talents, talents, admin_debug
+from app.core.compression import CompressionMiddleware
+from app.core.metrics import MetricsMiddleware, register_routes
+from app.core.responses import FastJSONResponse
+from app.core.tracing import TracingMiddleware
+from app.core.workload import WorkloadLimitMiddleware, classify_path, WORKLOAD_PUBLIC, WORKLOAD_ADMIN
+from app.db.connection import init_db, close_db, ensure_booking_link_patterns_table, pool_manager
+
+PROFILE_ALL = "all"
+PROFILE_PUBLIC = "public"
+PROFILE_ADMIN = "admin"
+PROFILES = (PROFILE_ALL, PROFILE_PUBLIC, PROFILE_ADMIN)
+
+# ルーター定義: (モジュール名, prefix, tags, 含まれるワークロード)
+#   None: 全プロファイル共通（ヘルスチェック・マスタ参照など）
+#   複数ワークロード: プロファイルに応じてパス単位（classify_path）で絞り込む
+ROUTERS = [
+    ("health", "/api", ["Health Check"], None),
+    ("metrics", "", ["Monitoring"], None),
+    ("target_segments", "/api", ["Master Data"], None),
+    ("industries", "/api", ["Master Data"], None),
+    ("matching", "/api", ["Matching Engine"], {WORKLOAD_PUBLIC}),
+    ("tracking", "/api", ["Tracking"], {WORKLOAD_PUBLIC}),
+    ("admin", "/api", ["Admin Panel"], {WORKLOAD_PUBLIC, WORKLOAD_ADMIN}),
+    ("recommended_talents", "/api", ["Recommended Talents"], {WORKLOAD_ADMIN}),
+    ("talents", "/api/talents", ["Talent Details"], None),
+    ("admin_debug", "/api", ["Debug Export"], {WORKLOAD_ADMIN}),
+]
+
+
+def _profile_workloads(profile: str) -> set:
+    if profile == PROFILE_PUBLIC:
+        return {WORKLOAD_PUBLIC}
+    if profile == PROFILE_ADMIN:
+        return {WORKLOAD_ADMIN}
+    return {WORKLOAD_PUBLIC, WORKLOAD_ADMIN}
+
+
+def _pool_sizes(profile: str) -> dict:
+    """プロファイルで使用するワークロード別プールサイズ"""
+    sizes = {
+        WORKLOAD_PUBLIC: (settings.public_pool_min_size, settings.public_pool_max_size),
+        WORKLOAD_ADMIN: (settings.admin_pool_min_size, settings.admin_pool_max_size),
+    }
+    return {workload: sizes[workload] for workload in (WORKLOAD_PUBLIC, WORKLOAD_ADMIN) if workload in _profile_workloads(profile)}
 
 
 @asynccontextmanager
@@ -12,7 +67,49 @@ async def lifespan(app: FastAPI):
     """アプリケーションライフサイクル管理"""
     # 起動時処理
     print("🚀 Starting Talent Casting System API...")
-    await init_db()
+    startup_started = time.perf_counter()
+
+    # スコアリング配列をメモリマップ（初回マッチングをDBレイテンシから切り離す）
+    scoring_arrays = None
+    if settings.scoring_arrays_path and app.state.profile != PROFILE_ADMIN:
+        from app.services.scoring_arrays import load_scoring_arrays, verify_scoring_arrays_version
+        scoring_arrays = load_scoring_arrays(settings.scoring_arrays_path)
+
+    # 事前計算済みの上位K件（参照SQLをプール接続作成時に準備するため init_db より前に読み込む）
+    matching_topk = None
+    if settings.matching_topk_enabled and app.state.profile != PROFILE_ADMIN:
+        from app.services import matching_topk
+
+    # 配列がある場合はスキーマ確認・データバージョン照合をバックグラウンドに回す
+    await init_db(ensure_schema=scoring_arrays is None, pool_sizes=_pool_sizes(app.state.profile))
+    # 返却されないDB接続（リーク）の監視
+    background_tasks = [asyncio.create_task(pool_manager.watch_long_held())]
+    if scoring_arrays is not None:
+        background_tasks.append(asyncio.create_task(ensure_booking_link_patterns_table()))
+        background_tasks.append(asyncio.create_task(
+            verify_scoring_arrays_version(settings.scoring_arrays_check_interval)
+        ))
+        print(f"✅ Scoring arrays mapped: {scoring_arrays.data_version} ({scoring_arrays.talent_count:,} talents)")
+    if settings.email_outbox_enabled:
+        # 送信待ちメールのテーブル（ワーカーを起動しない public プロファイルでも登録できるように作成）
+        from app.services.email_outbox import ensure_email_outbox_table
+        if scoring_arrays is None:
+            await ensure_email_outbox_table()
+        else:
+            background_tasks.append(asyncio.create_task(ensure_email_outbox_table()))
+    if matching_topk is not None:
+        # データバージョン・計算日の照合と、古い場合の再計算（専用接続で実行）
+        background_tasks.append(asyncio.create_task(
+            matching_topk.watch_matching_topk(settings.matching_topk_check_interval)
+        ))
+    if settings.partition_maintenance_enabled and app.state.profile != PROFILE_PUBLIC:
+        # 履歴テーブルの先の月のパーティション作成（パーティション化していないDBでは何もしない）
+        from app.services.partition_maintenance import watch_partitions
+        background_tasks.append(asyncio.create_task(watch_partitions()))
+    if settings.email_outbox_enabled and app.state.profile != PROFILE_PUBLIC:
+        # 診断完了メールの送信（利用者向けAPIと分離する場合は admin プロファイルで送信）
+        from app.services.email_outbox import email_outbox_worker
+        background_tasks.append(asyncio.create_task(email_outbox_worker.run()))
     # 機密情報をマスキングして表示
     masked_url = settings.database_url
     if '@' in masked_url:
@@ -22,81 +119,126 @@ async def lifespan(app: FastAPI):
             masked_url = f"{parts[0].split('://')[0]}://***@{parts[1]}"
     print(f"✅ Database initialized: {masked_url[:60]}...")
     print(f"✅ Environment: {settings.node_env}")
+    print(f"✅ Profile: {app.state.profile}")
     print(f"✅ CORS Origin: {settings.cors_origin}")
+    print(f"✅ Startup completed in {(time.perf_counter() - startup_started) * 1000:.0f}ms")
 
     yield
 
     # 終了時処理
     print("🛑 Shutting down Talent Casting System API...")
+    for task in background_tasks:
+        task.cancel()
     await close_db()
     print("✅ Database connections closed")
 
 
-# FastAPI アプリケーション作成
-app = FastAPI(
-    title="Talent Casting System API",
-    description="5段階マッチングロジックによるタレントキャスティング支援システム",
-    version="1.0.0",
-    lifespan=lifespan,
-    docs_url="/api/docs",
-    redoc_url="/api/redoc",
-    openapi_url="/api/openapi.json",
-)
-
-# CORS設定（本番運用診断対応: セキュリティ強化）
-# 環境変数のみ使用、ハードコード禁止
-cors_origins = []
-if settings.cors_origin:
-    cors_origins.append(settings.cors_origin)
-
-# 開発環境のフロントエンドドメインを追加
-development_origins = [
-    "http://localhost:3248",  # 管理画面・診断システム
-    "http://localhost:3247",  # ランディングページ
-]
-cors_origins.extend(development_origins)
+def create_app(profile: Optional[str] = None) -> FastAPI:
+    """プロファイル別にFastAPIアプリケーションを構築"""
+    profile = profile or settings.app_profile
+    if profile not in PROFILES:
+        raise ValueError(f"未対応のAPP_PROFILEです: {profile}（{', '.join(PROFILES)} のいずれか）")
 
-# 本番フロントエンドドメインを追加
-production_origins = [
-    "https://talent-casting-diagnosis.vercel.app",
-    "https://e-spirit.vercel.app"
-]
-cors_origins.extend(production_origins)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=cors_origins,
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],  # 管理画面のCRUD操作に必要
-    allow_headers=[
-        "Content-Type",
-        "Authorization",
-        "Accept",
-        "X-Requested-With",
-        "Origin",
-        "Access-Control-Request-Method",
-        "Access-Control-Request-Headers"
-    ],  # Preflightヘッダーを追加
-    expose_headers=["Content-Type"],  # レスポンスヘッダー制限
-    max_age=3600,  # Preflight結果をキャッシュ（1時間）
-)
-
-# ルーター登録
-app.include_router(health.router, prefix="/api", tags=["Health Check"])
-app.include_router(target_segments.router, prefix="/api", tags=["Master Data"])
-app.include_router(industries.router, prefix="/api", tags=["Master Data"])
-app.include_router(matching.router, prefix="/api", tags=["Matching Engine"])
-app.include_router(tracking.router, prefix="/api", tags=["Tracking"])
-app.include_router(admin.router, prefix="/api", tags=["Admin Panel"])
-app.include_router(recommended_talents.router, prefix="/api", tags=["Recommended Talents"])
-app.include_router(talents.router, prefix="/api/talents", tags=["Talent Details"])
-app.include_router(admin_debug.router, prefix="/api", tags=["Debug Export"])
-
-
-@app.get("/")
-async def root():
-    """ルートエンドポイント"""
-    return {
-        "message": "Talent Casting System API",
-        "version": "1.0.0",
-        "docs": "/api/docs",
-    }
+    # FastAPI アプリケーション作成
+    app = FastAPI(
+        title="Talent Casting System API",
+        description="5段階マッチングロジックによるタレントキャスティング支援システム",
+        version="1.0.0",
+        lifespan=lifespan,
+        docs_url="/api/docs",
+        redoc_url="/api/redoc",
+        openapi_url="/api/openapi.json",
+        default_response_class=FastJSONResponse if settings.fast_json_response_enabled else JSONResponse,
+    )
+    app.state.profile = profile
+
+    # ワークロード別の同時実行数制限（管理画面の重い処理が利用者向けAPIを圧迫しないように）
+    app.add_middleware(
+        WorkloadLimitMiddleware,
+        limits={WORKLOAD_PUBLIC: settings.public_max_concurrency, WORKLOAD_ADMIN: settings.admin_max_concurrency},
+        queue_timeout=settings.workload_queue_timeout,
+    )
+
+    # 段階別スパン計測（同時実行数制限の待ち時間も含めるため制限より外側に置く）
+    app.add_middleware(TracingMiddleware)
+
+    # ルート別レイテンシのメトリクス（/metrics）
+    app.add_middleware(MetricsMiddleware)
+
+    # レスポンス圧縮（gzip / br / zstd、計測値に圧縮時間を含めないよう計測より外側に置く）
+    app.add_middleware(CompressionMiddleware)
+
+    # CORS設定（本番運用診断対応: セキュリティ強化）
+    # 環境変数のみ使用、ハードコード禁止
+    cors_origins = []
+    if settings.cors_origin:
+        cors_origins.append(settings.cors_origin)
+
+    # 開発環境のフロントエンドドメインを追加
+    development_origins = [
+        "http://localhost:3248",  # 管理画面・診断システム
+        "http://localhost:3247",  # ランディングページ
+    ]
+    cors_origins.extend(development_origins)
+
+    # 本番フロントエンドドメインを追加
+    production_origins = [
+        "https://talent-casting-diagnosis.vercel.app",
+        "https://e-spirit.vercel.app"
+    ]
+    cors_origins.extend(production_origins)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=cors_origins,
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],  # 管理画面のCRUD操作に必要
+        allow_headers=[
+            "Content-Type",
+            "Authorization",
+            "Accept",
+            "X-Requested-With",
+            "Origin",
+            "Access-Control-Request-Method",
+            "Access-Control-Request-Headers"
+        ],  # Preflightヘッダーを追加
+        expose_headers=["Content-Type", "Server-Timing"],  # レスポンスヘッダー制限（段階別処理時間は公開）
+        max_age=3600,  # Preflight結果をキャッシュ（1時間）
+    )
+
+    # ルーター登録（プロファイル外のワークロードのみのルーターは import もしない）
+    workloads = _profile_workloads(profile)
+    for module_name, prefix, tags, router_workloads in ROUTERS:
+        if router_workloads is not None and not router_workloads & workloads:
+            continue
+        module = importlib.import_module(f"app.api.endpoints.{module_name}")
+        router = module.router
+        if router_workloads is not None and len(router_workloads) > 1:
+            router = _filter_router(router, prefix, workloads)
+        app.include_router(router, prefix=prefix, tags=tags)
+
+    @app.get("/")
+    async def root():
+        """ルートエンドポイント"""
+        return {
+            "message": "Talent Casting System API",
+            "version": "1.0.0",
+            "docs": "/api/docs",
+        }
+
+    # ルート×メソッド×ステータス区分のヒストグラムを事前登録（リクエスト時に生成しない）
+    register_routes(app.routes)
+
+    return app
+
+
+def _filter_router(router: APIRouter, prefix: str, workloads: set) -> APIRouter:
+    """プロファイルのワークロードに属するルートのみを含むルーターを返す"""
+    routes = [route for route in router.routes if classify_path(prefix + route.path) in workloads]
+    if len(routes) == len(router.routes):
+        return router
+    filtered = APIRouter()
+    filtered.routes.extend(routes)
+    return filtered
+
+
+app = create_app()
@@ -319,7 +319,11 @@ class FormSubmission(Base):
 
 
 class ButtonClick(Base):
-    """ボタンクリック追跡テーブル"""
+    """ボタンクリック追跡テーブル
+
+    scripts/partition_history_tables.sql 適用後は clicked_at の月次パーティション
+    （主キー (id, clicked_at)、form_submissions への外部キーなし）
+    """
     __tablename__ = "button_clicks"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -345,7 +349,12 @@ class ButtonClick(Base):
 
 
 class DiagnosisResult(Base):
-    """診断結果タレント30名保存テーブル"""
+    """診断結果タレント30名保存テーブル
+
+    scripts/partition_history_tables.sql 適用後は created_at の月次パーティション
+    （主キー (id, created_at)、form_submissions への外部キーなし）。参照時は
+    partition_maintenance.history_lower_bound() で created_at の下限を付けて対象月に絞る
+    """
     __tablename__ = "diagnosis_results"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -370,6 +379,28 @@ class DiagnosisResult(Base):
         return f"<DiagnosisResult(id={self.id}, form_submission_id={self.form_submission_id}, ranking={self.ranking}, talent_name='{self.talent_name}')>"
 
 
+class DiagnosisResultView(Base):
+    """診断結果の互換ビュー（読み取り専用）
+
+    diagnosis_results の行と diagnosis_result_sets（1送信1行の配列形式）を unnest した行を
+    UNION ALL したビュー（scripts/create_diagnosis_result_sets.sql）。列は DiagnosisResult と同じで、
+    配列形式の行は id が NULL のため (form_submission_id, ranking) を主キーとして扱う
+    """
+    __tablename__ = "diagnosis_results_all"
+
+    id = Column(Integer, nullable=True)
+    form_submission_id = Column(Integer, primary_key=True)
+    ranking = Column(Integer, primary_key=True)
+    talent_account_id = Column(Integer, nullable=False)
+    talent_name = Column(String(255), nullable=False)
+    talent_category = Column(String(255), nullable=True)
+    matching_score = Column(Numeric(5, 2), nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<DiagnosisResultView(form_submission_id={self.form_submission_id}, ranking={self.ranking}, talent_name='{self.talent_name}')>"
+
+
 class RecommendedTalent(Base):
     """おすすめタレント設定テーブル（業界別）"""
     __tablename__ = "recommended_talents"
@@ -3,6 +3,8 @@ from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional
 from datetime import datetime
 
+from app.schemas.talents import TalentDetailBundle
+
 
 class MatchingFormData(BaseModel):
     """フォームデータスキーマ（フロントエンド → バックエンド）"""
@@ -17,7 +19,9 @@ class MatchingFormData(BaseModel):
     phone: str = Field(..., min_length=1, max_length=50, description="電話番号")
     genre_preference: str = Field(..., min_length=1, max_length=50, description="ジャンル希望の有無")
     preferred_genres: Optional[List[str]] = Field(None, description="希望するジャンルリスト")
+    email_consent: bool = Field(False, description="メール送信同意（特定電子メール法対応）")
     session_id: Optional[str] = Field(None, max_length=100, description="セッションID")
+    include_details: bool = Field(False, description="結果にタレント詳細（CM概要・プロフィール・出身地）を同梱する")
 
     @field_validator("target_segments")
     @classmethod
@@ -71,6 +75,7 @@ class TalentResult(BaseModel):
     image_adjustment: Optional[float] = Field(None, description="業種イメージ加減点")
     is_recommended: bool = Field(False, description="おすすめタレントかどうか")
     is_currently_in_cm: bool = Field(False, description="現在CM出演中かどうか")
+    details: Optional[TalentDetailBundle] = Field(None, description="タレント詳細（include_details=true の場合のみ）")
 
     model_config = {
         "json_schema_extra": {
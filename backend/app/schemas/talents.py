@@ -30,6 +30,24 @@ class CMHistoryDetail(BaseModel):
     }
 
 
+class CMSummary(BaseModel):
+    """CM履歴の概要（マッチング結果同梱用）"""
+    client_name: str = Field(..., description="クライアント名/スポンサー名")
+    product_name: str = Field(default="", description="商品名/サービス名")
+    use_period_start: str = Field(default="", description="使用開始日 (YYYY-MM-DD形式)")
+    use_period_end: str = Field(default="", description="使用終了日 (YYYY-MM-DD形式)")
+    category: str = Field(default="その他", description="推定されたCMカテゴリ")
+
+
+class TalentDetailBundle(BaseModel):
+    """マッチング結果に同梱するタレント詳細（include_details=true の場合）"""
+    kana: Optional[str] = Field(None, description="ふりがな（姓 名の形式）")
+    age: Optional[int] = Field(None, description="年齢（birthdayから計算）")
+    birthplace: Optional[str] = Field(None, description="出身地")
+    cm_count: int = Field(0, description="CM出演件数")
+    recent_cms: List[CMSummary] = Field(default_factory=list, description="CM履歴（新しい順、最大5件）")
+
+
 class TalentDetailResponse(BaseModel):
     """タレント詳細情報レスポンス"""
     account_id: int = Field(..., description="タレントアカウントID")
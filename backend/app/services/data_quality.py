@@ -0,0 +1,580 @@
+"""マスタデータ品質検証エンジン（インポート前ゲート）
+
+verify_all_master_data.py / verify_database_integrity.py / audit_master_data.py など
+個別スクリプトに散らばっていた整合性チェックを宣言的ルールに集約する。
+
+- ルールはテーブル単位にまとめられ、必要列のみを 1テーブル1回のSELECT で取得
+- 取得後の判定は pandas/NumPy のベクトル演算で実施（行ループなし）
+- インポート処理のステージングDataFrameをそのまま渡せば、本番テーブル差し替え前のゲートとして利用可能
+- 結果は機械可読なJSONで出力
+
+コミット前ゲート（assert_session_valid）は1トランザクションで書き込む取り込み
+（scripts/update_tpr_with_name_matching.py）で使用する。VRデータ取り込み
+（import_vr_perfect_matching.py / import_vr_ultimate_perfect.py）は旧スキーマ（talents / talent_id）に
+100行・1ファイルごとにコミットするためゲートできず、取り込み後に scripts/validate_master_data.py で検証する。
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import json
+
+import numpy as np
+import pandas as pd
+
+
+SEVERITY_ERROR = "error"
+SEVERITY_WARNING = "warning"
+
+# talent_images の非正規化イメージ列（STEP 2 で使用する 7項目）
+IMAGE_SCORE_COLUMNS = [
+    "image_funny",
+    "image_clean",
+    "image_unique",
+    "image_trustworthy",
+    "image_cute",
+    "image_cool",
+    "image_mature",
+]
+
+# 違反サンプルとして返却する最大件数
+MAX_SAMPLES = 5
+
+
+@dataclass
+class Rule(ABC):
+    """検証ルール基底クラス
+
+    Attributes:
+        name: ルール識別子（レポートのキー）
+        table: 対象テーブル名
+        description: ルール説明
+        severity: error（ゲート失敗）/ warning（報告のみ）
+        where: 対象行の等価フィルタ（例: {"del_flag": 0}）
+    """
+    name: str
+    table: str
+    description: str = ""
+    severity: str = SEVERITY_ERROR
+    where: Dict[str, Any] = field(default_factory=dict)
+
+    def required_columns(self) -> Dict[str, List[str]]:
+        """ルール評価に必要なテーブル別の列"""
+        return {self.table: list(self.where.keys())}
+
+    @abstractmethod
+    def evaluate(self, frames: Dict[str, pd.DataFrame]) -> "RuleResult":
+        """frames（テーブル名 → DataFrame）を検証して結果を返す"""
+
+    def _filtered(self, df: pd.DataFrame) -> pd.DataFrame:
+        """where 条件を適用したDataFrameを返す"""
+        if not self.where:
+            return df
+        mask = np.ones(len(df), dtype=bool)
+        for column, value in self.where.items():
+            mask &= (df[column] == value).to_numpy()
+        return df[mask]
+
+    def _result(self, passed: bool, violations: int, samples: Optional[List[Dict]] = None,
+                details: Optional[Dict[str, Any]] = None) -> "RuleResult":
+        return RuleResult(
+            name=self.name,
+            rule_type=type(self).__name__,
+            table=self.table,
+            description=self.description,
+            severity=self.severity,
+            passed=passed,
+            violations=int(violations),
+            samples=samples or [],
+            details=details or {},
+        )
+
+
+@dataclass
+class RangeRule(Rule):
+    """数値列が [min_value, max_value] の範囲内であること（NULLは対象外）"""
+    columns: Sequence[str] = ()
+    min_value: Optional[float] = None
+    max_value: Optional[float] = None
+    key_columns: Sequence[str] = ()
+
+    def required_columns(self) -> Dict[str, List[str]]:
+        columns = super().required_columns()
+        columns[self.table] += list(self.columns) + list(self.key_columns)
+        return columns
+
+    def evaluate(self, frames: Dict[str, pd.DataFrame]) -> "RuleResult":
+        df = self._filtered(frames[self.table])
+        values = df[list(self.columns)].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=float)
+
+        out_of_range = np.zeros(values.shape, dtype=bool)
+        if self.min_value is not None:
+            out_of_range |= values < self.min_value
+        if self.max_value is not None:
+            out_of_range |= values > self.max_value
+
+        per_column = dict(zip(self.columns, out_of_range.sum(axis=0).tolist()))
+        bad_rows = out_of_range.any(axis=1)
+        samples = _samples(df[bad_rows], list(self.key_columns) + list(self.columns))
+
+        return self._result(
+            passed=not bad_rows.any(),
+            violations=bad_rows.sum(),
+            samples=samples,
+            details={"violations_by_column": per_column, "checked_rows": len(df)},
+        )
+
+
+@dataclass
+class NotNullRule(Rule):
+    """指定列が NULL でないこと"""
+    columns: Sequence[str] = ()
+    key_columns: Sequence[str] = ()
+
+    def required_columns(self) -> Dict[str, List[str]]:
+        columns = super().required_columns()
+        columns[self.table] += list(self.columns) + list(self.key_columns)
+        return columns
+
+    def evaluate(self, frames: Dict[str, pd.DataFrame]) -> "RuleResult":
+        df = self._filtered(frames[self.table])
+        nulls = df[list(self.columns)].isna().to_numpy()
+        bad_rows = nulls.any(axis=1)
+
+        return self._result(
+            passed=not bad_rows.any(),
+            violations=bad_rows.sum(),
+            samples=_samples(df[bad_rows], list(self.key_columns) + list(self.columns)),
+            details={"nulls_by_column": dict(zip(self.columns, nulls.sum(axis=0).tolist()))},
+        )
+
+
+@dataclass
+class UniqueRule(Rule):
+    """列の組み合わせが一意であること（重複タレント名など）"""
+    columns: Sequence[str] = ()
+    key_columns: Sequence[str] = ()
+
+    def required_columns(self) -> Dict[str, List[str]]:
+        columns = super().required_columns()
+        columns[self.table] += list(self.columns) + list(self.key_columns)
+        return columns
+
+    def evaluate(self, frames: Dict[str, pd.DataFrame]) -> "RuleResult":
+        df = self._filtered(frames[self.table])
+        duplicated = df.duplicated(subset=list(self.columns), keep=False).to_numpy()
+        duplicate_groups = df[duplicated].drop_duplicates(subset=list(self.columns))
+
+        return self._result(
+            passed=not duplicated.any(),
+            violations=len(duplicate_groups),
+            samples=_samples(df[duplicated], list(self.columns) + list(self.key_columns)),
+            details={"duplicated_rows": int(duplicated.sum())},
+        )
+
+
+@dataclass
+class ForeignKeyRule(Rule):
+    """参照先テーブルに存在しないキーを持つ行（孤立行）がないこと"""
+    column: str = ""
+    reference_table: str = ""
+    reference_column: str = ""
+    key_columns: Sequence[str] = ()
+
+    def required_columns(self) -> Dict[str, List[str]]:
+        columns = super().required_columns()
+        columns[self.table] += [self.column] + list(self.key_columns)
+        columns.setdefault(self.reference_table, []).append(self.reference_column)
+        return columns
+
+    def evaluate(self, frames: Dict[str, pd.DataFrame]) -> "RuleResult":
+        df = self._filtered(frames[self.table])
+        reference = frames[self.reference_table][self.reference_column].dropna().unique()
+        values = df[self.column]
+        orphaned = (values.notna() & ~values.isin(reference)).to_numpy()
+
+        return self._result(
+            passed=not orphaned.any(),
+            violations=orphaned.sum(),
+            samples=_samples(df[orphaned], [self.column] + list(self.key_columns)),
+            details={"orphaned_keys": int(values[orphaned].nunique())},
+        )
+
+
+@dataclass
+class CoverageRule(Rule):
+    """グループ（ターゲット層など）ごとのキー網羅率が min_ratio 以上であること
+
+    reference_table を省略した場合は、対象テーブルに1度でも現れるキー全体を母数とする。
+    groups_table を指定した場合、そのテーブルに存在するグループが1件も無いケースも検出する。
+    allow_empty=True の場合、母数が0件（スコア投入前の初期状態など）は合格とする。
+    """
+    key_column: str = ""
+    group_column: str = ""
+    min_ratio: float = 1.0
+    reference_table: Optional[str] = None
+    reference_column: Optional[str] = None
+    reference_where: Dict[str, Any] = field(default_factory=dict)
+    groups_table: Optional[str] = None
+    groups_column: Optional[str] = None
+    allow_empty: bool = False
+
+    def required_columns(self) -> Dict[str, List[str]]:
+        columns = super().required_columns()
+        columns[self.table] += [self.key_column, self.group_column]
+        if self.reference_table:
+            columns.setdefault(self.reference_table, []).extend(
+                [self.reference_column or self.key_column] + list(self.reference_where.keys())
+            )
+        if self.groups_table:
+            columns.setdefault(self.groups_table, []).append(self.groups_column or self.group_column)
+        return columns
+
+    def evaluate(self, frames: Dict[str, pd.DataFrame]) -> "RuleResult":
+        df = self._filtered(frames[self.table])
+
+        if self.reference_table:
+            reference_df = frames[self.reference_table]
+            mask = np.ones(len(reference_df), dtype=bool)
+            for column, value in self.reference_where.items():
+                mask &= (reference_df[column] == value).to_numpy()
+            reference_keys = reference_df.loc[mask, self.reference_column or self.key_column].dropna().unique()
+        else:
+            reference_keys = df[self.key_column].dropna().unique()
+
+        total = len(reference_keys)
+        scoped = df[df[self.key_column].isin(reference_keys)]
+        covered = scoped.groupby(self.group_column)[self.key_column].nunique()
+
+        if self.groups_table:
+            expected = frames[self.groups_table][self.groups_column or self.group_column].dropna().unique()
+            covered = covered.reindex(expected, fill_value=0)
+
+        ratios = (covered / total) if total else covered.astype(float)
+        failing = ratios[ratios < self.min_ratio]
+
+        return self._result(
+            passed=failing.empty if total else self.allow_empty,
+            violations=len(failing) if total else int(not self.allow_empty),
+            samples=[
+                {self.group_column: _to_builtin(group), "covered": int(covered[group]), "ratio": round(float(ratio), 4)}
+                for group, ratio in list(failing.items())[:MAX_SAMPLES]
+            ],
+            details={
+                "reference_keys": total,
+                "min_ratio": self.min_ratio,
+                "coverage_by_group": {str(_to_builtin(g)): round(float(r), 4) for g, r in ratios.items()},
+            },
+        )
+
+
+@dataclass
+class MonotonicRule(Rule):
+    """order_by で並べたとき各列が単調非減少であること（予算区分の整合性など）
+
+    no_overlap=(lower, upper) を指定すると、次行の下限が前行の上限を下回らない（区間が重ならない）ことも検証する。
+    NULL の上限値は「上限なし」として +inf 扱い。
+    """
+    order_by: str = ""
+    columns: Sequence[str] = ()
+    no_overlap: Optional[Tuple[str, str]] = None
+    key_columns: Sequence[str] = ()
+
+    def required_columns(self) -> Dict[str, List[str]]:
+        columns = super().required_columns()
+        columns[self.table] += [self.order_by] + list(self.columns) + list(self.key_columns)
+        if self.no_overlap:
+            columns[self.table] += list(self.no_overlap)
+        return columns
+
+    def evaluate(self, frames: Dict[str, pd.DataFrame]) -> "RuleResult":
+        df = self._filtered(frames[self.table]).sort_values(self.order_by, kind="stable")
+        bad = np.zeros(len(df), dtype=bool)
+        details: Dict[str, Any] = {}
+
+        for column in self.columns:
+            values = pd.to_numeric(df[column], errors="coerce").fillna(np.inf).to_numpy(dtype=float)
+            decreasing = np.zeros(len(values), dtype=bool)
+            decreasing[1:] = values[1:] < values[:-1]
+            details[f"decreasing_{column}"] = int(decreasing.sum())
+            bad |= decreasing
+
+        if self.no_overlap:
+            lower_col, upper_col = self.no_overlap
+            lower = pd.to_numeric(df[lower_col], errors="coerce").fillna(0).to_numpy(dtype=float)
+            upper = pd.to_numeric(df[upper_col], errors="coerce").fillna(np.inf).to_numpy(dtype=float)
+            overlap = np.zeros(len(df), dtype=bool)
+            overlap[1:] = lower[1:] < upper[:-1]
+            details["overlapping_rows"] = int(overlap.sum())
+            bad |= overlap
+
+        sample_columns = list(dict.fromkeys(
+            list(self.key_columns) + [self.order_by] + list(self.columns) + list(self.no_overlap or ())
+        ))
+        return self._result(
+            passed=not bad.any(),
+            violations=bad.sum(),
+            samples=_samples(df[bad], sample_columns),
+            details=details,
+        )
+
+
+@dataclass
+class RuleResult:
+    """ルール単位の検証結果"""
+    name: str
+    rule_type: str
+    table: str
+    description: str
+    severity: str
+    passed: bool
+    violations: int
+    samples: List[Dict[str, Any]]
+    details: Dict[str, Any]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "rule_type": self.rule_type,
+            "table": self.table,
+            "description": self.description,
+            "severity": self.severity,
+            "passed": self.passed,
+            "violations": self.violations,
+            "samples": self.samples,
+            "details": self.details,
+        }
+
+
+@dataclass
+class ValidationReport:
+    """検証レポート（JSON出力用）"""
+    results: List[RuleResult]
+    row_counts: Dict[str, int]
+    elapsed_ms: float
+    generated_at: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    @property
+    def passed(self) -> bool:
+        """error レベルのルールがすべて成功したか"""
+        return all(r.passed for r in self.results if r.severity == SEVERITY_ERROR)
+
+    @property
+    def failed_rules(self) -> List[RuleResult]:
+        return [r for r in self.results if not r.passed]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "passed": self.passed,
+            "generated_at": self.generated_at,
+            "elapsed_ms": round(self.elapsed_ms, 2),
+            "row_counts": self.row_counts,
+            "summary": {
+                "total_rules": len(self.results),
+                "failed_errors": sum(1 for r in self.failed_rules if r.severity == SEVERITY_ERROR),
+                "failed_warnings": sum(1 for r in self.failed_rules if r.severity == SEVERITY_WARNING),
+            },
+            "results": [r.to_dict() for r in self.results],
+        }
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=indent, default=str)
+
+
+class DataQualityError(Exception):
+    """インポート前ゲートで error ルールが失敗した場合の例外"""
+
+    def __init__(self, report: ValidationReport):
+        self.report = report
+        failed = ", ".join(r.name for r in report.failed_rules if r.severity == SEVERITY_ERROR)
+        super().__init__(f"データ品質検証に失敗しました: {failed}")
+
+
+# ===== 標準ルールセット =====
+DEFAULT_RULES: List[Rule] = [
+    CoverageRule(
+        name="talent_scores_segment_coverage",
+        table="talent_scores",
+        description="スコア登録済みタレントが全ターゲット層でスコアを持つこと",
+        key_column="account_id",
+        group_column="target_segment_id",
+        min_ratio=0.95,
+        groups_table="target_segments",
+        groups_column="target_segment_id",
+        allow_empty=True,
+    ),
+    RangeRule(
+        name="talent_scores_range",
+        table="talent_scores",
+        description="VR人気度・TPRパワースコアが0-100の範囲内であること",
+        columns=["vr_popularity", "tpr_power_score"],
+        min_value=0,
+        max_value=100,
+        key_columns=["account_id", "target_segment_id"],
+    ),
+    UniqueRule(
+        name="talent_scores_unique",
+        table="talent_scores",
+        description="(account_id, target_segment_id) が一意であること",
+        columns=["account_id", "target_segment_id"],
+    ),
+    RangeRule(
+        name="talent_images_range",
+        table="talent_images",
+        description="イメージスコア7項目が0-100の範囲内であること",
+        columns=IMAGE_SCORE_COLUMNS,
+        min_value=0,
+        max_value=100,
+        key_columns=["account_id", "target_segment_id"],
+    ),
+    ForeignKeyRule(
+        name="talent_images_orphaned",
+        table="talent_images",
+        description="talent_images の account_id が m_account に存在すること",
+        column="account_id",
+        reference_table="m_account",
+        reference_column="account_id",
+        key_columns=["target_segment_id"],
+    ),
+    UniqueRule(
+        name="m_account_duplicate_names",
+        table="m_account",
+        description="有効タレントの name_full_for_matching が重複しないこと",
+        severity=SEVERITY_WARNING,
+        where={"del_flag": 0},
+        columns=["name_full_for_matching"],
+        key_columns=["account_id"],
+    ),
+    NotNullRule(
+        name="m_account_name_not_null",
+        table="m_account",
+        description="有効タレントに名前が設定されていること",
+        where={"del_flag": 0},
+        columns=["name_full_for_matching"],
+        key_columns=["account_id"],
+    ),
+    ForeignKeyRule(
+        name="m_talent_act_orphaned",
+        table="m_talent_act",
+        description="m_talent_act の account_id が m_account に存在すること",
+        column="account_id",
+        reference_table="m_account",
+        reference_column="account_id",
+    ),
+    ForeignKeyRule(
+        name="m_talent_cm_orphaned",
+        table="m_talent_cm",
+        description="CM履歴の account_id が m_account に存在すること",
+        column="account_id",
+        reference_table="m_account",
+        reference_column="account_id",
+        key_columns=["sub_id"],
+    ),
+    MonotonicRule(
+        name="budget_ranges_monotonic",
+        table="budget_ranges",
+        description="予算区分が下限順に単調増加し、区間が重複しないこと",
+        order_by="min_amount",
+        columns=["min_amount", "max_amount"],
+        no_overlap=("min_amount", "max_amount"),
+        key_columns=["range_name"],
+    ),
+]
+
+
+class DataQualityValidator:
+    """宣言的ルールを1テーブル1スキャンで評価するバリデータ"""
+
+    def __init__(self, rules: Optional[List[Rule]] = None) -> None:
+        self.rules = rules if rules is not None else DEFAULT_RULES
+
+    def required_columns(self) -> Dict[str, List[str]]:
+        """全ルールが必要とする列をテーブル単位に集約（重複除去・順序保持）"""
+        merged: Dict[str, List[str]] = {}
+        for rule in self.rules:
+            for table, columns in rule.required_columns().items():
+                bucket = merged.setdefault(table, [])
+                for column in columns:
+                    if column not in bucket:
+                        bucket.append(column)
+        return merged
+
+    def build_queries(self) -> Dict[str, str]:
+        """テーブルごとのSELECT文（必要列のみ・1テーブル1クエリ）"""
+        return {
+            table: f"SELECT {', '.join(columns)} FROM {table}"
+            for table, columns in self.required_columns().items()
+        }
+
+    async def load_frames(self, conn) -> Dict[str, pd.DataFrame]:
+        """asyncpg接続から検証用DataFrameを取得"""
+        frames = {}
+        for table, query in self.build_queries().items():
+            rows = await conn.fetch(query)
+            columns = self.required_columns()[table]
+            frames[table] = pd.DataFrame([tuple(r) for r in rows], columns=columns)
+        return frames
+
+    def validate(self, frames: Dict[str, pd.DataFrame]) -> ValidationReport:
+        """ステージング済みDataFrame（またはDBから取得したDataFrame）を検証"""
+        start = datetime.now()
+        missing = [t for t in self.required_columns() if t not in frames]
+        if missing:
+            raise ValueError(f"検証対象テーブルのデータがありません: {', '.join(missing)}")
+
+        results = [rule.evaluate(frames) for rule in self.rules]
+        elapsed_ms = (datetime.now() - start).total_seconds() * 1000
+
+        return ValidationReport(
+            results=results,
+            row_counts={table: len(frames[table]) for table in self.required_columns()},
+            elapsed_ms=elapsed_ms,
+        )
+
+    async def validate_database(self, conn) -> ValidationReport:
+        """本番/ステージングDBを検証"""
+        start = datetime.now()
+        frames = await self.load_frames(conn)
+        report = self.validate(frames)
+        report.elapsed_ms = (datetime.now() - start).total_seconds() * 1000
+        return report
+
+    def assert_valid(self, frames: Dict[str, pd.DataFrame]) -> ValidationReport:
+        """インポート前ゲート: error ルール失敗時は DataQualityError を送出"""
+        report = self.validate(frames)
+        if not report.passed:
+            raise DataQualityError(report)
+        return report
+
+    async def assert_database_valid(self, conn) -> ValidationReport:
+        """コミット前ゲート: 未コミットの変更を含む接続上で検証し、失敗時は DataQualityError を送出"""
+        report = await self.validate_database(conn)
+        if not report.passed:
+            raise DataQualityError(report)
+        return report
+
+    async def assert_session_valid(self, session) -> ValidationReport:
+        """SQLAlchemy AsyncSession のトランザクション内で assert_database_valid を実行"""
+        await session.flush()
+        connection = await session.connection()
+        raw = await connection.get_raw_connection()
+        return await self.assert_database_valid(raw.driver_connection)
+
+
+def _to_builtin(value: Any) -> Any:
+    """NumPy/pandas スカラーをJSONシリアライズ可能な値に変換"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is pd.NaT or (isinstance(value, float) and np.isnan(value)):
+        return None
+    return value
+
+
+def _samples(df: pd.DataFrame, columns: List[str]) -> List[Dict[str, Any]]:
+    """違反行のサンプルを辞書リストで返す"""
+    columns = [c for c in dict.fromkeys(columns) if c in df.columns]
+    head = df[columns].head(MAX_SAMPLES)
+    return [
+        {column: _to_builtin(value) for column, value in zip(columns, row)}
+        for row in head.itertuples(index=False, name=None)
+    ]
@@ -0,0 +1,95 @@
+"""診断結果のコンパクト保存（1フォーム送信 = 1行の並列配列）
+
+DIAGNOSIS_STORAGE=compact のとき、診断結果タレント30名を diagnosis_results の30行ではなく
+diagnosis_result_sets の1行（順位順の talent_account_ids / talent_names / talent_categories /
+matching_scores 配列）として保存する。書き込みは主キー1件の UPSERT で済む。
+
+参照側は互換ビュー diagnosis_results_all（scripts/create_diagnosis_result_sets.sql）を読む。
+ビューは従来の行形式と unnest した配列を UNION ALL しているため、切り替え前後の診断が混在しても
+従来と同じ列・行で取得できる。
+"""
+from typing import Any, Dict, List, Sequence
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ROWS = "rows"
+COMPACT = "compact"
+
+ROW_TABLE = "diagnosis_results"
+COMPACT_TABLE = "diagnosis_result_sets"
+COMPAT_VIEW = "diagnosis_results_all"
+
+UPSERT_SQL = f"""
+    INSERT INTO {COMPACT_TABLE} (
+        form_submission_id, talent_account_ids, talent_names, talent_categories, matching_scores, created_at
+    )
+    VALUES (
+        :form_submission_id,
+        CAST(:talent_account_ids AS INTEGER[]),
+        CAST(:talent_names AS VARCHAR[]),
+        CAST(:talent_categories AS VARCHAR[]),
+        CAST(:matching_scores AS NUMERIC[]),
+        NOW()
+    )
+    ON CONFLICT (form_submission_id) DO UPDATE SET
+        talent_account_ids = EXCLUDED.talent_account_ids,
+        talent_names = EXCLUDED.talent_names,
+        talent_categories = EXCLUDED.talent_categories,
+        matching_scores = EXCLUDED.matching_scores,
+        created_at = EXCLUDED.created_at
+"""
+
+
+def compact_enabled() -> bool:
+    return settings.diagnosis_storage == COMPACT
+
+
+def diagnosis_relation() -> str:
+    """診断結果を行形式で読むためのテーブル名（compact では互換ビュー）"""
+    return COMPAT_VIEW if compact_enabled() else ROW_TABLE
+
+
+def pack_results(talent_results: Sequence[Any]) -> Dict[str, List[Any]]:
+    """TalentResult のリストを順位順の並列配列に変換（UPSERT_SQL のバインド値）"""
+    ordered = sorted(talent_results, key=lambda talent: talent.ranking)
+    rankings = [talent.ranking for talent in ordered]
+    if rankings != list(range(1, len(ordered) + 1)):
+        # 配列の位置を順位として扱うため、欠番・重複があると順位がずれる
+        raise ValueError(f"順位が1からの連番ではありません: {rankings}")
+    return {
+        "talent_account_ids": [talent.account_id for talent in ordered],
+        "talent_names": [talent.name for talent in ordered],
+        "talent_categories": [talent.category for talent in ordered],
+        "matching_scores": [round(float(talent.matching_score), 2) for talent in ordered],
+    }
+
+
+def unpack_results(row: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """diagnosis_result_sets の1行を diagnosis_results と同じ列の辞書リストに展開"""
+    return [
+        {
+            "form_submission_id": row["form_submission_id"],
+            "ranking": index + 1,
+            "talent_account_id": account_id,
+            "talent_name": name,
+            "talent_category": category,
+            "matching_score": score,
+            "created_at": row["created_at"],
+        }
+        for index, (account_id, name, category, score) in enumerate(zip(
+            row["talent_account_ids"], row["talent_names"], row["talent_categories"], row["matching_scores"],
+        ))
+    ]
+
+
+async def save_compact(session, form_submission_id: int, talent_results: Sequence[Any]) -> None:
+    """診断結果を1行で保存（コミットは呼び出し側）"""
+    from sqlalchemy import text
+
+    await session.execute(
+        text(UPSERT_SQL),
+        {"form_submission_id": form_submission_id, **pack_results(talent_results)},
+    )
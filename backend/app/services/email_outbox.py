@@ -0,0 +1,368 @@
+"""メール送信アウトボックス（診断完了メールの非同期送信）
+
+/api/matching はメールを送らず email_outbox に1行書き込むだけで応答し、送信はバックグラウンドの
+EmailOutboxWorker が行う。SMTPの遅延・障害がマッチングのレイテンシやエラーに影響しない。
+
+- 取り出し: FOR UPDATE SKIP LOCKED でまとめて確保するため、複数プロセスで動かしても重複送信しない
+- 送信: 確保したバッチを DB接続の返却後に EmailService で1通ずつ送る
+- 再試行: 失敗時は指数バックオフ（EMAIL_OUTBOX_RETRY_BASE_SECONDS × 2^(試行回数-1)、ジッター付き）で
+  再送し、EMAIL_OUTBOX_MAX_ATTEMPTS 回失敗したら failed にする
+- 起床: 書き込み時に pg_notify し、ワーカーは LISTEN で即座に起きる（通知を取りこぼしても、
+  LISTEN できない接続先でも EMAIL_OUTBOX_POLL_SECONDS ごとに確認する）
+- 送信中のままプロセスが落ちた行は EMAIL_OUTBOX_STALE_SECONDS 経過後に pending に戻す
+
+同じ (kind, session_id) は1通だけ登録する（混雑時の 503 後の再送で二重送信しない）。
+
+既定は無効（EMAIL_OUTBOX_ENABLED=false）。ワーカーはリクエストの処理外で動くため、CPU が常時割り当てられ
+0台にスケールしないインスタンス（Cloud Run なら --no-cpu-throttling・--min-instances 1 の admin プロファイル）で
+有効にする。リクエスト中しか CPU が無い構成で有効にすると、0台になった時点で送信待ちのメールが残る。
+"""
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import logging
+import random
+import time
+
+from app.core.config import settings
+from app.core.lazy_import import lazy_import
+from app.core.metrics import LATENCY_BUCKETS, registry
+from app.db.connection import acquire_connection
+
+logger = logging.getLogger(__name__)
+
+# メール送信は初回利用時に import（起動時間・常駐メモリ削減）
+EmailService = lazy_import("app.services.email_service", "EmailService")
+
+KIND_DIAGNOSIS_COMPLETION = "diagnosis_completion"
+
+NOTIFY_CHANNEL = "email_outbox"
+
+STATUSES = ("pending", "sending", "sent", "failed")
+
+EMAIL_OUTBOX_DDL = """
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    kind VARCHAR(50) NOT NULL,
+    session_id VARCHAR(255),
+    to_email VARCHAR(255) NOT NULL,
+    payload JSONB NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    locked_at TIMESTAMP,
+    last_error TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    sent_at TIMESTAMP,
+    UNIQUE (kind, session_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_email_outbox_pending
+    ON email_outbox (next_attempt_at) WHERE status = 'pending';
+
+COMMENT ON TABLE email_outbox IS 'メール送信アウトボックス（バックグラウンドワーカーが送信）';
+"""
+
+send_duration = registry.histogram(
+    "email_send_duration_seconds",
+    "Outbox email send latency by kind and result",
+    ("kind", "result"),
+    LATENCY_BUCKETS,
+)
+send_duration.preregister((KIND_DIAGNOSIS_COMPLETION, result) for result in ("sent", "error"))
+
+
+async def ensure_outbox_table(conn) -> None:
+    await conn.execute(EMAIL_OUTBOX_DDL)
+
+
+async def ensure_email_outbox_table() -> None:
+    """起動時の email_outbox テーブル作成（全プロファイル）
+
+    public プロファイルはワーカーを起動しないが /api/matching でメールを登録するため、
+    ワーカー任せにせず起動時に作成する。失敗しても起動は継続する（登録失敗時は直接送信）。
+    """
+    try:
+        async with acquire_connection() as conn:
+            await ensure_outbox_table(conn)
+        print("✅ email_outbox テーブル存在確認OK")
+    except Exception as e:
+        print(f"⚠️  email_outbox テーブル確認エラー: {e}")
+
+
+async def enqueue_email(
+    conn, kind: str, to_email: str, payload: Dict[str, Any], session_id: Optional[str] = None
+) -> bool:
+    """送信予定のメールを登録（同じ kind・session_id が登録済みなら何もしない）
+
+    Returns:
+        bool: 新たに登録した場合 True
+    """
+    row_id = await conn.fetchval(
+        """
+        INSERT INTO email_outbox (kind, session_id, to_email, payload)
+        VALUES ($1, $2, $3, $4::jsonb)
+        ON CONFLICT (kind, session_id) DO NOTHING
+        RETURNING id
+        """,
+        kind, session_id, to_email, json.dumps(payload, ensure_ascii=False),
+    )
+    if row_id is not None:
+        await conn.execute("SELECT pg_notify($1, '')", NOTIFY_CHANNEL)
+    return row_id is not None
+
+
+def backoff_seconds(attempts: int) -> float:
+    """attempts 回目の失敗後の待機秒数（指数バックオフ + 最大20%のジッター、上限あり）"""
+    delay = settings.email_outbox_retry_base_seconds * (2 ** max(attempts - 1, 0))
+    delay = min(delay, settings.email_outbox_retry_max_seconds)
+    return delay * (1 + random.random() * 0.2)
+
+
+@dataclass
+class OutboxStats:
+    """ワーカーの計測値（累積）"""
+    batches: int = 0
+    sent: int = 0
+    retried: int = 0
+    failed: int = 0
+    recovered: int = 0  # 送信中のまま放置された行を pending に戻した件数
+    send_seconds_total: float = 0.0
+
+
+class EmailOutboxWorker:
+    """email_outbox を取り出して送信するバックグラウンドワーカー"""
+
+    def __init__(self) -> None:
+        self.stats = OutboxStats()
+        self.queue_depth: Dict[str, int] = {status: 0 for status in STATUSES}
+        self.oldest_pending_seconds: Optional[float] = None
+        self.running = False
+        self.listen_failures = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._service = None
+
+    def _handlers(self):
+        return {KIND_DIAGNOSIS_COMPLETION: self._send_diagnosis_completion}
+
+    async def _send_diagnosis_completion(self, payload: Dict[str, Any]) -> None:
+        if self._service is None:
+            self._service = EmailService()
+        result = await self._service.send_diagnosis_completion_email(**payload)
+        if result is False:
+            raise RuntimeError("EmailService が送信失敗を返しました")
+
+    def _configured(self) -> bool:
+        if self._service is None:
+            self._service = EmailService()
+        return self._service.is_configured()
+
+    async def claim_batch(self, conn) -> List[Dict[str, Any]]:
+        """送信対象をまとめて確保（他プロセスが確保中の行は飛ばす）"""
+        recovered = await conn.fetchval(
+            """
+            WITH stale AS (
+                UPDATE email_outbox SET status = 'pending', locked_at = NULL
+                WHERE status = 'sending' AND locked_at < NOW() - make_interval(secs => $1)
+                RETURNING 1
+            )
+            SELECT COUNT(*) FROM stale
+            """,
+            float(settings.email_outbox_stale_seconds),
+        )
+        self.stats.recovered += recovered
+        rows = await conn.fetch(
+            """
+            UPDATE email_outbox SET status = 'sending', attempts = attempts + 1, locked_at = NOW()
+            WHERE id IN (
+                SELECT id FROM email_outbox
+                WHERE status = 'pending' AND next_attempt_at <= NOW()
+                ORDER BY next_attempt_at
+                LIMIT $1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, kind, session_id, to_email, payload, attempts
+            """,
+            settings.email_outbox_batch_size,
+        )
+        return [{**dict(row), "payload": json.loads(row["payload"])} for row in rows]
+
+    async def _deliver(self, message: Dict[str, Any]) -> Optional[str]:
+        """1通送信（失敗時はエラー文字列を返す）"""
+        handler = self._handlers().get(message["kind"])
+        if handler is None:
+            return f"未対応のメール種別です: {message['kind']}"
+
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(handler(message["payload"]), timeout=settings.email_outbox_send_timeout)
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - started
+        self.stats.send_seconds_total += elapsed
+        send_duration.labels(message["kind"], "error" if error else "sent").observe(elapsed)
+        return error
+
+    async def drain_once(self) -> int:
+        """1バッチ送信して送信を試みた件数を返す（未設定・対象なしは0）"""
+        if not self._configured():
+            return 0
+
+        async with acquire_connection() as conn:
+            messages = await self.claim_batch(conn)
+        if not messages:
+            return 0
+
+        self.stats.batches += 1
+        results = []
+        # DB接続を返却してから送信する（SMTPの待ち時間中にプール接続を占有しない）
+        for message in messages:
+            error = await self._deliver(message)
+            results.append((message, error))
+
+        async with acquire_connection() as conn:
+            for message, error in results:
+                await self._record_result(conn, message, error)
+        return len(messages)
+
+    async def _record_result(self, conn, message: Dict[str, Any], error: Optional[str]) -> None:
+        if error is None:
+            self.stats.sent += 1
+            logger.info(f"📧 メール送信成功: kind={message['kind']} session_id={message['session_id']}")
+            await conn.execute(
+                "UPDATE email_outbox SET status = 'sent', sent_at = NOW(), locked_at = NULL, last_error = NULL WHERE id = $1",
+                message["id"],
+            )
+        elif message["attempts"] >= settings.email_outbox_max_attempts:
+            self.stats.failed += 1
+            logger.error(
+                f"❌ メール送信失敗（再試行上限）: kind={message['kind']} session_id={message['session_id']} "
+                f"attempts={message['attempts']} error={error}"
+            )
+            await conn.execute(
+                "UPDATE email_outbox SET status = 'failed', locked_at = NULL, last_error = $2 WHERE id = $1",
+                message["id"], error,
+            )
+        else:
+            self.stats.retried += 1
+            delay = backoff_seconds(message["attempts"])
+            logger.warning(
+                f"⚠️ メール送信失敗、{delay:.0f}秒後に再試行: kind={message['kind']} "
+                f"session_id={message['session_id']} attempts={message['attempts']} error={error}"
+            )
+            await conn.execute(
+                """
+                UPDATE email_outbox
+                SET status = 'pending', locked_at = NULL, last_error = $2,
+                    next_attempt_at = NOW() + make_interval(secs => $3)
+                WHERE id = $1
+                """,
+                message["id"], error, delay,
+            )
+
+    async def refresh_queue_depth(self, conn) -> None:
+        rows = await conn.fetch(
+            """
+            SELECT status, COUNT(*) AS n,
+                   EXTRACT(EPOCH FROM NOW() - MIN(created_at)) AS oldest_seconds
+            FROM email_outbox GROUP BY status
+            """
+        )
+        self.queue_depth = {status: 0 for status in STATUSES}
+        self.oldest_pending_seconds = None
+        for row in rows:
+            self.queue_depth[row["status"]] = row["n"]
+            if row["status"] == "pending":
+                self.oldest_pending_seconds = float(row["oldest_seconds"])
+
+    def notify(self, *_args) -> None:
+        """新規登録の通知（LISTEN コールバック）"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _open_listener(self):
+        """LISTEN 用の専用接続を開く（失敗時は None を返し、ポーリングのみで送信を続ける）
+
+        PgBouncer のトランザクションプーリング等 LISTEN を使えない接続先でもワーカーは止めない。
+        """
+        import asyncpg
+        from app.db.connection import asyncpg_connection_params
+
+        listener = None
+        try:
+            listener = await asyncpg.connect(**asyncpg_connection_params())
+            await listener.add_listener(NOTIFY_CHANNEL, self.notify)
+            if self.listen_failures:
+                logger.info("✅ メール送信ワーカー: LISTEN を再開しました")
+            self.listen_failures = 0
+            return listener
+        except Exception as e:
+            if self.listen_failures == 0:
+                logger.warning(
+                    f"⚠️ メール送信ワーカー: LISTEN できないため {settings.email_outbox_poll_seconds:.0f}秒ごとの"
+                    f"確認で送信します: {e}"
+                )
+            self.listen_failures += 1
+            if listener is not None:
+                try:
+                    await listener.close()
+                except Exception:
+                    pass
+            return None
+
+    async def run(self) -> None:
+        """ワーカー本体（lifespan でバックグラウンドタスクとして起動）
+
+        テーブル作成・LISTEN 接続を含め、失敗はすべてループ内で記録して次の周期で再試行する。
+        """
+        self._wakeup = asyncio.Event()
+        self.running = True
+        listener = None
+        table_ready = False
+        warned_unconfigured = False
+        try:
+            while True:
+                try:
+                    if not table_ready:
+                        async with acquire_connection() as conn:
+                            await ensure_outbox_table(conn)
+                        table_ready = True
+                    if listener is None or listener.is_closed():
+                        listener = await self._open_listener()
+                    # 取り出しきるまで続けて送信（バースト時も1ループで複数バッチを処理）
+                    while await self.drain_once() >= settings.email_outbox_batch_size:
+                        pass
+                    async with acquire_connection() as conn:
+                        await self.refresh_queue_depth(conn)
+                    if not self._configured() and self.queue_depth["pending"] and not warned_unconfigured:
+                        logger.warning("⚠️ メール送信が設定されていないため、アウトボックスのメールは送信待ちのままです")
+                        warned_unconfigured = True
+                except Exception as e:
+                    logger.error(f"❌ メール送信ワーカーエラー: {e}")
+
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=settings.email_outbox_poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.running = False
+            if listener is not None:
+                await listener.close()
+
+    def status(self) -> Dict[str, Any]:
+        stats = self.stats
+        attempts = stats.sent + stats.retried + stats.failed
+        return {
+            "running": self.running,
+            "listen_failures": self.listen_failures,
+            "queue_depth": dict(self.queue_depth),
+            "oldest_pending_seconds": self.oldest_pending_seconds,
+            "send_ms_avg": round(stats.send_seconds_total / attempts * 1000, 1) if attempts else None,
+            **asdict(stats),
+        }
+
+
+email_outbox_worker = EmailOutboxWorker()
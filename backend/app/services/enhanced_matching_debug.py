@@ -3,8 +3,8 @@
 """
 from typing import Dict, List, Any
 import datetime
-from app.db.ultra_optimized_queries import UltraOptimizedMatchingQueries
-from app.db.connection import get_asyncpg_connection
+from app.api.endpoints.matching import run_matching_pipeline
+from app.db.connection import acquire_connection
 
 class EnhancedMatchingDebug:
     def __init__(self):
@@ -35,12 +35,8 @@ class EnhancedMatchingDebug:
         target_segment = target_segments[0] if target_segments else "女性20-34歳"
 
         try:
-            # 本番環境のマッチングロジックを直接呼び出し
-            talent_data = await UltraOptimizedMatchingQueries.execute_ultra_optimized_matching_flow(
-                industry,
-                target_segment,
-                budget
-            )
+            # 本番環境のマッチングロジックを直接呼び出し（/api/matching と同じ共通経路）
+            talent_data = await run_matching_pipeline(industry, target_segment, budget)
 
             # account_idリストを取得
             account_ids = [talent['account_id'] for talent in talent_data]
@@ -93,8 +89,7 @@ class EnhancedMatchingDebug:
         if not account_ids:
             return {}
 
-        conn = await get_asyncpg_connection()
-        try:
+        async with acquire_connection() as conn:
             # ターゲットセグメントIDを取得
             segment_query = "SELECT target_segment_id FROM target_segments WHERE segment_name = $1"
             segment_result = await conn.fetchrow(segment_query, target_segment)
@@ -134,9 +129,6 @@ class EnhancedMatchingDebug:
 
             return data_dict
 
-        finally:
-            await conn.close()
-
     def _calculate_conventional_ranking(self, detailed_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         従来順位を基礎パワー得点（従来スコア）順で正しく計算
@@ -0,0 +1,264 @@
+"""マッチングロジック STEP 0-4 のインメモリ実装（pandas/NumPy）
+
+app/api/endpoints/matching.py の execute_matching_logic（SQL CTE版）と同一の計算を、
+スナップショットやメモリ上のDataFrameに対して実行する。本番DBに触れずに分析・検証を行うためのもの。
+
+テーブルは以下の列を持つDataFrameの辞書として受け取る:
+    m_account:       account_id, name_full_for_matching, last_name_kana, act_genre, company_name, birthday, del_flag
+    m_talent_act:    account_id, money_representative_value（無い場合は money_max_one_year / money_min_one_year）
+    talent_scores:   account_id, target_segment_id, vr_popularity, tpr_power_score
+    talent_images:   account_id, target_segment_id, image_funny ... image_mature
+    industries:      industry_name, required_image_id
+    target_segments: target_segment_id, segment_name
+    budget_ranges:   range_name, min_amount, max_amount
+"""
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.matching_parameters import (  # noqa: F401  既存の import 先として再公開
+    ALCOHOL_INDUSTRY_NAME, ALCOHOL_MIN_AGE, ALL_IMAGE_ITEM_IDS, MAX_RESULTS, UNLIMITED_BUDGET_NAME,
+    UNLIMITED_MAX_BUDGET, MatchingParameters, build_parameters, normalize_budget_range_string,
+)
+
+
+# イメージ項目ID → talent_images 列名（SQLのUNPIVOTと同じ対応）
+IMAGE_COLUMNS_BY_ID: Dict[int, str] = {
+    1: "image_funny",
+    2: "image_clean",
+    3: "image_unique",
+    4: "image_trustworthy",
+    5: "image_cute",
+    6: "image_cool",
+    7: "image_mature",
+}
+
+# STEP 1: 基礎パワー得点の重み（VR人気度, TPRパワースコア）
+BASE_POWER_WEIGHTS = (0.5, 0.5)
+
+# STEP 2: PERCENT_RANK の上限値 → 加減点
+IMAGE_ADJUSTMENT_BANDS = [
+    (0.15, 12.0),
+    (0.30, 6.0),
+    (0.50, 3.0),
+    (0.70, -3.0),
+    (0.85, -6.0),
+    (1.00, -12.0),
+]
+
+def resolve_parameters(
+    tables: Dict[str, pd.DataFrame],
+    budget_name: str,
+    target_segment_name: str,
+    industry_name: str,
+) -> MatchingParameters:
+    """マスタDataFrameからマッチングパラメータを解決
+
+    Raises:
+        ValueError: 予算区分・ターゲット層・業種のいずれかが見つからない場合
+    """
+    budgets = tables["budget_ranges"]
+    normalized = budgets["range_name"].astype(str).map(normalize_budget_range_string)
+    budget_rows = budgets[normalized == normalize_budget_range_string(budget_name)]
+
+    segments = tables["target_segments"]
+    segment_rows = segments[segments["segment_name"] == target_segment_name]
+
+    industries = tables["industries"]
+    industry_rows = industries[industries["industry_name"] == industry_name]
+
+    if budget_rows.empty or segment_rows.empty or industry_rows.empty:
+        raise ValueError(
+            f"パラメータが見つかりません: 予算='{budget_name}', ターゲット='{target_segment_name}', 業種='{industry_name}'"
+        )
+
+    budget = budget_rows.iloc[0]
+    return build_parameters(
+        min_amount=_none_if_nan(budget["min_amount"]),
+        max_amount=_none_if_nan(budget["max_amount"]),
+        target_segment_id=segment_rows.iloc[0]["target_segment_id"],
+        required_image_id=_none_if_nan(industry_rows.iloc[0]["required_image_id"]),
+        industry_name=industry_name,
+        budget_name=budget_name,
+    )
+
+
+def budget_filter_mask(
+    accounts: pd.DataFrame,
+    acts: pd.DataFrame,
+    params: MatchingParameters,
+    today: Optional[date] = None,
+) -> pd.DataFrame:
+    """STEP 0: 予算フィルタ + アルコール業界年齢フィルタを通過したタレントを返す"""
+    merged = accounts[accounts["del_flag"] == 0].merge(
+        acts, on="account_id", how="inner", suffixes=("", "_act")
+    )
+
+    money = representative_money(merged)
+
+    in_range = money.notna() & (money >= params.min_budget) & (money < params.max_budget)
+    no_price = money.isna() & params.is_unlimited_budget
+    mask = in_range | no_price
+
+    if params.is_alcohol_industry:
+        mask &= _age_at_least(merged["birthday"], ALCOHOL_MIN_AGE, today or date.today())
+
+    return merged[mask.to_numpy()]
+
+
+def representative_money(talents: pd.DataFrame) -> pd.Series:
+    """代表出演料（money_representative_value、無い場合は COALESCE(max, min)）"""
+    if "money_representative_value" in talents.columns:
+        return pd.to_numeric(talents["money_representative_value"], errors="coerce")
+    return pd.to_numeric(talents["money_max_one_year"], errors="coerce").fillna(
+        pd.to_numeric(talents["money_min_one_year"], errors="coerce")
+    )
+
+
+def percent_rank_desc(scores: pd.Series) -> np.ndarray:
+    """PERCENT_RANK() OVER (ORDER BY score DESC) 相当（NULLは先頭・同点は最小順位）"""
+    n = len(scores)
+    rank = pd.to_numeric(scores, errors="coerce").rank(method="min", ascending=False, na_option="top").to_numpy()
+    return (rank - 1) / (n - 1) if n > 1 else np.zeros(n)
+
+
+def band_points(percentile: np.ndarray, bands=IMAGE_ADJUSTMENT_BANDS) -> np.ndarray:
+    """PERCENT_RANK → 加減点（CASE WHEN percentile_rank <= 上限値 ... と同じ判定）"""
+    thresholds = np.array([upper for upper, _ in bands], dtype=float)
+    points = np.array([value for _, value in bands], dtype=float)
+    band_index = np.minimum(np.searchsorted(thresholds, percentile, side="left"), len(points) - 1)
+    return points[band_index]
+
+
+def compute_image_adjustment(
+    images: pd.DataFrame,
+    target_segment_id: int,
+    image_item_ids: List[int],
+    bands=IMAGE_ADJUSTMENT_BANDS,
+) -> pd.Series:
+    """STEP 2: 業種イメージ加減点（account_id → 加減点の平均）
+
+    SQLの PERCENT_RANK() OVER (PARTITION BY segment, image ORDER BY score DESC) と同じく、
+    NULLスコアは先頭（順位1）扱い・同点は最小順位で計算する。
+    """
+    segment_images = images[images["target_segment_id"] == target_segment_id]
+    if segment_images.empty:
+        return pd.Series(dtype=float, name="image_adjustment")
+
+    per_image = [
+        band_points(percent_rank_desc(segment_images[IMAGE_COLUMNS_BY_ID[image_id]]), bands)
+        for image_id in image_item_ids
+    ]
+
+    adjustment = pd.DataFrame({
+        "account_id": np.tile(segment_images["account_id"].to_numpy(), len(per_image)),
+        "image_adjustment": np.concatenate(per_image),
+    })
+    return adjustment.groupby("account_id")["image_adjustment"].mean()
+
+
+def base_power_frame(
+    scores: pd.DataFrame,
+    target_segment_id: int,
+    base_weights: Tuple[float, float] = BASE_POWER_WEIGHTS,
+) -> pd.DataFrame:
+    """STEP 1: 基礎パワー得点 = (VR人気度 + TPRパワースコア) / 2（既定の重み）"""
+    scores = scores[scores["target_segment_id"] == target_segment_id]
+    vr_weight, tpr_weight = base_weights
+    base_power = (
+        pd.to_numeric(scores["vr_popularity"], errors="coerce").fillna(0) * vr_weight
+        + pd.to_numeric(scores["tpr_power_score"], errors="coerce").fillna(0) * tpr_weight
+    )
+    return pd.DataFrame({
+        "account_id": scores["account_id"].to_numpy(),
+        "target_segment_id": scores["target_segment_id"].to_numpy(),
+        "base_power_score": base_power.to_numpy(dtype=float),
+    })
+
+
+def rank_candidates(
+    step1: pd.DataFrame,
+    adjustment: pd.Series,
+    eligible: pd.DataFrame,
+    limit: int = MAX_RESULTS,
+) -> pd.DataFrame:
+    """STEP 3-4: 加減点を加算し、予算フィルタ通過者に限定して上位 limit 件を順位順で返す"""
+    step1 = step1.copy()
+    step1["image_adjustment"] = step1["account_id"].map(adjustment).fillna(0.0).to_numpy(dtype=float)
+    step1["reflected_score"] = step1["base_power_score"] + step1["image_adjustment"]
+
+    ranked = step1.merge(
+        eligible[["account_id", "name_full_for_matching", "last_name_kana", "act_genre", "company_name"]],
+        on="account_id",
+        how="inner",
+    ).drop_duplicates(subset="account_id")
+
+    order = np.lexsort((
+        ranked["account_id"].to_numpy(),
+        -ranked["base_power_score"].to_numpy(),
+        -ranked["reflected_score"].to_numpy(),
+    ))
+    return ranked.iloc[order[:limit]]
+
+
+def execute_matching(
+    tables: Dict[str, pd.DataFrame],
+    params: MatchingParameters,
+    limit: int = MAX_RESULTS,
+    today: Optional[date] = None,
+    base_weights: Tuple[float, float] = BASE_POWER_WEIGHTS,
+    bands=IMAGE_ADJUSTMENT_BANDS,
+) -> List[Dict]:
+    """STEP 0-4 を実行し、execute_matching_logic と同じ形式の辞書リストを返す
+
+    base_weights・bands を変えると STEP 1 の重み・STEP 2 の加減点テーブルを差し替えた
+    試算になる（app.services.scoring_simulation）。既定値は本番SQLと同じ計算。
+    """
+    eligible = budget_filter_mask(tables["m_account"], tables["m_talent_act"], params, today)
+    step1 = base_power_frame(tables["talent_scores"], params.target_segment_id, base_weights)
+
+    # STEP 2: 業種イメージ加減点
+    adjustment = compute_image_adjustment(
+        tables["talent_images"], params.target_segment_id, params.image_item_ids, bands
+    )
+    top = rank_candidates(step1, adjustment, eligible, limit)
+
+    return [
+        {
+            "account_id": int(row.account_id),
+            "target_segment_id": int(row.target_segment_id),
+            "base_power_score": float(row.base_power_score),
+            "image_adjustment": float(row.image_adjustment),
+            "reflected_score": float(row.reflected_score),
+            "ranking": ranking,
+            "name": row.name_full_for_matching,
+            "last_name_kana": _none_if_nan(row.last_name_kana),
+            "act_genre": _none_if_nan(row.act_genre),
+            "company_name": _none_if_nan(row.company_name),
+        }
+        for ranking, row in enumerate(top.itertuples(index=False), start=1)
+    ]
+
+
+def age_cutoff_date(years: int, today: date) -> date:
+    """満年齢が years 以上となる生年月日の上限日"""
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:
+        # 2/29 → 2/28
+        return today.replace(year=today.year - years, day=28)
+
+
+def _age_at_least(birthdays: pd.Series, years: int, today: date) -> pd.Series:
+    """生年月日から満年齢が years 以上か判定（生年月日NULLは通過）"""
+    cutoff = age_cutoff_date(years, today)
+    parsed = pd.to_datetime(birthdays, errors="coerce")
+    return parsed.isna() | (parsed <= pd.Timestamp(cutoff))
+
+
+def _none_if_nan(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    return value
@@ -0,0 +1,555 @@
+"""マッチングエンジン（STEP 0-4 のバックエンド切り替え・シャドー実行）
+
+/api/matching の STEP 0-4（予算フィルタ → 基礎パワー → 業種イメージ査定 → ランキング）を
+MatchingBackend として抽象化し、リクエスト経路を1本にまとめる。
+
+バックエンド:
+    sql:    STEP 0-4 統合CTE（プリペアドステートメント）。常に利用可能
+    arrays: 起動時にメモリマップしたスコアリング配列（app.services.scoring_arrays）
+    precomputed: 事前計算済みの上位K件の索引参照（app.services.matching_topk）。未計算の組み合わせは sql
+
+MATCHING_BACKEND で主バックエンドを選ぶ（auto: arrays → precomputed → sql の順で利用可能なもの）。
+MATCHING_SHADOW_BACKEND を設定すると、主バックエンドの結果を返した後に候補バックエンドを
+同じパラメータでバックグラウンド実行し、ランキングの差分とレイテンシをログ・統計に残す。
+新しいバックエンドは register_backend() で追加できる。
+
+同じパラメータの STEP 0-4 が同時に来た場合は1回の計算に相乗りし（MATCHING_COALESCING_ENABLED）、
+DBを使うバックエンドの計算は heavy_query_admission で同時実行数を制限する（超過分は 503 + Retry-After）。
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional, Set
+import asyncio
+import logging
+import random
+import sys
+import time
+
+from app.core.concurrency import SingleFlight, heavy_query_admission
+from app.core.config import settings
+from app.core.http_cache import master_data_cache
+from app.core.tracing import detached, span
+from app.db.connection import acquire_connection
+from app.db.prepared_statements import register_statement, fetch_prepared, fetchrow_prepared
+from app.services.matching_parameters import (
+    MAX_RESULTS, MatchingParameters, build_parameters, normalize_budget_range_string,
+)
+
+logger = logging.getLogger(__name__)
+
+BACKEND_AUTO = "auto"
+
+
+# 予算・ターゲット層・業種のパラメータ一括取得（Phase A2: 3クエリを1つのJOINに統合）
+MATCHING_PARAMETERS_STATEMENT = register_statement("matching_parameters", """
+    SELECT
+        br.min_amount,
+        br.max_amount,
+        ts.target_segment_id,
+        i.required_image_id
+    FROM budget_ranges br
+    CROSS JOIN target_segments ts
+    CROSS JOIN industries i
+    WHERE REPLACE(REPLACE(REPLACE(br.range_name, '～', '〜'), ' ', ''), '　', '') = $1
+      AND ts.segment_name = $2
+      AND i.industry_name = $3
+""")
+
+# STEP 0-4 統合クエリ（プール接続ごとにプリペアドステートメントとして準備）
+# $1 = min_budget, $2 = target_segment_id, $3 = image_item_ids, $4 = is_alcohol_industry,
+# $5 = is_unlimited_budget, $6 = max_budget, $7 = 件数（通常は MAX_RESULTS、事前計算は上位K件）
+MATCHING_STEP0_4_STATEMENT = register_statement("matching_step0_4", """
+WITH step0_budget_filter AS (
+    -- STEP 0: 予算フィルタリング（計算列インデックス活用版） + アルコール業界年齢フィルタリング
+    -- $1 = min_budget (下限、NULLの場合は0)
+    -- $6 = max_budget (上限、NULLの場合は無限大)
+    SELECT DISTINCT ma.account_id, ma.name_full_for_matching as name, ma.last_name_kana, ma.act_genre, ma.company_name
+    FROM m_account ma
+    LEFT JOIN m_talent_act mta ON ma.account_id = mta.account_id
+    WHERE ma.del_flag = 0  -- 有効なタレントのみ対象
+      AND mta.account_id IS NOT NULL  -- 未登録タレントを除外
+      AND (
+        -- 超高速化: 計算列インデックスを活用したシンプルな範囲チェック
+        -- money_representative_value = COALESCE(money_max_one_year, money_min_one_year)
+        (mta.money_representative_value IS NOT NULL
+         AND mta.money_representative_value >= $1
+         AND mta.money_representative_value < $6)
+        OR
+        -- 両方NULL: 「5,000万円以上」選択時のみ通過
+        (mta.money_representative_value IS NULL AND $5 = true)
+      ) AND (
+        -- アルコール業界の場合のみ25歳以上フィルタ適用（$4で制御）
+        $4 = false OR (
+            ma.birthday IS NULL OR  -- 生年月日がない場合は通過
+            EXTRACT(YEAR FROM AGE(CURRENT_DATE, ma.birthday)) >= 25
+        )
+      )
+),
+step1_base_power AS (
+    -- STEP 1: 基礎パワー得点計算（仕様通り: (VR人気度 + TPRパワースコア) / 2）
+    SELECT
+        ts.account_id,
+        ts.target_segment_id,
+        (COALESCE(ts.vr_popularity, 0) + COALESCE(ts.tpr_power_score, 0)) / 2.0 AS base_power_score
+    FROM talent_scores ts
+    WHERE ts.target_segment_id = $2
+),
+step2_adjustment AS (
+    -- STEP 2: 業種イメージ査定（非正規化データ対応 + 正しい加減点）
+    SELECT
+        account_id,
+        target_segment_id,
+        AVG(
+            CASE
+                WHEN percentile_rank <= 0.15 THEN 12.0
+                WHEN percentile_rank <= 0.30 THEN 6.0
+                WHEN percentile_rank <= 0.50 THEN 3.0
+                WHEN percentile_rank <= 0.70 THEN -3.0
+                WHEN percentile_rank <= 0.85 THEN -6.0
+                ELSE -12.0
+            END
+        ) AS image_adjustment
+    FROM (
+        SELECT
+            unpivot.account_id,
+            unpivot.target_segment_id,
+            unpivot.image_id,
+            PERCENT_RANK() OVER (
+                PARTITION BY unpivot.target_segment_id, unpivot.image_id
+                ORDER BY unpivot.score DESC
+            ) AS percentile_rank
+        FROM (
+            SELECT account_id, target_segment_id, 1 AS image_id, image_funny AS score FROM talent_images
+            UNION ALL
+            SELECT account_id, target_segment_id, 2 AS image_id, image_clean AS score FROM talent_images
+            UNION ALL
+            SELECT account_id, target_segment_id, 3 AS image_id, image_unique AS score FROM talent_images
+            UNION ALL
+            SELECT account_id, target_segment_id, 4 AS image_id, image_trustworthy AS score FROM talent_images
+            UNION ALL
+            SELECT account_id, target_segment_id, 5 AS image_id, image_cute AS score FROM talent_images
+            UNION ALL
+            SELECT account_id, target_segment_id, 6 AS image_id, image_cool AS score FROM talent_images
+            UNION ALL
+            SELECT account_id, target_segment_id, 7 AS image_id, image_mature AS score FROM talent_images
+        ) unpivot
+        WHERE unpivot.target_segment_id = $2
+            AND unpivot.image_id = ANY($3::int[])
+    ) sub
+    GROUP BY account_id, target_segment_id
+),
+step3_reflected_score AS (
+    -- STEP 3: 基礎反映得点（STEP1 + STEP2）
+    SELECT
+        bp.account_id,
+        bp.target_segment_id,
+        bp.base_power_score,
+        COALESCE(ia.image_adjustment, 0) AS image_adjustment,
+        bp.base_power_score + COALESCE(ia.image_adjustment, 0) AS reflected_score
+    FROM step1_base_power bp
+    LEFT JOIN step2_adjustment ia
+        ON bp.account_id = ia.account_id
+        AND bp.target_segment_id = ia.target_segment_id
+),
+step4_ranking AS (
+    -- STEP 4: ランキング確定（タレント重複除去 + 上位$7名抽出）
+    SELECT DISTINCT ON (rs.account_id)
+        rs.account_id,
+        rs.target_segment_id,
+        rs.base_power_score,
+        rs.image_adjustment,
+        rs.reflected_score,
+        ROW_NUMBER() OVER (ORDER BY rs.reflected_score DESC, rs.base_power_score DESC, rs.account_id) AS ranking
+    FROM step3_reflected_score rs
+    INNER JOIN step0_budget_filter bf ON bf.account_id = rs.account_id
+    ORDER BY rs.account_id, rs.reflected_score DESC, rs.base_power_score DESC
+),
+step4_final AS (
+    SELECT * FROM step4_ranking
+    ORDER BY reflected_score DESC, base_power_score DESC, account_id
+    LIMIT $7
+)
+-- 最終結果（STEP 5のスコア振り分けは後処理で実施）
+SELECT
+    r.account_id,
+    r.target_segment_id,
+    r.base_power_score,
+    r.image_adjustment,
+    r.reflected_score,
+    ROW_NUMBER() OVER (ORDER BY r.reflected_score DESC, r.base_power_score DESC, r.account_id) AS ranking,
+    bf.name,
+    bf.last_name_kana,
+    bf.act_genre,
+    bf.company_name
+FROM step4_final r
+INNER JOIN step0_budget_filter bf ON bf.account_id = r.account_id
+ORDER BY r.reflected_score DESC, r.base_power_score DESC, r.account_id
+""")
+
+
+class MatchingBackend(ABC):
+    """STEP 0-4 バックエンドの基底クラス（resolve_parameters / rank は必須）"""
+
+    name = "base"
+    uses_database = True  # True の場合はアドミッション制御の対象
+
+    def is_available(self) -> bool:
+        return True
+
+    @abstractmethod
+    async def resolve_parameters(self, budget_name: str, target_segment_name: str, industry_name: str) -> MatchingParameters:
+        """予算区分・ターゲット層・業種名からパラメータを解決
+
+        Raises:
+            ValueError: いずれかが見つからない場合
+        """
+
+    @abstractmethod
+    async def rank(self, params: MatchingParameters) -> List[Dict[str, Any]]:
+        """STEP 0-4 を実行し、上位30名を ranking 順で返す"""
+
+
+class SqlCteBackend(MatchingBackend):
+    """STEP 0-4 統合CTE（DB上で計算）"""
+
+    name = "sql"
+
+    async def resolve_parameters(self, budget_name: str, target_segment_name: str, industry_name: str) -> MatchingParameters:
+        async with acquire_connection() as conn:
+            row = await fetchrow_prepared(
+                conn, MATCHING_PARAMETERS_STATEMENT,
+                normalize_budget_range_string(budget_name), target_segment_name, industry_name,
+            )
+        if not row:
+            raise ValueError(
+                f"パラメータが見つかりません: 予算='{budget_name}', ターゲット='{target_segment_name}', 業種='{industry_name}'"
+            )
+        return build_parameters(
+            row["min_amount"], row["max_amount"], row["target_segment_id"], row["required_image_id"],
+            industry_name, budget_name,
+        )
+
+    async def rank(self, params: MatchingParameters) -> List[Dict[str, Any]]:
+        async with acquire_connection() as conn:
+            rows = await fetch_prepared(
+                conn, MATCHING_STEP0_4_STATEMENT,
+                params.min_budget, params.target_segment_id, params.image_item_ids,
+                params.is_alcohol_industry, params.is_unlimited_budget, params.max_budget, MAX_RESULTS,
+            )
+        return [dict(row) for row in rows]
+
+
+class ScoringArraysBackend(MatchingBackend):
+    """メモリマップ済みスコアリング配列（DBに問い合わせない）"""
+
+    name = "arrays"
+    uses_database = False
+
+    def _arrays(self):
+        # 配列を使わない環境で pandas / NumPy を import しないよう、lifespan で
+        # app.services.scoring_arrays が読み込まれている場合のみ参照する
+        module = sys.modules.get("app.services.scoring_arrays")
+        return module.get_scoring_arrays() if module else None
+
+    def is_available(self) -> bool:
+        return self._arrays() is not None
+
+    async def resolve_parameters(self, budget_name: str, target_segment_name: str, industry_name: str) -> MatchingParameters:
+        arrays = self._arrays()
+        if arrays is None:
+            raise RuntimeError("スコアリング配列が読み込まれていません")
+        return arrays.resolve_parameters(budget_name, target_segment_name, industry_name)
+
+    async def rank(self, params: MatchingParameters) -> List[Dict[str, Any]]:
+        arrays = self._arrays()
+        if arrays is None:
+            raise RuntimeError("スコアリング配列が読み込まれていません")
+        return arrays.match(params)
+
+
+class PrecomputedTopKBackend(MatchingBackend):
+    """事前計算済みの上位K件（app.services.matching_topk）を索引参照
+
+    参照は主キー範囲のK行（既定60）のため重いクエリとして扱わない（uses_database = False）。
+    K件すべてを返し、30名への切り詰めはおすすめタレントとの重複除去後（STEP 5.5）に行う。
+    未計算の組み合わせ・データバージョン不一致で0行の場合は統合CTEで計算する（こちらはアドミッション制御付き）。
+    """
+
+    name = "precomputed"
+    uses_database = False
+
+    def __init__(self) -> None:
+        self.fallback = SqlCteBackend()
+
+    def _store(self):
+        # 事前計算を使わない環境では lifespan で import されないため、読み込み済みの場合のみ参照する
+        return sys.modules.get("app.services.matching_topk")
+
+    def is_available(self) -> bool:
+        store = self._store()
+        return settings.matching_topk_enabled and store is not None and store.is_current()
+
+    async def resolve_parameters(self, budget_name: str, target_segment_name: str, industry_name: str) -> MatchingParameters:
+        return await self.fallback.resolve_parameters(budget_name, target_segment_name, industry_name)
+
+    async def rank(self, params: MatchingParameters) -> List[Dict[str, Any]]:
+        store = self._store()
+        rows = await store.lookup(params) if store is not None else []
+        if rows:
+            return rows
+        with span("matching.topk_fallback"):
+            async with heavy_query_admission.slot():
+                return await self.fallback.rank(params)
+
+
+def compare_rankings(primary: List[Dict[str, Any]], candidate: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """2つのバックエンドの STEP 0-4 結果を比較
+
+    Returns:
+        dict: identical（順位・スコアまで一致）, overlap（共通タレント数）, first_divergence（最初に
+        異なる順位、一致時は None）, max_rank_delta（共通タレントの最大順位差）, missing / extra
+        （主のみ / 候補のみのaccount_id）, max_score_delta（共通タレントの reflected_score 最大差）
+    """
+    primary_ids = [r["account_id"] for r in primary]
+    candidate_ids = [r["account_id"] for r in candidate]
+    primary_rank = {account_id: i for i, account_id in enumerate(primary_ids)}
+    candidate_rank = {account_id: i for i, account_id in enumerate(candidate_ids)}
+    common = set(primary_rank) & set(candidate_rank)
+
+    first_divergence = None
+    for i in range(max(len(primary_ids), len(candidate_ids))):
+        a = primary_ids[i] if i < len(primary_ids) else None
+        b = candidate_ids[i] if i < len(candidate_ids) else None
+        if a != b:
+            first_divergence = i + 1
+            break
+
+    primary_scores = {r["account_id"]: r.get("reflected_score") for r in primary}
+    score_deltas = [
+        abs(float(primary_scores[r["account_id"]]) - float(r["reflected_score"]))
+        for r in candidate
+        if r["account_id"] in common
+        and primary_scores.get(r["account_id"]) is not None and r.get("reflected_score") is not None
+    ]
+    max_score_delta = max(score_deltas, default=0.0)
+
+    return {
+        "identical": first_divergence is None and max_score_delta < 1e-6,
+        "overlap": len(common),
+        "first_divergence": first_divergence,
+        "max_rank_delta": max((abs(primary_rank[a] - candidate_rank[a]) for a in common), default=0),
+        "missing": [a for a in primary_ids if a not in candidate_rank],
+        "extra": [a for a in candidate_ids if a not in primary_rank],
+        "max_score_delta": round(max_score_delta, 6),
+    }
+
+
+@dataclass
+class ShadowStats:
+    """シャドー実行の計測値（累積）"""
+    runs: int = 0
+    mismatches: int = 0
+    errors: int = 0
+    primary_ms_total: float = 0.0
+    shadow_ms_total: float = 0.0
+    skipped: int = 0  # 重いクエリの枠が埋まっていたため省略
+
+
+class MatchingEngine:
+    """STEP 0-4 の実行窓口（主バックエンド選択・パラメータキャッシュ・シャドー実行）"""
+
+    def __init__(self, backends: List[MatchingBackend]) -> None:
+        self.backends: Dict[str, MatchingBackend] = {}
+        for backend in backends:
+            self.register_backend(backend)
+        # Phase A3最適化: パラメータのメモリキャッシュ（マスタデータバージョンが変わるまで保持）
+        self._parameter_cache: Dict[tuple, MatchingParameters] = {}
+        self._parameter_version: Optional[str] = None
+        self.parameter_cache_invalidations = 0
+        self.parameter_cache_hits = 0
+        self.parameter_cache_misses = 0
+        self.shadow_stats = ShadowStats()
+        self.last_shadow_diff: Optional[Dict[str, Any]] = None
+        self._shadow_tasks: Set[asyncio.Task] = set()
+        self.single_flight = SingleFlight()
+
+    def register_backend(self, backend: MatchingBackend) -> None:
+        self.backends[backend.name] = backend
+
+    def primary_backend(self) -> MatchingBackend:
+        """MATCHING_BACKEND の主バックエンド（利用不可の場合は sql にフォールバック）"""
+        name = settings.matching_backend
+        if name == BACKEND_AUTO:
+            for preferred in AUTO_PREFERENCE:
+                backend = self.backends.get(preferred)
+                if backend is not None and backend.is_available():
+                    return backend
+            return self.backends[SqlCteBackend.name]
+
+        backend = self.backends.get(name)
+        if backend is None or not backend.is_available():
+            return self.backends[SqlCteBackend.name]
+        return backend
+
+    def shadow_backend(self, primary: MatchingBackend) -> Optional[MatchingBackend]:
+        name = settings.matching_shadow_backend
+        backend = self.backends.get(name) if name else None
+        if backend is None or backend is primary or not backend.is_available():
+            return None
+        if random.random() >= settings.matching_shadow_sample_rate:
+            return None
+        return backend
+
+    async def resolve_parameters(self, budget_name: str, target_segment_name: str, industry_name: str) -> MatchingParameters:
+        """パラメータ解決（キャッシュ付き）
+
+        Raises:
+            ValueError: 予算区分・ターゲット層・業種のいずれかが見つからない場合
+        """
+        await self._expire_parameter_cache()
+        cache_key = (budget_name, target_segment_name, industry_name)
+        params = self._parameter_cache.get(cache_key)
+        with span("matching.parameters", cache_hit=params is not None):
+            if params is None:
+                self.parameter_cache_misses += 1
+                params = await self.primary_backend().resolve_parameters(budget_name, target_segment_name, industry_name)
+                self._parameter_cache[cache_key] = params
+            else:
+                self.parameter_cache_hits += 1
+        return params
+
+    async def _expire_parameter_cache(self) -> None:
+        """マスタデータバージョンが変わったらパラメータキャッシュを破棄
+
+        確認は HTTP キャッシュと共有（HTTP_CACHE_VERSION_CHECK_SECONDS ごとに1行PK参照）。
+        予算区分・業種の必須イメージ等の変更は取り込み・トリガーでバージョンが進むため反映される。
+        """
+        version = await master_data_cache.current_version()
+        if version != self._parameter_version:
+            if self._parameter_cache:
+                self.parameter_cache_invalidations += 1
+                logger.info(f"🔄 マスタデータバージョン変更（{self._parameter_version} → {version}）: パラメータキャッシュを破棄")
+            self.clear_parameter_cache()
+            self._parameter_version = version
+
+    def clear_parameter_cache(self) -> None:
+        self._parameter_cache.clear()
+
+    async def rank(self, params: MatchingParameters) -> List[Dict[str, Any]]:
+        """主バックエンドで STEP 0-4 を実行（シャドー設定時は候補バックエンドを裏で実行）"""
+        primary = self.primary_backend()
+        started = time.perf_counter()
+        with span("matching.step0_4", backend=primary.name) as current:
+            results, coalesced = await self._rank_primary(primary, params)
+            if current is not None:
+                current.set_attribute("matching.result_count", len(results))
+                current.set_attribute("matching.coalesced", coalesced)
+        primary_ms = (time.perf_counter() - started) * 1000
+
+        # 相乗りした場合は計算した側がシャドー実行を予約済み
+        shadow = None if coalesced else self.shadow_backend(primary)
+        if shadow is not None and shadow.uses_database and heavy_query_admission.saturated():
+            self.shadow_stats.skipped += 1
+            shadow = None
+        if shadow is not None:
+            # 主の結果は呼び出し側で書き換えられるため比較用に複製しておく
+            snapshot = [dict(r) for r in results[:MAX_RESULTS]]
+            with detached():
+                # シャドー実行はレスポンス後も続くためリクエストのトレースには含めない
+                task = asyncio.create_task(self._run_shadow(shadow, primary.name, params, snapshot, primary_ms))
+            self._shadow_tasks.add(task)
+            task.add_done_callback(self._shadow_tasks.discard)
+        return results
+
+    async def _rank_primary(self, primary: MatchingBackend, params: MatchingParameters):
+        """主バックエンドで計算（同一パラメータの計算中なら相乗り）。(結果, 相乗りしたか) を返す"""
+        async def compute():
+            if not primary.uses_database:
+                return await primary.rank(params)
+            async with heavy_query_admission.slot():
+                return await primary.rank(params)
+
+        if not settings.matching_coalescing_enabled:
+            return await compute(), False
+        results, coalesced = await self.single_flight.do((primary.name, params.key()), compute)
+        # 結果は呼び出し側で書き換えられるため、共有した結果は呼び出し元ごとに複製して返す
+        return [dict(r) for r in results], coalesced
+
+    async def _run_shadow(
+        self,
+        shadow: MatchingBackend,
+        primary_name: str,
+        params: MatchingParameters,
+        primary_results: List[Dict[str, Any]],
+        primary_ms: float,
+    ) -> None:
+        stats = self.shadow_stats
+        started = time.perf_counter()
+        try:
+            candidate = await shadow.rank(params)
+        except Exception as e:
+            stats.errors += 1
+            logger.error(f"❌ シャドー実行エラー: backend={shadow.name}: {e}")
+            return
+        shadow_ms = (time.perf_counter() - started) * 1000
+
+        diff = compare_rankings(primary_results, candidate[:MAX_RESULTS])
+        stats.runs += 1
+        stats.primary_ms_total += primary_ms
+        stats.shadow_ms_total += shadow_ms
+        self.last_shadow_diff = {"primary": primary_name, "shadow": shadow.name, "params": asdict(params), **diff}
+
+        summary = (
+            f"primary={primary_name} {primary_ms:.1f}ms / shadow={shadow.name} {shadow_ms:.1f}ms, "
+            f"segment={params.target_segment_id}"
+        )
+        if diff["identical"]:
+            logger.info(f"🔍 シャドー実行一致: {summary}")
+        else:
+            stats.mismatches += 1
+            logger.warning(
+                f"⚠️ シャドー実行ランキング差分: {summary}, overlap={diff['overlap']}, "
+                f"first_divergence={diff['first_divergence']}, max_rank_delta={diff['max_rank_delta']}, "
+                f"missing={diff['missing']}, extra={diff['extra']}, max_score_delta={diff['max_score_delta']}"
+            )
+
+    def status(self) -> Dict[str, Any]:
+        """エンジンの状態（主・シャドーバックエンド、相乗り・アドミッション制御・シャドー比較統計）"""
+        stats = self.shadow_stats
+        return {
+            "primary": self.primary_backend().name,
+            "configured_backend": settings.matching_backend,
+            "shadow_backend": settings.matching_shadow_backend or None,
+            "available_backends": [name for name, b in self.backends.items() if b.is_available()],
+            "parameter_cache": {
+                "entries": len(self._parameter_cache),
+                "hits": self.parameter_cache_hits,
+                "misses": self.parameter_cache_misses,
+                "invalidations": self.parameter_cache_invalidations,
+                "data_version": self._parameter_version,
+            },
+            "coalescing": {
+                "enabled": settings.matching_coalescing_enabled,
+                "in_flight": self.single_flight.in_flight(),
+                **asdict(self.single_flight.stats),
+            },
+            "admission": heavy_query_admission.status(),
+            "precomputed": self._precomputed_status(),
+            "shadow": {
+                **asdict(stats),
+                "pending": len(self._shadow_tasks),
+                "primary_ms_avg": round(stats.primary_ms_total / stats.runs, 2) if stats.runs else None,
+                "shadow_ms_avg": round(stats.shadow_ms_total / stats.runs, 2) if stats.runs else None,
+                "last_diff": self.last_shadow_diff,
+            },
+        }
+
+    def _precomputed_status(self) -> Optional[Dict[str, Any]]:
+        store = sys.modules.get("app.services.matching_topk")
+        return store.status() if store is not None else None
+
+
+# auto で優先するバックエンド（いずれも利用不可なら sql）
+AUTO_PREFERENCE = (ScoringArraysBackend.name, PrecomputedTopKBackend.name)
+
+matching_engine = MatchingEngine([SqlCteBackend(), ScoringArraysBackend(), PrecomputedTopKBackend()])
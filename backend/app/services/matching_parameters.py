@@ -0,0 +1,64 @@
+"""マッチング STEP 0-4 の入力パラメータ
+
+SQL CTE版・スコアリング配列版・インメモリ版の全バックエンドが共有する定義。
+予算下限・上限のNULL扱いやイメージ項目の既定値をここで一元化し、バックエンド間で
+パラメータの解釈がずれないようにする（pandas / NumPy に依存しない軽量モジュール）。
+"""
+from dataclasses import dataclass
+from typing import List, Optional
+
+ALL_IMAGE_ITEM_IDS: List[int] = [1, 2, 3, 4, 5, 6, 7]
+
+ALCOHOL_INDUSTRY_NAME = "アルコール飲料"
+ALCOHOL_MIN_AGE = 25
+UNLIMITED_BUDGET_NAME = "5,000万円以上"
+UNLIMITED_MAX_BUDGET = 999999999999
+MAX_RESULTS = 30
+
+
+@dataclass
+class MatchingParameters:
+    """STEP 0-4 の入力パラメータ（get_matching_parameters の戻り値 + 業種フラグ）"""
+    min_budget: float
+    max_budget: float
+    target_segment_id: int
+    image_item_ids: List[int]
+    is_alcohol_industry: bool = False
+    is_unlimited_budget: bool = False
+
+    def key(self) -> tuple:
+        """同一計算の判定キー（相乗り・キャッシュ用）"""
+        return (
+            self.min_budget, self.max_budget, self.target_segment_id, tuple(self.image_item_ids),
+            self.is_alcohol_industry, self.is_unlimited_budget,
+        )
+
+
+def normalize_budget_range_string(text: str) -> str:
+    """予算区分文字列を正規化（全角チルダ統一・空白除去）"""
+    text = text.replace("～", "〜")
+    text = text.replace(" ", "").replace("　", "")
+    return text
+
+
+def build_parameters(
+    min_amount: Optional[float],
+    max_amount: Optional[float],
+    target_segment_id: int,
+    required_image_id: Optional[int],
+    industry_name: str,
+    budget_name: str,
+) -> MatchingParameters:
+    """マスタの値からパラメータを組み立てる
+
+    - 予算下限 NULL → 0（下限なし）、予算上限 NULL → UNLIMITED_MAX_BUDGET（上限なし）
+    - 業種に必須イメージが無い場合は全イメージ項目（1-7）を対象
+    """
+    return MatchingParameters(
+        min_budget=float(min_amount or 0),
+        max_budget=float(max_amount or UNLIMITED_MAX_BUDGET),
+        target_segment_id=int(target_segment_id),
+        image_item_ids=[int(required_image_id)] if required_image_id else list(ALL_IMAGE_ITEM_IDS),
+        is_alcohol_industry=industry_name == ALCOHOL_INDUSTRY_NAME,
+        is_unlimited_budget=budget_name == UNLIMITED_BUDGET_NAME,
+    )
@@ -0,0 +1,413 @@
+"""STEP 0-4 上位K件の事前計算（予算帯 × ターゲット層 × イメージ項目 × アルコールフラグ）
+
+STEP 0-4 の結果は (ターゲット層, イメージ項目, 予算帯, アルコール業種, 上限なし予算) だけで決まり、
+予算帯・ターゲット層・業種の必須イメージはいずれも少数の固定値である。そこで全組み合わせの
+上位K件（おすすめタレントとの重複除去の余裕を見て既定60件）を matching_topk に書き出しておき、
+リクエスト時は主キー範囲の索引参照だけで返す（matching_engine の precomputed バックエンド）。
+
+- 鮮度: matching_topk_state にマスタデータバージョン（master_data_version）を刻印し、参照SQL側で
+  現在のバージョンと照合する。取り込み・industries.required_image_id の変更でバージョンが進むと
+  参照は空になり、統合CTEへフォールバックする
+- アルコール業種の25歳以上フィルタは CURRENT_DATE に依存するため、計算日が今日でない場合は
+  アルコール業種の組み合わせのみ参照しない（他の組み合わせはデータバージョンが同じ間そのまま使う）
+- 再計算: scripts/precompute_matching_topk.py（取り込み後）、管理API、または
+  watch_matching_topk() の定期照合（MATCHING_TOPK_AUTO_REFRESH）で実行する。データバージョンが
+  変わった場合は全組み合わせ、日付が変わっただけならアルコール業種の組み合わせのみ再計算し、
+  複数インスタンスのうち1つだけが実行する
+
+master_data_version テーブル（scripts/create_master_data_version.sql）が無い環境では
+事前計算は行わない。状態の照合はバージョンテーブルのみを参照し、フィンガープリント
+（全件走査）は計算しない（コールドスタートのたびに走らないように）。
+"""
+from dataclasses import dataclass, asdict
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import random
+import time
+
+from app.core.config import settings
+from app.db.connection import acquire_connection
+from app.db.data_version import fetch_tracked_version
+from app.db.prepared_statements import fetch_prepared, register_statement, registered_statements
+from app.services.matching_engine import MATCHING_STEP0_4_STATEMENT, compare_rankings
+from app.services.matching_parameters import (
+    ALCOHOL_INDUSTRY_NAME, MAX_RESULTS, MatchingParameters, build_parameters,
+)
+
+logger = logging.getLogger(__name__)
+
+# 再計算の範囲（refresh_scope）
+SCOPE_ALL = "all"
+SCOPE_ALCOHOL = "alcohol"
+
+# 複数インスタンスの同時再計算を排除する pg_try_advisory_xact_lock のキー
+REFRESH_LOCK_ID = 727_390_039
+
+TOPK_COLUMNS = [
+    "target_segment_id", "image_item_ids", "min_budget", "max_budget", "is_alcohol_industry",
+    "is_unlimited_budget", "rank", "account_id", "base_power_score", "image_adjustment", "reflected_score",
+]
+
+MATCHING_TOPK_DDL = """
+CREATE TABLE IF NOT EXISTS matching_topk (
+    target_segment_id INTEGER NOT NULL,
+    image_item_ids INTEGER[] NOT NULL,
+    min_budget DOUBLE PRECISION NOT NULL,
+    max_budget DOUBLE PRECISION NOT NULL,
+    is_alcohol_industry BOOLEAN NOT NULL,
+    is_unlimited_budget BOOLEAN NOT NULL,
+    rank SMALLINT NOT NULL,
+    account_id INTEGER NOT NULL,
+    base_power_score NUMERIC,
+    image_adjustment NUMERIC,
+    reflected_score NUMERIC,
+    PRIMARY KEY (target_segment_id, image_item_ids, min_budget, max_budget,
+                 is_alcohol_industry, is_unlimited_budget, rank)
+);
+
+CREATE TABLE IF NOT EXISTS matching_topk_state (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    data_version VARCHAR(64) NOT NULL,
+    computed_on DATE NOT NULL,
+    k INTEGER NOT NULL,
+    combinations INTEGER NOT NULL,
+    row_count INTEGER NOT NULL,
+    duration_ms DOUBLE PRECISION,
+    refreshed_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE matching_topk IS 'マッチング STEP 0-4 上位K件の事前計算結果';
+COMMENT ON TABLE matching_topk_state IS 'matching_topk の計算元データバージョン・計算日';
+"""
+
+# 事前計算結果の参照（$1 = target_segment_id, $2 = image_item_ids, $3 = min_budget, $4 = max_budget,
+# $5 = is_alcohol_industry, $6 = is_unlimited_budget, $7 = 件数）
+# 計算元のデータバージョンが現在と異なる場合、アルコール業種で計算日が今日でない場合は0行を返す
+MATCHING_TOPK_LOOKUP_STATEMENT = register_statement("matching_topk_lookup", """
+SELECT
+    t.account_id,
+    t.target_segment_id,
+    t.base_power_score,
+    t.image_adjustment,
+    t.reflected_score,
+    t.rank AS ranking,
+    ma.name_full_for_matching AS name,
+    ma.last_name_kana,
+    ma.act_genre,
+    ma.company_name
+FROM matching_topk_state s
+INNER JOIN master_data_version v ON v.id = 1 AND s.data_version = 'v' || v.version
+INNER JOIN matching_topk t
+    ON t.target_segment_id = $1
+    AND t.image_item_ids = $2::int[]
+    AND t.min_budget = $3
+    AND t.max_budget = $4
+    AND t.is_alcohol_industry = $5
+    AND t.is_unlimited_budget = $6
+    AND t.rank <= $7
+INNER JOIN m_account ma ON ma.account_id = t.account_id
+WHERE s.id = 1
+  AND ($5 = false OR s.computed_on = CURRENT_DATE)
+ORDER BY t.rank
+""")
+
+
+@dataclass
+class TopKStats:
+    """事前計算の計測値（累積）"""
+    hits: int = 0
+    misses: int = 0  # 0行（未計算の組み合わせ・バージョン不一致）で統合CTEにフォールバック
+    errors: int = 0
+    refreshes: int = 0
+    alcohol_refreshes: int = 0  # 日付の変更によるアルコール業種のみの再計算（refreshes の内数）
+    refresh_errors: int = 0
+
+
+stats = TopKStats()
+
+# 直近の照合結果（current / stale / missing / unsupported / unknown）
+_state: Dict[str, Any] = {"status": "unknown"}
+
+
+def is_current() -> bool:
+    """直近の照合で事前計算結果が現在のデータバージョンと一致していたか"""
+    return _state["status"] == "current"
+
+
+async def ensure_topk_tables(conn) -> None:
+    await conn.execute(MATCHING_TOPK_DDL)
+
+
+async def enumerate_parameters(conn) -> List[MatchingParameters]:
+    """予算帯 × ターゲット層 × 業種から、STEP 0-4 の入力として異なる組み合わせを列挙"""
+    budgets = await conn.fetch("SELECT range_name, min_amount, max_amount FROM budget_ranges")
+    segments = await conn.fetch("SELECT target_segment_id FROM target_segments")
+    industries = await conn.fetch("SELECT industry_name, required_image_id FROM industries")
+
+    # 業種は (必須イメージ, アルコール業種か) の組で十分（同じ組の業種は同じ結果になる）
+    image_variants = {
+        (row["required_image_id"], row["industry_name"] == ALCOHOL_INDUSTRY_NAME): row["industry_name"]
+        for row in industries
+    }
+
+    combinations: Dict[tuple, MatchingParameters] = {}
+    for budget in budgets:
+        for segment in segments:
+            for (required_image_id, _), industry_name in image_variants.items():
+                # 上限なし予算の判定は画面の予算区分名と同じくマスタの区分名で行う
+                params = build_parameters(
+                    budget["min_amount"], budget["max_amount"], segment["target_segment_id"],
+                    required_image_id, industry_name, budget["range_name"],
+                )
+                combinations.setdefault(params.key(), params)
+    return list(combinations.values())
+
+
+def _records(params: MatchingParameters, rows) -> List[tuple]:
+    return [
+        (
+            params.target_segment_id, params.image_item_ids, params.min_budget, params.max_budget,
+            params.is_alcohol_industry, params.is_unlimited_budget, rank, row["account_id"],
+            row["base_power_score"], row["image_adjustment"], row["reflected_score"],
+        )
+        for rank, row in enumerate(rows, start=1)
+    ]
+
+
+async def _step0_4(conn, params: MatchingParameters, limit: int):
+    """統合CTE（主経路と同じSQL）を件数指定で実行"""
+    return await conn.fetch(
+        registered_statements()[MATCHING_STEP0_4_STATEMENT],
+        params.min_budget, params.target_segment_id, params.image_item_ids,
+        params.is_alcohol_industry, params.is_unlimited_budget, params.max_budget, limit,
+    )
+
+
+async def read_state(conn) -> Dict[str, Any]:
+    """matching_topk_state と現在のデータバージョンを照合して状態を返す（バージョンテーブルが無ければ unsupported）"""
+    data_version = await fetch_tracked_version(conn)
+    if data_version is None:
+        return {"status": "unsupported", "db_version": None}
+
+    row = None
+    if await conn.fetchval("SELECT to_regclass('matching_topk_state') IS NOT NULL"):
+        row = await conn.fetchrow(
+            """
+            SELECT data_version, computed_on, computed_on = CURRENT_DATE AS computed_today,
+                   k, combinations, row_count, duration_ms, refreshed_at
+            FROM matching_topk_state WHERE id = 1
+            """
+        )
+    if row is None:
+        return {"status": "missing", "db_version": data_version}
+
+    state = dict(row)
+    # 計算日が今日でなくてもアルコール業種以外の組み合わせは有効（アルコール業種は参照SQL側で除外）
+    current = state["data_version"] == data_version
+    state.update(status="current" if current else "stale", db_version=data_version)
+    return state
+
+
+def refresh_scope(state: Dict[str, Any], k: Optional[int] = None, force: bool = False) -> Optional[str]:
+    """再計算の範囲（None: 不要 / all: 全組み合わせ / alcohol: アルコール業種の組み合わせのみ）
+
+    データバージョンの不一致・未計算・K不足は全組み合わせ、計算日が今日でないだけなら
+    CURRENT_DATE に依存するアルコール業種の組み合わせのみ再計算する。
+    """
+    k = k or settings.matching_topk_k
+    if force or state["status"] != "current" or state["k"] < k:
+        return SCOPE_ALL
+    if not state["computed_today"]:
+        return SCOPE_ALCOHOL
+    return None
+
+
+async def refresh_matching_topk(conn, k: Optional[int] = None, force: bool = False) -> Dict[str, Any]:
+    """上位K件を再計算して置き換える（範囲は refresh_scope で決める）
+
+    計算は REPEATABLE READ の1トランザクションで行うため、全組み合わせが同じスナップショット
+    （刻印するデータバージョンと同じ時点）から計算される。複数インスタンスの同時再計算は
+    トランザクション内の pg_try_advisory_xact_lock で排除する（PgBouncer のトランザクション
+    プーリング越しでもロックと計算が同じサーバー接続で行われ、終了時に必ず解放される）。
+    他のインスタンスが再計算中の場合は待たずに戻る（status = "busy"、次回の照合で最新になる）。
+    ロック取得後に状態が最新であれば（force でない限り）何もしない。
+
+    Raises:
+        RuntimeError: master_data_version テーブルが無い場合
+    """
+    k = k or settings.matching_topk_k
+    started = time.perf_counter()
+    async with conn.transaction(isolation="repeatable_read"):
+        if not await conn.fetchval("SELECT pg_try_advisory_xact_lock($1)", REFRESH_LOCK_ID):
+            logger.info("ℹ️ マッチング上位K件は他のインスタンスが再計算中です")
+            return {**_state, "status": "busy", "refreshed": False}
+
+        await ensure_topk_tables(conn)
+        state = await read_state(conn)
+        if state["status"] == "unsupported":
+            raise RuntimeError(
+                "master_data_version テーブルがありません（scripts/create_master_data_version.sql を実行してください）"
+            )
+        scope = refresh_scope(state, k, force)
+        if scope is None:
+            logger.info(f"✅ マッチング上位K件は最新です: {state['data_version']}")
+            return {**state, "refreshed": False}
+
+        data_version = state["db_version"]
+        combinations = await enumerate_parameters(conn)
+        if scope == SCOPE_ALCOHOL:
+            # 日付の変更のみ: 同じK件数でアルコール業種の組み合わせだけ置き換える
+            k = state["k"]
+            combinations = [params for params in combinations if params.is_alcohol_industry]
+        records: List[tuple] = []
+        for params in combinations:
+            records.extend(_records(params, await _step0_4(conn, params, k)))
+
+        # TRUNCATE は参照をブロックするため DELETE で置き換える（コミットまで旧結果が見える）
+        if scope == SCOPE_ALL:
+            await conn.execute("DELETE FROM matching_topk")
+        else:
+            await conn.execute("DELETE FROM matching_topk WHERE is_alcohol_industry")
+        await conn.copy_records_to_table("matching_topk", records=records, columns=TOPK_COLUMNS)
+        if scope == SCOPE_ALL:
+            combination_count, row_count = len(combinations), len(records)
+        else:
+            combination_count = state["combinations"]
+            row_count = await conn.fetchval("SELECT COUNT(*) FROM matching_topk")
+        duration_ms = (time.perf_counter() - started) * 1000
+        await conn.execute(
+            """
+            INSERT INTO matching_topk_state (id, data_version, computed_on, k, combinations, row_count, duration_ms, refreshed_at)
+            VALUES (1, $1, CURRENT_DATE, $2, $3, $4, $5, NOW())
+            ON CONFLICT (id) DO UPDATE SET
+                data_version = EXCLUDED.data_version,
+                computed_on = EXCLUDED.computed_on,
+                k = EXCLUDED.k,
+                combinations = EXCLUDED.combinations,
+                row_count = EXCLUDED.row_count,
+                duration_ms = EXCLUDED.duration_ms,
+                refreshed_at = EXCLUDED.refreshed_at
+            """,
+            data_version, k, combination_count, row_count, duration_ms,
+        )
+
+    stats.refreshes += 1
+    if scope == SCOPE_ALCOHOL:
+        stats.alcohol_refreshes += 1
+    _state.update(status="current", data_version=data_version, db_version=data_version, k=k,
+                  computed_on=date.today(), computed_today=True, combinations=combination_count,
+                  row_count=row_count, duration_ms=duration_ms, refreshed_at=datetime.now())
+    logger.info(
+        f"✅ マッチング上位K件を再計算（{scope}）: {data_version} 組み合わせ={len(combinations)} "
+        f"行数={len(records):,} K={k} ({duration_ms:.0f}ms)"
+    )
+    return {**_state, "scope": scope, "refreshed": True}
+
+
+async def open_connection():
+    """再計算・照合用の専用接続（長時間のトランザクションでプール接続を占有しない）"""
+    import asyncpg
+    from app.db.connection import asyncpg_connection_params
+
+    return await asyncpg.connect(**asyncpg_connection_params())
+
+
+async def refresh(k: Optional[int] = None, force: bool = False) -> Dict[str, Any]:
+    """専用接続で refresh_matching_topk を実行（管理API・バックグラウンドタスク用）"""
+    conn = await open_connection()
+    try:
+        return await refresh_matching_topk(conn, k=k, force=force)
+    except Exception:
+        stats.refresh_errors += 1
+        raise
+    finally:
+        await conn.close()
+
+
+async def watch_matching_topk(interval_seconds: int = 0) -> None:
+    """事前計算結果の鮮度を照合し、古ければ再計算する（バックグラウンドタスク用）
+
+    MATCHING_TOPK_AUTO_REFRESH=false の場合は照合のみ行い、古い間は precomputed バックエンドを
+    利用不可として統合CTEで計算する。interval_seconds > 0 の場合は定期的に再照合する。
+    """
+    while True:
+        try:
+            conn = await open_connection()
+            try:
+                state = await read_state(conn)
+            finally:
+                await conn.close()
+            _state.clear()
+            _state.update(state)
+
+            if state["status"] == "unsupported":
+                logger.info("ℹ️ master_data_version テーブルが無いため、マッチング上位K件の事前計算は行いません")
+                return
+            scope = refresh_scope(state)
+            if scope is not None and settings.matching_topk_auto_refresh:
+                logger.info(f"🔄 マッチング上位K件を再計算します（{state['status']}, {scope}）")
+                await refresh()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ マッチング上位K件の照合・再計算エラー: {e}")
+
+        if interval_seconds <= 0:
+            return
+        await asyncio.sleep(interval_seconds)
+
+
+async def lookup(params: MatchingParameters, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """事前計算結果を参照（未計算・バージョン不一致・エラー時は空リスト）
+
+    既定では保持しているK件まで返す。STEP 5.5 でおすすめタレントと重複する行を除いてから
+    30名に切り詰めるため、重複があっても4位以下を30位まで埋められる。
+    """
+    limit = limit or settings.matching_topk_k
+    try:
+        async with acquire_connection() as conn:
+            rows = await fetch_prepared(
+                conn, MATCHING_TOPK_LOOKUP_STATEMENT,
+                params.target_segment_id, params.image_item_ids, params.min_budget, params.max_budget,
+                params.is_alcohol_industry, params.is_unlimited_budget, limit,
+            )
+    except Exception as e:
+        stats.errors += 1
+        logger.error(f"❌ マッチング上位K件の参照エラー: {e}")
+        return []
+
+    if rows:
+        stats.hits += 1
+    else:
+        stats.misses += 1
+    return [dict(row) for row in rows]
+
+
+async def verify_matching_topk(conn, sample: int = 0, seed: Optional[int] = None) -> List[Dict[str, Any]]:
+    """事前計算結果と統合CTEの結果を組み合わせごとに比較（sample > 0 の場合は無作為抽出）"""
+    combinations = await enumerate_parameters(conn)
+    if 0 < sample < len(combinations):
+        combinations = random.Random(seed).sample(combinations, sample)
+
+    results = []
+    for params in combinations:
+        rows = await conn.fetch(
+            registered_statements()[MATCHING_TOPK_LOOKUP_STATEMENT],
+            params.target_segment_id, params.image_item_ids, params.min_budget, params.max_budget,
+            params.is_alcohol_industry, params.is_unlimited_budget, MAX_RESULTS,
+        )
+        live = await _step0_4(conn, params, MAX_RESULTS)
+        diff = compare_rankings([dict(r) for r in live], [dict(r) for r in rows])
+        results.append({"params": asdict(params), "precomputed_rows": len(rows), **diff})
+    return results
+
+
+def status() -> Dict[str, Any]:
+    return {
+        "enabled": settings.matching_topk_enabled,
+        "auto_refresh": settings.matching_topk_auto_refresh,
+        **_state,
+        **asdict(stats),
+    }
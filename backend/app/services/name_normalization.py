@@ -0,0 +1,30 @@
+"""タレント名の正規化（VRデータ取り込みとタレント検索で共通）
+
+import_vr_ultimate_perfect.py / import_vr_perfect_matching.py の advanced_normalize_name と
+タレント検索の索引が同じ規則で正規化するよう、ここに1か所だけ定義する。
+"""
+from typing import Any, Optional
+import re
+import unicodedata
+
+_LONG_VOWELS = re.compile(r"[−－─━ー−‐]")
+_FULLWIDTH_ALNUM = re.compile(r"[Ａ-Ｚａ-ｚ０-９]")
+_SPACES = re.compile(r"[\s\u3000\u00A0\u2000-\u200A\u2028\u2029\u202F\u205F\uFEFF]+")
+
+
+def normalize_name(name: Any) -> Optional[str]:
+    """タレント名の正規化（NFKC・長音符の統一・全角英数字の半角化・空白除去）
+
+    None / NaN は None を返す。
+    """
+    if name is None or name != name:
+        return None
+    # Unicodeの正規化（NFKCで全角→半角、濁点統合）
+    name = unicodedata.normalize("NFKC", str(name))
+    # 長音符の統一（全角ダッシュ → 長音符）
+    name = _LONG_VOWELS.sub("ー", name)
+    # 全角英数字を半角に変換
+    name = _FULLWIDTH_ALNUM.sub(lambda x: chr(ord(x.group()) - 0xFEE0), name)
+    # 各種スペースを除去
+    name = _SPACES.sub("", name)
+    return name.strip()
@@ -0,0 +1,204 @@
+"""履歴テーブルの月次パーティション管理（作成・アーカイブ・削除）
+
+scripts/partition_history_tables.sql でパーティション化した diagnosis_results・button_clicks について
+
+- 先の月のパーティションを PARTITION_MONTHS_AHEAD か月分作成しておく（作成漏れの行は
+  DEFAULT パーティションに入り、そこが肥大化するとパーティション化の効果がなくなる）
+- 保持期間（PARTITION_RETENTION_MONTHS）を過ぎた月のパーティションを gzip 圧縮CSVに書き出し、
+  件数・ハッシュを記録したマニフェストと共に PARTITION_ARCHIVE_DIR に保存してから DETACH・DROP する
+
+パーティション作成はアプリ起動時（管理系プロファイル）に毎日実行し、アーカイブ・削除は
+scripts/partition_maintenance.py（cron）から実行する。パーティション化していないDBでは何もしない。
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import re
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 親テーブル → パーティションキー
+PARTITIONED_TABLES: Dict[str, str] = {
+    "diagnosis_results": "created_at",
+    "button_clicks": "clicked_at",
+}
+
+_PARTITION_SUFFIX = re.compile(r"_p(\d{4})(\d{2})$")
+
+# 診断結果・クリックはフォーム送信より後に記録されるため、送信日時から少し前を下限にして
+# 参照するパーティションを絞る（月末をまたぐ場合も2パーティションで済む）
+HISTORY_LOOKBACK = timedelta(days=1)
+
+
+def history_lower_bound(submission_created_at: datetime) -> datetime:
+    """フォーム送信に紐づく履歴行の created_at / clicked_at の下限（パーティション絞り込み用）"""
+    return submission_created_at - HISTORY_LOOKBACK
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(parent: str, month: date) -> str:
+    return f"{parent}_p{month.year:04d}{month.month:02d}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    """パーティション名から対象月を取得（DEFAULT パーティションなどは None）"""
+    match = _PARTITION_SUFFIX.search(name)
+    if match is None:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+def create_partition_sql(parent: str, month: date) -> str:
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(parent, month)}" PARTITION OF "{parent}" '
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def expired_partitions(names: List[str], today: date, retention_months: int) -> List[str]:
+    """保持期間を過ぎた月のパーティション（当月を含めて retention_months か月より前の月）"""
+    cutoff = add_months(month_start(today), -retention_months)
+    return sorted(
+        name for name in names
+        if (month := partition_month(name)) is not None and month < cutoff
+    )
+
+
+async def is_partitioned(conn, parent: str) -> bool:
+    return bool(await conn.fetchval(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass($1))", parent
+    ))
+
+
+async def list_partitions(conn, parent: str) -> List[str]:
+    rows = await conn.fetch(
+        """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass($1)
+        ORDER BY c.relname
+        """,
+        parent,
+    )
+    return [row["relname"] for row in rows]
+
+
+async def ensure_future_partitions(conn, months_ahead: Optional[int] = None, today: Optional[date] = None) -> List[str]:
+    """当月から months_ahead か月先までのパーティションを作成（作成したパーティション名を返す）"""
+    months_ahead = settings.partition_months_ahead if months_ahead is None else months_ahead
+    current = month_start(today or date.today())
+    created = []
+    for parent in PARTITIONED_TABLES:
+        if not await is_partitioned(conn, parent):
+            continue
+        existing = set(await list_partitions(conn, parent))
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            name = partition_name(parent, month)
+            if name in existing:
+                continue
+            try:
+                await conn.execute(create_partition_sql(parent, month))
+                created.append(name)
+            except Exception as e:
+                # DEFAULT パーティションに同じ月の行がある場合は作成できない（手動で移動が必要）
+                logger.error(f"❌ パーティション作成失敗: {name}: {e}")
+    if created:
+        logger.info(f"✅ パーティションを作成: {', '.join(created)}")
+    return created
+
+
+async def archive_partition(conn, parent: str, name: str, archive_dir: Path) -> Dict[str, Any]:
+    """パーティションを gzip 圧縮CSVに書き出し、マニフェストを保存してから DETACH・DROP する"""
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    data_path = archive_dir / f"{name}.csv.gz"
+    rows = await conn.fetchval(f'SELECT COUNT(*) FROM "{name}"')
+
+    digest = hashlib.sha256()
+    with gzip.open(data_path, "wb", compresslevel=9) as out:
+        async def write(chunk: bytes) -> None:
+            digest.update(chunk)
+            out.write(chunk)
+
+        await conn.copy_from_table(name, output=write, format="csv", header=True)
+
+    manifest = {
+        "table": parent,
+        "partition": name,
+        "month": partition_month(name).isoformat(),
+        "rows": rows,
+        "sha256": digest.hexdigest(),
+        "compressed_bytes": data_path.stat().st_size,
+        "archived_at": datetime.now().isoformat(),
+    }
+    (archive_dir / f"{name}.json").write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    # 書き出しが終わってから切り離す（失敗時はパーティションが残る）
+    async with conn.transaction():
+        await conn.execute(f'ALTER TABLE "{parent}" DETACH PARTITION "{name}"')
+        await conn.execute(f'DROP TABLE "{name}"')
+    logger.info(f"📦 パーティションをアーカイブ: {name} ({rows:,}行 → {manifest['compressed_bytes']:,} bytes)")
+    return manifest
+
+
+@dataclass
+class RetentionResult:
+    archived: List[Dict[str, Any]]
+    expired: List[str]
+    dry_run: bool
+
+
+async def run_retention(
+    conn,
+    retention_months: Optional[int] = None,
+    archive_dir: Optional[str] = None,
+    dry_run: bool = False,
+    today: Optional[date] = None,
+) -> RetentionResult:
+    """保持期間を過ぎたパーティションをアーカイブして削除（dry_run では対象の列挙のみ）"""
+    retention_months = settings.partition_retention_months if retention_months is None else retention_months
+    directory = Path(archive_dir or settings.partition_archive_dir)
+    expired: List[str] = []
+    archived: List[Dict[str, Any]] = []
+    for parent in PARTITIONED_TABLES:
+        if not await is_partitioned(conn, parent):
+            continue
+        names = expired_partitions(await list_partitions(conn, parent), today or date.today(), retention_months)
+        expired.extend(names)
+        if dry_run:
+            continue
+        for name in names:
+            archived.append(await archive_partition(conn, parent, name, directory / parent))
+    return RetentionResult(archived=archived, expired=expired, dry_run=dry_run)
+
+
+async def watch_partitions(interval_seconds: int = 86400) -> None:
+    """先の月のパーティションを定期的に作成（バックグラウンドタスク用）"""
+    from app.db.connection import acquire_connection
+
+    while True:
+        try:
+            async with acquire_connection() as conn:
+                await ensure_future_partitions(conn)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ パーティション作成エラー: {e}")
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,41 @@
+"""おすすめタレントのマッチング用参照（STEP 5.5）
+
+/api/matching（public プロファイル）から呼ばれるため、管理画面の CRUD ルーター
+（app/api/endpoints/recommended_talents.py、admin ワークロード）とは分けて置く。
+"""
+from typing import Dict, List
+
+from app.db.connection import acquire_connection
+from app.db.prepared_statements import register_statement, fetch_prepared
+
+# マッチング実行ごとに呼ばれるためプリペアドステートメントとして登録
+RECOMMENDED_FOR_MATCHING_STATEMENT = register_statement("recommended_talents_for_matching", """
+    SELECT
+        ma.account_id,
+        ma.name_full_for_matching as name,
+        ma.last_name_kana,
+        ma.act_genre,
+        'recommended' as talent_type
+    FROM recommended_talents rt
+    INNER JOIN m_account ma ON (
+        (rt.talent_id_1 IS NOT NULL AND ma.account_id = rt.talent_id_1)
+        OR (rt.talent_id_2 IS NOT NULL AND ma.account_id = rt.talent_id_2)
+        OR (rt.talent_id_3 IS NOT NULL AND ma.account_id = rt.talent_id_3)
+    )
+    WHERE rt.industry_name = $1
+        AND ma.del_flag = 0
+    ORDER BY
+        CASE
+            WHEN ma.account_id = rt.talent_id_1 THEN 1
+            WHEN ma.account_id = rt.talent_id_2 THEN 2
+            WHEN ma.account_id = rt.talent_id_3 THEN 3
+        END
+""")
+
+
+async def get_recommended_talents_for_matching(industry_name: str) -> List[Dict]:
+    """マッチングロジック用：業界別おすすめタレント取得"""
+    async with acquire_connection() as conn:
+        rows = await fetch_prepared(conn, RECOMMENDED_FOR_MATCHING_STATEMENT, industry_name)
+
+        return [dict(row) for row in rows]
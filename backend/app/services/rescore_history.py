@@ -0,0 +1,267 @@
+"""過去のフォーム送信の一括再スコアリング（順位差分レポート）
+
+スコアデータ・おすすめタレントの更新後に、過去のリードの診断結果が現在のデータでどう変わるかを
+確認するためのバッチ処理。
+
+1. form_submissions を (業種, ターゲット層, 予算区分) でグループ化し、グループごとに
+   run_matching_pipeline を1回だけ実行する（10万件でも計算回数は組み合わせ数で頭打ち）
+2. フォーム送信を保存済みの診断結果（互換ビュー経由）と共にカーソルで1回だけ読み、
+   送信ごとの順位差分をその場でレポートへ書き出す（全件をメモリに載せない）
+
+STEP 5 のマッチングスコアは順位帯内の乱数を含むため、差分は順位のみを比較する。
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from app.services.diagnosis_storage import diagnosis_relation
+from app.services.partition_maintenance import HISTORY_LOOKBACK
+
+logger = logging.getLogger(__name__)
+
+GroupKey = Tuple[str, str, str]
+Ranker = Callable[[str, str, str], Awaitable[List[Dict[str, Any]]]]
+
+REPORT_COLUMNS = [
+    "form_submission_id",
+    "session_id",
+    "submitted_at",
+    "industry",
+    "target_segment",
+    "budget_range",
+    "talent_account_id",
+    "talent_name",
+    "previous_ranking",
+    "new_ranking",
+    "rank_delta",
+    "status",
+]
+
+# 順位が上がった場合の rank_delta は正（previous_ranking - new_ranking）
+STATUS_SAME = "same"
+STATUS_UP = "up"
+STATUS_DOWN = "down"
+STATUS_NEW = "new"
+STATUS_DROPPED = "dropped"
+
+GROUP_QUERY = """
+    SELECT industry, target_segment, budget_range, COUNT(*) AS submissions
+    FROM form_submissions
+    WHERE ($1::timestamp IS NULL OR created_at >= $1)
+      AND ($2::timestamp IS NULL OR created_at < $2)
+    GROUP BY industry, target_segment, budget_range
+    ORDER BY COUNT(*) DESC
+"""
+
+
+def submission_query(relation: str) -> str:
+    """フォーム送信と保存済み診断結果（順位順の配列）を1行で返すクエリ"""
+    return f"""
+        SELECT
+            fs.id, fs.session_id, fs.created_at, fs.industry, fs.target_segment, fs.budget_range,
+            prev.account_ids AS previous_account_ids,
+            prev.names AS previous_names
+        FROM form_submissions fs
+        LEFT JOIN LATERAL (
+            SELECT
+                array_agg(dr.talent_account_id ORDER BY dr.ranking) AS account_ids,
+                array_agg(dr.talent_name ORDER BY dr.ranking) AS names
+            FROM {relation} dr
+            WHERE dr.form_submission_id = fs.id
+              AND dr.created_at >= fs.created_at - $3::interval
+        ) prev ON TRUE
+        WHERE ($1::timestamp IS NULL OR fs.created_at >= $1)
+          AND ($2::timestamp IS NULL OR fs.created_at < $2)
+        ORDER BY fs.id
+    """
+
+
+@dataclass
+class RankDelta:
+    talent_account_id: int
+    talent_name: str
+    previous_ranking: Optional[int]
+    new_ranking: Optional[int]
+
+    @property
+    def rank_delta(self) -> Optional[int]:
+        if self.previous_ranking is None or self.new_ranking is None:
+            return None
+        return self.previous_ranking - self.new_ranking
+
+    @property
+    def status(self) -> str:
+        if self.previous_ranking is None:
+            return STATUS_NEW
+        if self.new_ranking is None:
+            return STATUS_DROPPED
+        if self.rank_delta > 0:
+            return STATUS_UP
+        if self.rank_delta < 0:
+            return STATUS_DOWN
+        return STATUS_SAME
+
+
+def rank_deltas(
+    previous_ids: Optional[List[int]],
+    previous_names: Optional[List[str]],
+    ranking: List[Dict[str, Any]],
+) -> List[RankDelta]:
+    """保存済みの順位（配列の位置 = 順位）と再計算結果を比較（新しい順位順 → 圏外になったタレント）"""
+    previous_ids = previous_ids or []
+    previous_names = previous_names or []
+    previous_rank = {account_id: index + 1 for index, account_id in enumerate(previous_ids)}
+    new_ids = {talent["account_id"] for talent in ranking}
+
+    deltas = [
+        RankDelta(
+            talent_account_id=talent["account_id"],
+            talent_name=talent["name"],
+            previous_ranking=previous_rank.get(talent["account_id"]),
+            new_ranking=talent["ranking"],
+        )
+        for talent in sorted(ranking, key=lambda talent: talent["ranking"])
+    ]
+    deltas.extend(
+        RankDelta(
+            talent_account_id=account_id,
+            talent_name=previous_names[index] if index < len(previous_names) else "",
+            previous_ranking=index + 1,
+            new_ranking=None,
+        )
+        for index, account_id in enumerate(previous_ids)
+        if account_id not in new_ids
+    )
+    return deltas
+
+
+@dataclass
+class RescoreSummary:
+    groups: int = 0
+    matching_runs: int = 0
+    failed_groups: List[Dict[str, Any]] = field(default_factory=list)
+    submissions: int = 0
+    skipped_submissions: int = 0
+    without_previous: int = 0
+    changed_submissions: int = 0
+    report_rows: int = 0
+    ranking_seconds: float = 0.0
+    report_seconds: float = 0.0
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "groups": self.groups,
+            "matching_runs": self.matching_runs,
+            "failed_groups": self.failed_groups,
+            "submissions": self.submissions,
+            "skipped_submissions": self.skipped_submissions,
+            "without_previous": self.without_previous,
+            "changed_submissions": self.changed_submissions,
+            "report_rows": self.report_rows,
+            "ranking_seconds": round(self.ranking_seconds, 2),
+            "report_seconds": round(self.report_seconds, 2),
+        }
+
+
+async def _default_ranker(industry: str, target_segment: str, budget_range: str) -> List[Dict[str, Any]]:
+    from app.api.endpoints.matching import run_matching_pipeline
+
+    return await run_matching_pipeline(industry, target_segment, budget_range)
+
+
+async def compute_group_rankings(
+    groups: List[GroupKey],
+    rank: Ranker,
+    summary: RescoreSummary,
+    concurrency: int = 4,
+) -> Dict[GroupKey, List[Dict[str, Any]]]:
+    """グループごとに1回だけマッチングを実行（順位・ID・名前のみ保持）"""
+    semaphore = asyncio.Semaphore(concurrency)
+    rankings: Dict[GroupKey, List[Dict[str, Any]]] = {}
+
+    async def run(key: GroupKey) -> None:
+        async with semaphore:
+            try:
+                results = await rank(*key)
+            except Exception as e:
+                # マスタから消えた業種・予算区分など（その送信はレポート対象外）
+                detail = getattr(e, "detail", None) or str(e)
+                summary.failed_groups.append({
+                    "industry": key[0], "target_segment": key[1], "budget_range": key[2], "error": detail,
+                })
+                logger.warning(f"⚠️ 再計算できない組み合わせ: {key}: {detail}")
+                return
+            summary.matching_runs += 1
+            rankings[key] = [
+                {"account_id": r["account_id"], "name": r["name"], "ranking": r["ranking"]}
+                for r in results
+            ]
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run(key) for key in groups))
+    summary.ranking_seconds = time.perf_counter() - started
+    return rankings
+
+
+async def rescore_submissions(
+    conn,
+    write_row: Callable[[List[Any]], None],
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    rank: Optional[Ranker] = None,
+    concurrency: int = 4,
+    prefetch: int = 1000,
+) -> RescoreSummary:
+    """過去のフォーム送信を再スコアリングし、順位差分を1行ずつ write_row へ書き出す
+
+    Args:
+        conn: asyncpg 接続（フォーム送信の読み出し用。マッチングは接続プールで実行）
+        write_row: REPORT_COLUMNS 順のリストを受け取る関数（csv.writer.writerow など）
+        since / until: 対象とするフォーム送信の created_at 範囲（未指定は全件）
+        rank: (業種, ターゲット層, 予算区分) → マッチング結果（既定: run_matching_pipeline）
+    """
+    summary = RescoreSummary()
+    group_rows = await conn.fetch(GROUP_QUERY, since, until)
+    groups = [(row["industry"], row["target_segment"], row["budget_range"]) for row in group_rows]
+    summary.groups = len(groups)
+    logger.info(f"🔁 再スコアリング: {sum(row['submissions'] for row in group_rows):,}件 / {len(groups):,}組み合わせ")
+
+    rankings = await compute_group_rankings(groups, rank or _default_ranker, summary, concurrency=concurrency)
+
+    started = time.perf_counter()
+    async with conn.transaction():
+        query = submission_query(diagnosis_relation())
+        async for row in conn.cursor(query, since, until, HISTORY_LOOKBACK, prefetch=prefetch):
+            summary.submissions += 1
+            ranking = rankings.get((row["industry"], row["target_segment"], row["budget_range"]))
+            if ranking is None:
+                summary.skipped_submissions += 1
+                continue
+            if not row["previous_account_ids"]:
+                summary.without_previous += 1
+
+            deltas = rank_deltas(row["previous_account_ids"], row["previous_names"], ranking)
+            if any(delta.status != STATUS_SAME for delta in deltas):
+                summary.changed_submissions += 1
+            submitted_at = row["created_at"].isoformat() if row["created_at"] else ""
+            for delta in deltas:
+                write_row([
+                    row["id"],
+                    row["session_id"],
+                    submitted_at,
+                    row["industry"],
+                    row["target_segment"],
+                    row["budget_range"],
+                    delta.talent_account_id,
+                    delta.talent_name,
+                    delta.previous_ranking,
+                    delta.new_ranking,
+                    delta.rank_delta,
+                    delta.status,
+                ])
+                summary.report_rows += 1
+    summary.report_seconds = time.perf_counter() - started
+    return summary
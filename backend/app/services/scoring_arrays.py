@@ -0,0 +1,391 @@
+"""スコアリング配列スナップショット（メモリマップ・コールドスタート高速化）
+
+ビルド時にマッチング STEP 0-4 に必要なスコア配列とマスタデータをデータバージョン付きの
+バイナリ成果物として書き出し、APIは起動時にそれをメモリマップするだけで最初のマッチングを
+処理できるようにする。コールドスタート直後の初回マッチングがDBレイテンシに依存しない。
+
+ディレクトリ構成:
+    <path>/manifest.json        フォーマット・データバージョン・配列の dtype / shape
+    <path>/master.json          業種・ターゲット層・予算区分・おすすめタレント・タレント表示項目
+    <path>/account_ids.npy      int64   [N]        有効タレント（del_flag=0 かつ m_talent_act あり）
+    <path>/money.npy            float64 [N]        代表出演料（NULLはNaN）
+    <path>/birthday_days.npy    int32   [N]        生年月日（1970-01-01からの日数、NULLは最小値）
+    <path>/base_power.npy       float64 [S, N]     STEP 1 基礎パワー得点（talent_scores行なしはNaN）
+    <path>/image_percentile.npy float64 [S, 7, N]  STEP 2 PERCENT_RANK（talent_images行なしはNaN）
+
+STEP 2 の PERCENT_RANK はセグメント内の全 talent_images 行を母集団として計算済みのため、
+実行時は加減点テーブルの適用と平均だけで済む（加減点テーブルを差し替えた試算にも使える）。
+
+DBとのデータバージョン照合は起動後にバックグラウンドで行い、不一致の場合は配列を無効化して
+SQL CTE版（execute_matching_logic）へフォールバックする。
+"""
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+import asyncio
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+from app.services import local_matching
+from app.services.local_matching import MatchingParameters
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+MASTER_FILE = "master.json"
+ARRAY_NAMES = ("account_ids", "money", "birthday_days", "base_power", "image_percentile")
+NULL_BIRTHDAY = np.iinfo(np.int32).min
+EPOCH = date(1970, 1, 1)
+
+# マスタとして master.json に含めるテーブル
+MASTER_TABLES = ("industries", "target_segments", "budget_ranges", "recommended_talents")
+# タレント表示項目（execute_matching_logic の戻り値と同じキー → m_account 列）
+TALENT_FIELDS = {
+    "name": "name_full_for_matching",
+    "last_name_kana": "last_name_kana",
+    "act_genre": "act_genre",
+    "company_name": "company_name",
+}
+
+
+class ScoringArrays:
+    """STEP 0-4 用のスコア配列 + マスタデータ"""
+
+    def __init__(
+        self,
+        arrays: Dict[str, np.ndarray],
+        segment_ids: List[int],
+        master: Dict[str, List[Dict[str, Any]]],
+        talents: Dict[str, List[Optional[str]]],
+        data_version: str,
+        created_at: Optional[str] = None,
+    ) -> None:
+        self.account_ids = arrays["account_ids"]
+        self.money = arrays["money"]
+        self.birthday_days = arrays["birthday_days"]
+        self.base_power = arrays["base_power"]
+        self.image_percentile = arrays["image_percentile"]
+        self.segment_ids = list(segment_ids)
+        self.master = master
+        self.talents = talents
+        self.data_version = data_version
+        self.created_at = created_at or datetime.now().isoformat()
+
+        self._segment_index = {segment_id: i for i, segment_id in enumerate(self.segment_ids)}
+        self._master_frames = {name: pd.DataFrame(master.get(name, [])) for name in MASTER_TABLES}
+
+    @property
+    def talent_count(self) -> int:
+        return int(self.account_ids.shape[0])
+
+    # ===== 構築・保存・読み込み =====
+
+    @classmethod
+    def from_tables(cls, tables: Dict[str, pd.DataFrame], data_version: str) -> "ScoringArrays":
+        """スナップショットと同じ形式のDataFrame辞書から配列を構築"""
+        accounts = tables["m_account"]
+        talents = (
+            accounts[accounts["del_flag"] == 0]
+            .merge(tables["m_talent_act"], on="account_id", how="inner", suffixes=("", "_act"))
+            .drop_duplicates(subset="account_id")
+            .sort_values("account_id")
+            .reset_index(drop=True)
+        )
+        account_ids = talents["account_id"].to_numpy(dtype=np.int64)
+        position = pd.Series(np.arange(len(account_ids)), index=account_ids)
+
+        money = local_matching.representative_money(talents).to_numpy(dtype=np.float64)
+        birthdays = pd.to_datetime(talents["birthday"], errors="coerce")
+        birthday_days = (
+            ((birthdays - pd.Timestamp(EPOCH)).dt.days).fillna(NULL_BIRTHDAY).to_numpy(dtype=np.int32)
+        )
+
+        segment_ids = sorted(int(s) for s in tables["target_segments"]["target_segment_id"])
+        segment_index = {segment_id: i for i, segment_id in enumerate(segment_ids)}
+
+        # STEP 1: 基礎パワー得点
+        base_power = np.full((len(segment_ids), len(account_ids)), np.nan)
+        scores = tables["talent_scores"].drop_duplicates(subset=["account_id", "target_segment_id"])
+        base = (
+            pd.to_numeric(scores["vr_popularity"], errors="coerce").fillna(0)
+            + pd.to_numeric(scores["tpr_power_score"], errors="coerce").fillna(0)
+        ) / 2.0
+        seg_pos = scores["target_segment_id"].map(segment_index)
+        talent_pos = scores["account_id"].map(position)
+        valid = (seg_pos.notna() & talent_pos.notna()).to_numpy()
+        base_power[
+            seg_pos[valid].to_numpy(dtype=np.int64), talent_pos[valid].to_numpy(dtype=np.int64)
+        ] = base[valid].to_numpy(dtype=np.float64)
+
+        # STEP 2: PERCENT_RANK（セグメント内の全行が母集団）
+        image_ids = local_matching.ALL_IMAGE_ITEM_IDS
+        image_percentile = np.full((len(segment_ids), len(image_ids), len(account_ids)), np.nan)
+        images = tables["talent_images"]
+        for segment_id, s in segment_index.items():
+            segment_images = images[images["target_segment_id"] == segment_id]
+            if segment_images.empty:
+                continue
+            first_row = ~segment_images["account_id"].duplicated().to_numpy()
+            talent_pos = segment_images["account_id"].map(position).to_numpy()
+            keep = first_row & ~pd.isna(talent_pos)
+            target = talent_pos[keep].astype(np.int64)
+            for k, image_id in enumerate(image_ids):
+                column = local_matching.IMAGE_COLUMNS_BY_ID[image_id]
+                percentile = local_matching.percent_rank_desc(segment_images[column])
+                image_percentile[s, k, target] = percentile[keep]
+
+        master = {name: _records(tables[name]) for name in MASTER_TABLES if name in tables}
+        talent_fields = {
+            key: [_json_value(v) for v in talents[column].tolist()]
+            for key, column in TALENT_FIELDS.items()
+        }
+
+        return cls(
+            arrays={
+                "account_ids": account_ids,
+                "money": money,
+                "birthday_days": birthday_days,
+                "base_power": base_power,
+                "image_percentile": image_percentile,
+            },
+            segment_ids=segment_ids,
+            master=master,
+            talents=talent_fields,
+            data_version=data_version,
+        )
+
+    def save(self, path: Union[str, Path]) -> Path:
+        """配列を .npy（非圧縮・メモリマップ可能）で書き出す"""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+
+        arrays_manifest: Dict[str, Any] = {}
+        for name in ARRAY_NAMES:
+            array = np.ascontiguousarray(getattr(self, name))
+            np.save(path / f"{name}.npy", array, allow_pickle=False)
+            arrays_manifest[name] = {"file": f"{name}.npy", "dtype": str(array.dtype), "shape": list(array.shape)}
+
+        master_payload = {"master": self.master, "talents": self.talents}
+        (path / MASTER_FILE).write_text(
+            json.dumps(master_payload, ensure_ascii=False, default=_json_value), encoding="utf-8"
+        )
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "data_version": self.data_version,
+            "created_at": self.created_at,
+            "segment_ids": self.segment_ids,
+            "talent_count": self.talent_count,
+            "arrays": arrays_manifest,
+        }
+        (path / MANIFEST_FILE).write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+        return path
+
+    @classmethod
+    def load(cls, path: Union[str, Path], mmap: bool = True) -> "ScoringArrays":
+        """成果物を読み込む（mmap=True の場合は配列をメモリマップし、ページは参照時に読み込まれる）
+
+        Raises:
+            FileNotFoundError: 成果物が存在しない場合
+            ValueError: フォーマットバージョンや配列形状が一致しない場合
+        """
+        path = Path(path)
+        manifest_path = path / MANIFEST_FILE
+        if not manifest_path.exists():
+            raise FileNotFoundError(f"スコアリング配列が見つかりません: {path}")
+
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"未対応のスコアリング配列フォーマットです: {manifest.get('format_version')}")
+
+        arrays = {}
+        for name in ARRAY_NAMES:
+            entry = manifest["arrays"][name]
+            array = np.load(path / entry["file"], mmap_mode="r" if mmap else None, allow_pickle=False)
+            if list(array.shape) != entry["shape"]:
+                raise ValueError(f"配列形状がマニフェストと一致しません: {name} {array.shape} != {entry['shape']}")
+            arrays[name] = array
+
+        payload = json.loads((path / MASTER_FILE).read_text(encoding="utf-8"))
+        return cls(
+            arrays=arrays,
+            segment_ids=manifest["segment_ids"],
+            master=payload["master"],
+            talents=payload["talents"],
+            data_version=manifest["data_version"],
+            created_at=manifest.get("created_at"),
+        )
+
+    # ===== マッチング =====
+
+    def resolve_parameters(self, budget_name: str, target_segment_name: str, industry_name: str) -> MatchingParameters:
+        """マスタデータからマッチングパラメータを解決（get_matching_parameters と同一仕様）
+
+        Raises:
+            ValueError: 予算区分・ターゲット層・業種のいずれかが見つからない場合
+        """
+        return local_matching.resolve_parameters(self._master_frames, budget_name, target_segment_name, industry_name)
+
+    def match(
+        self,
+        params: MatchingParameters,
+        limit: int = local_matching.MAX_RESULTS,
+        today: Optional[date] = None,
+        bands=local_matching.IMAGE_ADJUSTMENT_BANDS,
+    ) -> List[Dict]:
+        """STEP 0-4 を実行し、execute_matching_logic と同じ形式の辞書リストを返す"""
+        s = self._segment_index.get(params.target_segment_id)
+        if s is None:
+            return []
+
+        # STEP 0: 予算フィルタ + アルコール業界年齢フィルタ
+        money = self.money
+        has_money = ~np.isnan(money)
+        mask = has_money & (money >= params.min_budget) & (money < params.max_budget)
+        if params.is_unlimited_budget:
+            mask |= ~has_money
+        if params.is_alcohol_industry:
+            cutoff = local_matching.age_cutoff_date(local_matching.ALCOHOL_MIN_AGE, today or date.today())
+            cutoff_days = (cutoff - EPOCH).days
+            mask &= (self.birthday_days == NULL_BIRTHDAY) | (self.birthday_days <= cutoff_days)
+
+        # STEP 1: talent_scores 行があるタレントのみ
+        base_power = self.base_power[s]
+        mask &= ~np.isnan(base_power)
+        idx = np.flatnonzero(mask)
+        if idx.size == 0:
+            return []
+
+        # STEP 2-3: 加減点の平均（talent_images 行なしは0）
+        image_rows = [local_matching.ALL_IMAGE_ITEM_IDS.index(image_id) for image_id in params.image_item_ids]
+        percentile = np.asarray(self.image_percentile[s][image_rows][:, idx])
+        present = ~np.isnan(percentile)
+        points = np.where(present, local_matching.band_points(percentile, bands), 0.0)
+        counts = present.sum(axis=0)
+        adjustment = np.divide(points.sum(axis=0), counts, out=np.zeros(idx.size), where=counts > 0)
+
+        base = np.asarray(base_power[idx])
+        reflected = base + adjustment
+        account_ids = np.asarray(self.account_ids[idx])
+
+        # STEP 4: reflected_score DESC, base_power_score DESC, account_id
+        order = np.lexsort((account_ids, -base, -reflected))[:limit]
+
+        results = []
+        for ranking, i in enumerate(order, start=1):
+            talent_pos = int(idx[i])
+            result = {
+                "account_id": int(account_ids[i]),
+                "target_segment_id": int(params.target_segment_id),
+                "base_power_score": float(base[i]),
+                "image_adjustment": float(adjustment[i]),
+                "reflected_score": float(reflected[i]),
+                "ranking": ranking,
+            }
+            for key in TALENT_FIELDS:
+                result[key] = self.talents[key][talent_pos]
+            results.append(result)
+        return results
+
+
+# ===== API起動時の読み込みとバージョン照合 =====
+
+_scoring_arrays: Optional[ScoringArrays] = None
+_version_status: str = "unloaded"  # unloaded / unverified / current / stale
+
+
+def load_scoring_arrays(path: Union[str, Path]) -> Optional[ScoringArrays]:
+    """起動時にスコアリング配列をメモリマップする（失敗時はSQL版で動作を継続）"""
+    global _scoring_arrays, _version_status
+    try:
+        _scoring_arrays = ScoringArrays.load(path, mmap=True)
+    except (FileNotFoundError, ValueError, KeyError, OSError) as e:
+        logger.warning(f"⚠️ スコアリング配列を読み込めませんでした（SQL版で動作）: {e}")
+        _scoring_arrays = None
+        _version_status = "unloaded"
+        return None
+
+    _version_status = "unverified"
+    logger.info(
+        f"✅ スコアリング配列読み込み: {path} "
+        f"(データバージョン: {_scoring_arrays.data_version}, タレント数: {_scoring_arrays.talent_count:,})"
+    )
+    return _scoring_arrays
+
+
+def get_scoring_arrays() -> Optional[ScoringArrays]:
+    """マッチングに使用できるスコアリング配列を返す（未読み込み・DBと不一致の場合は None）"""
+    if _scoring_arrays is None or _version_status == "stale":
+        return None
+    return _scoring_arrays
+
+
+def get_scoring_arrays_status() -> Dict[str, Any]:
+    """ヘルスチェック・管理画面向けの状態"""
+    return {
+        "status": _version_status,
+        "data_version": _scoring_arrays.data_version if _scoring_arrays else None,
+        "created_at": _scoring_arrays.created_at if _scoring_arrays else None,
+        "talent_count": _scoring_arrays.talent_count if _scoring_arrays else 0,
+    }
+
+
+async def verify_scoring_arrays_version(interval_seconds: int = 0) -> None:
+    """DBのデータバージョンと照合し、不一致なら配列を無効化する（バックグラウンドタスク用）
+
+    interval_seconds > 0 の場合は定期的に再照合する。master_data_version テーブルが無い環境では
+    フィンガープリント計算が全件走査になるため、照合は1回だけ行う。
+    """
+    global _version_status
+    from app.db.connection import acquire_connection
+    from app.db.data_version import fetch_data_version
+
+    while _scoring_arrays is not None and _version_status != "stale":
+        try:
+            async with acquire_connection() as conn:
+                db_version = await fetch_data_version(conn)
+
+            if db_version == _scoring_arrays.data_version:
+                _version_status = "current"
+            else:
+                _version_status = "stale"
+                logger.warning(
+                    f"⚠️ スコアリング配列のデータバージョンがDBと一致しません "
+                    f"(配列: {_scoring_arrays.data_version}, DB: {db_version})。SQL版にフォールバックします"
+                )
+                return
+
+            if db_version.startswith("fp-"):
+                return
+        except Exception as e:
+            logger.error(f"❌ スコアリング配列のバージョン照合エラー: {e}")
+
+        if interval_seconds <= 0:
+            return
+        await asyncio.sleep(interval_seconds)
+
+
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    return [
+        {key: _json_value(value) for key, value in row.items()}
+        for row in df.to_dict(orient="records")
+    ]
+
+
+def _json_value(value):
+    """numpy / pandas の値をJSONに書ける値へ変換（欠損は None）"""
+    if value is None:
+        return None
+    if isinstance(value, (np.integer,)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, (date, datetime, pd.Timestamp)):
+        return value.isoformat()
+    if value is pd.NaT or value is pd.NA:
+        return None
+    return value
@@ -0,0 +1,294 @@
+"""スコアリング変更の試算（STEP 1 の重み・STEP 2 の加減点テーブル）
+
+本番SQLの STEP 1「(VR人気度 + TPRパワースコア) / 2」と STEP 2 のパーセンタイル帯（≤15% → +12 … >85% → −12）
+を差し替えた場合に、全 (業種, ターゲット層, 予算区分) の組み合わせで上位30名がどれだけ変わるかを
+メモリ上のスコアリングデータ（スナップショット、またはDBから1回だけ読み込んだコピー）で計算する。
+計算は local_matching（STEP 0-4 のインメモリ実装）で行い、試算中は本番DBに問い合わせない。
+
+STEP 5.5 のおすすめタレント固定枠と STEP 5 のスコア振り分けはスコアリングに依存しないため比較対象外。
+"""
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import asyncio
+import logging
+import time
+
+import pandas as pd
+
+from app.core.config import settings
+from app.services import local_matching
+
+logger = logging.getLogger(__name__)
+
+OVERLAP_DEPTHS = (3, 10, 30)
+WORST_COMBINATIONS = 10
+
+Combination = Tuple[str, str, str]
+
+
+@dataclass(frozen=True)
+class ScoringVariant:
+    """試算するスコアリング設定（既定値は本番と同じ）"""
+    vr_weight: float = local_matching.BASE_POWER_WEIGHTS[0]
+    tpr_weight: float = local_matching.BASE_POWER_WEIGHTS[1]
+    # (PERCENT_RANK の上限値, 加減点) を上限値の昇順で。最後の上限値は 1.0
+    bands: Tuple[Tuple[float, float], ...] = tuple(local_matching.IMAGE_ADJUSTMENT_BANDS)
+
+    def __post_init__(self) -> None:
+        # キャッシュキーにするため、リストで渡された加減点テーブルもタプルに揃える
+        object.__setattr__(self, "vr_weight", float(self.vr_weight))
+        object.__setattr__(self, "tpr_weight", float(self.tpr_weight))
+        object.__setattr__(self, "bands", tuple((float(upper), float(points)) for upper, points in self.bands))
+
+    def validate(self) -> None:
+        """Raises: ValueError（重み・加減点テーブルが不正な場合）"""
+        if self.vr_weight < 0 or self.tpr_weight < 0 or self.vr_weight + self.tpr_weight <= 0:
+            raise ValueError(f"重みは0以上かつ合計が正である必要があります: vr={self.vr_weight}, tpr={self.tpr_weight}")
+        if not self.bands:
+            raise ValueError("加減点テーブルが空です")
+        uppers = [upper for upper, _ in self.bands]
+        if any(b <= a for a, b in zip(uppers, uppers[1:])) or uppers[0] <= 0:
+            raise ValueError(f"加減点テーブルの上限値は0より大きい昇順である必要があります: {uppers}")
+        if uppers[-1] != 1.0:
+            raise ValueError(f"加減点テーブルの最後の上限値は1.0である必要があります: {uppers[-1]}")
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "vr_weight": self.vr_weight,
+            "tpr_weight": self.tpr_weight,
+            "bands": [{"upper": upper, "points": points} for upper, points in self.bands],
+        }
+
+
+def enumerate_combinations(tables: Dict[str, pd.DataFrame]) -> List[Combination]:
+    """マスタにある全 (業種, ターゲット層, 予算区分) の組み合わせ"""
+    return [
+        (industry, segment, budget)
+        for industry in tables["industries"]["industry_name"].dropna().astype(str)
+        for segment in tables["target_segments"]["segment_name"].dropna().astype(str)
+        for budget in tables["budget_ranges"]["range_name"].dropna().astype(str)
+    ]
+
+
+def ranking_overlap(baseline: Sequence[int], variant: Sequence[int]) -> Dict[str, Any]:
+    """2つの順位リスト（account_id の順位順）の一致度"""
+    metrics: Dict[str, Any] = {}
+    for depth in OVERLAP_DEPTHS:
+        top_baseline, top_variant = set(baseline[:depth]), set(variant[:depth])
+        size = max(len(top_baseline), len(top_variant))
+        metrics[f"overlap_at_{depth}"] = len(top_baseline & top_variant) / size if size else 1.0
+
+    variant_rank = {account_id: index for index, account_id in enumerate(variant)}
+    shifts = [abs(index - variant_rank[a]) for index, a in enumerate(baseline) if a in variant_rank]
+    metrics["mean_abs_rank_shift"] = sum(shifts) / len(shifts) if shifts else 0.0
+    metrics["entered"] = len(set(variant) - set(baseline))
+    metrics["top1_changed"] = list(baseline[:1]) != list(variant[:1])
+    return metrics
+
+
+@dataclass
+class SimulationResult:
+    variant: ScoringVariant
+    baseline: ScoringVariant
+    combinations: int = 0
+    skipped: int = 0
+    summary: Dict[str, Any] = field(default_factory=dict)
+    worst: List[Dict[str, Any]] = field(default_factory=list)
+    duration_seconds: float = 0.0
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "variant": self.variant.describe(),
+            "baseline": self.baseline.describe(),
+            "combinations": self.combinations,
+            "skipped": self.skipped,
+            "summary": self.summary,
+            "worst": self.worst,
+            "duration_seconds": round(self.duration_seconds, 3),
+        }
+
+
+class ScoringSimulator:
+    """メモリ上のスコアリングデータに対する試算
+
+    組み合わせは MatchingParameters.key() が同じなら同じ順位になるため、順位はキーごとに1回だけ計算する。
+    予算フィルタ（予算帯 × アルコール）・STEP 1（重み × ターゲット層）・STEP 2（加減点テーブル ×
+    ターゲット層 × イメージ項目）の途中結果もキャッシュし、組み合わせごとの計算は STEP 3-4 のみにする。
+    基準側（既定は本番と同じ設定）の順位は試算をまたいで再利用する。
+    """
+
+    def __init__(self, tables: Dict[str, pd.DataFrame], data_version: Optional[str] = None, today: Optional[date] = None):
+        self.tables = tables
+        self.data_version = data_version
+        self.today = today or date.today()
+        self.combinations = enumerate_combinations(tables)
+        self._params: Dict[Combination, Optional[local_matching.MatchingParameters]] = {}
+        self._eligible: Dict[tuple, pd.DataFrame] = {}
+        self._base_power: Dict[tuple, pd.DataFrame] = {}
+        self._adjustments: Dict[tuple, pd.Series] = {}
+        self._rankings: Dict[tuple, List[int]] = {}
+
+    def _parameters(self, combination: Combination) -> Optional[local_matching.MatchingParameters]:
+        if combination not in self._params:
+            industry, segment, budget = combination
+            try:
+                self._params[combination] = local_matching.resolve_parameters(self.tables, budget, segment, industry)
+            except ValueError:
+                self._params[combination] = None
+        return self._params[combination]
+
+    def _eligible_for(self, params: local_matching.MatchingParameters) -> pd.DataFrame:
+        key = (params.min_budget, params.max_budget, params.is_unlimited_budget, params.is_alcohol_industry)
+        if key not in self._eligible:
+            self._eligible[key] = local_matching.budget_filter_mask(
+                self.tables["m_account"], self.tables["m_talent_act"], params, self.today
+            )
+        return self._eligible[key]
+
+    def _base_power_for(self, variant: ScoringVariant, segment_id: int) -> pd.DataFrame:
+        key = (variant.vr_weight, variant.tpr_weight, segment_id)
+        if key not in self._base_power:
+            self._base_power[key] = local_matching.base_power_frame(
+                self.tables["talent_scores"], segment_id, (variant.vr_weight, variant.tpr_weight)
+            )
+        return self._base_power[key]
+
+    def _adjustment_for(self, variant: ScoringVariant, segment_id: int, image_item_ids: List[int]) -> pd.Series:
+        key = (variant.bands, segment_id, tuple(image_item_ids))
+        if key not in self._adjustments:
+            self._adjustments[key] = local_matching.compute_image_adjustment(
+                self.tables["talent_images"], segment_id, image_item_ids, list(variant.bands)
+            )
+        return self._adjustments[key]
+
+    def ranking(self, variant: ScoringVariant, combination: Combination) -> Optional[List[int]]:
+        """組み合わせの上位30名（account_id の順位順、パラメータ解決不可なら None）"""
+        params = self._parameters(combination)
+        if params is None:
+            return None
+        key = (variant, params.key())
+        if key not in self._rankings:
+            top = local_matching.rank_candidates(
+                self._base_power_for(variant, params.target_segment_id),
+                self._adjustment_for(variant, params.target_segment_id, params.image_item_ids),
+                self._eligible_for(params),
+            )
+            self._rankings[key] = [int(account_id) for account_id in top["account_id"]]
+        return self._rankings[key]
+
+    def run(self, variant: ScoringVariant, baseline: ScoringVariant = ScoringVariant()) -> SimulationResult:
+        variant.validate()
+        baseline.validate()
+        started = time.perf_counter()
+        result = SimulationResult(variant=variant, baseline=baseline)
+        per_combination = []
+        for combination in self.combinations:
+            base_ranking = self.ranking(baseline, combination)
+            if base_ranking is None:
+                result.skipped += 1
+                continue
+            metrics = ranking_overlap(base_ranking, self.ranking(variant, combination))
+            per_combination.append({
+                "industry": combination[0], "target_segment": combination[1], "budget_range": combination[2],
+                **metrics,
+            })
+        self._forget(keep=baseline)
+
+        result.combinations = len(per_combination)
+        result.summary = summarize(per_combination)
+        result.worst = sorted(
+            per_combination, key=lambda m: (m["overlap_at_30"], m["overlap_at_10"], -m["mean_abs_rank_shift"])
+        )[:WORST_COMBINATIONS]
+        result.duration_seconds = time.perf_counter() - started
+        logger.info(f"🧪 スコアリング試算: {result.combinations}組み合わせ {result.duration_seconds:.2f}秒")
+        return result
+
+    def _forget(self, keep: ScoringVariant) -> None:
+        """試算した設定の途中結果を破棄（基準側と予算フィルタのみ残す）"""
+        self._rankings = {key: value for key, value in self._rankings.items() if key[0] == keep}
+        self._base_power = {
+            key: value for key, value in self._base_power.items() if key[:2] == (keep.vr_weight, keep.tpr_weight)
+        }
+        self._adjustments = {key: value for key, value in self._adjustments.items() if key[0] == keep.bands}
+
+
+def summarize(per_combination: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """組み合わせ別の一致度を集計（平均・最小、1位が変わった組み合わせ数）"""
+    if not per_combination:
+        return {}
+    summary: Dict[str, Any] = {}
+    for depth in OVERLAP_DEPTHS:
+        values = [m[f"overlap_at_{depth}"] for m in per_combination]
+        summary[f"mean_overlap_at_{depth}"] = round(sum(values) / len(values), 4)
+        summary[f"min_overlap_at_{depth}"] = round(min(values), 4)
+    shifts = [m["mean_abs_rank_shift"] for m in per_combination]
+    summary["mean_abs_rank_shift"] = round(sum(shifts) / len(shifts), 3)
+    summary["top1_changed"] = sum(1 for m in per_combination if m["top1_changed"])
+    summary["identical"] = sum(1 for m in per_combination if m["overlap_at_30"] == 1.0 and m["mean_abs_rank_shift"] == 0)
+    return summary
+
+
+def parse_bands(spec: str) -> Tuple[Tuple[float, float], ...]:
+    """'0.15:12,0.3:6,...,1:-12' 形式の加減点テーブルを解析（CLI用）"""
+    bands = []
+    for item in spec.split(","):
+        upper, _, points = item.partition(":")
+        if not points:
+            raise ValueError(f"加減点テーブルの形式が不正です（上限値:加減点）: {item}")
+        bands.append((float(upper), float(points)))
+    return tuple(bands)
+
+
+_simulator: Optional[ScoringSimulator] = None
+_simulator_lock = asyncio.Lock()
+
+
+async def _load_simulator() -> ScoringSimulator:
+    """スコアリングデータのメモリ上のコピーを作成（スナップショット指定時はDBに接続しない）"""
+    if settings.scoring_simulation_snapshot:
+        from app.services.scoring_snapshot import ScoringSnapshot
+
+        snapshot = ScoringSnapshot.open(settings.scoring_simulation_snapshot)
+        return ScoringSimulator(snapshot.tables(), data_version=snapshot.data_version)
+
+    from app.db.connection import acquire_connection
+    from app.db.data_version import fetch_data_version
+    from app.services.scoring_snapshot import fetch_snapshot_tables
+
+    async with acquire_connection() as conn:
+        data_version = await fetch_data_version(conn)
+        tables = await fetch_snapshot_tables(conn)
+    return ScoringSimulator(tables, data_version=data_version)
+
+
+async def _current_version() -> Optional[str]:
+    if settings.scoring_simulation_snapshot:
+        return _simulator.data_version if _simulator else None
+    from app.db.connection import acquire_connection
+    from app.db.data_version import fetch_tracked_version
+
+    async with acquire_connection() as conn:
+        return await fetch_tracked_version(conn)
+
+
+async def simulate(variant: ScoringVariant, baseline: ScoringVariant = ScoringVariant(), reload: bool = False) -> Dict[str, Any]:
+    """APIから試算を実行（データはデータバージョンが変わるまで・日付が変わるまで再利用）
+
+    master_data_version テーブルが無いDBではバージョンを判定できないため、reload=True で読み直す。
+    """
+    global _simulator
+    variant.validate()
+    baseline.validate()
+    async with _simulator_lock:
+        if _simulator is not None and not reload:
+            version = await _current_version()
+            if (version is not None and version != _simulator.data_version) or _simulator.today != date.today():
+                reload = True
+        if _simulator is None or reload:
+            started = time.perf_counter()
+            _simulator = await _load_simulator()
+            logger.info(f"📥 試算用スコアリングデータ読み込み: {_simulator.data_version}（{time.perf_counter() - started:.1f}秒）")
+        # pandas の計算はイベントループを止めないよう別スレッドで実行（ロック中は1件ずつ）
+        result = await asyncio.to_thread(_simulator.run, variant, baseline)
+    return {"data_version": _simulator.data_version, **result.status()}
@@ -0,0 +1,210 @@
+"""スコアリングデータのカラムナースナップショット（Parquet / Arrow IPC）
+
+分析スクリプトが本番Neon DBへ全件スキャンを繰り返さないよう、マッチングに必要なテーブルを
+バージョン付き・圧縮済みの列指向ファイルとして書き出し、ローカルで読み込むためのモジュール。
+
+ディレクトリ構成:
+    <root>/LATEST                         最新スナップショットのディレクトリ名
+    <root>/<data_version>_<timestamp>/
+        manifest.json                     データバージョン・形式・テーブル別件数
+        m_account.parquet ...             テーブル別ファイル（.parquet または .arrow）
+
+Arrow IPC（.arrow）を非圧縮で書き出した場合はメモリマップでゼロコピー読み込みできる。
+"""
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+import json
+import logging
+
+import pandas as pd
+
+from app.db.data_version import fetch_data_version
+from app.services import local_matching
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_PARQUET = "parquet"
+SNAPSHOT_FORMAT_ARROW = "arrow"
+MANIFEST_FILE = "manifest.json"
+LATEST_FILE = "LATEST"
+
+# スナップショット対象テーブルと取得クエリ（NUMERICはfloat8に変換して列指向で扱いやすくする）
+SNAPSHOT_QUERIES: Dict[str, str] = {
+    "m_account": """
+        SELECT account_id, name_full_for_matching, last_name_kana, first_name_kana,
+               act_genre, company_name, birthday, pref_cd, del_flag
+        FROM m_account
+    """,
+    "m_talent_act": """
+        SELECT account_id,
+               money_min_one_year::float8 AS money_min_one_year,
+               money_max_one_year::float8 AS money_max_one_year,
+               money_representative_value::float8 AS money_representative_value
+        FROM m_talent_act
+    """,
+    "talent_scores": """
+        SELECT account_id, target_segment_id,
+               vr_popularity::float8 AS vr_popularity,
+               tpr_power_score::float8 AS tpr_power_score,
+               base_power_score::float8 AS base_power_score
+        FROM talent_scores
+    """,
+    "talent_images": """
+        SELECT account_id, target_segment_id,
+               image_funny::float8 AS image_funny,
+               image_clean::float8 AS image_clean,
+               image_unique::float8 AS image_unique,
+               image_trustworthy::float8 AS image_trustworthy,
+               image_cute::float8 AS image_cute,
+               image_cool::float8 AS image_cool,
+               image_mature::float8 AS image_mature
+        FROM talent_images
+    """,
+    "m_talent_cm": """
+        SELECT account_id, sub_id, client_name, product_name, use_period_start, use_period_end,
+               rival_category_type_cd1, rival_category_type_cd2,
+               rival_category_type_cd3, rival_category_type_cd4
+        FROM m_talent_cm
+    """,
+    # STEP 0-4 のパラメータ解決に必要な小規模マスタ
+    "industries": "SELECT industry_id, industry_name, required_image_id FROM industries",
+    "target_segments": "SELECT target_segment_id, segment_name FROM target_segments",
+    "budget_ranges": """
+        SELECT range_name, min_amount::float8 AS min_amount, max_amount::float8 AS max_amount
+        FROM budget_ranges
+    """,
+    "recommended_talents": "SELECT industry_name, talent_id_1, talent_id_2, talent_id_3 FROM recommended_talents",
+}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise RuntimeError("スナップショット機能には pyarrow が必要です（pip install pyarrow）") from e
+
+
+async def export_snapshot(
+    conn,
+    output_root: Union[str, Path],
+    fmt: str = SNAPSHOT_FORMAT_PARQUET,
+    compression: Optional[str] = "zstd",
+) -> Path:
+    """DBからスナップショットを書き出し、作成したディレクトリを返す
+
+    Args:
+        conn: asyncpg接続
+        output_root: スナップショットのルートディレクトリ
+        fmt: "parquet" または "arrow"（Arrow IPC / Feather v2）
+        compression: "zstd" / "lz4" / None（arrow形式でメモリマップする場合は None 推奨）
+    """
+    _require_pyarrow()
+    import pyarrow as pa
+
+    if fmt not in (SNAPSHOT_FORMAT_PARQUET, SNAPSHOT_FORMAT_ARROW):
+        raise ValueError(f"未対応のスナップショット形式です: {fmt}")
+
+    data_version = await fetch_data_version(conn)
+    created_at = datetime.now()
+    root = Path(output_root)
+    snapshot_dir = root / f"{data_version}_{created_at.strftime('%Y%m%d_%H%M%S')}"
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+
+    tables_manifest: Dict[str, Any] = {}
+    for table_name, df in (await fetch_snapshot_tables(conn)).items():
+        arrow_table = pa.Table.from_pandas(df, preserve_index=False)
+        file_name = f"{table_name}.{fmt}"
+        _write_table(arrow_table, snapshot_dir / file_name, fmt, compression)
+
+        tables_manifest[table_name] = {"file": file_name, "rows": len(df), "columns": list(df.columns)}
+        logger.info(f"スナップショット書き出し: {table_name} ({len(df):,}行)")
+
+    manifest = {
+        "data_version": data_version,
+        "created_at": created_at.isoformat(),
+        "format": fmt,
+        "compression": compression,
+        "tables": tables_manifest,
+    }
+    (snapshot_dir / MANIFEST_FILE).write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    (root / LATEST_FILE).write_text(snapshot_dir.name, encoding="utf-8")
+
+    return snapshot_dir
+
+
+async def fetch_snapshot_tables(conn) -> Dict[str, pd.DataFrame]:
+    """スナップショット対象テーブルをDataFrameとして取得（1テーブル1クエリ）"""
+    frames: Dict[str, pd.DataFrame] = {}
+    for table_name, query in SNAPSHOT_QUERIES.items():
+        stmt = await conn.prepare(query)
+        rows = await stmt.fetch()
+        columns = [attr.name for attr in stmt.get_attributes()]
+        frames[table_name] = pd.DataFrame.from_records([tuple(r) for r in rows], columns=columns)
+    return frames
+
+
+def _write_table(arrow_table, path: Path, fmt: str, compression: Optional[str]) -> None:
+    if fmt == SNAPSHOT_FORMAT_PARQUET:
+        import pyarrow.parquet as pq
+        pq.write_table(arrow_table, path, compression=compression or "none")
+    else:
+        import pyarrow.feather as feather
+        feather.write_feather(arrow_table, path, compression=compression or "uncompressed")
+
+
+class ScoringSnapshot:
+    """スナップショット読み込み + ローカルマッチング実行"""
+
+    def __init__(self, path: Path, manifest: Dict[str, Any]) -> None:
+        self.path = path
+        self.manifest = manifest
+        self._frames: Dict[str, pd.DataFrame] = {}
+
+    @classmethod
+    def open(cls, path: Union[str, Path]) -> "ScoringSnapshot":
+        """スナップショットを開く（ルートディレクトリを指定した場合は LATEST を解決）"""
+        _require_pyarrow()
+        path = Path(path)
+        if not (path / MANIFEST_FILE).exists() and (path / LATEST_FILE).exists():
+            path = path / (path / LATEST_FILE).read_text(encoding="utf-8").strip()
+
+        manifest_path = path / MANIFEST_FILE
+        if not manifest_path.exists():
+            raise FileNotFoundError(f"スナップショットが見つかりません: {path}")
+
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        return cls(path, manifest)
+
+    @property
+    def data_version(self) -> str:
+        return self.manifest["data_version"]
+
+    @property
+    def table_names(self) -> List[str]:
+        return list(self.manifest["tables"].keys())
+
+    def table(self, name: str) -> pd.DataFrame:
+        """テーブルをDataFrameとして取得（メモリマップ読み込み・キャッシュ付き）"""
+        if name not in self._frames:
+            entry = self.manifest["tables"].get(name)
+            if entry is None:
+                raise KeyError(f"スナップショットにテーブルがありません: {name}")
+            self._frames[name] = self._read_table(self.path / entry["file"])
+        return self._frames[name]
+
+    def tables(self) -> Dict[str, pd.DataFrame]:
+        return {name: self.table(name) for name in self.table_names}
+
+    def _read_table(self, path: Path) -> pd.DataFrame:
+        if self.manifest["format"] == SNAPSHOT_FORMAT_PARQUET:
+            import pyarrow.parquet as pq
+            return pq.read_table(path, memory_map=True).to_pandas()
+        import pyarrow.feather as feather
+        return feather.read_table(path, memory_map=True).to_pandas()
+
+    def match(self, industry: str, target_segment: str, budget: str, limit: int = local_matching.MAX_RESULTS) -> List[Dict]:
+        """スナップショットに対して STEP 0-4 を実行"""
+        tables = self.tables()
+        params = local_matching.resolve_parameters(tables, budget, target_segment, industry)
+        return local_matching.execute_matching(tables, params, limit=limit)
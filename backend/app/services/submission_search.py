@@ -0,0 +1,152 @@
+"""フォーム送信の検索（管理画面のリード検索）
+
+会社名・担当者名・メールアドレスの部分一致と、業種・ターゲット層・予算・期間の絞り込みを
+組み合わせ、作成日時の新しい順にキーセット方式でページングする。
+
+- 部分一致は pg_trgm の GIN 索引（scripts/create_form_submission_search_indexes.sql）で解決する。
+  3文字未満の検索語は trigram を作れないため索引を使えない（結果は同じで、絞り込み条件次第で遅くなる）
+- ページングは OFFSET ではなく (created_at, id) の続きから読む。何ページ目でも読む行数は limit+1 件
+- 件数（COUNT）は返さない（全件走査になるため）。次ページの有無は has_more / next_cursor で返す
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import json
+import unicodedata
+
+SUBMISSION_COLUMNS = """
+    id, session_id, industry, target_segment, purpose, budget_range, company_name,
+    email, contact_name, phone, genre_preference, preferred_genres, created_at
+"""
+
+
+class InvalidCursorError(ValueError):
+    """ページングカーソルが不正"""
+
+
+@dataclass
+class SubmissionSearch:
+    """検索条件（None の条件は使わない）"""
+    q: Optional[str] = None
+    industry: Optional[str] = None
+    target_segment: Optional[str] = None
+    budget_range: Optional[str] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    limit: int = 50
+    cursor: Optional[str] = None
+
+
+def encode_cursor(created_at: datetime, submission_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{submission_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, submission_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(submission_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursorError(f"カーソルが不正です: {cursor}") from e
+
+
+def like_pattern(text: str) -> str:
+    """部分一致用の ILIKE パターン（NFKC 正規化し、% _ \\ をエスケープ）"""
+    text = unicodedata.normalize("NFKC", text).strip()
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def build_search_query(search: SubmissionSearch) -> Tuple[str, List[Any]]:
+    """検索SQLと引数を組み立てる（limit+1 件取得して次ページの有無を判定する）"""
+    conditions: List[str] = []
+    args: List[Any] = []
+
+    def arg(value: Any) -> str:
+        args.append(value)
+        return f"${len(args)}"
+
+    if search.q and search.q.strip():
+        pattern = arg(like_pattern(search.q))
+        # 列ごとの GIN 索引の BitmapOr になるよう、列ごとに ILIKE を書く
+        conditions.append(
+            f"(company_name ILIKE {pattern} OR contact_name ILIKE {pattern} OR email ILIKE {pattern})"
+        )
+    for column in ("industry", "target_segment", "budget_range"):
+        value = getattr(search, column)
+        if value:
+            conditions.append(f"{column} = {arg(value)}")
+    if search.created_from is not None:
+        conditions.append(f"created_at >= {arg(search.created_from)}")
+    if search.created_to is not None:
+        conditions.append(f"created_at < {arg(search.created_to)}")
+    if search.cursor:
+        created_at, submission_id = decode_cursor(search.cursor)
+        conditions.append(f"(created_at, id) < ({arg(created_at)}, {arg(submission_id)})")
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql = f"""
+        SELECT {SUBMISSION_COLUMNS}
+        FROM form_submissions
+        {where}
+        ORDER BY created_at DESC, id DESC
+        LIMIT {arg(search.limit + 1)}
+    """
+    return sql, args
+
+
+def _json_list(raw: Optional[str]) -> Any:
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except (json.JSONDecodeError, TypeError):
+        return None
+
+
+def format_submission(row: Dict[str, Any]) -> Dict[str, Any]:
+    """管理画面の一覧（GET /api/admin/form-submissions）と同じ形式に変換"""
+    purpose = _json_list(row["purpose"])
+    if isinstance(purpose, list):
+        purpose_display = ", ".join(purpose)
+    else:
+        purpose_display = str(row["purpose"]) if row["purpose"] else ""
+    preferred_genres = None
+    if row["preferred_genres"]:
+        preferred_genres = _json_list(row["preferred_genres"])
+        if preferred_genres is None:
+            preferred_genres = []
+    return {
+        "id": row["id"],
+        "session_id": row["session_id"],
+        "industry": row["industry"],
+        "target_segment": row["target_segment"],
+        "purpose": purpose_display,
+        "budget_range": row["budget_range"],
+        "company_name": row["company_name"],
+        "email": row["email"],
+        "contact_name": row["contact_name"],
+        "phone_number": row["phone"],
+        "genre_preference": row["genre_preference"],
+        "preferred_genres": preferred_genres,
+        "created_at": row["created_at"].isoformat() + "Z",
+    }
+
+
+async def search_submissions(conn, search: SubmissionSearch) -> Dict[str, Any]:
+    """フォーム送信を検索して1ページ分返す
+
+    Raises:
+        InvalidCursorError: cursor が不正な場合
+    """
+    sql, args = build_search_query(search)
+    rows = await conn.fetch(sql, *args)
+    has_more = len(rows) > search.limit
+    rows = rows[:search.limit]
+    return {
+        "items": [format_submission(row) for row in rows],
+        "has_more": has_more,
+        "next_cursor": encode_cursor(rows[-1]["created_at"], rows[-1]["id"]) if has_more else None,
+    }
@@ -0,0 +1,254 @@
+"""マッチング結果に同梱するタレント詳細（CM概要・基本プロフィール・出身地）
+
+/api/matching の結果画面はカードごとに /api/talents/{account_id}/details を呼んでいたため、
+最大30回の往復（1回につき3クエリ）が発生していた。include_details=true の場合は返却する
+タレント分の詳細を1回の集合クエリ（account_id = ANY($1) + CM履歴の LATERAL 集約）で取得し、
+タレントごとにプロセス内へ保持する。
+
+保持した詳細は master_data_version が変わるか（HTTPキャッシュと同じ間隔で確認）、
+日付が変わる（年齢が変わる）か、TALENT_DETAIL_CACHE_TTL_SECONDS を過ぎたら破棄する。
+"""
+from dataclasses import dataclass, asdict
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+import json
+import logging
+import time
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 同梱するCM履歴の件数（新しい順）。全件は詳細APIで取得する
+RECENT_CM_LIMIT = 5
+
+# タレント数の上限（m_account 全件よりも十分大きい値）
+MAX_ENTRIES = 20000
+
+BUNDLE_QUERY = """
+    SELECT
+        ma.account_id,
+        ma.last_name_kana,
+        ma.first_name_kana,
+        ma.pref_cd,
+        CASE
+            WHEN ma.birthday IS NOT NULL
+            THEN EXTRACT(YEAR FROM AGE(CURRENT_DATE, ma.birthday))::INTEGER
+            ELSE NULL
+        END AS age,
+        COALESCE(cm.cm_count, 0) AS cm_count,
+        cm.recent_cms
+    FROM m_account ma
+    LEFT JOIN LATERAL (
+        SELECT
+            COUNT(*) AS cm_count,
+            (array_agg(
+                json_build_object(
+                    'client_name', mtc.client_name,
+                    'product_name', COALESCE(mtc.product_name, ''),
+                    'use_period_start', mtc.use_period_start,
+                    'use_period_end', mtc.use_period_end
+                )
+                ORDER BY mtc.use_period_start DESC NULLS LAST, mtc.sub_id DESC
+            ))[1:$2] AS recent_cms
+        FROM m_talent_cm mtc
+        WHERE mtc.account_id = ma.account_id
+    ) cm ON TRUE
+    WHERE ma.account_id = ANY($1::int[])
+      AND ma.del_flag = 0
+"""
+
+
+def prefecture_name(pref_cd: Optional[int]) -> Optional[str]:
+    """
+    都道府県コードから都道府県名を取得
+
+    このプロジェクトは独自の都道府県コード体系を使用
+    実際のデータベース調査結果に基づく正確なマッピング
+
+    Args:
+        pref_cd: 都道府県コード
+
+    Returns:
+        str: 都道府県名、またはNone
+    """
+    if not pref_cd:
+        return None
+
+    # 実際のDB調査結果に基づく独自コード体系マッピング
+    # JIS X 0401の先頭0削除版（ただし12/13が入れ替わり）
+    prefecture_map = {
+        1: "北海道",     # 中島みゆき、大泉洋 ✅確認済み
+        2: "青森県",     # 吉幾三
+        3: "岩手県",     #
+        4: "宮城県",     # 福原愛、千葉雄大 (※JIS標準とは順序異なる)
+        5: "秋田県",     # 佐々木希
+        6: "山形県",     # 橋本マナミ
+        7: "福島県",     # 武田玲奈
+        8: "茨城県",     # 磯山さやか、渡辺直美 ✅確認済み
+        9: "栃木県",     # 大島優子、U字工事 ✅確認済み
+        10: "群馬県",    # 白石麻衣、井森美幸 ✅確認済み
+        11: "埼玉県",    # 菜々緒、草彅剛 ✅確認済み
+        12: "東京都",    # いとうあさこ、きゃりー、木村拓哉 ✅確認済み
+        13: "千葉県",    # 小島瑠璃子、桐谷美玲 ✅確認済み
+        14: "神奈川県",  # ムロツヨシ、香取慎吾 ✅確認済み
+        15: "新潟県",    # 横澤夏子、渡辺謙
+        16: "富山県",    # はじめしゃちょー
+        17: "石川県",    # 浜辺美波
+        18: "福井県",    # 道端ジェシカ
+        19: "山梨県",    # 田中要次、藤森慎吾
+        20: "長野県",    # 清水ミチコ
+        21: "岐阜県",    # マキタスポーツ
+        22: "静岡県",    # 別所哲也、広瀬すず ✅確認済み
+        23: "愛知県",    # 浅田舞、松井珠理奈 ✅確認済み
+        24: "三重県",    # 高橋メアリージュン、西野カナ
+        25: "滋賀県",    # 徳井義実、安田美沙子
+        26: "京都府",    # 足立梨花、水野美紀
+        27: "大阪府",    # 三戸なつめ、ゆりやん (※標準JISと一致)
+        28: "兵庫県",    # 明石家さんま (※実際は和歌山出身だが兵庫育ち)
+        29: "奈良県",    # 高畑充希、今田耕司 ✅確認済み
+        30: "和歌山県",  # 松本人志、北川景子 (※要再確認)
+        31: "鳥取県",    # イモトアヤコ
+        32: "島根県",    # 錦織圭 ✅確認済み
+        33: "岡山県",    # 佐野史郎
+        34: "広島県",    # 有吉弘行 ✅確認済み
+        35: "山口県",    # 田村淳
+        36: "徳島県",    # 松本明子
+        37: "香川県",    # 犬飼貴丈
+        38: "愛媛県",    # 眞鍋かをり
+        39: "高知県",    # 間寛平、広末涼子
+        40: "福岡県",    # 橋本環奈、博多華丸 ✅確認済み
+        41: "佐賀県",    # 指原莉乃
+        42: "長崎県",    # 森高千里、福山雅治
+        43: "熊本県",    # 松雪泰子
+        44: "大分県",    # 指原莉乃（大分出身）
+        45: "宮崎県",    # オカリナ、東国原英夫
+        46: "鹿児島県",  # 柏木由紀
+        47: "沖縄県",    # 新垣結衣、黒木メイサ ✅確認済み
+        99: "その他"
+    }
+
+    return prefecture_map.get(pref_cd, "不明")
+
+
+def cm_category(client_name: str, product_name: str) -> str:
+    """
+    クライアント名と商品名からCMカテゴリを推定
+
+    Args:
+        client_name: クライアント名
+        product_name: 商品名
+
+    Returns:
+        str: 推定されたカテゴリ
+    """
+    if not client_name:
+        return "その他"
+
+    # エンターテイメント系
+    entertainment_keywords = ["テレビ", "放送", "映画", "ゲーム", "アプリ", "コミック"]
+    if any(keyword in client_name for keyword in entertainment_keywords):
+        return "エンターテイメント"
+
+    # 食品系
+    food_keywords = ["食品", "飲料", "レストラン", "カフェ"]
+    if any(keyword in client_name for keyword in food_keywords):
+        return "食品・飲料"
+
+    # 化粧品・美容系
+    beauty_keywords = ["化粧品", "コスメ", "美容", "ヘアケア"]
+    if any(keyword in client_name for keyword in beauty_keywords):
+        return "化粧品・美容"
+
+    # 自動車系
+    auto_keywords = ["自動車", "トヨタ", "ホンダ", "日産"]
+    if any(keyword in client_name for keyword in auto_keywords):
+        return "自動車"
+
+    return "その他"
+
+
+def build_bundle(row) -> Dict[str, Any]:
+    """BUNDLE_QUERY の1行を TalentDetailBundle の辞書に変換"""
+    kana = None
+    if row["last_name_kana"] or row["first_name_kana"]:
+        kana = f"{row['last_name_kana'] or ''} {row['first_name_kana'] or ''}".strip()
+
+    recent_cms = []
+    for raw in row["recent_cms"] or []:
+        cm = json.loads(raw) if isinstance(raw, str) else raw
+        recent_cms.append({
+            "client_name": cm["client_name"] or "",
+            "product_name": cm["product_name"] or "",
+            "use_period_start": cm["use_period_start"] or "",
+            "use_period_end": cm["use_period_end"] or "",
+            "category": cm_category(cm["client_name"], cm["product_name"]),
+        })
+
+    return {
+        "account_id": row["account_id"],
+        "kana": kana,
+        "age": row["age"],
+        "birthplace": prefecture_name(row["pref_cd"]),
+        "cm_count": row["cm_count"],
+        "recent_cms": recent_cms,
+    }
+
+
+async def fetch_bundles(conn, account_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """指定タレントの詳細を1クエリで取得（削除済み・存在しないタレントは含まない）"""
+    rows = await conn.fetch(BUNDLE_QUERY, account_ids, RECENT_CM_LIMIT)
+    return {row["account_id"]: build_bundle(row) for row in rows}
+
+
+@dataclass
+class TalentDetailCacheStats:
+    hits: int = 0
+    misses: int = 0
+    queries: int = 0
+    invalidations: int = 0
+
+
+class TalentDetailCache:
+    """タレント詳細のプロセス内キャッシュ（データバージョン・日付ごと）"""
+
+    def __init__(self) -> None:
+        self.entries: Dict[int, Dict[str, Any]] = {}
+        self.stats = TalentDetailCacheStats()
+        self._key: Optional[tuple] = None
+        self._built_at = time.monotonic()
+
+    def _expire(self, version: Optional[str]) -> None:
+        key = (version, date.today())
+        if key != self._key or time.monotonic() - self._built_at >= settings.talent_detail_cache_ttl_seconds:
+            if self.entries:
+                self.stats.invalidations += 1
+            self.entries.clear()
+            self._key = key
+            self._built_at = time.monotonic()
+
+    async def get_many(self, account_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """account_id → 詳細（保持していないタレントのみ1クエリで取得）"""
+        from app.core.http_cache import master_data_cache
+        from app.db.connection import acquire_connection
+
+        account_ids = list(dict.fromkeys(account_ids))
+        self._expire(await master_data_cache.current_version())
+
+        missing = [account_id for account_id in account_ids if account_id not in self.entries]
+        self.stats.hits += len(account_ids) - len(missing)
+        self.stats.misses += len(missing)
+        if missing:
+            self.stats.queries += 1
+            async with acquire_connection() as conn:
+                fetched = await fetch_bundles(conn, missing)
+            if len(self.entries) + len(fetched) > MAX_ENTRIES:
+                self.entries.clear()
+            self.entries.update(fetched)
+        return {account_id: self.entries[account_id] for account_id in account_ids if account_id in self.entries}
+
+    def status(self) -> Dict[str, Any]:
+        return {"entries": len(self.entries), **asdict(self.stats)}
+
+
+talent_detail_cache = TalentDetailCache()
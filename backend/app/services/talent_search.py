@@ -0,0 +1,291 @@
+"""タレント名の前方一致・部分一致検索（管理画面のおすすめタレント選択用）
+
+m_account の表示名・かな（姓・名）とそのローマ字を正規化してメモリ上の n-gram 索引に載せ、
+入力途中の文字列から上位N件を返す。全件をクライアントに送って絞り込む必要がなくなる。
+
+正規化はVRデータ取り込みと共通の normalize_name（app/services/name_normalization.py）に加え、
+区切り記号の除去・カタカナ→ひらがな・英字の小文字化を行う。
+「ありよし」「アリヨシ」「ｱﾘﾖｼ」「ariyoshi」「有吉」のいずれでも同じタレントに当たる。
+ローマ字は長音の書き方（おおたに → otani / ohtani / ootani / outani）の揺れも索引に載せる。
+
+順位: 完全一致 → 前方一致 → 姓・名いずれかの前方一致 → 部分一致。同順位は基礎パワー得点
+（ターゲット層のうち最大値）の高い順。
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import heapq
+import logging
+import re
+import time
+
+from app.core.config import settings
+from app.services.name_normalization import normalize_name
+
+logger = logging.getLogger(__name__)
+
+_SEPARATORS = re.compile(r"[・･.,]+")
+
+# 順位（小さいほど上位）
+TIER_EXACT = 0
+TIER_PREFIX = 1
+TIER_PART_PREFIX = 2
+TIER_SUBSTRING = 3
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """検索用の正規化（normalize_name・区切り記号の除去・カタカナ→ひらがな・小文字化）"""
+    text = normalize_name(text)
+    if not text:
+        return ""
+    return to_hiragana(_SEPARATORS.sub("", text)).lower()
+
+
+def to_hiragana(text: str) -> str:
+    return "".join(chr(ord(c) - 0x60) if "ァ" <= c <= "ヶ" else c for c in text)
+
+
+_ROMAJI_DIGRAPHS = {
+    "きゃ": "kya", "きゅ": "kyu", "きょ": "kyo", "しゃ": "sha", "しゅ": "shu", "しょ": "sho",
+    "ちゃ": "cha", "ちゅ": "chu", "ちょ": "cho", "にゃ": "nya", "にゅ": "nyu", "にょ": "nyo",
+    "ひゃ": "hya", "ひゅ": "hyu", "ひょ": "hyo", "みゃ": "mya", "みゅ": "myu", "みょ": "myo",
+    "りゃ": "rya", "りゅ": "ryu", "りょ": "ryo", "ぎゃ": "gya", "ぎゅ": "gyu", "ぎょ": "gyo",
+    "じゃ": "ja", "じゅ": "ju", "じょ": "jo", "びゃ": "bya", "びゅ": "byu", "びょ": "byo",
+    "ぴゃ": "pya", "ぴゅ": "pyu", "ぴょ": "pyo", "しぇ": "she", "ちぇ": "che", "じぇ": "je",
+    "てぃ": "ti", "でぃ": "di", "ふぁ": "fa", "ふぃ": "fi", "ふぇ": "fe", "ふぉ": "fo", "うぃ": "wi", "うぇ": "we",
+}
+_ROMAJI = dict(zip(
+    "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん"
+    "がぎぐげござじずぜぞだぢづでどばびぶべぼぱぴぷぺぽぁぃぅぇぉゃゅょゔ",
+    "a i u e o ka ki ku ke ko sa shi su se so ta chi tsu te to na ni nu ne no ha hi fu he ho "
+    "ma mi mu me mo ya yu yo ra ri ru re ro wa o n ga gi gu ge go za ji zu ze zo da ji zu de do "
+    "ba bi bu be bo pa pi pu pe po a i u e o ya yu yo vu".split(),
+))
+
+
+def kana_to_romaji(kana: str) -> str:
+    """ひらがな（normalize_text 済み）をヘボン式ローマ字に変換（変換できない文字は除去）"""
+    out: List[str] = []
+    i = 0
+    double_next = False
+    while i < len(kana):
+        pair = kana[i:i + 2]
+        if pair in _ROMAJI_DIGRAPHS:
+            syllable, i = _ROMAJI_DIGRAPHS[pair], i + 2
+        elif kana[i] == "っ":
+            double_next, i = True, i + 1
+            continue
+        elif kana[i] == "ー":
+            # 長音は直前の母音を重ねず省略（「らーめん」→ ramen）
+            i += 1
+            continue
+        else:
+            syllable, i = _ROMAJI.get(kana[i], ""), i + 1
+        if double_next and syllable:
+            syllable = ("t" if syllable.startswith("ch") else syllable[0]) + syllable
+        double_next = False
+        out.append(syllable)
+    return "".join(out)
+
+
+# お段の長音（おお・おう）と う段の長音（うう）の表記揺れ
+_LONG_O = re.compile(r"o[ou]")
+_LONG_U = re.compile(r"uu")
+
+
+def romaji_variants(romaji: str) -> List[str]:
+    """長音の書き方違いを展開（「ootani」→ ootani / otani / ohtani / outani）
+
+    1語の中では同じ書き方に揃える前提で、組み合わせは最大8通りに抑える。
+    """
+    if not romaji:
+        return []
+    variants = []
+    for o in ("oo", "o", "oh", "ou") if _LONG_O.search(romaji) else ("",):
+        spelled = _LONG_O.sub(o, romaji) if o else romaji
+        for u in ("uu", "u") if _LONG_U.search(spelled) else ("",):
+            variants.append(_LONG_U.sub(u, spelled) if u else spelled)
+    return list(dict.fromkeys([romaji] + variants))
+
+
+@dataclass
+class TalentEntry:
+    account_id: int
+    name: str
+    category: Optional[str]
+    kana: Optional[str]
+    base_power_score: float
+    keys: Tuple[str, ...]  # 全体一致・前方一致の対象（表示名・かな・ローマ字）
+    parts: Tuple[str, ...]  # 姓・名それぞれの前方一致の対象
+
+
+def _entry(row: Dict[str, Any]) -> TalentEntry:
+    last_kana = normalize_text(row.get("last_name_kana"))
+    first_kana = normalize_text(row.get("first_name_kana"))
+    full_kana = last_kana + first_kana
+    keys = [normalize_text(row["name"]), full_kana, *romaji_variants(kana_to_romaji(full_kana))]
+    parts = [
+        last_kana, first_kana,
+        *romaji_variants(kana_to_romaji(last_kana)), *romaji_variants(kana_to_romaji(first_kana)),
+    ]
+    kana = " ".join(k for k in (row.get("last_name_kana"), row.get("first_name_kana")) if k) or None
+    return TalentEntry(
+        account_id=row["account_id"],
+        name=row["name"],
+        category=row.get("category"),
+        kana=kana,
+        base_power_score=float(row.get("base_power_score") or 0),
+        keys=tuple(dict.fromkeys(k for k in keys if k)),
+        parts=tuple(dict.fromkeys(p for p in parts if p)),
+    )
+
+
+def _grams(text: str) -> Iterable[str]:
+    """1文字は文字そのもの、2文字以上は bigram"""
+    if len(text) == 1:
+        return (text,)
+    return (text[i:i + 2] for i in range(len(text) - 1))
+
+
+@dataclass
+class TalentSearchIndex:
+    """タレント名の n-gram 転置索引"""
+    entries: List[TalentEntry]
+    data_version: Optional[str] = None
+    built_at: float = field(default_factory=time.time)
+    build_ms: float = 0.0
+
+    def __post_init__(self) -> None:
+        self._unigrams: Dict[str, Set[int]] = {}
+        self._bigrams: Dict[str, Set[int]] = {}
+        for position, entry in enumerate(self.entries):
+            for key in entry.keys + entry.parts:
+                for char in key:
+                    self._unigrams.setdefault(char, set()).add(position)
+                for gram in _grams(key) if len(key) > 1 else ():
+                    self._bigrams.setdefault(gram, set()).add(position)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]], data_version: Optional[str] = None) -> "TalentSearchIndex":
+        started = time.perf_counter()
+        index = cls([_entry(dict(row)) for row in rows], data_version=data_version)
+        index.build_ms = (time.perf_counter() - started) * 1000
+        return index
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _candidates(self, query: str) -> Set[int]:
+        postings = self._unigrams if len(query) == 1 else self._bigrams
+        candidates: Optional[Set[int]] = None
+        for gram in sorted(set(_grams(query)), key=lambda g: len(postings.get(g, ()))):
+            posting = postings.get(gram)
+            if not posting:
+                return set()
+            candidates = set(posting) if candidates is None else candidates & posting
+            if not candidates:
+                return set()
+        return candidates or set()
+
+    def _tier(self, entry: TalentEntry, query: str) -> Optional[int]:
+        if query in entry.keys:
+            return TIER_EXACT
+        if any(key.startswith(query) for key in entry.keys):
+            return TIER_PREFIX
+        if any(part.startswith(query) for part in entry.parts):
+            return TIER_PART_PREFIX
+        if any(query in key for key in entry.keys + entry.parts):
+            return TIER_SUBSTRING
+        return None
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """正規化した query に一致するタレントを順位順に最大 limit 件返す"""
+        query = normalize_text(query)
+        if not query:
+            return []
+
+        # n-gram の積集合で候補を絞り、実際に一致するかと順位は候補ごとに判定する
+        ranked = []
+        for position in self._candidates(query):
+            entry = self.entries[position]
+            tier = self._tier(entry, query)
+            if tier is not None:
+                ranked.append((tier, -entry.base_power_score, len(entry.name), entry.account_id, entry))
+        ranked = heapq.nsmallest(limit, ranked, key=lambda item: item[:4])
+
+        return [
+            {
+                "account_id": entry.account_id,
+                "name": entry.name,
+                "category": entry.category,
+                "kana": entry.kana,
+                "base_power_score": round(entry.base_power_score, 2),
+                "match": ("exact", "prefix", "part_prefix", "substring")[tier],
+            }
+            for tier, _, _, _, entry in ranked
+        ]
+
+
+# 基礎パワー得点はターゲット層ごとに異なるため、選択肢の並び替えには最大値を使う
+TALENT_SEARCH_ROWS_SQL = """
+    SELECT
+        ma.account_id,
+        ma.name_full_for_matching AS name,
+        ma.last_name_kana,
+        ma.first_name_kana,
+        ma.act_genre AS category,
+        MAX((COALESCE(ts.vr_popularity, 0) + COALESCE(ts.tpr_power_score, 0)) / 2.0) AS base_power_score
+    FROM m_account ma
+    LEFT JOIN talent_scores ts ON ts.account_id = ma.account_id
+    WHERE ma.del_flag = 0
+    GROUP BY ma.account_id
+"""
+
+_index: Optional[TalentSearchIndex] = None
+_checked_at = 0.0
+_lock: Optional[asyncio.Lock] = None
+_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+async def get_talent_search_index() -> TalentSearchIndex:
+    """索引を取得（TALENT_SEARCH_CHECK_INTERVAL ごとにデータバージョンを照合し、変わっていれば作り直す）
+
+    master_data_version テーブルが無い環境ではバージョン照合が全件走査になるため、
+    照合せずに間隔ごとに作り直す。
+    """
+    global _index, _checked_at, _lock, _lock_loop
+    if _index is not None and time.monotonic() - _checked_at < settings.talent_search_check_interval:
+        return _index
+
+    loop = asyncio.get_running_loop()
+    if _lock is None or _lock_loop is not loop:
+        _lock, _lock_loop = asyncio.Lock(), loop
+    async with _lock:
+        if _index is not None and time.monotonic() - _checked_at < settings.talent_search_check_interval:
+            return _index
+
+        from app.db.connection import acquire_connection
+        from app.db.data_version import fetch_tracked_version
+
+        async with acquire_connection() as conn:
+            data_version = await fetch_tracked_version(conn)
+            if _index is None or data_version is None or data_version != _index.data_version:
+                rows = await conn.fetch(TALENT_SEARCH_ROWS_SQL)
+                _index = TalentSearchIndex.from_rows(rows, data_version=data_version)
+                logger.info(
+                    f"🔎 タレント検索索引を作成: {len(_index):,}名 ({_index.build_ms:.0f}ms, version={data_version})"
+                )
+        _checked_at = time.monotonic()
+        return _index
+
+
+def talent_search_status() -> Dict[str, Any]:
+    if _index is None:
+        return {"loaded": False}
+    return {
+        "loaded": True,
+        "talents": len(_index),
+        "data_version": _index.data_version,
+        "build_ms": round(_index.build_ms, 1),
+        "age_seconds": round(time.time() - _index.built_at, 1),
+    }
@@ -1,5 +1,9 @@
 #!/usr/bin/env python3
-"""VRデータ究極完美インポート（100%マッチング版）"""
+"""VRデータ究極完美インポート（100%マッチング版）
+
+100行・1ファイルごとにコミットするため、データ品質ゲート（app/services/data_quality.py）は
+コミット前にかけられない。取り込み後に scripts/validate_master_data.py で検証すること。
+"""
 
 import asyncio
 import sys
@@ -14,6 +18,7 @@ sys.path.insert(0, str(Path(__file__).parent))
 from sqlalchemy import text
 from app.db.connection import init_db, get_session_maker
 from app.models import TalentScore, TalentImage
+from app.services.name_normalization import normalize_name
 
 # VRデータディレクトリ（統合後）
 VR_DATA_DIRECTORY = "/Users/lennon/projects/talent-casting-form/DB情報/VR_data"
@@ -45,16 +50,8 @@ def advanced_normalize_name(name):
     """高度なタレント名正規化（VRデータ専用）"""
     if pd.isna(name) or name is None:
         return None
-    name = str(name)
-    # Unicodeの正規化（NFKCで全角→半角、濁点統合）
-    name = unicodedata.normalize('NFKC', name)
-    # 長音符の統一（全角ダッシュ → 長音符）
-    name = re.sub(r'[−－─━ー−‐]', 'ー', name)
-    # 全角英数字を半角に変換
-    name = re.sub(r'[Ａ-Ｚａ-ｚ０-９]', lambda x: chr(ord(x.group()) - 0xFEE0), name)
-    # 各種スペースを除去
-    name = re.sub(r'[\s\u3000\u00A0\u2000-\u200A\u2028\u2029\u202F\u205F\uFEFF]+', '', name)
-    return name.strip()
+    # タレント検索の索引と同じ規則（app/services/name_normalization.py）
+    return normalize_name(name)
 
 def create_name_variants(name):
     """名前バリエーション自動生成"""
@@ -0,0 +1,14 @@
+"""負荷試験パッケージ（仮想ユーザーの同時実行による /api/matching の飽和点測定）
+
+ローカルの uvicorn + PostgreSQL に対して、実際の診断フォーム送信に近い業種・ターゲット層・予算の
+分布（form_submissions の履歴、または test_*.json フィクスチャ）でリクエストを送り、
+同時実行数ごとのレイテンシ分位点・エラー率・スループットと飽和点をレポートにまとめる。
+
+    cd backend
+    python -m loadtest --source db --concurrency 1,2,4,8,16 --duration 30
+    python -m loadtest --source fixtures --rate 5 --concurrency 8 --compare loadtest_reports/前回.json
+    python -m loadtest --spawn-server --concurrency 1,4,8   # uvicorn を起動してから計測
+
+送信したフォームは form_submissions に保存されるため、company_name を「負荷試験」で始め、
+session_id を loadtest- で始めて本番データと区別できるようにしている（メール送信同意は常に false）。
+"""
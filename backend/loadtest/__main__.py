@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""負荷試験 CLI（python -m loadtest）"""
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+from loadtest.report import build_report, compare_reports, render_markdown  # noqa: E402
+from loadtest.runner import MATCHING_PATH, StepConfig, run_step  # noqa: E402
+from loadtest.scenarios import ScenarioSampler, load_fixture_scenarios, load_history_scenarios  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger("loadtest")
+
+
+async def load_scenarios(source: str, fixtures_dir: Path, days: int):
+    if source == "fixtures":
+        return load_fixture_scenarios(fixtures_dir)
+
+    import asyncpg
+    from app.db.connection import asyncpg_connection_params
+
+    conn = await asyncpg.connect(**asyncpg_connection_params())
+    try:
+        return await load_history_scenarios(conn, days=days)
+    finally:
+        await conn.close()
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def spawn_server(port: int) -> subprocess.Popen:
+    """ローカルの uvicorn を起動して /api/health が応答するまで待つ"""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn が起動できませんでした（終了コード {process.returncode}）")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=2.0).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("uvicorn の起動待ちがタイムアウトしました")
+
+
+async def run(args) -> dict:
+    scenarios = await load_scenarios(args.source, Path(args.fixtures_dir), args.days)
+    sampler = ScenarioSampler(scenarios, seed=args.seed)
+    logger.info(f"🎭 シナリオ {len(scenarios)} 種類（{args.source}）")
+
+    steps = [
+        StepConfig(concurrency=c, duration=args.duration, rate=args.rate, warmup=args.warmup)
+        for c in args.concurrency
+    ]
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    started_at = datetime.now()
+    step_results = []
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        for step in steps:
+            step_results.append(await run_step(client, sampler, step, path=args.path, seed=args.seed))
+            if args.pause:
+                await asyncio.sleep(args.pause)
+
+    meta = {
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "base_url": args.base_url,
+        "path": args.path,
+        "source": args.source,
+        "scenario_count": len(scenarios),
+        "seed": args.seed,
+        "git_commit": _git_commit(),
+        "timeout_seconds": args.timeout,
+    }
+    return build_report(meta, step_results)
+
+
+def _concurrency_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/api/matching の負荷試験（同時実行数ごとのレイテンシ・エラー率・飽和点）")
+    parser.add_argument("--base-url", default=os.getenv("LOADTEST_BASE_URL", "http://127.0.0.1:8432"))
+    parser.add_argument("--path", default=MATCHING_PATH)
+    parser.add_argument("--source", choices=["db", "fixtures"], default="db",
+                        help="db: form_submissions の履歴分布 / fixtures: backend/test_*.json")
+    parser.add_argument("--fixtures-dir", default=str(BACKEND_DIR))
+    parser.add_argument("--days", type=int, default=180, help="履歴を参照する日数（--source db）")
+    parser.add_argument("--concurrency", type=_concurrency_list, default=[1, 2, 4, 8, 16],
+                        help="段階ごとの同時実行数（カンマ区切り）")
+    parser.add_argument("--rate", type=float, default=0.0, help="到着率（件/秒）。0 はクローズドループ")
+    parser.add_argument("--duration", type=float, default=30.0, help="各段階の計測秒数")
+    parser.add_argument("--warmup", type=float, default=5.0, help="各段階の集計から除外する先頭秒数")
+    parser.add_argument("--pause", type=float, default=2.0, help="段階間の休止秒数")
+    parser.add_argument("--timeout", type=float, default=30.0, help="1リクエストのタイムアウト秒数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output-dir", default=str(BACKEND_DIR / "loadtest_reports"))
+    parser.add_argument("--compare", help="比較する前回レポート（JSON）")
+    parser.add_argument("--spawn-server", action="store_true", help="uvicorn を起動して計測（--base-url のポートを使用）")
+    args = parser.parse_args()
+
+    server = None
+    if args.spawn_server:
+        port = httpx.URL(args.base_url).port or 8432
+        server = spawn_server(port)
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        report["comparison"] = compare_reports(report, previous)
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stem = f"loadtest_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    (output_dir / f"{stem}.json").write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    markdown = render_markdown(report)
+    (output_dir / f"{stem}.md").write_text(markdown, encoding="utf-8")
+
+    print(markdown)
+    print(f"📄 レポート: {output_dir / stem}.json / .md")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""負荷試験レポート（分位点・エラー率・飽和点の算出と前回レポートとの比較）"""
+from collections import Counter
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, Sequence
+
+from loadtest.runner import PoolSample, RequestResult
+
+PERCENTILES = (50, 90, 95, 99)
+
+# 飽和判定（最初に満たした段階を飽和点とする）
+ERROR_RATE_LIMIT = 0.01  # エラー率 1% 超
+LATENCY_FACTOR = 2.0  # p95 が最小同時実行数の段階の2倍超
+MIN_THROUGHPUT_GAIN = 0.10  # 同時実行数を増やしてもスループットが10%未満しか伸びない
+
+
+def percentile(values: Sequence[float], p: float) -> Optional[float]:
+    """線形補間の分位点"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _latency_summary(values: Sequence[float]) -> Dict[str, Optional[float]]:
+    summary = {f"p{p}": _round(percentile(values, p)) for p in PERCENTILES}
+    summary["max"] = _round(max(values)) if values else None
+    summary["mean"] = _round(sum(values) / len(values)) if values else None
+    return summary
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 1) if value is not None else None
+
+
+def _pool_summary(samples: List[PoolSample]) -> Dict[str, Any]:
+    if not samples:
+        return {}
+    first, last = samples[0], samples[-1]
+    pools = {}
+    for pool, max_size in last.max_size.items():
+        peak = max(s.in_use.get(pool, 0) for s in samples)
+        acquires = last.acquires_total.get(pool, 0) - first.acquires_total.get(pool, 0)
+        wait = last.acquire_wait_seconds_total.get(pool, 0) - first.acquire_wait_seconds_total.get(pool, 0)
+        pools[pool] = {
+            "max_size": int(max_size),
+            "peak_in_use": int(peak),
+            "exhausted": peak >= max_size,
+            "acquires": int(acquires),
+            "avg_acquire_wait_ms": round(wait / acquires * 1000, 2) if acquires else None,
+        }
+    return pools
+
+
+def summarize_step(step_result: Dict[str, Any]) -> Dict[str, Any]:
+    """1段階の結果を集計"""
+    config = step_result["config"]
+    results: List[RequestResult] = step_result["results"]
+    errors = [r for r in results if r.error]
+    latencies = [r.latency_ms for r in results if not r.error]
+    server = [r.server_ms for r in results if r.server_ms is not None]
+
+    by_scenario: Dict[str, List[float]] = {}
+    for r in results:
+        if not r.error:
+            by_scenario.setdefault(r.scenario, []).append(r.latency_ms)
+    scenarios = sorted(by_scenario.items(), key=lambda kv: -len(kv[1]))[:10]
+
+    return {
+        **asdict(config),
+        "requests": len(results),
+        "throughput_rps": round(len(results) / step_result["elapsed"], 2),
+        "error_rate": round(len(errors) / len(results), 4) if results else 0.0,
+        "status_counts": {str(k): v for k, v in sorted(Counter(r.status for r in results).items())},
+        "errors": dict(Counter(r.error for r in errors).most_common(5)),
+        "latency_ms": _latency_summary(latencies),
+        "server_ms": _latency_summary(server),
+        "scenarios": {key: {"requests": len(v), "p95": _round(percentile(v, 95))} for key, v in scenarios},
+        "pools": _pool_summary(step_result["pool_samples"]),
+    }
+
+
+def find_saturation(steps: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """飽和点（エラー率・レイテンシ・スループットの頭打ちのいずれかを最初に満たした段階）"""
+    if not steps:
+        return None
+    baseline_p95 = steps[0]["latency_ms"]["p95"]
+    for previous, step in zip([None] + steps[:-1], steps):
+        reasons = []
+        if step["error_rate"] > ERROR_RATE_LIMIT:
+            reasons.append(f"エラー率 {step['error_rate']:.1%}")
+        p95 = step["latency_ms"]["p95"]
+        if baseline_p95 and p95 and p95 > baseline_p95 * LATENCY_FACTOR:
+            reasons.append(f"p95 {p95:.0f}ms（基準 {baseline_p95:.0f}ms の{LATENCY_FACTOR:g}倍超）")
+        if previous is not None and step["concurrency"] > previous["concurrency"] and previous["throughput_rps"]:
+            gain = step["throughput_rps"] / previous["throughput_rps"] - 1
+            if gain < MIN_THROUGHPUT_GAIN:
+                reasons.append(f"スループット増加 {gain:+.0%}")
+        exhausted = [pool for pool, p in step.get("pools", {}).items() if p["exhausted"]]
+        if reasons:
+            return {"concurrency": step["concurrency"], "rate": step["rate"], "reasons": reasons, "exhausted_pools": exhausted}
+    return None
+
+
+def build_report(meta: Dict[str, Any], step_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    steps = [summarize_step(s) for s in step_results]
+    return {"meta": meta, "steps": steps, "saturation": find_saturation(steps)}
+
+
+def compare_reports(current: Dict[str, Any], previous: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """同じ同時実行数・到着率の段階同士で p95・スループット・エラー率の差分を出す"""
+    previous_steps = {(s["concurrency"], s["rate"]): s for s in previous.get("steps", [])}
+    rows = []
+    for step in current["steps"]:
+        before = previous_steps.get((step["concurrency"], step["rate"]))
+        if before is None:
+            continue
+        p95, p95_before = step["latency_ms"]["p95"], before["latency_ms"]["p95"]
+        rows.append({
+            "concurrency": step["concurrency"],
+            "rate": step["rate"],
+            "p95_ms": p95,
+            "p95_ms_before": p95_before,
+            "p95_change": round(p95 / p95_before - 1, 4) if p95 and p95_before else None,
+            "throughput_rps": step["throughput_rps"],
+            "throughput_rps_before": before["throughput_rps"],
+            "error_rate": step["error_rate"],
+            "error_rate_before": before["error_rate"],
+        })
+    return rows
+
+
+def render_markdown(report: Dict[str, Any]) -> str:
+    meta = report["meta"]
+    lines = [
+        f"# 負荷試験レポート {meta.get('started_at', '')}",
+        "",
+        f"- 対象: {meta.get('base_url')}{meta.get('path', '')}",
+        f"- シナリオ: {meta.get('source')}（{meta.get('scenario_count')}種類）",
+        f"- コミット: {meta.get('git_commit') or '-'}",
+        "",
+        "| 同時実行数 | 到着率 | 件数 | req/s | エラー率 | p50 | p95 | p99 | max | プール最大使用 |",
+        "|---|---|---|---|---|---|---|---|---|---|",
+    ]
+    for s in report["steps"]:
+        latency = s["latency_ms"]
+        pools = ", ".join(
+            f"{name} {p['peak_in_use']}/{p['max_size']}{' ⚠️' if p['exhausted'] else ''}" for name, p in s["pools"].items()
+        ) or "-"
+        lines.append(
+            f"| {s['concurrency']} | {s['rate'] or 'closed'} | {s['requests']} | {s['throughput_rps']} | "
+            f"{s['error_rate']:.1%} | {latency['p50']} | {latency['p95']} | {latency['p99']} | {latency['max']} | {pools} |"
+        )
+
+    saturation = report.get("saturation")
+    lines.append("")
+    if saturation:
+        lines.append(f"**飽和点**: 同時実行数 {saturation['concurrency']}（{' / '.join(saturation['reasons'])}）")
+        if saturation["exhausted_pools"]:
+            lines.append(f"- 接続プール上限到達: {', '.join(saturation['exhausted_pools'])}")
+    else:
+        lines.append("**飽和点**: 計測範囲内では未到達")
+
+    comparison = report.get("comparison")
+    if comparison:
+        lines += ["", "## 前回比較", "", "| 同時実行数 | p95（前回→今回） | req/s（前回→今回） | エラー率（前回→今回） |", "|---|---|---|---|"]
+        for row in comparison:
+            change = f" ({row['p95_change']:+.0%})" if row["p95_change"] is not None else ""
+            lines.append(
+                f"| {row['concurrency']} | {row['p95_ms_before']} → {row['p95_ms']}{change} | "
+                f"{row['throughput_rps_before']} → {row['throughput_rps']} | "
+                f"{row['error_rate_before']:.1%} → {row['error_rate']:.1%} |"
+            )
+    return "\n".join(lines) + "\n"
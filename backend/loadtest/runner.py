@@ -0,0 +1,170 @@
+"""負荷試験の実行（仮想ユーザーの同時実行・到着率制御・プール状態のサンプリング）"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import random
+import re
+import time
+
+import httpx
+
+from loadtest.scenarios import ScenarioSampler
+
+logger = logging.getLogger(__name__)
+
+MATCHING_PATH = "/api/matching"
+
+_METRIC_LINE = re.compile(r'^(\w+)(?:\{([^}]*)\})?\s+(\S+)$')
+
+
+@dataclass
+class StepConfig:
+    """1段階の負荷条件
+
+    rate = 0: クローズドループ（仮想ユーザーが応答を受け取ったらすぐ次を送る）
+    rate > 0: オープンループ（平均 rate 件/秒のポアソン到着、同時実行数は concurrency で上限）
+    """
+    concurrency: int
+    duration: float
+    rate: float = 0.0
+    warmup: float = 0.0
+
+
+@dataclass
+class RequestResult:
+    scenario: str
+    started: float  # 段階開始からの経過秒（オープンループでは到着時刻）
+    latency_ms: float  # 到着から応答まで（同時実行数上限による待ちを含む）
+    status: int  # 0: 接続エラー・タイムアウト
+    error: Optional[str] = None
+    server_ms: Optional[float] = None  # レスポンスの processing_time_ms
+
+
+@dataclass
+class PoolSample:
+    in_use: Dict[str, float]
+    max_size: Dict[str, float]
+    acquire_wait_seconds_total: Dict[str, float]
+    acquires_total: Dict[str, float]
+
+
+def parse_pool_metrics(text: str) -> PoolSample:
+    """/metrics のテキストからプール関連の値を pool ラベル別に取り出す"""
+    sample = PoolSample({}, {}, {}, {})
+    targets = {
+        "db_pool_max_connections": sample.max_size,
+        "db_pool_acquire_wait_seconds_total": sample.acquire_wait_seconds_total,
+        "db_pool_acquires_total": sample.acquires_total,
+    }
+    for line in text.splitlines():
+        match = _METRIC_LINE.match(line)
+        if not match:
+            continue
+        name, labels, value = match.groups()
+        label_map = dict(re.findall(r'(\w+)="([^"]*)"', labels or ""))
+        pool = label_map.get("pool")
+        if pool is None:
+            continue
+        if name == "db_pool_connections" and label_map.get("state") == "in_use":
+            sample.in_use[pool] = float(value)
+        elif name in targets:
+            targets[name][pool] = float(value)
+    return sample
+
+
+async def scrape_pool(client: httpx.AsyncClient) -> Optional[PoolSample]:
+    try:
+        response = await client.get("/metrics", timeout=5.0)
+    except httpx.HTTPError:
+        return None
+    if response.status_code != 200:
+        return None
+    return parse_pool_metrics(response.text)
+
+
+async def _send(client: httpx.AsyncClient, sampler: ScenarioSampler, path: str, arrived: float, origin: float) -> RequestResult:
+    scenario = sampler.choose()
+    try:
+        response = await client.post(path, json=sampler.payload(scenario))
+    except httpx.HTTPError as e:
+        return RequestResult(scenario.key, arrived - origin, (time.perf_counter() - arrived) * 1000, 0, type(e).__name__)
+
+    latency_ms = (time.perf_counter() - arrived) * 1000
+    server_ms = None
+    error = None
+    if response.status_code == 200:
+        try:
+            server_ms = response.json().get("processing_time_ms")
+        except ValueError:
+            error = "InvalidJSON"
+    else:
+        error = f"HTTP {response.status_code}"
+    return RequestResult(scenario.key, arrived - origin, latency_ms, response.status_code, error, server_ms)
+
+
+async def run_step(
+    client: httpx.AsyncClient,
+    sampler: ScenarioSampler,
+    step: StepConfig,
+    path: str = MATCHING_PATH,
+    pool_interval: float = 1.0,
+    seed: Optional[int] = None,
+) -> Dict[str, object]:
+    """1段階を実行して結果とプールのサンプルを返す（ウォームアップ中の結果は除外）"""
+    results: List[RequestResult] = []
+    pool_samples: List[PoolSample] = []
+    origin = time.perf_counter()
+    deadline = origin + step.warmup + step.duration
+
+    async def watch_pool():
+        while True:
+            sample = await scrape_pool(client)
+            if sample is not None:
+                pool_samples.append(sample)
+            await asyncio.sleep(pool_interval)
+
+    async def virtual_user():
+        while time.perf_counter() < deadline:
+            results.append(await _send(client, sampler, path, time.perf_counter(), origin))
+
+    async def open_loop():
+        rng = random.Random(seed)
+        semaphore = asyncio.Semaphore(step.concurrency)
+        tasks = set()
+
+        async def arrival(arrived):
+            async with semaphore:
+                results.append(await _send(client, sampler, path, arrived, origin))
+
+        next_arrival = time.perf_counter()
+        while next_arrival < deadline:
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.create_task(arrival(next_arrival))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            next_arrival += rng.expovariate(step.rate)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+    watcher = asyncio.create_task(watch_pool())
+    try:
+        if step.rate > 0:
+            await open_loop()
+        else:
+            await asyncio.gather(*(virtual_user() for _ in range(step.concurrency)))
+    finally:
+        watcher.cancel()
+    final_sample = await scrape_pool(client)
+    if final_sample is not None:
+        pool_samples.append(final_sample)
+
+    measured = [r for r in results if r.started >= step.warmup]
+    elapsed = max(time.perf_counter() - origin - step.warmup, 1e-9)
+    logger.info(
+        f"📈 concurrency={step.concurrency} rate={step.rate or 'closed'}: "
+        f"{len(measured)} requests in {elapsed:.1f}s"
+    )
+    return {"config": step, "results": measured, "elapsed": elapsed, "pool_samples": pool_samples}
@@ -0,0 +1,123 @@
+"""負荷試験のシナリオ（業種・ターゲット層・予算の組み合わせと出現頻度）"""
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+import json
+import logging
+import random
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# MatchingFormData.validate_target_segments の許可リストと同じ
+TARGET_SEGMENTS = [
+    "男性12-19歳", "女性12-19歳", "男性20-34歳", "女性20-34歳",
+    "男性35-49歳", "女性35-49歳", "男性50-69歳", "女性50-69歳",
+]
+
+LOADTEST_COMPANY_PREFIX = "負荷試験"
+LOADTEST_SESSION_PREFIX = "loadtest-"
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """1種類のフォーム送信（業種 × ターゲット層 × 予算）"""
+    industry: str
+    target_segment: str
+    budget: str
+    weight: int = 1
+
+    @property
+    def key(self) -> str:
+        return f"{self.industry} / {self.target_segment} / {self.budget}"
+
+
+def normalize_target_segment(value: Any) -> Optional[str]:
+    """フィクスチャの表記ゆれ（配列・「歳」なし）を許可リストの表記に揃える"""
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if not value:
+        return None
+    value = str(value).strip()
+    if not value.endswith("歳"):
+        value += "歳"
+    return value if value in TARGET_SEGMENTS else None
+
+
+def _merge(scenarios: Iterable[Scenario]) -> List[Scenario]:
+    weights: Dict[tuple, int] = {}
+    for s in scenarios:
+        key = (s.industry, s.target_segment, s.budget)
+        weights[key] = weights.get(key, 0) + s.weight
+    return [Scenario(*key, weight=w) for key, w in sorted(weights.items(), key=lambda kv: -kv[1])]
+
+
+def load_fixture_scenarios(directory: Path) -> List[Scenario]:
+    """test_*.json（/api/matching のリクエストボディ）からシナリオを作る"""
+    scenarios = []
+    for path in sorted(directory.glob("test_*.json")):
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            continue
+        if not isinstance(data, dict) or not {"industry", "budget"} <= data.keys():
+            continue
+        segment = normalize_target_segment(data.get("target_segments"))
+        if segment is None:
+            logger.info(f"⏭️ ターゲット層を解釈できないためスキップ: {path.name}")
+            continue
+        scenarios.append(Scenario(data["industry"], segment, data["budget"]))
+    return _merge(scenarios)
+
+
+async def load_history_scenarios(conn, days: int = 180, limit: int = 200) -> List[Scenario]:
+    """form_submissions の送信履歴から出現頻度付きのシナリオを作る（負荷試験の送信は除外）"""
+    rows = await conn.fetch(
+        """
+        SELECT industry, target_segment, budget_range, COUNT(*) AS n
+        FROM form_submissions
+        WHERE created_at >= NOW() - make_interval(days => $1)
+          AND session_id NOT LIKE $2
+        GROUP BY industry, target_segment, budget_range
+        ORDER BY n DESC
+        LIMIT $3
+        """,
+        days,
+        LOADTEST_SESSION_PREFIX + "%",
+        limit,
+    )
+    scenarios = []
+    for row in rows:
+        segment = normalize_target_segment(row["target_segment"])
+        if segment is not None:
+            scenarios.append(Scenario(row["industry"], segment, row["budget_range"], int(row["n"])))
+    return _merge(scenarios)
+
+
+class ScenarioSampler:
+    """出現頻度に比例してシナリオを選び、リクエストボディを作る"""
+
+    def __init__(self, scenarios: List[Scenario], seed: Optional[int] = None) -> None:
+        if not scenarios:
+            raise ValueError("シナリオがありません（履歴・フィクスチャを確認してください）")
+        self.scenarios = scenarios
+        self._weights = [s.weight for s in scenarios]
+        self._random = random.Random(seed)
+
+    def choose(self) -> Scenario:
+        return self._random.choices(self.scenarios, weights=self._weights)[0]
+
+    def payload(self, scenario: Scenario) -> Dict[str, Any]:
+        return {
+            "industry": scenario.industry,
+            "target_segments": scenario.target_segment,
+            "purpose": ["商品サービスの売上拡大"],
+            "budget": scenario.budget,
+            "company_name": f"{LOADTEST_COMPANY_PREFIX}株式会社",
+            "email": "loadtest@example.com",
+            "contact_name": "負荷試験",
+            "phone": "000-0000-0000",
+            "genre_preference": "希望ジャンルなし",
+            "email_consent": False,
+            "session_id": f"{LOADTEST_SESSION_PREFIX}{uuid.uuid4().hex}",
+        }
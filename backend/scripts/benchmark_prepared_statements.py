@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+プリペアドステートメントのベンチマーク
+
+レジストリ（app.db.prepared_statements）に登録されたホットクエリを、同じ引数で
+  - text:     SQL文字列で実行（asyncpg 既定の文キャッシュあり。レジストリ無しの本番と同じ）
+  - prepared: 接続作成時に準備したステートメントで実行（本番のプール接続と同じ）
+の2通り実行し、新しい接続での初回実行と2回目以降のレイテンシ（中央値・p95）を比較する。
+asyncpg は2回目以降のSQL文字列も自動で準備済みのため、2回目以降の差はレジストリの
+オーバーヘッド程度で、主な削減は接続ごとの初回（パース・プランニング）を接続作成時に移す分となる。
+
+引数は実データから組み立てる（先頭の予算区分・ターゲット層・業種、STEP 0-4 の上位タレント）。
+
+使用例:
+    python scripts/benchmark_prepared_statements.py
+    python scripts/benchmark_prepared_statements.py --iterations 100 --industry 食品
+    python scripts/benchmark_prepared_statements.py --json > prepared_benchmark.json
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncpg
+
+from app.db.connection import asyncpg_connection_params
+from app.db import prepared_statements
+# 登録元モジュールを読み込んでホットクエリをレジストリに登録
+from app.api.endpoints import matching  # noqa: F401
+
+
+async def build_arguments(conn, industry: str = None) -> Dict[str, tuple]:
+    """各ステートメントの引数を実データから組み立てる"""
+    budget_name = await conn.fetchval("SELECT range_name FROM budget_ranges ORDER BY min_amount NULLS FIRST LIMIT 1")
+    segment_name = await conn.fetchval("SELECT segment_name FROM target_segments ORDER BY target_segment_id LIMIT 1")
+    industry_name = industry or await conn.fetchval("SELECT industry_name FROM industries ORDER BY industry_id LIMIT 1")
+
+    normalized_budget = matching.normalize_budget_range_string(budget_name)
+    row = await conn.fetchrow(
+        prepared_statements.registered_statements()["matching_parameters"],
+        normalized_budget, segment_name, industry_name,
+    )
+    if row is None:
+        raise RuntimeError(f"パラメータが見つかりません: {budget_name} / {segment_name} / {industry_name}")
+
+    image_item_ids = [row["required_image_id"]] if row["required_image_id"] else [1, 2, 3, 4, 5, 6, 7]
+    step_args = (
+        float(row["min_amount"] or 0), row["target_segment_id"], image_item_ids,
+        False, False, float(row["max_amount"] or 999999999999), 30,
+    )
+    top_rows = await conn.fetch(prepared_statements.registered_statements()["matching_step0_4"], *step_args)
+    account_ids = [r["account_id"] for r in top_rows]
+
+    return {
+        "matching_parameters": (normalized_budget, segment_name, industry_name),
+        "matching_step0_4": step_args,
+        "cm_competing_category": (account_ids, datetime.now().date(), [1, 3, 4]),
+        "recommended_talents_for_matching": (industry_name,),
+    }
+
+
+async def measure(run, iterations: int) -> Dict[str, float]:
+    """初回（接続で最初の実行）と2回目以降のレイテンシを計測"""
+    timings = []
+    for _ in range(iterations + 1):
+        start = time.perf_counter()
+        await run()
+        timings.append((time.perf_counter() - start) * 1000)
+    first, ordered = timings[0], sorted(timings[1:])
+    return {
+        "first_ms": round(first, 3),
+        "median_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+    }
+
+
+async def run_benchmark(iterations: int, industry: str = None) -> Dict[str, Any]:
+    params = asyncpg_connection_params()
+    # 引数の組み立て用（計測する接続で事前に実行して初回を汚さない）
+    setup_conn = await asyncpg.connect(**params)
+    # text: asyncpg 既定の文キャッシュ／ prepared: 本番プールと同じ初期化フック
+    text_conn = await asyncpg.connect(**params)
+    prepared_conn = await asyncpg.connect(**params)
+    try:
+        arguments = await build_arguments(setup_conn, industry)
+        await prepared_statements.prepare_registered_statements(prepared_conn)
+        sql = prepared_statements.registered_statements()
+
+        results = {}
+        for name, args in arguments.items():
+            text = await measure(lambda: text_conn.fetch(sql[name], *args), iterations)
+            prepared = await measure(
+                lambda: prepared_statements.fetch_prepared(prepared_conn, name, *args), iterations
+            )
+            results[name] = {
+                "text": text,
+                "prepared": prepared,
+                "saving_first_ms": round(text["first_ms"] - prepared["first_ms"], 3),
+                "saving_median_ms": round(text["median_ms"] - prepared["median_ms"], 3),
+            }
+        return {
+            "iterations": iterations,
+            "statements": results,
+            "registry": prepared_statements.get_prepared_statement_status(),
+        }
+    finally:
+        await setup_conn.close()
+        await text_conn.close()
+        await prepared_conn.close()
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print("=" * 80)
+    print(f"📊 プリペアドステートメント ベンチマーク（{report['iterations']}回）")
+    print("=" * 80)
+    print(f"{'ステートメント':<36}{'初回 text/prepared':>22}{'削減':>10}{'中央値 text/prepared':>24}{'削減':>10}")
+    for name, result in report["statements"].items():
+        text, prepared = result["text"], result["prepared"]
+        print(
+            f"{name:<36}{text['first_ms']:>10.2f}/{prepared['first_ms']:<9.2f}ms{result['saving_first_ms']:>8.2f}ms"
+            f"{text['median_ms']:>12.2f}/{prepared['median_ms']:<9.2f}ms{result['saving_median_ms']:>8.2f}ms"
+        )
+    registry = report["registry"]
+    print(f"\n準備時間（接続あたり）: {registry['prepare_seconds_total'] * 1000:.1f}ms / "
+          f"{registry['statements_prepared']}文")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="プリペアドステートメントのベンチマーク")
+    parser.add_argument("--iterations", type=int, default=30, help="各ステートメントの実行回数")
+    parser.add_argument("--industry", help="業種名（既定: industries の先頭）")
+    parser.add_argument("--json", action="store_true", help="JSONで出力")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args.iterations, args.industry))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
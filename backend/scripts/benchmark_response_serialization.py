@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+MatchingResponse のシリアライズ処理のベンチマーク
+
+30件の TalentResult を持つ MatchingResponse を、1リクエスト分ずつ
+  - default:   FastAPI 既定の経路（response_model で再検証 → jsonable_encoder → json.dumps）
+  - orjson:    FastAPI の経路のまま既定レスポンスクラスだけ FastJSONResponse にした場合
+  - model:     model_response()（再検証なしで model_dump_json() を直接返す、/api/matching の高速経路）
+の3通りでバイト列にし、処理時間（中央値・p95）を比較する。DB接続は不要。
+
+使用例:
+    python scripts/benchmark_response_serialization.py
+    python scripts/benchmark_response_serialization.py --iterations 5000 --results 30
+    python scripts/benchmark_response_serialization.py --json > serialization_benchmark.json
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.core.responses import FastJSONResponse, model_response, orjson
+from app.schemas.matching import MatchingResponse, TalentResult
+
+
+def build_response(count: int) -> MatchingResponse:
+    results = [
+        TalentResult(
+            account_id=10000 + i,
+            name=f"サンプルタレント{i + 1}",
+            kana=f"サンプルタレント{i + 1}",
+            category="俳優",
+            company_name="サンプル事務所",
+            matching_score=round(98.5 - i * 0.7, 1),
+            ranking=i + 1,
+            base_power_score=85.3 - i,
+            image_adjustment=12.0,
+            is_recommended=i < 3,
+            is_currently_in_cm=i % 4 == 0,
+        )
+        for i in range(count)
+    ]
+    return MatchingResponse(
+        success=True, total_results=len(results), results=results,
+        processing_time_ms=242.5, session_id="benchmark-session",
+    )
+
+
+async def measure(run: Callable[[], Awaitable[bytes]], iterations: int) -> List[float]:
+    await run()  # ウォームアップ
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await run()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    ordered = sorted(timings)
+    return {
+        "median_ms": round(statistics.median(ordered), 4),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+    }
+
+
+async def run_benchmark(iterations: int, count: int) -> Dict[str, Any]:
+    response = build_response(count)
+    field = create_model_field(name="Response_post_matching", type_=MatchingResponse, mode="serialization")
+
+    def via_route(response_class):
+        async def run() -> bytes:
+            content = await serialize_response(field=field, response_content=response, is_coroutine=True)
+            return response_class(content).body
+        return run
+
+    async def via_model() -> bytes:
+        return model_response(response).body
+
+    paths = {"default": via_route(JSONResponse), "orjson": via_route(FastJSONResponse), "model": via_model}
+
+    # 3経路とも同じJSONになることを確認してから計測する
+    decoded = {name: json.loads(await run()) for name, run in paths.items()}
+    if any(value != decoded["default"] for value in decoded.values()):
+        raise RuntimeError("シリアライズ結果が経路によって異なります")
+
+    results = {name: summarize(await measure(run, iterations)) for name, run in paths.items()}
+    baseline = results["default"]["median_ms"]
+    for result in results.values():
+        result["speedup"] = round(baseline / result["median_ms"], 2) if result["median_ms"] else None
+    return {
+        "iterations": iterations,
+        "results_per_response": count,
+        "response_bytes": len(await via_model()),
+        "orjson_available": orjson is not None,
+        "paths": results,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print("=" * 80)
+    print(f"📊 レスポンスシリアライズ ベンチマーク（{report['iterations']}回、"
+          f"{report['results_per_response']}件/レスポンス、{report['response_bytes']:,} bytes）")
+    print("=" * 80)
+    print(f"{'経路':<12}{'中央値':>12}{'p95':>12}{'倍率':>10}")
+    for name, result in report["paths"].items():
+        print(f"{name:<12}{result['median_ms']:>10.3f}ms{result['p95_ms']:>10.3f}ms{result['speedup']:>9.2f}x")
+    if not report["orjson_available"]:
+        print("\n⚠️ orjson が未インストールのため、orjson 経路は標準の json で計測しています")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MatchingResponse のシリアライズ処理のベンチマーク")
+    parser.add_argument("--iterations", type=int, default=2000, help="各経路の実行回数")
+    parser.add_argument("--results", type=int, default=30, help="レスポンスあたりのタレント件数（最大30）")
+    parser.add_argument("--json", action="store_true", help="JSONで出力")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_benchmark(args.iterations, min(args.results, 30)))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+スコアリング配列スナップショットのビルド（Cloud Build / Docker ビルド前に実行）
+
+APIは SCORING_ARRAYS_PATH に置かれた成果物を起動時にメモリマップし、
+初回マッチングから STEP 0-4 をDBに問い合わせずに実行する。
+
+使用例:
+    # DBから直接ビルド
+    python scripts/build_scoring_arrays.py --output scoring_arrays
+
+    # 既存のカラムナースナップショット（scripts/scoring_snapshot.py export）からビルド
+    python scripts/build_scoring_arrays.py --output scoring_arrays --from-snapshot snapshots
+
+    # 成果物の内容確認
+    python scripts/build_scoring_arrays.py --inspect scoring_arrays
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from app.services.scoring_arrays import ScoringArrays
+
+
+async def build_from_database(output: str) -> ScoringArrays:
+    """DBからテーブルを取得して配列を構築"""
+    from app.db.connection import acquire_connection, close_db
+    from app.db.data_version import fetch_data_version
+    from app.services.scoring_snapshot import fetch_snapshot_tables
+
+    try:
+        async with acquire_connection() as conn:
+            data_version = await fetch_data_version(conn)
+            tables = await fetch_snapshot_tables(conn)
+            # 取得中にマスタが更新された場合は古いバージョンで刻印しない
+            if await fetch_data_version(conn) != data_version:
+                raise RuntimeError("ビルド中にマスタデータが更新されました。再実行してください")
+    finally:
+        await close_db()
+
+    arrays = ScoringArrays.from_tables(tables, data_version)
+    arrays.save(output)
+    return arrays
+
+
+def build_from_snapshot(snapshot_path: str, output: str) -> ScoringArrays:
+    """カラムナースナップショットから配列を構築"""
+    from app.services.scoring_snapshot import ScoringSnapshot
+
+    snapshot = ScoringSnapshot.open(snapshot_path)
+    arrays = ScoringArrays.from_tables(snapshot.tables(), snapshot.data_version)
+    arrays.save(output)
+    return arrays
+
+
+def inspect(path: str) -> None:
+    """成果物の読み込み時間と内容を表示"""
+    start = time.perf_counter()
+    arrays = ScoringArrays.load(path, mmap=True)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    print(f"📦 {path}")
+    print(f"   データバージョン: {arrays.data_version}")
+    print(f"   作成日時: {arrays.created_at}")
+    print(f"   タレント数: {arrays.talent_count:,}")
+    print(f"   ターゲット層: {arrays.segment_ids}")
+    print(f"   読み込み時間（メモリマップ）: {elapsed_ms:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="スコアリング配列スナップショットのビルド")
+    parser.add_argument("--output", default="scoring_arrays", help="出力ディレクトリ")
+    parser.add_argument("--from-snapshot", help="DBの代わりに使うカラムナースナップショット")
+    parser.add_argument("--inspect", metavar="PATH", help="ビルドせずに成果物の内容を表示")
+    args = parser.parse_args()
+
+    if args.inspect:
+        inspect(args.inspect)
+        sys.exit(0)
+
+    start = time.perf_counter()
+    if args.from_snapshot:
+        arrays = build_from_snapshot(args.from_snapshot, args.output)
+    else:
+        arrays = asyncio.run(build_from_database(args.output))
+
+    print(f"✅ スコアリング配列ビルド完了: {args.output} ({time.perf_counter() - start:.1f}s)")
+    print(f"   データバージョン: {arrays.data_version}")
+    print(f"   タレント数: {arrays.talent_count:,} / ターゲット層: {len(arrays.segment_ids)}")
@@ -0,0 +1,48 @@
+-- 診断結果のコンパクト保存テーブル作成（1フォーム送信 = 1行）
+-- 目的: 診断ごとに diagnosis_results へ30行書く代わりに、順位順の並列配列で1行だけ書く。
+--       書き込み・インデックス更新が1行分になり、参照は主キー1行の取得で済む
+--
+-- - diagnosis_result_sets: 順位 i（1始まり）の結果は各配列の i 番目
+-- - diagnosis_results_all: 既存の diagnosis_results と同じ列の互換ビュー（行形式 + コンパクト形式）
+--   管理画面・PDF・手元の集計SQLは、このビューを読めば保存形式に関係なく30行で取得できる
+--
+-- 実行: psql "$DATABASE_URL" -f scripts/create_diagnosis_result_sets.sql
+-- 適用後に DIAGNOSIS_STORAGE=compact にすると新しい診断はコンパクト形式で保存される
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS diagnosis_result_sets (
+    form_submission_id INTEGER PRIMARY KEY,
+    talent_account_ids INTEGER[] NOT NULL,
+    talent_names VARCHAR(255)[] NOT NULL,
+    talent_categories VARCHAR(255)[] NOT NULL,
+    matching_scores NUMERIC(5,2)[] NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    CHECK (
+        cardinality(talent_names) = cardinality(talent_account_ids)
+        AND cardinality(talent_categories) = cardinality(talent_account_ids)
+        AND cardinality(matching_scores) = cardinality(talent_account_ids)
+    )
+);
+
+CREATE OR REPLACE VIEW diagnosis_results_all AS
+SELECT id, form_submission_id, ranking, talent_account_id, talent_name, talent_category, matching_score, created_at
+FROM diagnosis_results
+UNION ALL
+SELECT
+    NULL::INTEGER AS id,
+    s.form_submission_id,
+    r.ranking::INTEGER,
+    r.talent_account_id,
+    r.talent_name,
+    r.talent_category,
+    r.matching_score,
+    s.created_at
+FROM diagnosis_result_sets s
+CROSS JOIN LATERAL unnest(s.talent_account_ids, s.talent_names, s.talent_categories, s.matching_scores)
+    WITH ORDINALITY AS r(talent_account_id, talent_name, talent_category, matching_score, ranking);
+
+COMMENT ON TABLE diagnosis_result_sets IS '診断結果タレント30名（1フォーム送信1行、順位順の並列配列）';
+COMMENT ON VIEW diagnosis_results_all IS '診断結果の互換ビュー（diagnosis_results と diagnosis_result_sets を行形式で統合）';
+
+COMMIT;
@@ -0,0 +1,24 @@
+-- フォーム送信検索用インデックス作成（app.services.submission_search）
+-- 目的: 管理画面のリード検索（会社名・担当者名・メールの部分一致 + 業種・期間の絞り込み）を
+--       全件取得なしで数ミリ秒で返す
+-- CONCURRENTLY で作成するため、トランザクション外で実行すること（psql -f でそのまま実行可）
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- 部分一致（ILIKE '%...%'）用の trigram GIN インデックス
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_form_submissions_company_trgm
+    ON form_submissions USING gin (company_name gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_form_submissions_contact_trgm
+    ON form_submissions USING gin (contact_name gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_form_submissions_email_trgm
+    ON form_submissions USING gin (email gin_trgm_ops);
+
+-- 業種での絞り込み + 新しい順のキーセットページング
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_form_submissions_industry_created
+    ON form_submissions (industry, created_at DESC, id DESC);
+
+-- 絞り込みなしの新しい順のキーセットページング
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_form_submissions_created_id
+    ON form_submissions (created_at DESC, id DESC);
+
+ANALYZE form_submissions;
@@ -0,0 +1,51 @@
+-- マスタデータバージョン管理テーブル作成
+-- 目的: スナップショット・キャッシュ・事前計算結果の鮮度判定に使う単調増加バージョン
+-- マスタテーブルへの変更（INSERT/UPDATE/DELETE/TRUNCATE）を文単位トリガーで検知して自動採番する
+
+CREATE TABLE IF NOT EXISTS master_data_version (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 1,
+    last_table VARCHAR(100),
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO master_data_version (id, version, last_table)
+VALUES (1, 1, NULL)
+ON CONFLICT (id) DO NOTHING;
+
+-- バージョン採番関数（文単位トリガー用）
+CREATE OR REPLACE FUNCTION bump_master_data_version() RETURNS trigger AS $$
+BEGIN
+    UPDATE master_data_version
+    SET version = version + 1,
+        last_table = TG_TABLE_NAME,
+        updated_at = NOW()
+    WHERE id = 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- マッチング結果に影響するマスタテーブルへトリガー設定
+DO $$
+DECLARE
+    target_table TEXT;
+BEGIN
+    FOREACH target_table IN ARRAY ARRAY[
+        'm_account', 'm_talent_act', 'talent_scores', 'talent_images', 'm_talent_cm',
+        'industries', 'target_segments', 'budget_ranges', 'recommended_talents'
+    ]
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_master_data_version ON %I', target_table);
+        EXECUTE format(
+            'CREATE TRIGGER trg_master_data_version
+             AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I
+             FOR EACH STATEMENT EXECUTE FUNCTION bump_master_data_version()',
+            target_table
+        );
+    END LOOP;
+END;
+$$;
+
+COMMENT ON TABLE master_data_version IS 'マスタデータバージョン（スナップショット・キャッシュ鮮度判定用）';
+COMMENT ON COLUMN master_data_version.version IS 'マスタ変更ごとに単調増加するバージョン番号';
+COMMENT ON COLUMN master_data_version.last_table IS '最後に変更されたテーブル名';
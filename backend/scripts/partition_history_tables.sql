@@ -0,0 +1,117 @@
+-- 履歴テーブルの月次パーティション化（diagnosis_results・button_clicks）
+-- 目的: 診断ごとに30行増える diagnosis_results とクリックごとに増える button_clicks を
+--       作成月ごとのパーティションに分け、書き込み・参照のレイテンシを履歴の量に依存させない。
+--       古い月はパーティション単位で圧縮アーカイブ・削除する（scripts/partition_maintenance.py）
+--
+-- - パーティションキー: diagnosis_results.created_at / button_clicks.clicked_at（月単位のRANGE）
+-- - 主キーはパーティションキーを含む必要があるため (id, created_at) / (id, clicked_at) に変更
+-- - form_submissions への外部キーは外す（パーティションごとの削除ができなくなるため）。
+--   form_submissions は session_id の一意制約（再送時の ON CONFLICT）を持つためパーティション化しない
+-- - 範囲外の行は DEFAULT パーティションに入る（先の月のパーティションはアプリが自動作成）
+-- - 移行前のテーブルは *_legacy として残す。件数を確認後に DROP TABLE してよい
+--
+-- 実行: psql "$DATABASE_URL" -f scripts/partition_history_tables.sql（1トランザクション）
+
+BEGIN;
+
+-- 月次パーティション作成関数（既存はスキップ）
+CREATE OR REPLACE FUNCTION create_monthly_partition(parent TEXT, month_start DATE) RETURNS TEXT AS $$
+DECLARE
+    partition_name TEXT := format('%s_p%s', parent, to_char(month_start, 'YYYYMM'));
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+        partition_name, parent, month_start, (month_start + INTERVAL '1 month')::date
+    );
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ===== diagnosis_results =====
+ALTER TABLE diagnosis_results RENAME TO diagnosis_results_legacy;
+ALTER TABLE diagnosis_results_legacy RENAME CONSTRAINT diagnosis_results_pkey TO diagnosis_results_legacy_pkey;
+ALTER INDEX IF EXISTS idx_diagnosis_results_submission_id RENAME TO idx_diagnosis_results_legacy_submission_id;
+ALTER INDEX IF EXISTS idx_diagnosis_results_ranking RENAME TO idx_diagnosis_results_legacy_ranking;
+ALTER SEQUENCE diagnosis_results_id_seq OWNED BY NONE;
+
+CREATE TABLE diagnosis_results (
+    id INTEGER NOT NULL DEFAULT nextval('diagnosis_results_id_seq'),
+    form_submission_id INTEGER NOT NULL,
+    ranking INTEGER NOT NULL,
+    talent_account_id INTEGER NOT NULL,
+    talent_name VARCHAR(255) NOT NULL,
+    talent_category VARCHAR(255),
+    matching_score DECIMAL(5,2) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+ALTER SEQUENCE diagnosis_results_id_seq OWNED BY diagnosis_results.id;
+CREATE INDEX idx_diagnosis_results_ranking ON diagnosis_results (form_submission_id, ranking);
+CREATE TABLE diagnosis_results_default PARTITION OF diagnosis_results DEFAULT;
+
+-- ===== button_clicks =====
+ALTER TABLE button_clicks RENAME TO button_clicks_legacy;
+ALTER TABLE button_clicks_legacy RENAME CONSTRAINT button_clicks_pkey TO button_clicks_legacy_pkey;
+ALTER INDEX IF EXISTS idx_button_clicks_submission RENAME TO idx_button_clicks_legacy_submission;
+ALTER INDEX IF EXISTS idx_button_clicks_type RENAME TO idx_button_clicks_legacy_type;
+ALTER INDEX IF EXISTS idx_button_clicks_clicked_at RENAME TO idx_button_clicks_legacy_clicked_at;
+ALTER SEQUENCE button_clicks_id_seq OWNED BY NONE;
+
+CREATE TABLE button_clicks (
+    id INTEGER NOT NULL DEFAULT nextval('button_clicks_id_seq'),
+    form_submission_id INTEGER NOT NULL,
+    button_type VARCHAR(50) NOT NULL,
+    button_text VARCHAR(255),
+    clicked_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    ip_address VARCHAR(45),
+    user_agent TEXT,
+    PRIMARY KEY (id, clicked_at)
+) PARTITION BY RANGE (clicked_at);
+
+ALTER SEQUENCE button_clicks_id_seq OWNED BY button_clicks.id;
+CREATE INDEX idx_button_clicks_submission ON button_clicks (form_submission_id, button_type, clicked_at DESC);
+CREATE INDEX idx_button_clicks_type ON button_clicks (button_type, clicked_at);
+CREATE TABLE button_clicks_default PARTITION OF button_clicks DEFAULT;
+
+-- 既存データの月から3か月先までのパーティションを作成
+DO $$
+DECLARE
+    target RECORD;
+    first_month DATE;
+    month_start DATE;
+BEGIN
+    FOR target IN
+        SELECT * FROM (VALUES
+            ('diagnosis_results', 'diagnosis_results_legacy', 'created_at'),
+            ('button_clicks', 'button_clicks_legacy', 'clicked_at')
+        ) AS t(parent, legacy, key_column)
+    LOOP
+        EXECUTE format('SELECT date_trunc(''month'', MIN(%I))::date FROM %I', target.key_column, target.legacy)
+            INTO first_month;
+        month_start := COALESCE(first_month, date_trunc('month', CURRENT_DATE)::date);
+        WHILE month_start <= (date_trunc('month', CURRENT_DATE) + INTERVAL '3 months')::date LOOP
+            PERFORM create_monthly_partition(target.parent, month_start);
+            month_start := (month_start + INTERVAL '1 month')::date;
+        END LOOP;
+    END LOOP;
+END;
+$$;
+
+-- 既存データの移行（created_at / clicked_at が NULL の行は移行時刻を入れる）
+INSERT INTO diagnosis_results
+SELECT id, form_submission_id, ranking, talent_account_id, talent_name, talent_category, matching_score,
+       COALESCE(created_at, NOW())
+FROM diagnosis_results_legacy;
+
+INSERT INTO button_clicks
+SELECT id, form_submission_id, button_type, button_text, COALESCE(clicked_at, NOW()), ip_address, user_agent
+FROM button_clicks_legacy;
+
+COMMENT ON TABLE diagnosis_results IS '診断結果タレント30名保存テーブル（created_at の月次パーティション）';
+COMMENT ON TABLE button_clicks IS 'ボタンクリック追跡テーブル（clicked_at の月次パーティション）';
+
+COMMIT;
+
+ANALYZE diagnosis_results;
+ANALYZE button_clicks;
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+履歴テーブル（diagnosis_results・button_clicks）の月次パーティション管理
+
+事前に scripts/partition_history_tables.sql でパーティション化しておくこと。
+
+使用例:
+    # パーティション一覧と、保持期間を過ぎた（アーカイブ対象の）パーティションを表示
+    python scripts/partition_maintenance.py --status
+
+    # 先の月のパーティションを作成（アプリの管理系プロファイルも毎日実行している）
+    python scripts/partition_maintenance.py --create-ahead 6
+
+    # 保持期間を過ぎたパーティションを圧縮アーカイブして削除（cron で月1回）
+    python scripts/partition_maintenance.py --retention --retention-months 24 --archive-dir /mnt/archive
+
+    # 削除対象の確認のみ
+    python scripts/partition_maintenance.py --retention --dry-run
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncpg
+
+from app.core.config import settings
+from app.db.connection import asyncpg_connection_params
+from app.services import partition_maintenance as pm
+
+
+async def show_status(conn, retention_months: int) -> None:
+    for parent in pm.PARTITIONED_TABLES:
+        if not await pm.is_partitioned(conn, parent):
+            print(f"ℹ️ {parent}: パーティション化されていません（scripts/partition_history_tables.sql）")
+            continue
+        names = await pm.list_partitions(conn, parent)
+        expired = set(pm.expired_partitions(names, date.today(), retention_months))
+        print(f"📦 {parent}: {len(names)}パーティション")
+        for name in names:
+            rows = await conn.fetchval(f'SELECT COUNT(*) FROM "{name}"')
+            mark = "  ← アーカイブ対象" if name in expired else ""
+            print(f"   {name:<40}{rows:>12,}行{mark}")
+
+
+async def main(args) -> None:
+    conn = await asyncpg.connect(**asyncpg_connection_params())
+    try:
+        if args.status:
+            await show_status(conn, args.retention_months)
+        if args.create_ahead is not None:
+            created = await pm.ensure_future_partitions(conn, months_ahead=args.create_ahead)
+            print(f"✅ 作成: {', '.join(created) if created else 'なし（作成済み）'}")
+        if args.retention:
+            result = await pm.run_retention(
+                conn, retention_months=args.retention_months, archive_dir=args.archive_dir, dry_run=args.dry_run,
+            )
+            if result.dry_run:
+                print(f"🔎 アーカイブ対象: {', '.join(result.expired) if result.expired else 'なし'}")
+            for manifest in result.archived:
+                print(
+                    f"📦 {manifest['partition']}: {manifest['rows']:,}行 → "
+                    f"{manifest['compressed_bytes']:,} bytes（sha256={manifest['sha256'][:12]}）"
+                )
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="履歴テーブルの月次パーティション管理")
+    parser.add_argument("--status", action="store_true", help="パーティション一覧を表示")
+    parser.add_argument("--create-ahead", type=int, help="当月から指定か月先までのパーティションを作成")
+    parser.add_argument("--retention", action="store_true", help="保持期間を過ぎたパーティションをアーカイブして削除")
+    parser.add_argument("--retention-months", type=int, default=settings.partition_retention_months, help="保持する月数")
+    parser.add_argument("--archive-dir", default=settings.partition_archive_dir, help="アーカイブの保存先")
+    parser.add_argument("--dry-run", action="store_true", help="--retention の対象を表示するのみ")
+    args = parser.parse_args()
+
+    if not (args.status or args.create_ahead is not None or args.retention):
+        parser.print_help()
+        sys.exit(1)
+    asyncio.run(main(args))
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+マッチング上位K件の事前計算（データ取り込み後・業種の必須イメージ変更後に実行）
+
+予算帯 × ターゲット層 × 業種イメージ × アルコールフラグの全組み合わせについて STEP 0-4 の
+上位K件を matching_topk に書き出す。APIはデータバージョンが一致する間この結果を索引参照する。
+
+使用例:
+    # 古い場合のみ再計算
+    python scripts/precompute_matching_topk.py
+
+    # 最新でも再計算 / 保持件数を変更
+    python scripts/precompute_matching_topk.py --force --k 80
+
+    # 事前計算結果と統合CTEの比較（無作為に20組み合わせ）
+    python scripts/precompute_matching_topk.py --verify 20
+
+    # 状態確認のみ
+    python scripts/precompute_matching_topk.py --status
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from app.services import matching_topk
+
+
+async def show_status() -> None:
+    conn = await matching_topk.open_connection()
+    try:
+        state = await matching_topk.read_state(conn)
+    finally:
+        await conn.close()
+
+    print(f"📦 状態: {state['status']}（DB: {state['db_version']}）")
+    if "data_version" in state:
+        print(f"   計算元データバージョン: {state['data_version']}")
+        print(f"   計算日: {state['computed_on']} / K={state['k']}")
+        print(f"   組み合わせ: {state['combinations']:,} / 行数: {state['row_count']:,}")
+        print(f"   所要時間: {state['duration_ms']:.0f}ms（{state['refreshed_at']}）")
+
+
+async def verify(sample: int, seed: int) -> bool:
+    conn = await matching_topk.open_connection()
+    try:
+        results = await matching_topk.verify_matching_topk(conn, sample=sample, seed=seed)
+    finally:
+        await conn.close()
+
+    mismatches = [r for r in results if not r["identical"]]
+    for r in mismatches:
+        params = r["params"]
+        print(
+            f"⚠️ 差分: segment={params['target_segment_id']} images={params['image_item_ids']} "
+            f"budget={params['min_budget']:.0f}-{params['max_budget']:.0f} alcohol={params['is_alcohol_industry']} "
+            f"rows={r['precomputed_rows']} first_divergence={r['first_divergence']} "
+            f"missing={r['missing']} extra={r['extra']}"
+        )
+    print(f"{'✅' if not mismatches else '❌'} 比較 {len(results)} 組み合わせ / 差分 {len(mismatches)}")
+    return not mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="マッチング上位K件の事前計算")
+    parser.add_argument("--k", type=int, default=None, help="保持件数（既定: MATCHING_TOPK_K）")
+    parser.add_argument("--force", action="store_true", help="最新でも再計算する")
+    parser.add_argument("--verify", type=int, metavar="N", nargs="?", const=0,
+                        help="再計算せずに統合CTEと比較（N: 無作為抽出する組み合わせ数、省略時は全件）")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--status", action="store_true", help="再計算せずに状態を表示")
+    args = parser.parse_args()
+
+    if args.status:
+        asyncio.run(show_status())
+        sys.exit(0)
+    if args.verify is not None:
+        sys.exit(0 if asyncio.run(verify(args.verify, args.seed)) else 1)
+
+    start = time.perf_counter()
+    result = asyncio.run(matching_topk.refresh(k=args.k, force=args.force))
+    if result["status"] == "busy":
+        print("ℹ️ 他のインスタンスが再計算中のため実行しませんでした")
+        sys.exit(0)
+    if not result["refreshed"]:
+        print(f"✅ 最新のため再計算しませんでした: {result['data_version']}（--force で再計算）")
+        sys.exit(0)
+
+    print(f"✅ マッチング上位K件の事前計算完了 ({time.perf_counter() - start:.1f}s)")
+    print(f"   データバージョン: {result['data_version']}")
+    print(f"   組み合わせ: {result['combinations']:,} / 行数: {result['row_count']:,} / K={result['k']}")
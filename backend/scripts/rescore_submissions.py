@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+過去のフォーム送信の一括再スコアリング（順位差分レポート）
+
+スコアデータ・おすすめタレントを更新した後、過去のリードの診断結果が現在のデータで
+どう変わるかをCSVに書き出す。マッチングは (業種, ターゲット層, 予算区分) の組み合わせごとに
+1回だけ実行し、フォーム送信はカーソルで読みながら1行ずつレポートへ書き出す。
+
+使用例:
+    # 全件（.gz で終わる場合は gzip 圧縮）
+    python scripts/rescore_submissions.py --output rescore_report.csv.gz
+
+    # 期間指定・マッチングの同時実行数を変更
+    python scripts/rescore_submissions.py --since 2025-10-01 --until 2025-12-01 --concurrency 2 --output report.csv
+
+レポートの列: app/services/rescore_history.py の REPORT_COLUMNS
+    status: same / up / down / new（新たに30位以内） / dropped（30位圏外へ）
+"""
+
+import argparse
+import asyncio
+import csv
+import gzip
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncpg
+
+from app.db.connection import asyncpg_connection_params, close_db, init_db
+from app.services import rescore_history
+
+
+def open_report(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8-sig", newline="")
+
+
+async def main(args) -> None:
+    # マッチング（run_matching_pipeline）は接続プール、フォーム送信の読み出しは専用接続のカーソル
+    await init_db(ensure_schema=False)
+    conn = await asyncpg.connect(**asyncpg_connection_params())
+    try:
+        with open_report(args.output) as out:
+            writer = csv.writer(out)
+            writer.writerow(rescore_history.REPORT_COLUMNS)
+            summary = await rescore_history.rescore_submissions(
+                conn,
+                writer.writerow,
+                since=args.since,
+                until=args.until,
+                concurrency=args.concurrency,
+            )
+    finally:
+        await conn.close()
+        await close_db()
+
+    status = summary.status()
+    print(f"✅ レポート: {args.output}（{status['report_rows']:,}行）")
+    print(f"   組み合わせ: {status['groups']:,} / マッチング実行: {status['matching_runs']:,}（{status['ranking_seconds']}秒）")
+    print(
+        f"   フォーム送信: {status['submissions']:,} / 順位変動あり: {status['changed_submissions']:,} / "
+        f"保存済み結果なし: {status['without_previous']:,}（{status['report_seconds']}秒）"
+    )
+    for failed in status["failed_groups"]:
+        print(f"⚠️ 再計算できない組み合わせ: {failed['industry']} / {failed['target_segment']} / {failed['budget_range']}: {failed['error']}")
+    if status["skipped_submissions"]:
+        print(f"⚠️ 対象外のフォーム送信: {status['skipped_submissions']:,}件")
+    if args.summary_json:
+        Path(args.summary_json).write_text(json.dumps(status, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="過去のフォーム送信の一括再スコアリング")
+    parser.add_argument("--output", required=True, help="順位差分レポートの出力先（.csv / .csv.gz）")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="対象とする送信日時の下限（例: 2025-10-01）")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="対象とする送信日時の上限（この日時を含まない）")
+    parser.add_argument("--concurrency", type=int, default=4, help="マッチングの同時実行数")
+    parser.add_argument("--summary-json", help="集計結果をJSONで保存するパス")
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+スコアリングデータのスナップショット書き出し・ローカルマッチング実行
+
+本番DBへの探索的な全件スキャンを避けるため、分析はスナップショットに対して行う。
+
+使用例:
+    # スナップショット書き出し（Parquet + zstd）
+    python scripts/scoring_snapshot.py export --output-dir snapshots
+
+    # メモリマップ用（Arrow IPC・非圧縮）
+    python scripts/scoring_snapshot.py export --output-dir snapshots --format arrow --compression none
+
+    # スナップショットに対して STEP 0-4 を実行
+    python scripts/scoring_snapshot.py match --snapshot snapshots \
+        --industry "化粧品・ヘアケア・オーラルケア" --segment "女性20-34歳" --budget "1,000万円〜3,000万円未満"
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from app.services.scoring_snapshot import ScoringSnapshot, export_snapshot
+
+
+async def run_export(output_dir: str, fmt: str, compression: str) -> None:
+    """DBからスナップショットを書き出す"""
+    from app.db.connection import acquire_connection, close_db
+
+    try:
+        async with acquire_connection() as conn:
+            snapshot_dir = await export_snapshot(
+                conn, output_dir, fmt=fmt, compression=None if compression == "none" else compression
+            )
+    finally:
+        await close_db()
+
+    snapshot = ScoringSnapshot.open(snapshot_dir)
+    print(f"✅ スナップショット作成完了: {snapshot_dir}")
+    print(f"   データバージョン: {snapshot.data_version}")
+    for name, entry in snapshot.manifest["tables"].items():
+        print(f"   {name}: {entry['rows']:,}行")
+
+
+def run_match(snapshot_path: str, industry: str, segment: str, budget: str, as_json: bool) -> None:
+    """スナップショットに対してマッチングを実行"""
+    snapshot = ScoringSnapshot.open(snapshot_path)
+
+    start = time.perf_counter()
+    results = snapshot.match(industry, segment, budget)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    if as_json:
+        print(json.dumps(results, ensure_ascii=False, indent=2, default=str))
+        return
+
+    print(f"📊 {industry} / {segment} / {budget}（データバージョン: {snapshot.data_version}, {elapsed_ms:.1f}ms）")
+    for r in results:
+        print(
+            f"{r['ranking']:>2}位 {r['name']:<20} 基礎パワー {r['base_power_score']:6.2f}"
+            f"  イメージ {r['image_adjustment']:+6.2f}  反映得点 {r['reflected_score']:6.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="スコアリングデータスナップショット")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="DBからスナップショットを書き出す")
+    export_parser.add_argument("--output-dir", default="snapshots")
+    export_parser.add_argument("--format", choices=["parquet", "arrow"], default="parquet")
+    export_parser.add_argument("--compression", choices=["zstd", "lz4", "none"], default="zstd")
+
+    match_parser = subparsers.add_parser("match", help="スナップショットに対して STEP 0-4 を実行")
+    match_parser.add_argument("--snapshot", default="snapshots")
+    match_parser.add_argument("--industry", required=True)
+    match_parser.add_argument("--segment", required=True)
+    match_parser.add_argument("--budget", required=True)
+    match_parser.add_argument("--json", action="store_true", help="結果をJSONで出力")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        asyncio.run(run_export(args.output_dir, args.format, args.compression))
+    else:
+        run_match(args.snapshot, args.industry, args.segment, args.budget, args.json)
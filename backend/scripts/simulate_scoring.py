@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+スコアリング変更の試算（STEP 1 の重み・STEP 2 の加減点テーブル）
+
+全 (業種, ターゲット層, 予算区分) の組み合わせについて、本番と同じ設定の上位30名と
+試算する設定の上位30名の一致度を表示する。スナップショットを指定すれば本番DBには接続しない。
+
+使用例:
+    # VR人気度を重視（スナップショットに対して実行）
+    python scripts/simulate_scoring.py --snapshot snapshots --vr-weight 0.7 --tpr-weight 0.3
+
+    # 加減点テーブルを変更（上限値:加減点 を上限値の昇順で、最後は 1.0）
+    python scripts/simulate_scoring.py --snapshot snapshots --bands "0.1:15,0.5:0,1.0:-15"
+
+    # DBから1回だけ読み込んで試算・結果をJSONで保存
+    python scripts/simulate_scoring.py --vr-weight 0.6 --tpr-weight 0.4 --json result.json
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.scoring_simulation import ScoringSimulator, ScoringVariant, parse_bands
+
+
+async def load_from_database() -> ScoringSimulator:
+    from app.db.connection import acquire_connection, close_db
+    from app.db.data_version import fetch_data_version
+    from app.services.scoring_snapshot import fetch_snapshot_tables
+
+    try:
+        async with acquire_connection() as conn:
+            data_version = await fetch_data_version(conn)
+            tables = await fetch_snapshot_tables(conn)
+    finally:
+        await close_db()
+    return ScoringSimulator(tables, data_version=data_version)
+
+
+def load_simulator(snapshot_path: str) -> ScoringSimulator:
+    if snapshot_path:
+        from app.services.scoring_snapshot import ScoringSnapshot
+
+        snapshot = ScoringSnapshot.open(snapshot_path)
+        return ScoringSimulator(snapshot.tables(), data_version=snapshot.data_version)
+    return asyncio.run(load_from_database())
+
+
+def main(args) -> None:
+    try:
+        variant = ScoringVariant(
+            vr_weight=args.vr_weight,
+            tpr_weight=args.tpr_weight,
+            **({"bands": parse_bands(args.bands)} if args.bands else {}),
+        )
+        variant.validate()
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    simulator = load_simulator(args.snapshot)
+    print(f"📥 スコアリングデータ: {simulator.data_version}（{time.perf_counter() - start:.1f}秒）")
+
+    result = simulator.run(variant)
+    status = {"data_version": simulator.data_version, **result.status()}
+    summary = status["summary"]
+
+    print(f"🧪 {status['combinations']:,}組み合わせ（解決不可 {status['skipped']}）{status['duration_seconds']}秒")
+    for depth in (3, 10, 30):
+        print(
+            f"   上位{depth:>2}名の一致率: 平均 {summary.get(f'mean_overlap_at_{depth}', 0):.1%}"
+            f" / 最小 {summary.get(f'min_overlap_at_{depth}', 0):.1%}"
+        )
+    print(f"   平均順位変動: {summary.get('mean_abs_rank_shift', 0)} / 1位が変わった組み合わせ: {summary.get('top1_changed', 0)}")
+    print("   一致率の低い組み合わせ:")
+    for worst in status["worst"]:
+        print(
+            f"     {worst['overlap_at_30']:.0%}  {worst['industry']} / {worst['target_segment']} / {worst['budget_range']}"
+        )
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(status, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"✅ 保存: {args.json}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="スコアリング変更の試算")
+    parser.add_argument("--snapshot", help="スナップショットのディレクトリ（未指定はDBから1回だけ読み込む）")
+    parser.add_argument("--vr-weight", type=float, default=0.5, help="STEP 1 の VR人気度の重み")
+    parser.add_argument("--tpr-weight", type=float, default=0.5, help="STEP 1 の TPRパワースコアの重み")
+    parser.add_argument("--bands", help="STEP 2 の加減点テーブル（例: 0.15:12,0.3:6,0.5:3,0.7:-3,0.85:-6,1:-12）")
+    parser.add_argument("--json", help="結果をJSONで保存するパス")
+    main(parser.parse_args())
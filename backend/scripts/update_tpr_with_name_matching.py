@@ -29,6 +29,7 @@ from difflib import SequenceMatcher
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from app.db.connection import init_db, get_session_maker
 from app.models import TalentScore, Talent
+from app.services.data_quality import DataQualityValidator
 
 # マッピング辞書をインポート
 try:
@@ -320,6 +321,8 @@ class TPRImporter:
                             }
                         )
 
+                # コミット前に同じトランザクション内で品質検証（失敗時はロールバック）
+                await DataQualityValidator().assert_session_valid(session)
                 await session.commit()
                 logger.info(f"✅ Database updated: {len(records)} records")
 
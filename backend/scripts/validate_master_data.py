@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+マスタデータ品質検証（インポート前ゲート）
+
+app/services/data_quality.py の標準ルールセットで1テーブル1スキャン検証を行い、
+結果をJSONで出力する。error ルールが1件でも失敗した場合は終了コード1。
+
+使用例:
+    python scripts/validate_master_data.py
+    python scripts/validate_master_data.py --output validation_report.json
+    python scripts/validate_master_data.py --fail-on-warning
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from app.db.connection import acquire_connection, close_db
+from app.services.data_quality import DataQualityValidator
+
+
+async def validate_master_data(output: str = None, fail_on_warning: bool = False) -> int:
+    """標準ルールセットで検証し、終了コードを返す"""
+    validator = DataQualityValidator()
+
+    try:
+        async with acquire_connection() as conn:
+            report = await validator.validate_database(conn)
+    finally:
+        await close_db()
+
+    report_json = report.to_json()
+    if output:
+        Path(output).write_text(report_json, encoding="utf-8")
+        print(f"✅ 検証レポートを保存しました: {output}", file=sys.stderr)
+    else:
+        print(report_json)
+
+    if not report.passed:
+        return 1
+    if fail_on_warning and report.failed_rules:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="マスタデータ品質検証（JSON出力）")
+    parser.add_argument("--output", "-o", help="レポート出力先（省略時は標準出力）")
+    parser.add_argument("--fail-on-warning", action="store_true", help="warning ルールの失敗でも終了コード1にする")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(validate_master_data(args.output, args.fail_on_warning)))
@@ -101,13 +101,13 @@ echo "📊 ベンチマーク完了 - performance_results/benchmarks/ を確認
 
     os.chmod("run_benchmark.sh", 0o755)
 
-    # 監視ダッシュボード実行スクリプト
+    # メトリクス確認スクリプト（APIサーバーの /metrics）
     monitoring_script = """#!/bin/bash
-echo "🖥️ パフォーマンス監視ダッシュボード開始"
-echo "ダッシュボードURL: http://localhost:8433"
+echo "🖥️ APIメトリクス（Prometheus形式）"
+echo "メトリクスURL: http://localhost:8432/metrics"
 echo "==========================================="
 
-python monitoring_dashboard.py
+curl -s http://localhost:8432/metrics | grep -v '^#'
 """
 
     with open("run_monitoring.sh", "w") as f:
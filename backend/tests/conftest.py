@@ -0,0 +1,80 @@
+"""
+Shared fixtures for talent casting system backend tests
+"""
+
+from datetime import date
+
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def scoring_tables():
+    """Small in-memory copy of the scoring dataset (two segments, five talents)"""
+    image_columns = [
+        "image_funny", "image_clean", "image_unique", "image_trustworthy",
+        "image_cute", "image_cool", "image_mature",
+    ]
+    return {
+        "m_account": pd.DataFrame({
+            "account_id": [1, 2, 3, 4, 5],
+            "name_full_for_matching": ["タレントA", "タレントB", "タレントC", "タレントD", "タレントE"],
+            "last_name_kana": ["エー", "ビー", "シー", "ディー", "イー"],
+            "first_name_kana": [None, None, None, None, None],
+            "act_genre": ["俳優", "歌手", "俳優", "モデル", "芸人"],
+            "company_name": ["事務所1", "事務所2", "事務所1", None, "事務所3"],
+            "birthday": [date(1990, 1, 1), date(2005, 6, 1), None, date(1980, 3, 3), date(1995, 12, 31)],
+            "pref_cd": [12, 13, 1, 47, 27],
+            "del_flag": [0, 0, 0, 0, 1],
+        }),
+        "m_talent_act": pd.DataFrame({
+            "account_id": [1, 2, 3, 4, 5],
+            "money_min_one_year": [None, None, None, None, None],
+            "money_max_one_year": [5000000.0, 20000000.0, None, 15000000.0, 1000000.0],
+            "money_representative_value": [5000000.0, 20000000.0, None, 15000000.0, 1000000.0],
+        }),
+        "talent_scores": pd.DataFrame({
+            "account_id": [1, 2, 3, 4, 5, 1, 2, 3, 4, 5],
+            "target_segment_id": [1, 1, 1, 1, 1, 2, 2, 2, 2, 2],
+            "vr_popularity": [80.0, 70.0, 60.0, 50.0, 99.0, 40.0, 45.0, 50.0, 55.0, 10.0],
+            "tpr_power_score": [60.0, 70.0, None, 50.0, 99.0, 40.0, 45.0, 50.0, 55.0, 10.0],
+            "base_power_score": [70.0, 70.0, 30.0, 50.0, 99.0, 40.0, 45.0, 50.0, 55.0, 10.0],
+        }),
+        "talent_images": pd.DataFrame({
+            "account_id": [1, 2, 3, 4, 5],
+            "target_segment_id": [1, 1, 1, 1, 1],
+            **{col: [10.0, 50.0, None, 30.0, 20.0] for col in image_columns},
+        }),
+        "m_talent_cm": pd.DataFrame({
+            "account_id": [1, 2],
+            "sub_id": [1, 1],
+            "client_name": ["食品会社", "飲料会社"],
+            "product_name": ["商品1", None],
+            "use_period_start": ["2024-01-01", "2023-01-01"],
+            "use_period_end": ["2099-12-31", "2023-12-31"],
+            "rival_category_type_cd1": [1, 6],
+            "rival_category_type_cd2": [None, None],
+            "rival_category_type_cd3": [None, None],
+            "rival_category_type_cd4": [None, None],
+        }),
+        "industries": pd.DataFrame({
+            "industry_id": [1, 2, 3],
+            "industry_name": ["化粧品・ヘアケア・オーラルケア", "アルコール飲料", "食品"],
+            "required_image_id": [2, None, 4],
+        }),
+        "target_segments": pd.DataFrame({
+            "target_segment_id": [1, 2],
+            "segment_name": ["女性20-34歳", "男性20-34歳"],
+        }),
+        "budget_ranges": pd.DataFrame({
+            "range_name": ["1,000万円未満", "1,000万円～3,000万円未満", "5,000万円以上"],
+            "min_amount": [0.0, 10000000.0, 50000000.0],
+            "max_amount": [10000000.0, 30000000.0, None],
+        }),
+        "recommended_talents": pd.DataFrame({
+            "industry_name": ["食品"],
+            "talent_id_1": [4],
+            "talent_id_2": [None],
+            "talent_id_3": [None],
+        }),
+    }
@@ -0,0 +1,119 @@
+"""
+Response compression middleware tests (negotiation, size threshold, PDF exclusion, streaming chunks)
+"""
+
+import asyncio
+import gzip
+import zlib
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from app.core.compression import CompressionMiddleware, choose_encoding
+
+ROWS = [{"company_name": f"株式会社テスト{i}", "contact_name": "山田太郎", "industry": "食品"} for i in range(200)]
+
+
+def _app():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/large")
+    async def large():
+        return JSONResponse(ROWS, headers={"ETag": '"abc"'})
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/pdf")
+    async def pdf():
+        return Response(b"%PDF-1.4" + b"0" * 4096, media_type="application/pdf")
+
+    @app.get("/csv")
+    async def csv():
+        async def rows():
+            yield "会社名,担当者\n" * 100
+            for i in range(3):
+                yield f"株式会社テスト{i},山田太郎\n" * 100
+        return StreamingResponse(rows(), media_type="text/csv")
+
+    return app
+
+
+def test_choose_encoding_respects_q_values_and_availability():
+    available = ("zstd", "br", "gzip")
+    assert choose_encoding("gzip, deflate, br, zstd", available) == "zstd"
+    assert choose_encoding("gzip, br;q=0.5", available) == "gzip"
+    assert choose_encoding("br, zstd;q=0", available) == "br"
+    assert choose_encoding("gzip, deflate, br", ("gzip",)) == "gzip"
+    assert choose_encoding("*;q=0.1", ("gzip",)) == "gzip"
+    assert choose_encoding("identity", available) is None
+
+
+@pytest.mark.asyncio
+async def test_large_json_is_gzipped_with_weak_etag_and_vary():
+    async with httpx.AsyncClient(app=_app(), base_url="http://test") as ac:
+        response = await ac.get("/large", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == 'W/"abc"'
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(response.content) / 4
+    assert response.json() == ROWS
+
+
+@pytest.mark.asyncio
+async def test_small_pdf_and_unaccepted_responses_are_not_compressed():
+    async with httpx.AsyncClient(app=_app(), base_url="http://test") as ac:
+        small = await ac.get("/small", headers={"Accept-Encoding": "gzip"})
+        pdf = await ac.get("/pdf", headers={"Accept-Encoding": "gzip"})
+        identity = await ac.get("/large", headers={"Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in small.headers
+    assert "content-encoding" not in pdf.headers
+    assert pdf.content.startswith(b"%PDF")
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["etag"] == '"abc"'
+    assert "Accept-Encoding" in identity.headers["vary"]
+
+
+@pytest.mark.asyncio
+async def test_streaming_csv_is_compressed_chunk_by_chunk():
+    messages = []
+    requests = [{"type": "http.request", "body": b"", "more_body": False}]
+    finished = asyncio.Event()
+
+    async def receive():
+        # after the request body, report a disconnect once the response is complete
+        # so StreamingResponse's disconnect listener can finish
+        if requests:
+            return requests.pop()
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+        if message["type"] == "http.response.body" and not message.get("more_body", False):
+            finished.set()
+
+    scope = {
+        "type": "http", "method": "GET", "path": "/csv", "raw_path": b"/csv", "query_string": b"",
+        "headers": [(b"accept-encoding", b"gzip")], "root_path": "", "scheme": "http",
+        "server": ("test", 80), "http_version": "1.1",
+    }
+    await _app()(scope, receive, send)
+
+    start, *bodies = messages
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    # every chunk is flushed on its own, so a client can decode the stream as it arrives
+    assert len([m for m in bodies if m["body"]]) >= 4
+    decoder = zlib.decompressobj(31)
+    first = decoder.decompress(bodies[0]["body"])
+    assert first.decode("utf-8").startswith("会社名,担当者")
+    text = gzip.decompress(b"".join(m["body"] for m in bodies)).decode("utf-8")
+    assert text.endswith("株式会社テスト2,山田太郎\n")
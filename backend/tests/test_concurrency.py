@@ -0,0 +1,113 @@
+"""
+Single-flight coalescing and admission control tests
+"""
+
+import asyncio
+
+import pytest
+
+from app.core.concurrency import AdmissionController, AdmissionRejected, SingleFlight
+
+
+def _controller(limit=1, max_queue=1, queue_timeout=0.5):
+    return AdmissionController("test", lambda: limit, lambda: max_queue, lambda: queue_timeout)
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_one_computation():
+    flight = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return [1, 2, 3]
+
+    waiters = [asyncio.create_task(flight.do("key", compute)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    outcomes = await asyncio.gather(*waiters)
+
+    assert calls == 1
+    assert [shared for _, shared in outcomes] == [False, True, True, True, True]
+    assert flight.stats.coalesced == 4
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_single_flight_survives_leader_cancellation_and_propagates_errors():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def compute():
+        await release.wait()
+        return "done"
+
+    leader = asyncio.create_task(flight.do("key", compute))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do("key", compute))
+    await asyncio.sleep(0)
+    leader.cancel()
+    release.set()
+
+    assert await follower == ("done", True)
+
+    async def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        await flight.do("other", fail)
+
+
+@pytest.mark.asyncio
+async def test_admission_rejects_fast_when_queue_is_full():
+    controller = _controller(limit=1, max_queue=1)
+    release = asyncio.Event()
+
+    async def hold():
+        async with controller.slot():
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    queued = asyncio.create_task(hold())
+    await asyncio.sleep(0.01)
+    assert (controller.active, controller.waiting) == (1, 1)
+
+    with pytest.raises(AdmissionRejected) as excinfo:
+        async with controller.slot():
+            pass
+    assert excinfo.value.status_code == 503
+    assert excinfo.value.headers["Retry-After"] == "1"
+    assert excinfo.value.reason == "queue_full"
+
+    release.set()
+    await asyncio.gather(holder, queued)
+    assert controller.stats.admitted == 2
+    assert controller.active == 0
+
+
+@pytest.mark.asyncio
+async def test_admission_times_out_waiting():
+    controller = _controller(limit=1, max_queue=5, queue_timeout=0.05)
+
+    async with controller.slot():
+        with pytest.raises(AdmissionRejected) as excinfo:
+            async with controller.slot():
+                pass
+
+    assert excinfo.value.reason == "timeout"
+    assert controller.stats.rejected_timeout == 1
+    assert controller.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_admission_unlimited_when_limit_is_zero():
+    controller = _controller(limit=0)
+
+    async with controller.slot():
+        async with controller.slot():
+            pass
+
+    assert controller.stats.admitted == 0
@@ -0,0 +1,201 @@
+"""
+Data quality validation engine tests
+Tests for declarative rules evaluated on staged DataFrames
+"""
+
+import json
+
+import pandas as pd
+import pytest
+
+from app.services.data_quality import (
+    CoverageRule,
+    DataQualityError,
+    DataQualityValidator,
+    ForeignKeyRule,
+    MonotonicRule,
+    RangeRule,
+    Rule,
+    UniqueRule,
+    DEFAULT_RULES,
+)
+
+
+def _staged_frames():
+    """Build a small, fully consistent staged dataset"""
+    return {
+        "m_account": pd.DataFrame({
+            "account_id": [1, 2, 3],
+            "name_full_for_matching": ["新垣結衣", "大泉洋", "広瀬すず"],
+            "del_flag": [0, 0, 0],
+        }),
+        "m_talent_act": pd.DataFrame({"account_id": [1, 2, 3]}),
+        "m_talent_cm": pd.DataFrame({"account_id": [1, 2], "sub_id": [1, 1]}),
+        "target_segments": pd.DataFrame({"target_segment_id": [1, 2]}),
+        "talent_scores": pd.DataFrame({
+            "account_id": [1, 2, 1, 2],
+            "target_segment_id": [1, 1, 2, 2],
+            "vr_popularity": [50.0, 60.0, 55.0, None],
+            "tpr_power_score": [40.0, 30.0, 20.0, 10.0],
+        }),
+        "talent_images": pd.DataFrame({
+            "account_id": [1, 2],
+            "target_segment_id": [1, 1],
+            **{col: [10.0, 20.0] for col in [
+                "image_funny", "image_clean", "image_unique", "image_trustworthy",
+                "image_cute", "image_cool", "image_mature",
+            ]},
+        }),
+        "budget_ranges": pd.DataFrame({
+            "range_name": ["1,000万円未満", "1,000万円〜3,000万円未満", "3,000万円以上"],
+            "min_amount": [0, 10000000, 30000000],
+            "max_amount": [10000000, 30000000, None],
+        }),
+    }
+
+
+def test_default_rules_pass_on_consistent_data():
+    """A consistent staged dataset passes every default rule"""
+    report = DataQualityValidator().validate(_staged_frames())
+    assert report.passed
+    assert not report.failed_rules
+    assert report.row_counts["talent_scores"] == 4
+
+
+def test_rule_without_evaluate_cannot_be_created():
+    with pytest.raises(TypeError):
+        Rule(name="r", table="m_account")
+
+
+def test_required_columns_are_one_query_per_table():
+    """Rules touching the same table are merged into a single SELECT"""
+    queries = DataQualityValidator().build_queries()
+    tables = {rule.table for rule in DEFAULT_RULES}
+    assert tables <= set(queries)
+    assert queries["talent_scores"].count("FROM talent_scores") == 1
+
+
+def test_range_rule_reports_offending_rows():
+    frames = _staged_frames()
+    frames["talent_images"].loc[1, "image_cute"] = 120.0
+    rule = RangeRule(name="r", table="talent_images", columns=["image_cute"],
+                     min_value=0, max_value=100, key_columns=["account_id"])
+    result = rule.evaluate(frames)
+    assert not result.passed
+    assert result.violations == 1
+    assert result.samples[0]["account_id"] == 2
+
+
+def test_unique_rule_respects_where_filter():
+    frames = _staged_frames()
+    frames["m_account"] = pd.DataFrame({
+        "account_id": [1, 2, 3],
+        "name_full_for_matching": ["大泉洋", "大泉洋", "大泉洋"],
+        "del_flag": [0, 1, 1],
+    })
+    rule = UniqueRule(name="u", table="m_account", columns=["name_full_for_matching"], where={"del_flag": 0})
+    assert rule.evaluate(frames).passed
+
+
+def test_foreign_key_rule_detects_orphaned_cm_rows():
+    frames = _staged_frames()
+    frames["m_talent_cm"] = pd.DataFrame({"account_id": [1, 99, 99], "sub_id": [1, 1, 2]})
+    rule = ForeignKeyRule(name="fk", table="m_talent_cm", column="account_id",
+                          reference_table="m_account", reference_column="account_id")
+    result = rule.evaluate(frames)
+    assert result.violations == 2
+    assert result.details["orphaned_keys"] == 1
+
+
+def test_coverage_rule_detects_missing_segment():
+    frames = _staged_frames()
+    frames["target_segments"] = pd.DataFrame({"target_segment_id": [1, 2, 3]})
+    rule = CoverageRule(name="c", table="talent_scores", key_column="account_id",
+                        group_column="target_segment_id", min_ratio=1.0,
+                        groups_table="target_segments", groups_column="target_segment_id")
+    result = rule.evaluate(frames)
+    assert not result.passed
+    assert result.details["coverage_by_group"]["3"] == 0.0
+
+
+def test_coverage_rule_on_empty_table_depends_on_allow_empty():
+    """A freshly seeded database has no scores yet; the default rule accepts that"""
+    frames = _staged_frames()
+    frames["talent_scores"] = frames["talent_scores"].iloc[0:0]
+    rule = CoverageRule(name="c", table="talent_scores", key_column="account_id",
+                        group_column="target_segment_id", min_ratio=1.0)
+    assert not rule.evaluate(frames).passed
+
+    rule.allow_empty = True
+    assert rule.evaluate(frames).passed
+    assert DataQualityValidator().validate(frames).passed
+
+
+def test_monotonic_rule_detects_overlapping_budget_ranges():
+    frames = _staged_frames()
+    frames["budget_ranges"].loc[1, "min_amount"] = 5000000
+    rule = MonotonicRule(name="m", table="budget_ranges", order_by="min_amount",
+                         columns=["min_amount", "max_amount"], no_overlap=("min_amount", "max_amount"))
+    result = rule.evaluate(frames)
+    assert not result.passed
+    assert result.details["overlapping_rows"] == 1
+
+
+def test_assert_valid_raises_and_report_is_json():
+    frames = _staged_frames()
+    frames["talent_scores"].loc[0, "tpr_power_score"] = -5
+    validator = DataQualityValidator()
+    with pytest.raises(DataQualityError) as exc_info:
+        validator.assert_valid(frames)
+
+    payload = json.loads(exc_info.value.report.to_json())
+    assert payload["passed"] is False
+    assert payload["summary"]["failed_errors"] == 1
+
+
+class FakeFrameConnection:
+    """asyncpg-style connection serving the staged frames (uncommitted importer state)"""
+
+    def __init__(self, frames):
+        self.frames = frames
+
+    async def fetch(self, query):
+        table = query.rsplit(" FROM ", 1)[1]
+        columns = query[len("SELECT "):query.index(" FROM ")].split(", ")
+        return [tuple(row) for row in self.frames[table][columns].itertuples(index=False)]
+
+
+class FakeSession:
+    """Minimal AsyncSession exposing the raw driver connection of its transaction"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.flushed = False
+
+    async def flush(self):
+        self.flushed = True
+
+    async def connection(self):
+        return self
+
+    async def get_raw_connection(self):
+        return self
+
+    @property
+    def driver_connection(self):
+        return self.conn
+
+
+@pytest.mark.asyncio
+async def test_session_gate_validates_the_open_transaction():
+    """Importers gate their commit on the data visible inside their own transaction"""
+    frames = _staged_frames()
+    session = FakeSession(FakeFrameConnection(frames))
+    validator = DataQualityValidator()
+
+    assert (await validator.assert_session_valid(session)).passed
+    assert session.flushed
+
+    frames["budget_ranges"].loc[1, "min_amount"] = 5000000
+    with pytest.raises(DataQualityError, match="budget_ranges"):
+        await validator.assert_session_valid(session)
@@ -0,0 +1,88 @@
+"""
+Compact diagnosis result storage tests (array packing, compatibility relation)
+"""
+
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services import diagnosis_storage
+
+
+def talent(ranking, account_id, score):
+    return SimpleNamespace(
+        ranking=ranking, account_id=account_id, name=f"talent-{account_id}", category="俳優", matching_score=score,
+    )
+
+
+def test_pack_orders_parallel_arrays_by_ranking():
+    packed = diagnosis_storage.pack_results([talent(2, 20, 88.456), talent(1, 10, 91.0)])
+
+    assert packed == {
+        "talent_account_ids": [10, 20],
+        "talent_names": ["talent-10", "talent-20"],
+        "talent_categories": ["俳優", "俳優"],
+        "matching_scores": [91.0, 88.46],
+    }
+
+
+def test_pack_rejects_gaps_in_ranking():
+    with pytest.raises(ValueError):
+        diagnosis_storage.pack_results([talent(1, 10, 90.0), talent(3, 30, 80.0)])
+
+
+def test_unpack_returns_diagnosis_results_columns():
+    created_at = datetime(2025, 12, 10, 9, 0)
+    row = {
+        "form_submission_id": 7,
+        "talent_account_ids": [10, 20],
+        "talent_names": ["a", "b"],
+        "talent_categories": ["俳優", None],
+        "matching_scores": [Decimal("91.00"), Decimal("88.46")],
+        "created_at": created_at,
+    }
+
+    rows = diagnosis_storage.unpack_results(row)
+
+    assert [r["ranking"] for r in rows] == [1, 2]
+    assert rows[1] == {
+        "form_submission_id": 7,
+        "ranking": 2,
+        "talent_account_id": 20,
+        "talent_name": "b",
+        "talent_category": None,
+        "matching_score": Decimal("88.46"),
+        "created_at": created_at,
+    }
+
+
+def test_relation_follows_storage_setting(monkeypatch):
+    monkeypatch.setattr(settings, "diagnosis_storage", "rows")
+    assert diagnosis_storage.diagnosis_relation() == "diagnosis_results"
+
+    monkeypatch.setattr(settings, "diagnosis_storage", "compact")
+    assert diagnosis_storage.diagnosis_relation() == "diagnosis_results_all"
+
+
+class FakeSession:
+    def __init__(self):
+        self.executed = []
+
+    async def execute(self, statement, params):
+        self.executed.append((str(statement), params))
+
+
+@pytest.mark.asyncio
+async def test_save_compact_writes_one_upsert():
+    session = FakeSession()
+
+    await diagnosis_storage.save_compact(session, 7, [talent(1, 10, 90.0), talent(2, 20, 80.0)])
+
+    assert len(session.executed) == 1
+    sql, params = session.executed[0]
+    assert "ON CONFLICT (form_submission_id) DO UPDATE" in sql
+    assert params["form_submission_id"] == 7
+    assert params["talent_account_ids"] == [10, 20]
@@ -0,0 +1,173 @@
+"""
+Email outbox tests (backoff, batch delivery with one service instance, retry and failure bookkeeping)
+"""
+
+from contextlib import asynccontextmanager
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.services import email_outbox
+from app.services.email_outbox import EmailOutboxWorker, KIND_DIAGNOSIS_COMPLETION, backoff_seconds
+
+
+class FakeEmailService:
+    instances = 0
+
+    def __init__(self):
+        FakeEmailService.instances += 1
+        self.sent = []
+
+    def is_configured(self):
+        return True
+
+    async def send_diagnosis_completion_email(self, **payload):
+        if payload["to_email"].startswith("broken"):
+            raise ConnectionError("smtp down")
+        self.sent.append(payload["to_email"])
+        return True
+
+
+class FakeOutboxConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    async def fetchval(self, sql, *args):
+        return 0  # no stale rows to recover
+
+    async def fetch(self, sql, *args):
+        claimed, self.rows = self.rows, []
+        return claimed
+
+    async def execute(self, sql, *args):
+        self.executed.append((sql.split("SET status = '")[1].split("'")[0], args))
+
+
+def _row(row_id, to_email, attempts=1):
+    payload = {"to_email": to_email, "company_name": "テスト", "contact_name": "担当", "pdf_download_url": "u", "session_id": str(row_id)}
+    return {
+        "id": row_id, "kind": KIND_DIAGNOSIS_COMPLETION, "session_id": str(row_id), "to_email": to_email,
+        "payload": json.dumps(payload), "attempts": attempts,
+    }
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    monkeypatch.setattr(email_outbox, "EmailService", FakeEmailService)
+    monkeypatch.setattr(settings, "email_outbox_max_attempts", 3)
+    monkeypatch.setattr(settings, "email_outbox_retry_base_seconds", 10.0)
+    monkeypatch.setattr(settings, "email_outbox_retry_max_seconds", 60.0)
+    FakeEmailService.instances = 0
+
+    conn = FakeOutboxConnection([])
+
+    @asynccontextmanager
+    async def acquire_connection():
+        yield conn
+
+    monkeypatch.setattr(email_outbox, "acquire_connection", acquire_connection)
+    return conn
+
+
+def test_backoff_grows_exponentially_and_is_capped(monkeypatch):
+    monkeypatch.setattr(settings, "email_outbox_retry_base_seconds", 10.0)
+    monkeypatch.setattr(settings, "email_outbox_retry_max_seconds", 60.0)
+    monkeypatch.setattr(email_outbox.random, "random", lambda: 0.0)
+
+    assert [backoff_seconds(n) for n in (1, 2, 3, 4, 5)] == [10.0, 20.0, 40.0, 60.0, 60.0]
+
+
+@pytest.mark.asyncio
+async def test_batch_is_sent_with_one_service_instance(outbox):
+    outbox.rows = [_row(1, "a@example.com"), _row(2, "b@example.com"), _row(3, "c@example.com")]
+    worker = EmailOutboxWorker()
+
+    assert await worker.drain_once() == 3
+    assert await worker.drain_once() == 0
+
+    assert FakeEmailService.instances == 1
+    assert worker._service.sent == ["a@example.com", "b@example.com", "c@example.com"]
+    assert [status for status, _ in outbox.executed] == ["sent", "sent", "sent"]
+    assert worker.stats.sent == 3
+    assert email_outbox.send_duration.get(KIND_DIAGNOSIS_COMPLETION, "sent").count >= 3
+
+
+@pytest.mark.asyncio
+async def test_failures_are_retried_with_backoff_then_marked_failed(outbox):
+    outbox.rows = [_row(1, "broken@example.com", attempts=1), _row(2, "broken2@example.com", attempts=3)]
+    worker = EmailOutboxWorker()
+
+    await worker.drain_once()
+
+    (retry_status, retry_args), (failed_status, failed_args) = outbox.executed
+    assert retry_status == "pending"
+    assert "ConnectionError" in retry_args[1]
+    assert 10.0 <= retry_args[2] <= 12.0
+    assert failed_status == "failed"
+    assert (worker.stats.retried, worker.stats.failed) == (1, 1)
+    assert worker.status()["send_ms_avg"] is not None
+
+
+@pytest.mark.asyncio
+async def test_worker_retries_setup_failures_and_polls_without_listen(outbox, monkeypatch):
+    """A failing CREATE TABLE or LISTEN (e.g. behind a transaction pooler) must not stop the worker"""
+    import asyncio
+    import asyncpg
+
+    monkeypatch.setattr(settings, "email_outbox_poll_seconds", 0.01)
+    ddl_attempts = []
+
+    async def flaky_ensure(conn):
+        ddl_attempts.append(1)
+        if len(ddl_attempts) == 1:
+            raise OSError("connection reset")
+
+    async def refuse_listen(**params):
+        raise asyncpg.FeatureNotSupportedError("LISTEN is not supported in transaction mode")
+
+    async def no_depth(conn):
+        pass
+
+    monkeypatch.setattr(email_outbox, "ensure_outbox_table", flaky_ensure)
+    monkeypatch.setattr(asyncpg, "connect", refuse_listen)
+    outbox.rows = [_row(1, "a@example.com")]
+    worker = EmailOutboxWorker()
+    monkeypatch.setattr(worker, "refresh_queue_depth", no_depth)
+
+    task = asyncio.create_task(worker.run())
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        if worker.stats.sent:
+            break
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert len(ddl_attempts) == 2
+    assert worker.stats.sent == 1
+    assert worker.listen_failures >= 1
+    assert worker.running is False
+
+
+@pytest.mark.asyncio
+async def test_enqueue_failure_falls_back_to_direct_send(monkeypatch):
+    """If the outbox row cannot be written (e.g. table missing) the email is sent inline instead of lost"""
+    from app.api.endpoints import matching
+    from app.schemas.matching import MatchingFormData
+
+    @asynccontextmanager
+    async def broken_connection():
+        raise OSError("relation \"email_outbox\" does not exist")
+        yield
+
+    service = FakeEmailService()
+    monkeypatch.setattr(settings, "email_outbox_enabled", True)
+    monkeypatch.setattr(matching, "acquire_connection", broken_connection)
+    monkeypatch.setattr(matching, "EmailService", lambda: service)
+    form_data = MatchingFormData.model_construct(email="a@example.com", company_name="テスト", contact_name="担当")
+
+    await matching.send_diagnosis_completion_email(form_data, "session-1")
+
+    assert service.sent == ["a@example.com"]
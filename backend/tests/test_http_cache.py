@@ -0,0 +1,113 @@
+"""
+Master-data HTTP cache tests (ETag / If-None-Match 304, rebuild on data-version change, Cache-Control)
+"""
+
+from contextlib import asynccontextmanager
+import json
+
+import pytest
+from starlette.requests import Request
+
+from app.core import http_cache
+from app.core.config import settings
+from app.core.http_cache import MasterDataHttpCache, etag_matches
+
+
+class FakeVersionConnection:
+    def __init__(self):
+        self.version = 1
+
+    async def fetchval(self, sql, *args):
+        return self.version
+
+
+def _request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/api/industries", "headers": headers})
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    monkeypatch.setattr(settings, "http_cache_enabled", True)
+    monkeypatch.setattr(settings, "http_cache_version_check_seconds", 0.0)
+    monkeypatch.setattr(settings, "http_cache_ttl_seconds", 300.0)
+    conn = FakeVersionConnection()
+
+    @asynccontextmanager
+    async def acquire_connection():
+        yield conn
+
+    monkeypatch.setattr(http_cache, "acquire_connection", acquire_connection)
+    return conn
+
+
+def test_etag_matching_handles_lists_weak_and_wildcard():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('"x", W/"abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+@pytest.mark.asyncio
+async def test_body_is_cached_and_if_none_match_returns_304(conn):
+    cache = MasterDataHttpCache()
+    builds = []
+
+    async def build():
+        builds.append(1)
+        return {"total": 1, "industries": [{"id": 1, "name": "食品"}]}
+
+    first = await cache.respond(_request(), "industries", build)
+    second = await cache.respond(_request(first.headers["etag"]), "industries", build)
+
+    assert first.status_code == 200
+    assert json.loads(first.body)["industries"][0]["name"] == "食品"
+    assert "s-maxage=" in first.headers["cache-control"]
+    assert "stale-while-revalidate=" in first.headers["cache-control"]
+    assert second.status_code == 304
+    assert second.body == b""
+    assert second.headers["etag"] == first.headers["etag"]
+    assert len(builds) == 1
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.not_modified) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_version_change_rebuilds_but_unchanged_body_keeps_etag(conn):
+    cache = MasterDataHttpCache()
+    content = {"total": 0, "items": []}
+
+    async def build():
+        return content
+
+    first = await cache.respond(_request(), "target-segments", build)
+    conn.version = 2
+    same = await cache.respond(_request(), "target-segments", build)
+    content = {"total": 1, "items": [{"id": 1}]}
+    conn.version = 3
+    changed = await cache.respond(_request(first.headers["etag"]), "target-segments", build)
+
+    assert cache.stats.misses == 3
+    assert same.headers["etag"] == first.headers["etag"]
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != first.headers["etag"]
+
+
+@pytest.mark.asyncio
+async def test_invalidate_and_build_errors_are_not_cached(conn):
+    cache = MasterDataHttpCache()
+
+    async def build():
+        return {"booking_url": "https://example.com"}
+
+    async def broken():
+        raise ConnectionError("db down")
+
+    await cache.respond(_request(), "booking-link:食品", build)
+    await cache.respond(_request(), "industries", build)
+
+    assert cache.invalidate("booking-link:") == 1
+    assert list(cache.entries) == ["industries"]
+    with pytest.raises(ConnectionError):
+        await cache.respond(_request(), "booking-link:飲料", broken)
+    assert "booking-link:飲料" not in cache.entries
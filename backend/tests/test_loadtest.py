@@ -0,0 +1,128 @@
+"""
+Load-test package tests (scenario loading, percentiles, saturation detection, step runner)
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from app.schemas.matching import MatchingFormData
+from loadtest.report import build_report, compare_reports, find_saturation, percentile, render_markdown
+from loadtest.runner import StepConfig, parse_pool_metrics, run_step
+from loadtest.scenarios import Scenario, ScenarioSampler, load_fixture_scenarios, normalize_target_segment
+
+
+def _step(concurrency, p95, throughput, error_rate=0.0):
+    return {
+        "concurrency": concurrency, "rate": 0.0, "throughput_rps": throughput, "error_rate": error_rate,
+        "latency_ms": {"p95": p95}, "pools": {},
+    }
+
+
+def test_fixture_scenarios_are_normalized_and_weighted(tmp_path):
+    payloads = [
+        {"industry": "食品", "target_segments": "女性20-34歳", "budget": "1,000万円未満"},
+        {"industry": "食品", "target_segments": ["女性20-34"], "budget": "1,000万円未満"},
+        {"industry": "食品", "target_segments": "不明", "budget": "1,000万円未満"},
+    ]
+    for i, payload in enumerate(payloads):
+        (tmp_path / f"test_{i}.json").write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    (tmp_path / "other.json").write_text("{}", encoding="utf-8")
+
+    scenarios = load_fixture_scenarios(tmp_path)
+
+    assert scenarios == [Scenario("食品", "女性20-34歳", "1,000万円未満", weight=2)]
+    assert normalize_target_segment(["男性50-69"]) == "男性50-69歳"
+
+
+def test_sampler_payload_is_valid_form_data():
+    sampler = ScenarioSampler([Scenario("食品", "女性20-34歳", "1,000万円未満")], seed=1)
+
+    payload = sampler.payload(sampler.choose())
+
+    form = MatchingFormData(**payload)
+    assert form.session_id.startswith("loadtest-")
+    assert form.email_consent is False
+
+
+def test_percentile_interpolates():
+    assert percentile([10, 20, 30, 40], 50) == 25
+    assert percentile([5], 99) == 5
+    assert percentile([], 95) is None
+
+
+def test_saturation_detects_throughput_plateau_and_errors():
+    steps = [_step(1, 100, 10), _step(2, 110, 19), _step(4, 150, 20)]
+    assert find_saturation(steps)["concurrency"] == 4
+
+    steps = [_step(1, 100, 10), _step(2, 110, 19, error_rate=0.05)]
+    assert find_saturation(steps)["reasons"] == ["エラー率 5.0%"]
+
+    assert find_saturation([_step(1, 100, 10), _step(2, 120, 19)]) is None
+
+
+def test_parse_pool_metrics():
+    sample = parse_pool_metrics(
+        'db_pool_connections{pool="public",state="in_use"} 5\n'
+        'db_pool_connections{pool="public",state="idle"} 0\n'
+        'db_pool_max_connections{pool="public"} 5\n'
+        'db_pool_acquire_wait_seconds_total{pool="public"} 1.5\n'
+        'process_cpu_seconds_total 3\n'
+    )
+    assert sample.in_use == {"public": 5.0}
+    assert sample.max_size == {"public": 5.0}
+    assert sample.acquire_wait_seconds_total == {"public": 1.5}
+
+
+def _fake_api():
+    app = FastAPI()
+    state = {"in_flight": 0, "acquires": 0}
+
+    @app.post("/api/matching")
+    async def matching(payload: dict):
+        state["in_flight"] += 1
+        state["acquires"] += 1
+        await asyncio.sleep(0.01)
+        state["in_flight"] -= 1
+        if payload["industry"] == "エラー業種":
+            return PlainTextResponse("boom", status_code=500)
+        return {"processing_time_ms": 10.0}
+
+    @app.get("/metrics")
+    async def metrics():
+        return PlainTextResponse(
+            f'db_pool_connections{{pool="public",state="in_use"}} {min(state["in_flight"], 2)}\n'
+            'db_pool_max_connections{pool="public"} 2\n'
+            f'db_pool_acquires_total{{pool="public"}} {state["acquires"]}\n'
+            f'db_pool_acquire_wait_seconds_total{{pool="public"}} {state["acquires"] * 0.001}\n'
+        )
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_run_step_against_asgi_app():
+    sampler = ScenarioSampler([
+        Scenario("食品", "女性20-34歳", "1,000万円未満", weight=3),
+        Scenario("エラー業種", "女性20-34歳", "1,000万円未満", weight=1),
+    ], seed=3)
+    transport = httpx.ASGITransport(app=_fake_api())
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        closed = await run_step(client, sampler, StepConfig(concurrency=3, duration=0.2), pool_interval=0.05)
+        opened = await run_step(client, sampler, StepConfig(concurrency=2, duration=0.2, rate=50), pool_interval=0.05, seed=1)
+
+    report = build_report({"base_url": "http://test"}, [closed, opened])
+    first = report["steps"][0]
+    assert first["requests"] > 0
+    assert 0 < first["error_rate"] < 1
+    assert set(first["status_counts"]) == {"200", "500"}
+    assert first["server_ms"]["p50"] == 10.0
+    assert first["pools"]["public"]["max_size"] == 2
+    assert report["steps"][1]["rate"] == 50
+    assert "| 3 | closed |" in render_markdown(report)
+    assert compare_reports(report, report)[0]["p95_change"] == 0
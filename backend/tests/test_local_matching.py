@@ -0,0 +1,79 @@
+"""
+In-memory STEP 0-4 matching tests
+Tests that the pandas implementation follows the SQL CTE semantics
+"""
+
+from datetime import date
+
+import pyarrow as pa
+import pytest
+
+from app.services import local_matching
+from app.services.scoring_snapshot import ScoringSnapshot, _write_table
+
+
+TODAY = date(2026, 10, 19)
+
+
+def _match(tables, industry, segment, budget):
+    params = local_matching.resolve_parameters(tables, budget, segment, industry)
+    return local_matching.execute_matching(tables, params, today=TODAY)
+
+
+def test_budget_filter_and_image_adjustment(scoring_tables):
+    """Only talents inside [min, max) survive, ranked by base + image adjustment"""
+    results = _match(scoring_tables, "化粧品・ヘアケア・オーラルケア", "女性20-34歳", "1,000万円〜3,000万円未満")
+
+    assert [r["account_id"] for r in results] == [2, 4]
+    assert [r["ranking"] for r in results] == [1, 2]
+    assert results[0]["base_power_score"] == pytest.approx(70.0)
+    assert results[0]["image_adjustment"] == pytest.approx(6.0)
+    assert results[1]["image_adjustment"] == pytest.approx(3.0)
+
+
+def test_null_image_scores_rank_first_like_postgres(scoring_tables):
+    """ORDER BY score DESC puts NULLs first, so a NULL image score receives +12"""
+    adjustment = local_matching.compute_image_adjustment(scoring_tables["talent_images"], 1, [2])
+    assert adjustment[3] == pytest.approx(12.0)
+    assert adjustment[1] == pytest.approx(-12.0)
+
+
+def test_unlimited_budget_admits_unpriced_talents(scoring_tables):
+    results = _match(scoring_tables, "アルコール飲料", "女性20-34歳", "5,000万円以上")
+    assert [r["account_id"] for r in results] == [3]
+    assert results[0]["reflected_score"] == pytest.approx(42.0)
+
+
+def test_alcohol_industry_excludes_under_25(scoring_tables):
+    results = _match(scoring_tables, "アルコール飲料", "女性20-34歳", "1,000万円〜3,000万円未満")
+    assert [r["account_id"] for r in results] == [4]
+
+
+def test_unknown_parameters_raise(scoring_tables):
+    with pytest.raises(ValueError):
+        local_matching.resolve_parameters(scoring_tables, "存在しない予算", "女性20-34歳", "食品")
+
+
+@pytest.mark.parametrize("fmt,compression", [("parquet", "zstd"), ("arrow", None)])
+def test_snapshot_round_trip(tmp_path, scoring_tables, fmt, compression):
+    """A snapshot written to disk yields the same ranking as the in-memory tables"""
+    import json
+
+    snapshot_dir = tmp_path / "v42_20261019_000000"
+    snapshot_dir.mkdir()
+    entries = {}
+    for name, df in scoring_tables.items():
+        _write_table(pa.Table.from_pandas(df, preserve_index=False), snapshot_dir / f"{name}.{fmt}", fmt, compression)
+        entries[name] = {"file": f"{name}.{fmt}", "rows": len(df), "columns": list(df.columns)}
+    (snapshot_dir / "manifest.json").write_text(json.dumps({
+        "data_version": "v42", "created_at": "2026-10-19T00:00:00",
+        "format": fmt, "compression": compression, "tables": entries,
+    }))
+    (tmp_path / "LATEST").write_text(snapshot_dir.name)
+
+    snapshot = ScoringSnapshot.open(tmp_path)
+    assert snapshot.data_version == "v42"
+
+    from_snapshot = snapshot.match("化粧品・ヘアケア・オーラルケア", "女性20-34歳", "1,000万円〜3,000万円未満")
+    in_memory = _match(scoring_tables, "化粧品・ヘアケア・オーラルケア", "女性20-34歳", "1,000万円〜3,000万円未満")
+    assert [r["account_id"] for r in from_snapshot] == [r["account_id"] for r in in_memory]
@@ -0,0 +1,191 @@
+"""
+Matching engine tests (backend selection, parameter cache, shadow comparison)
+"""
+
+import asyncio
+import logging
+
+import pytest
+
+from app.core.config import settings
+from app.core.http_cache import master_data_cache
+from app.services.matching_engine import MatchingBackend, MatchingEngine, compare_rankings
+from app.services.matching_parameters import MatchingParameters, build_parameters
+
+
+def _row(account_id, score):
+    return {"account_id": account_id, "reflected_score": score, "base_power_score": score}
+
+
+class FakeBackend(MatchingBackend):
+    def __init__(self, name, results, available=True):
+        self.name = name
+        self.results = results
+        self.available = available
+        self.rank_calls = 0
+        self.resolve_calls = 0
+
+    def is_available(self):
+        return self.available
+
+    async def resolve_parameters(self, budget_name, target_segment_name, industry_name):
+        self.resolve_calls += 1
+        return build_parameters(None, 30000000, 1, None, industry_name, budget_name)
+
+    async def rank(self, params):
+        self.rank_calls += 1
+        await asyncio.sleep(0)
+        if isinstance(self.results, Exception):
+            raise self.results
+        return [dict(r) for r in self.results]
+
+
+PARAMS = MatchingParameters(min_budget=0.0, max_budget=1.0, target_segment_id=1, image_item_ids=[1])
+
+
+def test_backend_without_rank_cannot_be_created():
+    """An incomplete backend fails when it is instantiated for register_backend, not per request"""
+    class ResolveOnlyBackend(MatchingBackend):
+        name = "resolve_only"
+
+        async def resolve_parameters(self, budget_name, target_segment_name, industry_name):
+            return PARAMS
+
+    with pytest.raises(TypeError):
+        ResolveOnlyBackend()
+
+
+@pytest.fixture
+def engine_settings(monkeypatch):
+    monkeypatch.setattr(settings, "matching_backend", "auto")
+    monkeypatch.setattr(settings, "matching_shadow_backend", "")
+    monkeypatch.setattr(settings, "matching_shadow_sample_rate", 1.0)
+    monkeypatch.setattr(settings, "matching_coalescing_enabled", True)
+    monkeypatch.setattr(master_data_cache, "current_version", _tracked_version)
+    monkeypatch.setitem(TRACKED_VERSION, "value", "v1")
+    return settings
+
+
+TRACKED_VERSION = {"value": "v1"}
+
+
+async def _tracked_version():
+    return TRACKED_VERSION["value"]
+
+
+def test_build_parameters_handles_null_budget_bounds():
+    params = build_parameters(None, None, 3, None, "アルコール飲料", "5,000万円以上")
+
+    assert params.min_budget == 0.0
+    assert params.max_budget == 999999999999
+    assert params.image_item_ids == [1, 2, 3, 4, 5, 6, 7]
+    assert params.is_alcohol_industry and params.is_unlimited_budget
+
+
+def test_compare_rankings_reports_divergence():
+    primary = [_row(1, 90.0), _row(2, 80.0), _row(3, 70.0)]
+    candidate = [_row(1, 90.0), _row(3, 75.0), _row(4, 60.0)]
+
+    diff = compare_rankings(primary, candidate)
+
+    assert not diff["identical"]
+    assert diff["overlap"] == 2
+    assert diff["first_divergence"] == 2
+    assert diff["max_rank_delta"] == 1
+    assert diff["missing"] == [2]
+    assert diff["extra"] == [4]
+    assert diff["max_score_delta"] == 5.0
+    assert compare_rankings(primary, primary)["identical"]
+
+
+def test_auto_prefers_arrays_and_falls_back_to_sql(engine_settings):
+    sql = FakeBackend("sql", [])
+    arrays = FakeBackend("arrays", [], available=False)
+    engine = MatchingEngine([sql, arrays])
+    assert engine.primary_backend() is sql
+
+    arrays.available = True
+    assert engine.primary_backend() is arrays
+
+    engine_settings.matching_backend = "unknown"
+    assert engine.primary_backend() is sql
+
+
+@pytest.mark.asyncio
+async def test_parameters_are_cached(engine_settings):
+    sql = FakeBackend("sql", [])
+    engine = MatchingEngine([sql])
+
+    first = await engine.resolve_parameters("1,000万円〜3,000万円未満", "女性20-34歳", "食品")
+    second = await engine.resolve_parameters("1,000万円〜3,000万円未満", "女性20-34歳", "食品")
+
+    assert first is second
+    assert sql.resolve_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_parameter_cache_is_cleared_when_data_version_changes(engine_settings):
+    sql = FakeBackend("sql", [])
+    engine = MatchingEngine([sql])
+
+    await engine.resolve_parameters("1,000万円〜3,000万円未満", "女性20-34歳", "食品")
+    TRACKED_VERSION["value"] = "v2"
+    await engine.resolve_parameters("1,000万円〜3,000万円未満", "女性20-34歳", "食品")
+
+    assert sql.resolve_calls == 2
+    assert engine.status()["parameter_cache"]["invalidations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_shadow_backend_logs_ranking_diff(engine_settings, caplog):
+    engine_settings.matching_backend = "sql"
+    engine_settings.matching_shadow_backend = "arrays"
+    sql = FakeBackend("sql", [_row(1, 90.0), _row(2, 80.0)])
+    arrays = FakeBackend("arrays", [_row(2, 85.0), _row(1, 84.0)])
+    engine = MatchingEngine([sql, arrays])
+
+    with caplog.at_level(logging.WARNING):
+        results = await engine.rank(PARAMS)
+        await asyncio.gather(*engine._shadow_tasks)
+
+    assert [r["account_id"] for r in results] == [1, 2]
+    assert arrays.rank_calls == 1
+    assert engine.shadow_stats.runs == 1
+    assert engine.shadow_stats.mismatches == 1
+    assert engine.last_shadow_diff["first_divergence"] == 1
+    assert "シャドー実行ランキング差分" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_shadow_failure_does_not_affect_primary(engine_settings):
+    engine_settings.matching_backend = "sql"
+    engine_settings.matching_shadow_backend = "arrays"
+    sql = FakeBackend("sql", [_row(1, 90.0)])
+    arrays = FakeBackend("arrays", RuntimeError("boom"))
+    engine = MatchingEngine([sql, arrays])
+
+    results = await engine.rank(PARAMS)
+    await asyncio.gather(*engine._shadow_tasks)
+
+    assert results == [_row(1, 90.0)]
+    assert engine.shadow_stats.errors == 1
+    assert engine.shadow_stats.runs == 0
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_ranks_are_coalesced(engine_settings):
+    engine_settings.matching_backend = "sql"
+    sql = FakeBackend("sql", [_row(1, 90.0), _row(2, 80.0)])
+    engine = MatchingEngine([sql])
+
+    first, second = await asyncio.gather(engine.rank(PARAMS), engine.rank(PARAMS))
+
+    assert sql.rank_calls == 1
+    assert first == second
+    first[0]["ranking"] = 1
+    assert "ranking" not in second[0]
+    assert engine.status()["coalescing"]["coalesced"] == 1
+
+    engine_settings.matching_coalescing_enabled = False
+    await asyncio.gather(engine.rank(PARAMS), engine.rank(PARAMS))
+    assert sql.rank_calls == 3
@@ -0,0 +1,290 @@
+"""
+Top-K precomputation tests (combination enumeration, lookup fallback, auto backend preference)
+"""
+
+from contextlib import asynccontextmanager
+
+import asyncpg
+import pytest
+
+from app.core.config import settings
+from app.services import matching_topk
+from app.services.matching_engine import MatchingBackend, MatchingEngine, PrecomputedTopKBackend
+from app.services.matching_parameters import MatchingParameters
+
+
+class FakeBackend(MatchingBackend):
+    def __init__(self, name, results, available=True):
+        self.name = name
+        self.results = results
+        self.available = available
+        self.rank_calls = 0
+
+    def is_available(self):
+        return self.available
+
+    async def resolve_parameters(self, budget_name, target_segment_name, industry_name):
+        raise AssertionError("the top-K backend resolves parameters itself")
+
+    async def rank(self, params):
+        self.rank_calls += 1
+        return [dict(r) for r in self.results]
+
+
+class FakeMasterConnection:
+    """Answers the three master queries used by enumerate_parameters"""
+
+    def __init__(self, budgets, segments, industries):
+        self.tables = {"budget_ranges": budgets, "target_segments": segments, "industries": industries}
+
+    async def fetch(self, sql, *args):
+        for table, rows in self.tables.items():
+            if f"FROM {table}" in sql:
+                return rows
+        raise AssertionError(sql)
+
+
+PARAMS = MatchingParameters(min_budget=0.0, max_budget=1.0, target_segment_id=1, image_item_ids=[1])
+
+
+@pytest.fixture
+def topk_state(monkeypatch):
+    monkeypatch.setattr(settings, "matching_backend", "auto")
+    monkeypatch.setattr(settings, "matching_topk_enabled", True)
+    monkeypatch.setattr(matching_topk, "_state", {"status": "current"})
+    monkeypatch.setattr(matching_topk, "stats", matching_topk.TopKStats())
+    return matching_topk._state
+
+
+@pytest.mark.asyncio
+async def test_enumerate_parameters_deduplicates_industries_with_same_inputs():
+    conn = FakeMasterConnection(
+        budgets=[
+            {"range_name": "1,000万円未満", "min_amount": None, "max_amount": 10000000},
+            {"range_name": "5,000万円以上", "min_amount": 50000000, "max_amount": None},
+        ],
+        segments=[{"target_segment_id": 1}, {"target_segment_id": 2}],
+        industries=[
+            {"industry_name": "食品", "required_image_id": 2},
+            {"industry_name": "化粧品", "required_image_id": 2},
+            {"industry_name": "アルコール飲料", "required_image_id": 2},
+            {"industry_name": "その他", "required_image_id": None},
+        ],
+    )
+
+    combinations = await matching_topk.enumerate_parameters(conn)
+
+    # 2 budgets x 2 segments x 3 distinct (image set, alcohol) variants
+    assert len(combinations) == 12
+    assert len({p.key() for p in combinations}) == 12
+    assert sum(p.is_unlimited_budget for p in combinations) == 6
+    assert {tuple(p.image_item_ids) for p in combinations} == {(2,), (1, 2, 3, 4, 5, 6, 7)}
+
+
+def test_records_are_ranked_from_one():
+    rows = [
+        {"account_id": 10, "base_power_score": 80, "image_adjustment": 6, "reflected_score": 86},
+        {"account_id": 11, "base_power_score": 70, "image_adjustment": 3, "reflected_score": 73},
+    ]
+
+    records = matching_topk._records(PARAMS, rows)
+
+    assert [r[6] for r in records] == [1, 2]
+    assert records[0][:6] == (1, [1], 0.0, 1.0, False, False)
+    assert len(records[0]) == len(matching_topk.TOPK_COLUMNS)
+
+
+@pytest.mark.asyncio
+async def test_precomputed_backend_falls_back_to_cte_when_lookup_is_empty(topk_state, monkeypatch):
+    backend = PrecomputedTopKBackend()
+    backend.fallback = FakeBackend("sql", [{"account_id": 1, "reflected_score": 90.0}])
+    lookups = []
+
+    async def lookup(params, limit=30):
+        lookups.append(params)
+        return [{"account_id": 2, "reflected_score": 95.0}] if len(lookups) == 1 else []
+
+    monkeypatch.setattr(matching_topk, "lookup", lookup)
+
+    assert (await backend.rank(PARAMS))[0]["account_id"] == 2
+    assert (await backend.rank(PARAMS))[0]["account_id"] == 1
+    assert backend.fallback.rank_calls == 1
+
+
+def test_auto_prefers_precomputed_over_sql_only_while_current(topk_state):
+    sql = FakeBackend("sql", [])
+    arrays = FakeBackend("arrays", [], available=False)
+    precomputed = PrecomputedTopKBackend()
+    engine = MatchingEngine([sql, arrays, precomputed])
+
+    assert engine.primary_backend() is precomputed
+    assert engine.status()["precomputed"]["status"] == "current"
+
+    arrays.available = True
+    assert engine.primary_backend() is arrays
+
+    arrays.available = False
+    topk_state["status"] = "stale"
+    assert engine.primary_backend() is sql
+
+
+class LockedRefreshConnection:
+    """Another instance holds the refresh lock: the try-lock inside the transaction fails"""
+
+    def __init__(self):
+        self.statements = []
+        self.isolation = None
+
+    def transaction(self, isolation=None):
+        @asynccontextmanager
+        async def transaction():
+            self.isolation = isolation
+            yield
+
+        return transaction()
+
+    async def fetchval(self, sql, *args):
+        self.statements.append(sql)
+        return False
+
+    async def execute(self, sql, *args):
+        self.statements.append(sql)
+
+
+class NoVersionTableConnection:
+    """A database without master_data_version; any other query would be a fingerprint scan"""
+
+    def __init__(self):
+        self.statements = []
+
+    async def fetchval(self, sql, *args):
+        self.statements.append(sql)
+        raise asyncpg.exceptions.UndefinedTableError("relation \"master_data_version\" does not exist")
+
+    async def fetchrow(self, sql, *args):
+        raise AssertionError(f"unexpected query: {sql}")
+
+
+@pytest.mark.asyncio
+async def test_read_state_without_version_table_skips_fingerprint_scan():
+    conn = NoVersionTableConnection()
+
+    state = await matching_topk.read_state(conn)
+
+    assert state == {"status": "unsupported", "db_version": None}
+    assert len(conn.statements) == 1 and "master_data_version" in conn.statements[0]
+
+
+@pytest.mark.asyncio
+async def test_refresh_skips_when_another_instance_holds_the_transaction_lock(topk_state):
+    conn = LockedRefreshConnection()
+
+    result = await matching_topk.refresh_matching_topk(conn)
+
+    assert result["status"] == "busy"
+    assert result["refreshed"] is False
+    assert conn.isolation == "repeatable_read"
+    # only the transaction-scoped try-lock: nothing session-level that a pooler could strand
+    assert conn.statements == ["SELECT pg_try_advisory_xact_lock($1)"]
+
+
+@pytest.mark.asyncio
+async def test_lookup_returns_all_k_rows_for_recommended_dedup(topk_state, monkeypatch):
+    """Lookup reads the K-row headroom; STEP 5.5 trims to 30 after removing recommended talents"""
+    monkeypatch.setattr(settings, "matching_topk_k", 60)
+    limits = []
+
+    @asynccontextmanager
+    async def acquire_connection():
+        yield None
+
+    async def fetch_prepared(conn, name, *args):
+        limits.append(args[-1])
+        return [{"account_id": rank} for rank in range(1, args[-1] + 1)]
+
+    monkeypatch.setattr(matching_topk, "acquire_connection", acquire_connection)
+    monkeypatch.setattr(matching_topk, "fetch_prepared", fetch_prepared)
+
+    rows = await matching_topk.lookup(PARAMS)
+
+    assert limits == [60]
+    assert len(rows) == 60
+
+
+def _topk_state(**overrides):
+    state = {"status": "current", "k": 60, "computed_today": True, "combinations": 12, "data_version": "v5"}
+    state.update(overrides)
+    return state
+
+
+def test_refresh_scope():
+    assert matching_topk.refresh_scope(_topk_state()) is None
+    # a new day only invalidates the CURRENT_DATE-dependent alcohol combinations
+    assert matching_topk.refresh_scope(_topk_state(computed_today=False)) == "alcohol"
+    assert matching_topk.refresh_scope(_topk_state(status="stale", computed_today=False)) == "all"
+    assert matching_topk.refresh_scope({"status": "missing"}) == "all"
+    assert matching_topk.refresh_scope(_topk_state(k=30)) == "all"
+    assert matching_topk.refresh_scope(_topk_state(), force=True) == "all"
+
+
+class DailyRefreshConnection(FakeMasterConnection):
+    """Version unchanged but computed yesterday: only alcohol combinations are recomputed"""
+
+    def __init__(self):
+        super().__init__(
+            budgets=[{"range_name": "1,000万円未満", "min_amount": None, "max_amount": 10000000}],
+            segments=[{"target_segment_id": 1}, {"target_segment_id": 2}],
+            industries=[
+                {"industry_name": "食品", "required_image_id": 2},
+                {"industry_name": "アルコール飲料", "required_image_id": 2},
+            ],
+        )
+        self.executed = []
+        self.copied = []
+        self.step0_4_calls = []
+
+    def transaction(self, isolation=None):
+        @asynccontextmanager
+        async def transaction():
+            yield
+
+        return transaction()
+
+    async def fetchval(self, sql, *args):
+        if "master_data_version" in sql:
+            return 5
+        if "COUNT(*)" in sql:
+            return 120
+        return True  # try-lock acquired, state table exists
+
+    async def fetchrow(self, sql, *args):
+        return {"data_version": "v5", "computed_on": None, "computed_today": False, "k": 60,
+                "combinations": 4, "row_count": 240, "duration_ms": 1.0, "refreshed_at": None}
+
+    async def fetch(self, sql, *args):
+        if "FROM budget_ranges" in sql or "FROM target_segments" in sql or "FROM industries" in sql:
+            return await super().fetch(sql, *args)
+        self.step0_4_calls.append(args[3])  # is_alcohol_industry
+        return [{"account_id": 1, "base_power_score": 80, "image_adjustment": 0, "reflected_score": 80}]
+
+    async def execute(self, sql, *args):
+        self.executed.append(" ".join(sql.split()))
+
+    async def copy_records_to_table(self, table, records, columns):
+        self.copied.extend(records)
+
+
+@pytest.mark.asyncio
+async def test_daily_refresh_recomputes_only_alcohol_combinations(topk_state):
+    conn = DailyRefreshConnection()
+
+    result = await matching_topk.refresh_matching_topk(conn)
+
+    assert result["scope"] == "alcohol"
+    assert conn.step0_4_calls == [True, True]
+    assert "DELETE FROM matching_topk WHERE is_alcohol_industry" in conn.executed
+    assert "DELETE FROM matching_topk" not in conn.executed
+    assert all(record[4] for record in conn.copied)
+    # the state keeps the full combination count and reports the table's row count
+    assert (result["combinations"], result["row_count"], result["computed_today"]) == (4, 120, True)
+    assert matching_topk.stats.alcohol_refreshes == 1
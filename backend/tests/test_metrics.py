@@ -0,0 +1,87 @@
+"""
+Prometheus metrics tests (histogram exposition, route templates, /metrics endpoint)
+"""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.metrics import Histogram, MetricsMiddleware, register_routes, request_duration, stage_duration
+from app.core.tracing import span
+
+
+def _value(text, sample):
+    for line in text.splitlines():
+        if line.startswith(sample + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("demo_seconds", "demo", ("stage",), (0.1, 1.0))
+    child = histogram.labels("a")
+    for value in (0.05, 0.1, 0.5, 3.0):
+        child.observe(value)
+
+    text = "\n".join(histogram.collect())
+
+    assert _value(text, 'demo_seconds_bucket{stage="a",le="0.1"}') == 2
+    assert _value(text, 'demo_seconds_bucket{stage="a",le="1"}') == 3
+    assert _value(text, 'demo_seconds_bucket{stage="a",le="+Inf"}') == 4
+    assert _value(text, 'demo_seconds_count{stage="a"}') == 4
+
+
+def test_request_latency_is_recorded_per_route_template(monkeypatch):
+    monkeypatch.setattr(settings, "metrics_enabled", True)
+    app = FastAPI()
+
+    @app.get("/api/talents/{talent_id}")
+    async def talent(talent_id: int):
+        return {"id": talent_id}
+
+    app.add_middleware(MetricsMiddleware)
+    register_routes(app.routes)
+    child = request_duration.get("/api/talents/{talent_id}", "GET", "2xx")
+    before = child.count
+
+    client = TestClient(app)
+    client.get("/api/talents/1")
+    client.get("/api/talents/2")
+    client.get("/api/unknown")
+
+    assert child.count == before + 2
+    assert request_duration.get("/api/talents/1", "GET", "2xx") is None
+    assert request_duration.get(metrics.UNMATCHED_ROUTE, "GET", "4xx").count >= 1
+
+
+def test_spans_feed_stage_histogram_without_trace(monkeypatch):
+    monkeypatch.setattr(settings, "metrics_enabled", True)
+    child = stage_duration.get("matching.step5")
+    before = child.count
+
+    with span("matching.step5"):
+        pass
+    with span("not.a.stage"):
+        pass
+
+    assert child.count == before + 1
+    assert stage_duration.get("not.a.stage") is None
+
+
+def test_metrics_endpoint_exposes_gauges(monkeypatch):
+    from app.main import create_app
+
+    monkeypatch.setattr(settings, "metrics_enabled", True)
+    client = TestClient(create_app("all"))
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE matching_stage_duration_seconds histogram" in response.text
+    assert _value(response.text, 'http_requests_in_flight{workload="public"}') is not None
+    assert _value(response.text, 'background_queue_depth{queue="matching_shadow"}') == 0
+
+    monkeypatch.setattr(settings, "metrics_enabled", False)
+    assert client.get("/metrics").status_code == 404
@@ -0,0 +1,77 @@
+"""
+History partition maintenance tests (month arithmetic, partition DDL, retention selection)
+"""
+
+from datetime import date, datetime
+
+import pytest
+
+from app.services import partition_maintenance as pm
+
+
+def test_month_arithmetic_crosses_year_boundaries():
+    assert pm.add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+    assert pm.add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+    assert pm.month_start(date(2025, 12, 31)) == date(2025, 12, 1)
+
+
+def test_partition_names_and_ddl():
+    name = pm.partition_name("diagnosis_results", date(2025, 12, 1))
+
+    assert name == "diagnosis_results_p202512"
+    assert pm.partition_month(name) == date(2025, 12, 1)
+    assert pm.partition_month("diagnosis_results_default") is None
+    assert pm.create_partition_sql("button_clicks", date(2025, 12, 1)) == (
+        'CREATE TABLE IF NOT EXISTS "button_clicks_p202512" PARTITION OF "button_clicks" '
+        "FOR VALUES FROM ('2025-12-01') TO ('2026-01-01')"
+    )
+
+
+def test_expired_partitions_keep_retention_window_and_default():
+    names = [
+        "button_clicks_default",
+        "button_clicks_p202310",
+        "button_clicks_p202311",
+        "button_clicks_p202312",
+        "button_clicks_p202512",
+    ]
+
+    # 24 months kept counting the current month: everything before 2023-12 is archived
+    assert pm.expired_partitions(names, date(2025, 12, 15), retention_months=24) == [
+        "button_clicks_p202310",
+        "button_clicks_p202311",
+    ]
+
+
+def test_history_lower_bound_reaches_into_previous_partition():
+    assert pm.history_lower_bound(datetime(2025, 12, 1, 0, 30)) == datetime(2025, 11, 30, 0, 30)
+
+
+class FakePartitionConnection:
+    def __init__(self, partitioned, existing):
+        self.partitioned = partitioned
+        self.existing = existing
+        self.executed = []
+
+    async def fetchval(self, sql, parent):
+        return parent in self.partitioned
+
+    async def fetch(self, sql, parent):
+        return [{"relname": name} for name in self.existing.get(parent, [])]
+
+    async def execute(self, sql):
+        self.executed.append(sql)
+
+
+@pytest.mark.asyncio
+async def test_ensure_future_partitions_creates_only_missing_months():
+    conn = FakePartitionConnection(
+        partitioned={"diagnosis_results"},
+        existing={"diagnosis_results": ["diagnosis_results_p202512", "diagnosis_results_default"]},
+    )
+
+    created = await pm.ensure_future_partitions(conn, months_ahead=2, today=date(2025, 12, 10))
+
+    # button_clicks is not partitioned in this database, so it is left alone
+    assert created == ["diagnosis_results_p202601", "diagnosis_results_p202602"]
+    assert len(conn.executed) == 2
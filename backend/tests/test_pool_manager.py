@@ -0,0 +1,147 @@
+"""
+Connection pool manager tests (checkout tracking, leak warnings, per-workload routing)
+"""
+
+import asyncio
+import logging
+
+import pytest
+
+from app.core.workload import WORKLOAD_ADMIN, WORKLOAD_PUBLIC, current_workload
+from app.db.connection import PoolManager, PoolStats
+
+
+class FakePool:
+    """Minimal stand-in for asyncpg.Pool"""
+
+    def __init__(self, size=2):
+        self.size = size
+        self.idle = size
+        self.released = []
+
+    async def acquire(self):
+        self.idle -= 1
+        return object()
+
+    async def release(self, conn):
+        self.idle += 1
+        self.released.append(conn)
+
+    def get_size(self):
+        return self.size
+
+    def get_idle_size(self):
+        return self.idle
+
+    def get_min_size(self):
+        return 1
+
+    def get_max_size(self):
+        return self.size
+
+
+def _manager(**pools):
+    manager = PoolManager()
+    for workload, pool in pools.items():
+        manager.pools[workload] = pool
+        manager.stats[workload] = PoolStats()
+        manager._pool_workloads[id(pool)] = workload
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_context_manager_returns_connection_even_on_error():
+    pool = FakePool()
+    manager = _manager(public=pool)
+
+    with pytest.raises(RuntimeError):
+        async with manager.connection("test_site") as conn:
+            assert manager.snapshot()["pools"]["public"]["in_use"] == 1
+            raise RuntimeError("boom")
+
+    assert pool.released == [conn]
+    snapshot = manager.snapshot()["pools"]["public"]
+    assert snapshot["in_use"] == 0
+    assert snapshot["acquires"] == 1
+    assert snapshot["checked_out"] == 0
+
+
+@pytest.mark.asyncio
+async def test_connections_are_routed_by_workload():
+    public, admin = FakePool(), FakePool()
+    manager = _manager(public=public, admin=admin)
+
+    token = current_workload.set(WORKLOAD_ADMIN)
+    try:
+        async with manager.connection():
+            pass
+    finally:
+        current_workload.reset(token)
+
+    assert len(admin.released) == 1
+    assert public.released == []
+    assert manager.stats[WORKLOAD_ADMIN].acquires == 1
+    assert manager.stats[WORKLOAD_PUBLIC].acquires == 0
+
+
+@pytest.mark.asyncio
+async def test_long_held_connection_is_reported_with_call_site(monkeypatch, caplog):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "db_hold_warning_seconds", 0.01)
+
+    manager = _manager(public=FakePool())
+    conn = await manager.acquire("matching.py:123 execute_matching_logic")
+    await asyncio.sleep(0.02)
+
+    long_held = manager.long_held()
+    assert long_held[0]["call_site"] == "matching.py:123 execute_matching_logic"
+
+    with caplog.at_level(logging.WARNING):
+        await manager.release(conn)
+    assert manager.stats[WORKLOAD_PUBLIC].long_held_warnings == 1
+    assert "execute_matching_logic" in caplog.text
+
+
+class FakePoolConnection:
+    def __init__(self, closed_by_client=False):
+        self.closed_by_client = closed_by_client
+        self.termination_listeners = []
+
+    def add_termination_listener(self, callback):
+        self.termination_listeners.append(callback)
+
+    def close(self, by_client):
+        self.closed_by_client = by_client
+        for callback in self.termination_listeners:
+            callback(self)
+
+
+@pytest.mark.asyncio
+async def test_reconnects_count_only_replacements_of_lost_connections(monkeypatch):
+    """Idle/max-queries recycling by the pool is not a reconnect; a server-side drop is"""
+    import asyncpg
+    from app.db.connection import PooledConnection
+
+    created = {}
+
+    async def create_pool(**kwargs):
+        created.update(kwargs)
+        return FakePool()
+
+    monkeypatch.setattr(asyncpg, "create_pool", create_pool)
+    manager = PoolManager()
+    await manager.create_pool(WORKLOAD_PUBLIC, 1, 2)
+    init = created["init"]
+    assert created["connection_class"] is PooledConnection
+
+    first = FakePoolConnection()
+    await init(first)
+    first.close(by_client=True)  # recycled by the pool after max_inactive_connection_lifetime
+    second = FakePoolConnection()
+    await init(second)
+    second.close(by_client=False)  # dropped by the server
+    await init(FakePoolConnection())
+
+    stats = manager.stats[WORKLOAD_PUBLIC]
+    assert (stats.connections_opened, stats.connections_lost, stats.reconnects) == (3, 1, 1)
+
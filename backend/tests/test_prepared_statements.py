@@ -0,0 +1,131 @@
+"""
+Prepared statement registry tests
+"""
+
+import weakref
+
+import pytest
+
+from app.core.config import settings
+from app.db import prepared_statements
+from app.db.prepared_statements import (
+    fetch_prepared, prepare_registered_statements, register_statement, registered_statements,
+)
+
+
+class FakeStatement:
+    def __init__(self, sql):
+        self.sql = sql
+        self.calls = []
+
+    async def fetch(self, *args):
+        self.calls.append(args)
+        return [("prepared", self.sql)]
+
+
+class FakeConnection:
+    """Minimal stand-in for asyncpg.Connection"""
+
+    def __init__(self, pid=4242):
+        self.pid = pid
+        self.prepared = []
+        self.text_queries = []
+        self.termination_listeners = []
+
+    def get_server_pid(self):
+        return self.pid
+
+    def add_termination_listener(self, callback):
+        self.termination_listeners.append(callback)
+
+    async def prepare(self, sql):
+        self.prepared.append(sql)
+        return FakeStatement(sql)
+
+    async def fetch(self, sql, *args):
+        self.text_queries.append(sql)
+        return [("text", sql)]
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(prepared_statements, "_statements", {})
+    monkeypatch.setattr(prepared_statements, "_prepared", weakref.WeakKeyDictionary())
+    monkeypatch.setattr(prepared_statements, "stats", prepared_statements.PreparedStatementStats())
+    # keep plan sampling from opening a side connection
+    monkeypatch.setattr(settings, "query_plan_sample_rate", 0.0)
+
+
+@pytest.mark.asyncio
+async def test_statements_are_prepared_once_per_connection(registry):
+    name = register_statement("hot", "SELECT $1::int")
+    conn = FakeConnection()
+
+    await prepare_registered_statements(conn)
+    await fetch_prepared(conn, name, 1)
+    await fetch_prepared(conn, name, 2)
+
+    assert conn.prepared == ["SELECT $1::int"]
+    assert conn.text_queries == []
+    assert prepared_statements.stats.prepared_executions == 2
+
+    # Closing the connection drops its statements so they are prepared again on reconnect
+    conn.termination_listeners[0](conn)
+    await fetch_prepared(conn, name, 3)
+    assert len(conn.prepared) == 2
+
+
+@pytest.mark.asyncio
+async def test_statements_are_keyed_by_client_connection_not_server_pid(registry):
+    """Behind PgBouncer two client connections can report the same server PID"""
+    name = register_statement("hot", "SELECT $1::int")
+    first, second = FakeConnection(pid=7), FakeConnection(pid=7)
+
+    await prepare_registered_statements(first)
+    await fetch_prepared(second, name, 1)
+
+    assert first.prepared == ["SELECT $1::int"]
+    assert second.prepared == ["SELECT $1::int"]
+    assert prepared_statements.get_prepared_statement_status()["connections"] == 2
+
+
+@pytest.mark.asyncio
+async def test_late_registration_is_prepared_on_first_use(registry):
+    conn = FakeConnection()
+    await prepare_registered_statements(conn)
+    name = register_statement("late", "SELECT 1")
+
+    rows = await fetch_prepared(conn, name)
+
+    assert rows == [("prepared", "SELECT 1")]
+    assert conn.prepared == ["SELECT 1"]
+
+
+@pytest.mark.asyncio
+async def test_disabled_registry_falls_back_to_text(registry, monkeypatch):
+    monkeypatch.setattr(settings, "prepared_statements_enabled", False)
+    name = register_statement("hot", "SELECT 1")
+    conn = FakeConnection()
+
+    await prepare_registered_statements(conn)
+    await fetch_prepared(conn, name)
+
+    assert conn.prepared == []
+    assert conn.text_queries == ["SELECT 1"]
+
+
+def test_conflicting_registration_is_rejected(registry):
+    register_statement("hot", "SELECT 1")
+    register_statement("hot", "SELECT 1")
+    with pytest.raises(ValueError):
+        register_statement("hot", "SELECT 2")
+
+
+def test_matching_hot_queries_are_registered_and_parameterized():
+    from app.api.endpoints import matching  # noqa: F401
+
+    statements = registered_statements()
+    for name in ("matching_parameters", "matching_step0_4", "cm_competing_category"):
+        assert name in statements
+        assert "{" not in statements[name]
+    assert "ANY($3::int[])" in statements["cm_competing_category"]
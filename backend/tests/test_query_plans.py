@@ -0,0 +1,162 @@
+"""
+Query plan sampler tests (plan fingerprints, slow-query capture, plan change detection)
+"""
+
+import asyncio
+import json
+import logging
+
+import pytest
+
+from app.core.config import settings
+from app.db.query_plans import QueryPlanSampler, normalize_sql, plan_fingerprint, redact_plan, summarize_plan
+
+
+def _plan(index_name="idx_talent_images_lookup", cost=10.0, execution_ms=5.0):
+    scan = (
+        {"Node Type": "Index Scan", "Relation Name": "talent_images", "Index Name": index_name, "Total Cost": cost}
+        if index_name
+        else {"Node Type": "Seq Scan", "Relation Name": "talent_images", "Total Cost": cost}
+    )
+    return {
+        "Plan": {
+            "Node Type": "Hash Join",
+            "Join Type": "Inner",
+            "Shared Hit Blocks": 12,
+            "Plans": [scan, {"Node Type": "Seq Scan", "Relation Name": "m_account"}],
+        },
+        "Planning Time": 0.4,
+        "Execution Time": execution_ms,
+    }
+
+
+class FakeTransaction:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSideConnection:
+    def __init__(self, plans):
+        self.plans = list(plans)
+        self.explained = []
+
+    def transaction(self, readonly=False):
+        return FakeTransaction()
+
+    async def execute(self, sql):
+        return None
+
+    async def fetchval(self, sql, *args):
+        if sql.startswith("EXPLAIN"):
+            self.explained.append((sql, args))
+            return json.dumps([self.plans.pop(0)])
+        return 7  # master_data_version
+
+
+@pytest.fixture
+def sampler(monkeypatch):
+    monkeypatch.setattr(settings, "query_plan_sample_rate", 0.0)
+    monkeypatch.setattr(settings, "slow_query_threshold_ms", 100.0)
+    instance = QueryPlanSampler()
+
+    def use(*plans):
+        conn = FakeSideConnection(plans)
+
+        async def side_connection():
+            return conn
+
+        instance._side_connection = side_connection
+        return conn
+
+    instance.use = use
+    return instance
+
+
+def test_plan_fingerprint_ignores_costs_but_not_indexes():
+    assert plan_fingerprint(_plan(cost=10.0)) == plan_fingerprint(_plan(cost=9999.0, execution_ms=80.0))
+    assert plan_fingerprint(_plan()) != plan_fingerprint(_plan(index_name=None))
+
+    summary = summarize_plan(_plan(index_name=None))
+    assert summary["indexes"] == []
+    assert summary["seq_scans"] == ["m_account", "talent_images"]
+
+
+def test_normalize_sql_replaces_literals():
+    assert normalize_sql("SELECT *  FROM t WHERE a = 'x''y' AND b > 10.5") == "SELECT * FROM t WHERE a = ? AND b > ?"
+    assert normalize_sql("SELECT * FROM t WHERE a = $1") == "SELECT * FROM t WHERE a = $1"
+
+
+def test_redact_plan_hides_literals_in_conditions():
+    plan = _plan()
+    plan["Plan"]["Plans"][1].update({
+        "Filter": "(email = 'user@example.com'::text)",
+        "Output": ["name", "'山田花子'::text", "42"],
+    })
+
+    redacted = redact_plan(plan)["Plan"]["Plans"][1]
+
+    assert redacted["Filter"] == "(email = ?::text)"
+    assert redacted["Output"] == ["name", "?::text", "?"]
+    assert redacted["Relation Name"] == "m_account"
+    assert plan_fingerprint(redact_plan(plan)) == plan_fingerprint(plan)
+
+
+@pytest.mark.asyncio
+async def test_slow_query_is_captured_in_background(sampler):
+    conn = sampler.use(_plan())
+
+    sampler.observe("matching_step0_4", "WITH a AS (SELECT 1) SELECT * FROM a WHERE $1", (3,), 0.25)
+    sampler.observe("matching_parameters", "SELECT $1", (1,), 0.01)  # under threshold, not sampled
+    await asyncio.gather(*sampler._tasks)
+
+    assert conn.explained == [("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) WITH a AS (SELECT 1) SELECT * FROM a WHERE $1", (3,))]
+    (record,) = sampler.status(include_plan=True)["records"]
+    assert record["trigger"] == "slow"
+    assert record["observed_ms"] == 250.0
+    assert record["data_version"] == "v7"
+    assert record["indexes"] == ["idx_talent_images_lookup"]
+    assert record["arg_types"] == ["int"]
+    assert "args" not in record
+    assert "plan" in record
+    assert "plan" not in sampler.status()["records"][0]
+
+
+@pytest.mark.asyncio
+async def test_plan_change_is_flagged(sampler, caplog):
+    sampler.use(_plan(), _plan(index_name=None))
+
+    await sampler.capture("matching_step0_4", "SELECT 1")
+    with caplog.at_level(logging.WARNING):
+        record = await sampler.recapture("matching_step0_4")
+
+    assert record["plan_changed"]
+    assert record["previous_plan_fingerprint"] == plan_fingerprint(_plan())
+    assert sampler.stats.plan_changes == 1
+    assert "実行計画が変化しました" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_non_select_statements_are_not_analyzed(sampler):
+    conn = sampler.use(_plan())
+
+    await sampler.capture("sql:abc", "INSERT INTO t VALUES ($1)", (1,))
+
+    assert conn.explained[0][0] == "EXPLAIN (FORMAT JSON) INSERT INTO t VALUES ($1)"
+    with pytest.raises(KeyError):
+        await sampler.recapture("never_captured")
+
+
+@pytest.mark.asyncio
+async def test_text_query_arguments_are_not_kept(sampler):
+    """Slow SQL-text queries may carry personal data: their arguments are neither stored nor replayed"""
+    sampler.use(_plan())
+
+    record = await sampler.capture("sql:abc", "SELECT * FROM diagnoses WHERE email = $1", ("user@example.com",), "slow")
+
+    assert "user@example.com" not in json.dumps(record, ensure_ascii=False)
+    assert record["arg_types"] == ["str"]
+    with pytest.raises(KeyError):
+        await sampler.recapture("sql:abc")
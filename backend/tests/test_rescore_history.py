@@ -0,0 +1,99 @@
+"""
+Historical re-score batch tests (rank deltas, one matching run per input combination)
+"""
+
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import pytest
+
+from app.services import rescore_history
+
+
+def ranked(*account_ids):
+    return [{"account_id": a, "name": f"t{a}", "ranking": i + 1} for i, a in enumerate(account_ids)]
+
+
+def test_rank_deltas_cover_moves_entries_and_drops():
+    deltas = rescore_history.rank_deltas([1, 2, 3], ["t1", "t2", "t3"], ranked(2, 1, 4))
+
+    assert [(d.talent_account_id, d.previous_ranking, d.new_ranking, d.rank_delta, d.status) for d in deltas] == [
+        (2, 2, 1, 1, "up"),
+        (1, 1, 2, -1, "down"),
+        (4, None, 3, None, "new"),
+        (3, 3, None, None, "dropped"),
+    ]
+
+
+def test_rank_deltas_without_previous_results():
+    deltas = rescore_history.rank_deltas(None, None, ranked(5))
+
+    assert [d.status for d in deltas] == ["new"]
+
+
+class FakeRescoreConnection:
+    def __init__(self, submissions):
+        self.submissions = submissions
+
+    async def fetch(self, sql, since, until):
+        counts = {}
+        for row in self.submissions:
+            key = (row["industry"], row["target_segment"], row["budget_range"])
+            counts[key] = counts.get(key, 0) + 1
+        return [
+            {"industry": k[0], "target_segment": k[1], "budget_range": k[2], "submissions": n}
+            for k, n in counts.items()
+        ]
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+    async def cursor(self, sql, *args, prefetch=None):
+        for row in self.submissions:
+            yield row
+
+
+def submission(submission_id, industry, previous):
+    return {
+        "id": submission_id,
+        "session_id": f"s{submission_id}",
+        "created_at": datetime(2025, 12, 1),
+        "industry": industry,
+        "target_segment": "女性20-34歳",
+        "budget_range": "1,000万円～3,000万円",
+        "previous_account_ids": previous,
+        "previous_names": [f"t{a}" for a in previous] if previous else None,
+    }
+
+
+@pytest.mark.asyncio
+async def test_rescore_runs_matching_once_per_combination():
+    conn = FakeRescoreConnection([
+        submission(1, "化粧品", [1, 2]),
+        submission(2, "化粧品", [1, 2]),
+        submission(3, "化粧品", [2, 1]),
+        submission(4, "食品", None),
+        submission(5, "廃止業種", [1]),
+    ])
+    calls = []
+
+    async def rank(industry, target_segment, budget_range):
+        calls.append(industry)
+        if industry == "廃止業種":
+            raise ValueError("業種が見つかりません")
+        return ranked(1, 2)
+
+    rows = []
+    summary = await rescore_history.rescore_submissions(conn, rows.append, rank=rank)
+
+    assert sorted(calls) == ["化粧品", "廃止業種", "食品"]
+    assert summary.matching_runs == 2
+    assert summary.submissions == 5
+    assert summary.skipped_submissions == 1
+    assert summary.without_previous == 1
+    # submission 3 (order swapped) and 4 (no stored results) changed
+    assert summary.changed_submissions == 2
+    assert summary.report_rows == len(rows) == 8
+    assert all(len(row) == len(rescore_history.REPORT_COLUMNS) for row in rows)
+    assert [(row[0], row[-1]) for row in rows[4:6]] == [(3, "up"), (3, "down")]
@@ -0,0 +1,45 @@
+"""
+Fast JSON response tests (orjson response class and the no-revalidation model path match the default output)
+"""
+
+from datetime import datetime
+import json
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.responses import FastJSONResponse, model_response
+from app.schemas.matching import MatchingResponse, TalentResult
+
+
+def _response():
+    result = TalentResult(
+        account_id=1, name="有村架純", kana="アリムラカスミ", category="女優",
+        matching_score=98.5, ranking=1, base_power_score=85.3, is_recommended=True,
+    )
+    return MatchingResponse(
+        total_results=1, results=[result], processing_time_ms=12.5,
+        timestamp=datetime(2025, 11, 28, 12, 0, 0, 123456), session_id="s-1",
+    )
+
+
+def test_fast_json_response_matches_default_json_response():
+    content = jsonable_encoder(_response())
+
+    fast = FastJSONResponse(content)
+    default = JSONResponse(content)
+
+    assert json.loads(fast.body) == json.loads(default.body)
+    assert "有村架純".encode("utf-8") in fast.body  # non-ASCII is not escaped
+    assert fast.headers["content-type"] == "application/json"
+
+
+def test_model_response_skips_revalidation_but_keeps_output():
+    response = _response()
+
+    fast = model_response(response)
+
+    assert json.loads(fast.body) == jsonable_encoder(response)
+    assert json.loads(fast.body)["timestamp"] == "2025-11-28T12:00:00.123456"
+    assert fast.status_code == 200
+    assert fast.media_type == "application/json"
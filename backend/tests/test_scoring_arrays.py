@@ -0,0 +1,75 @@
+"""
+Memory-mapped scoring array tests
+Tests that the NumPy arrays reproduce the pandas STEP 0-4 reference implementation
+"""
+
+from datetime import date
+from itertools import product
+
+import numpy as np
+import pytest
+
+from app.services import local_matching, scoring_arrays
+from app.services.scoring_arrays import ScoringArrays
+
+
+TODAY = date(2026, 10, 19)
+
+
+@pytest.fixture
+def arrays(scoring_tables):
+    return ScoringArrays.from_tables(scoring_tables, "v7")
+
+
+@pytest.fixture(autouse=True)
+def reset_loaded_arrays(monkeypatch):
+    """Restore the module-level loaded state after each test"""
+    monkeypatch.setattr(scoring_arrays, "_scoring_arrays", None)
+    monkeypatch.setattr(scoring_arrays, "_version_status", "unloaded")
+
+
+def test_matches_reference_for_every_combination(scoring_tables, arrays):
+    """Every industry x segment x budget yields the same ranking and scores as local_matching"""
+    industries = scoring_tables["industries"]["industry_name"]
+    segments = scoring_tables["target_segments"]["segment_name"]
+    budgets = scoring_tables["budget_ranges"]["range_name"]
+
+    for industry, segment, budget in product(industries, segments, budgets):
+        params = local_matching.resolve_parameters(scoring_tables, budget, segment, industry)
+        expected = local_matching.execute_matching(scoring_tables, params, today=TODAY)
+        actual = arrays.match(arrays.resolve_parameters(budget, segment, industry), today=TODAY)
+
+        assert [r["account_id"] for r in actual] == [r["account_id"] for r in expected], (industry, segment, budget)
+        for a, e in zip(actual, expected):
+            assert a["reflected_score"] == pytest.approx(e["reflected_score"])
+            assert a["image_adjustment"] == pytest.approx(e["image_adjustment"])
+            assert a["name"] == e["name"]
+            assert a["company_name"] == e["company_name"]
+
+
+def test_save_and_memory_mapped_load(tmp_path, arrays):
+    arrays.save(tmp_path / "scoring_arrays")
+    loaded = ScoringArrays.load(tmp_path / "scoring_arrays", mmap=True)
+
+    assert loaded.data_version == "v7"
+    assert isinstance(loaded.base_power, np.memmap)
+    assert loaded.talent_count == 4  # del_flag=1 talent is excluded at build time
+
+    params = loaded.resolve_parameters("1,000万円〜3,000万円未満", "女性20-34歳", "化粧品・ヘアケア・オーラルケア")
+    assert [r["account_id"] for r in loaded.match(params, today=TODAY)] == [2, 4]
+
+
+def test_missing_artifact_falls_back_to_sql(tmp_path):
+    assert scoring_arrays.load_scoring_arrays(tmp_path / "missing") is None
+    assert scoring_arrays.get_scoring_arrays() is None
+
+
+def test_stale_version_disables_arrays(tmp_path, arrays):
+    """A data version mismatch found by the background check turns the arrays off"""
+    arrays.save(tmp_path / "scoring_arrays")
+    assert scoring_arrays.load_scoring_arrays(tmp_path / "scoring_arrays") is not None
+    assert scoring_arrays.get_scoring_arrays_status()["status"] == "unverified"
+    assert scoring_arrays.get_scoring_arrays() is not None
+
+    scoring_arrays._version_status = "stale"
+    assert scoring_arrays.get_scoring_arrays() is None
@@ -0,0 +1,83 @@
+"""
+Form submission search tests (query building, LIKE escaping, keyset cursor paging)
+"""
+
+from datetime import datetime
+
+import pytest
+
+from app.services.submission_search import (
+    InvalidCursorError,
+    SubmissionSearch,
+    build_search_query,
+    decode_cursor,
+    encode_cursor,
+    like_pattern,
+    search_submissions,
+)
+
+
+def _row(submission_id, created_at):
+    return {
+        "id": submission_id, "session_id": f"s-{submission_id}", "industry": "食品", "target_segment": "女性20-34歳",
+        "purpose": '["認知拡大", "売上向上"]', "budget_range": "1,000万円未満", "company_name": "株式会社テスト",
+        "email": "a@example.com", "contact_name": "山田", "phone": "000", "genre_preference": "いいえ",
+        "preferred_genres": None, "created_at": created_at,
+    }
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    async def fetch(self, sql, *args):
+        self.calls.append((sql, args))
+        return self.rows[:args[-1]]
+
+
+def test_like_pattern_normalizes_and_escapes_wildcards():
+    assert like_pattern(" ＡＢＣ ") == "%ABC%"
+    assert like_pattern("100%_off\\") == "%100\\%\\_off\\\\%"
+
+
+def test_query_combines_text_filters_and_cursor():
+    cursor = encode_cursor(datetime(2025, 12, 1, 10, 0), 42)
+
+    sql, args = build_search_query(SubmissionSearch(q="テスト", industry="食品", limit=20, cursor=cursor))
+
+    assert "company_name ILIKE $1 OR contact_name ILIKE $1 OR email ILIKE $1" in sql
+    assert "industry = $2" in sql
+    assert "(created_at, id) < ($3, $4)" in sql
+    assert "ORDER BY created_at DESC, id DESC" in sql
+    assert args == ["%テスト%", "食品", datetime(2025, 12, 1, 10, 0), 42, 21]
+
+
+def test_query_without_conditions_has_no_where():
+    sql, args = build_search_query(SubmissionSearch(q="   "))
+
+    assert "WHERE" not in sql
+    assert args == [51]
+
+
+def test_cursor_round_trip_and_invalid_cursor():
+    created_at = datetime(2025, 12, 1, 10, 0, 0, 123456)
+
+    assert decode_cursor(encode_cursor(created_at, 7)) == (created_at, 7)
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_search_returns_next_cursor_only_when_more_rows_exist():
+    rows = [_row(i, datetime(2025, 12, 1, 10, 0, 0) if i > 1 else datetime(2025, 11, 1)) for i in (3, 2, 1)]
+
+    page = await search_submissions(FakeConnection(rows), SubmissionSearch(limit=2))
+    last = await search_submissions(FakeConnection(rows), SubmissionSearch(limit=3))
+
+    assert [item["id"] for item in page["items"]] == [3, 2]
+    assert page["has_more"] is True
+    assert decode_cursor(page["next_cursor"]) == (datetime(2025, 12, 1, 10, 0), 2)
+    assert page["items"][0]["purpose"] == "認知拡大, 売上向上"
+    assert page["items"][0]["created_at"] == "2025-12-01T10:00:00Z"
+    assert last["has_more"] is False and last["next_cursor"] is None
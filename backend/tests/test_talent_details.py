@@ -0,0 +1,108 @@
+"""
+Talent detail bundle tests (row conversion, set-based fetch, per-version caching)
+"""
+
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.core.http_cache import master_data_cache
+from app.schemas.matching import TalentResult
+from app.services import talent_details
+
+
+def bundle_row(account_id, cms=None, **overrides):
+    row = {
+        "account_id": account_id,
+        "last_name_kana": "やまだ",
+        "first_name_kana": "はなこ",
+        "pref_cd": 12,
+        "age": 30,
+        "cm_count": len(cms or []),
+        "recent_cms": [json.dumps(cm, ensure_ascii=False) for cm in cms] if cms else None,
+    }
+    row.update(overrides)
+    return row
+
+
+def test_build_bundle_formats_profile_and_cm_summary():
+    bundle = talent_details.build_bundle(bundle_row(7, cms=[
+        {"client_name": "飲料会社", "product_name": "", "use_period_start": "2025-01-01", "use_period_end": None},
+    ]))
+
+    assert bundle["kana"] == "やまだ はなこ"
+    assert bundle["birthplace"] == "東京都"
+    assert bundle["recent_cms"] == [{
+        "client_name": "飲料会社",
+        "product_name": "",
+        "use_period_start": "2025-01-01",
+        "use_period_end": "",
+        "category": "食品・飲料",
+    }]
+    # the bundle validates against the response schema
+    assert TalentResult(
+        account_id=7, name="山田花子", matching_score=90.0, ranking=1, details=bundle,
+    ).details.cm_count == 1
+
+
+def test_build_bundle_without_cm_history():
+    bundle = talent_details.build_bundle(bundle_row(8, last_name_kana=None, first_name_kana=None, pref_cd=None))
+
+    assert bundle["kana"] is None
+    assert bundle["birthplace"] is None
+    assert bundle["recent_cms"] == []
+
+
+class FakeDetailConnection:
+    def __init__(self):
+        self.calls = []
+
+    async def fetch(self, sql, account_ids, limit):
+        self.calls.append(list(account_ids))
+        # account 99 is deleted (del_flag = 1) so the query returns nothing for it
+        return [bundle_row(account_id) for account_id in account_ids if account_id != 99]
+
+
+@pytest.fixture
+def detail_env(monkeypatch):
+    conn = FakeDetailConnection()
+    version = {"value": "v1"}
+
+    @asynccontextmanager
+    async def fake_acquire():
+        yield conn
+
+    async def fake_version():
+        return version["value"]
+
+    monkeypatch.setattr("app.db.connection.acquire_connection", fake_acquire)
+    monkeypatch.setattr(master_data_cache, "current_version", fake_version)
+    return conn, version
+
+
+@pytest.mark.asyncio
+async def test_cache_fetches_only_missing_talents_in_one_query(detail_env):
+    conn, _ = detail_env
+    cache = talent_details.TalentDetailCache()
+
+    first = await cache.get_many([1, 2, 99])
+    second = await cache.get_many([2, 3, 1])
+
+    assert conn.calls == [[1, 2, 99], [3]]
+    assert list(first) == [1, 2]
+    assert list(second) == [2, 3, 1]
+    assert cache.stats.queries == 2
+
+
+@pytest.mark.asyncio
+async def test_cache_is_cleared_when_data_version_changes(detail_env):
+    conn, version = detail_env
+    cache = talent_details.TalentDetailCache()
+
+    await cache.get_many([1, 2])
+    version["value"] = "v2"
+    await cache.get_many([1, 2])
+
+    assert conn.calls == [[1, 2], [1, 2]]
+    assert cache.stats.invalidations == 1
@@ -0,0 +1,71 @@
+"""
+Talent typeahead search tests (normalization, romaji, ranking tiers and base-power tie-break)
+"""
+
+from app.services.name_normalization import normalize_name
+from app.services.talent_search import TalentSearchIndex, kana_to_romaji, normalize_text, romaji_variants, to_hiragana
+
+
+ROWS = [
+    {"account_id": 1, "name": "有吉弘行", "last_name_kana": "アリヨシ", "first_name_kana": "ヒロイキ", "category": "芸人", "base_power_score": 50},
+    {"account_id": 2, "name": "有村架純", "last_name_kana": "アリムラ", "first_name_kana": "カスミ", "category": "女優", "base_power_score": 70},
+    {"account_id": 3, "name": "新垣結衣", "last_name_kana": "アラガキ", "first_name_kana": "ユイ", "category": "女優", "base_power_score": 80},
+    {"account_id": 4, "name": "きゃりーぱみゅぱみゅ", "last_name_kana": "キャリーパミュパミュ", "first_name_kana": None, "category": "歌手", "base_power_score": None},
+    {"account_id": 5, "name": "大谷翔平", "last_name_kana": "オオタニ", "first_name_kana": "ショウヘイ", "category": "スポーツ", "base_power_score": 90},
+]
+
+
+def _ids(results):
+    return [r["account_id"] for r in results]
+
+
+def test_normalize_folds_width_kana_and_spaces():
+    assert normalize_text("ｱﾘﾖｼ　ﾋﾛｲｷ") == "ありよしひろいき"
+    assert normalize_text("ＡＲＩ") == "ari"
+    assert kana_to_romaji("きっちょむ") == "kitchomu"
+    assert kana_to_romaji(normalize_text("キャリーパミュパミュ")) == "kyaripamyupamyu"
+    # same rules as the VR importers' name normalization, plus kana/case folding
+    name = "Ｍｒ．　ビーン－"
+    assert normalize_text(name) == to_hiragana(normalize_name(name).replace(".", "")).lower()
+
+
+def test_romaji_variants_cover_long_vowel_spellings():
+    assert romaji_variants(kana_to_romaji("おおたに")) == ["ootani", "otani", "ohtani", "outani"]
+    assert set(romaji_variants("yuuko")) == {"yuuko", "yuko"}
+    assert romaji_variants("arimura") == ["arimura"]
+
+
+def test_search_matches_kanji_kana_and_romaji_forms():
+    index = TalentSearchIndex.from_rows(ROWS)
+
+    for query in ("有吉", "ありよし", "アリヨシ", "ｱﾘﾖｼ", "ariyoshi", "ARIYOSHI"):
+        assert _ids(index.search(query))[0] == 1, query
+    assert _ids(index.search("kyari")) == [4]
+    for query in ("otani", "ohtani", "ootani", "shohei", "shouhei"):
+        assert _ids(index.search(query)) == [5], query
+    assert index.search("zzz") == []
+    assert index.search("  ") == []
+
+
+def test_ranking_tiers_then_base_power():
+    index = TalentSearchIndex.from_rows(ROWS)
+
+    # both are prefix matches: higher base power first
+    assert _ids(index.search("あり")) == [2, 1]
+    # exact beats prefix regardless of base power
+    assert index.search("有吉弘行")[0]["match"] == "exact"
+    # given-name prefix ranks after full-name prefix
+    results = index.search("ゆい")
+    assert results[0]["account_id"] == 3 and results[0]["match"] == "part_prefix"
+
+
+def test_limit_caps_results():
+    rows = [
+        {"account_id": i, "name": f"田中{i}", "last_name_kana": "タナカ", "first_name_kana": None, "category": None, "base_power_score": i}
+        for i in range(50)
+    ]
+    index = TalentSearchIndex.from_rows(rows)
+
+    results = index.search("たなか", limit=5)
+
+    assert _ids(results) == [49, 48, 47, 46, 45]
@@ -0,0 +1,140 @@
+"""
+Tracing tests (span nesting, Server-Timing header, OTLP/JSON export)
+"""
+
+import asyncio
+import json
+import logging
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import tracing
+from app.core.config import settings
+from app.core.tracing import TracingMiddleware, query_span, record_span, span, to_otlp, traced
+
+
+@pytest.fixture
+def tracing_settings(monkeypatch):
+    monkeypatch.setattr(settings, "tracing_exporter", "log")
+    monkeypatch.setattr(settings, "tracing_sample_rate", 1.0)
+    monkeypatch.setattr(settings, "server_timing_enabled", True)
+    return settings
+
+
+@traced("matching.cm_check")
+async def _cm_check():
+    record_span("db.query", 0.002, **{"db.statement": "SELECT 1"})
+    return "ok"
+
+
+def _make_app():
+    app = FastAPI()
+
+    @app.get("/match")
+    async def match():
+        with span("matching.step0_4", backend="sql"):
+            record_span("db.acquire", 0.001)
+        await _cm_check()
+        await _cm_check()
+        return {"ok": True}
+
+    app.add_middleware(TracingMiddleware)
+    return app
+
+
+def _exported_spans(caplog):
+    records = [r for r in caplog.records if r.name == "app.tracing.export"]
+    assert len(records) == 1
+    payload = json.loads(records[0].getMessage())
+    return payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+
+
+def test_span_is_noop_outside_trace():
+    with span("matching.step5") as s:
+        assert s is None
+    record_span("db.query", 0.1)
+    assert tracing.current_span() is None
+
+
+def test_spans_nest_under_request_root(tracing_settings, caplog):
+    client = TestClient(_make_app())
+
+    with caplog.at_level(logging.INFO, logger="app.tracing.export"):
+        response = client.get("/match")
+
+    assert response.status_code == 200
+    spans = {s["name"]: s for s in _exported_spans(caplog)}
+    root = spans["GET /match"]
+    assert "parentSpanId" not in root
+    assert spans["matching.step0_4"]["parentSpanId"] == root["spanId"]
+    assert spans["db.acquire"]["parentSpanId"] == spans["matching.step0_4"]["spanId"]
+    assert {"key": "backend", "value": {"stringValue": "sql"}} in spans["matching.step0_4"]["attributes"]
+    assert {"key": "http.status_code", "value": {"intValue": "200"}} in root["attributes"]
+
+
+def test_server_timing_header_sums_repeated_stages(tracing_settings):
+    client = TestClient(_make_app())
+
+    header = client.get("/match").headers["server-timing"]
+
+    metrics = {m.split(";")[0]: m for m in header.split(", ")}
+    assert set(metrics) == {"matching.step0_4", "db.acquire", "matching.cm_check", "db.query", "total"}
+    assert 'desc="x2"' in metrics["matching.cm_check"]
+
+
+def test_server_timing_header_is_opt_in(tracing_settings):
+    tracing_settings.server_timing_enabled = False
+    client = TestClient(_make_app())
+
+    assert "server-timing" not in client.get("/match").headers
+
+
+def test_incoming_traceparent_is_continued(tracing_settings, caplog):
+    client = TestClient(_make_app())
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    parent_id = "00f067aa0ba902b7"
+
+    with caplog.at_level(logging.INFO, logger="app.tracing.export"):
+        client.get("/match", headers={"traceparent": f"00-{trace_id}-{parent_id}-01"})
+
+    spans = _exported_spans(caplog)
+    assert {s["traceId"] for s in spans} == {trace_id}
+    root = next(s for s in spans if s["name"] == "GET /match")
+    assert root["parentSpanId"] == parent_id
+
+
+def test_to_otlp_marks_errors():
+    trace = tracing.Trace(trace_id="0" * 32)
+    token = tracing._current_trace.set(trace)
+    try:
+        with pytest.raises(ValueError):
+            with span("matching.email"):
+                raise ValueError("smtp down")
+    finally:
+        tracing._current_trace.reset(token)
+
+    (exported,) = to_otlp(trace)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert exported["status"] == {"code": tracing.STATUS_ERROR, "message": "ValueError: smtp down"}
+
+
+@pytest.mark.asyncio
+async def test_text_fallback_inside_query_span_is_recorded_once():
+    """asyncpg calls the query logger via call_soon; queries run inside query_span are not recorded again"""
+    trace = tracing.Trace(trace_id="0" * 32)
+    token = tracing._current_trace.set(trace)
+    loop = asyncio.get_running_loop()
+    record = SimpleNamespace(query="SELECT 1", elapsed=0.001, exception=None)
+    try:
+        with query_span(**{"db.prepared_statement": "talent_names"}):
+            loop.call_soon(tracing.query_logger, record)
+        loop.call_soon(tracing.query_logger, record)
+        await asyncio.sleep(0)
+    finally:
+        tracing._current_trace.reset(token)
+
+    prepared, logged = [s for s in trace.spans if s.name == "db.query"]
+    assert prepared.attributes == {"db.system": "postgresql", "db.prepared_statement": "talent_names"}
+    assert logged.attributes["db.statement"] == "SELECT 1"